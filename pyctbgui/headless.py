@@ -0,0 +1,238 @@
+"""
+Acquisition and processing without the gui and without importing Qt
+
+The detector is configured from a parameter file (as written by File > Save Parameters of the gui) and the
+measurements are run with the same detector logic as the acquisition tab. The zmq stream of the receiver is
+copied into a shared memory ring and decoded in worker processes, pedestals are recorded or applied and the
+frames are written to numpy files.
+
+usage:
+    ctbgui-headless parameters.txt --measurements 10 --image --pedestal-frames 100 --workers 8
+    ctbgui-headless parameters.txt --scan dac3 500:1500:100 --scan adcphase 0,90,180 --measurements 2
+"""
+import argparse
+import json
+import logging
+import threading
+from pathlib import Path
+
+from slsdet import Detector
+
+from pyctbgui.processing.config import AcquisitionConfig
+from pyctbgui.processing.pipeline import ProcessingPipeline, SharedMemoryPipeline
+from pyctbgui.utils import measurement
+from pyctbgui.utils.frameSource import ZmqFrameSource
+from pyctbgui.utils.scan import Scan, ScanParameter, parseValues
+
+logger = logging.getLogger('headless')
+
+
+def readConfig(det) -> AcquisitionConfig:
+    """
+    read the settings needed to decode the data from the detector
+    """
+    adcMask = det.adcenable10g if det.tengiga else det.adcenable
+    return AcquisitionConfig(romode=det.romode.value,
+                             aSamples=det.asamples,
+                             dSamples=det.dsamples,
+                             tSamples=det.tsamples,
+                             adcMask=adcMask,
+                             dbitList=list(det.rx_dbitlist),
+                             dbitOffset=det.rx_dbitoffset,
+                             transceiverMask=det.transceiverenable)
+
+
+class HeadlessRunner:
+
+    def __init__(self, det, pipeline: ProcessingPipeline, source: ZmqFrameSource):
+        self.det = det
+        self.pipeline = pipeline
+        self.source = source
+        self.framesReceived = 0
+        # messages of measurements given up by waitForData, received after their timeout. Late frames of a
+        # measurement still running are dropped by the pipeline (pipeline.lateMessages)
+        self.lateMessages = 0
+        # file index of the measurement received (json header field 'fileIndex'), None once given up
+        self.fileIndex: int | None = None
+        # index of the acquisition of the run the received frames belong to (json header field 'acquisition')
+        self.acquisition = 0
+        self.watcher = measurement.MeasurementWatcher(det)
+        self.__stopped = threading.Event()
+        self.__endOfAcquisition = threading.Event()
+        self.__lock = threading.Lock()
+        self.__reader = threading.Thread(target=self.__readLoop, name='HeadlessReader', daemon=True)
+
+    def __readLoop(self):
+        while not self.__stopped.is_set():
+            msg = self.source.receive(timeoutMs=100)
+            if msg is None:
+                continue
+            fileIndex = self.fileIndex
+            if len(msg) != 2:
+                # dummy message sent by the receiver at the end of an acquisition
+                jsonHeader = json.loads(msg[0])
+                if jsonHeader.get('fileIndex') != fileIndex:
+                    # late message of a previous measurement, its end was already counted by waitForData
+                    self.lateMessages += 1
+                    continue
+                self.__nextAcquisition()
+                self.watcher.streamEnded(jsonHeader.get('fileIndex'))
+                self.__endOfAcquisition.set()
+                continue
+            if fileIndex is None:
+                self.lateMessages += 1
+                continue
+            # the json header is parsed and matched against the file index in the writer thread of the pipeline
+            with self.__lock:
+                self.pipeline.submit(msg[0], msg[1], {'acquisition': self.acquisition}, fileIndex)
+            self.framesReceived += 1
+
+    def __nextAcquisition(self):
+        with self.__lock:
+            self.pipeline.endOfAcquisition()
+            self.acquisition += 1
+
+    def startMeasurement(self):
+        """
+        @note: each measurement needs its own file index (findex), the messages are matched against it
+        """
+        self.fileIndex = self.det.findex
+        self.__endOfAcquisition.clear()
+        self.watcher.reset(self.fileIndex)
+        measurement.startMeasurement(self.det)
+
+    def waitForMeasurement(self) -> int:
+        """
+        wait until the detector is done and stop the receiver, frames may still be in the zmq stream
+        @return: frames caught by the receiver
+        """
+        caught, status = self.watcher.wait()
+        measurement.stopReceiver(self.det)
+        logger.info(f'measurement done, receiver caught {caught} frames')
+        return caught
+
+    def waitForData(self, timeout: float):
+        """
+        wait until all frames of the measurement are received
+        """
+        if not self.__endOfAcquisition.wait(timeout):
+            logger.warning('no end of acquisition message received')
+            self.fileIndex = None
+            self.__nextAcquisition()
+
+    def runMeasurement(self, timeout: float):
+        self.startMeasurement()
+        self.waitForMeasurement()
+        self.waitForData(timeout)
+
+    def startReader(self):
+        self.__reader.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__reader.join()
+        self.pipeline.close()
+        logger.info(f'received {self.framesReceived} frames, wrote {self.pipeline.framesWritten} frames, '
+                    f'{self.pipeline.errors} errors, '
+                    f'dropped {self.lateMessages + self.pipeline.lateMessages} late messages')
+
+    def run(self, nMeasurements: int, timeout: float = 5):
+        self.startReader()
+        try:
+            for i in range(nMeasurements):
+                logger.info(f'starting measurement {i + 1}/{nMeasurements} (file index {self.det.findex})')
+                self.runMeasurement(timeout)
+                self.det.findex += 1
+        finally:
+            self.stop()
+
+
+class ScanRunner(HeadlessRunner):
+    """
+    acquire at each point of a parameter grid, all points are written to a single file
+
+    the frames are saved with the index of their acquisition ('acquisition' array of the file), the metadata
+    next to the file maps the acquisitions to the scan points. The next point is configured as soon as the
+    detector is done, while the frames of the previous point are still received, decoded and written. Each
+    measurement gets the next file index.
+    """
+
+    def run(self, scan: Scan, repeats: int = 1, timeout: float = 5):
+        """
+        @param repeats: measurements per scan point
+        """
+        points = scan.points()
+        self.pipeline.metadata['scan'] = scan.metadata() | {'repeats': repeats}
+        self.startReader()
+        try:
+            measurement.applyScanPoint(self.det, points[0])
+            for i, point in enumerate(points):
+                logger.info(f'scan point {i + 1}/{len(points)}: {point}')
+                for repeat in range(repeats):
+                    self.startMeasurement()
+                    self.waitForMeasurement()
+                    if repeat == repeats - 1 and i + 1 < len(points):
+                        # configure the next point while the data of this one is still coming
+                        measurement.applyScanPoint(self.det, points[i + 1], point)
+                    self.waitForData(timeout)
+                    self.det.findex += 1
+        finally:
+            self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run ctb measurements and save numpy data without the gui')
+    parser.add_argument('parameters', type=Path, help='parameter file (File > Save Parameters in the gui)')
+    parser.add_argument('-n', '--measurements', type=int, default=1)
+    parser.add_argument('--image', action='store_true', help='decode images instead of waveforms')
+    parser.add_argument('--workers', type=int, help='decoding processes, defaults to the number of cpus')
+    parser.add_argument('--transport',
+                        choices=['shared-memory', 'pickle'],
+                        default='shared-memory',
+                        help='how frames are passed to the decoding processes')
+    parser.add_argument('--pedestal-frames', type=int, default=0, help='record a pedestal from the first frames')
+    parser.add_argument('--pedestal', type=Path, help='.npy pedestal file to subtract')
+    parser.add_argument('-o', '--output', type=Path, help='output directory, defaults to fpath of the detector')
+    parser.add_argument('--timeout', type=float, default=5, help='seconds to wait for the end of acquisition')
+    parser.add_argument('--scan',
+                        nargs=2,
+                        action='append',
+                        metavar=('PARAMETER', 'VALUES'),
+                        help='scan a parameter (dac<i>, adcphase, dbitphase, runclk, patwaittime<level>) over '
+                        'values (100,200 or start:stop:step), repeat for a grid. --measurements per point')
+    args = parser.parse_args(argv)
+    logging.basicConfig(encoding='utf-8', level=logging.INFO)
+    scan = None
+    if args.scan:
+        try:
+            scan = Scan([ScanParameter(name, parseValues(values)) for name, values in args.scan])
+        except ValueError as e:
+            parser.error(str(e))
+
+    det = Detector()
+    det.parameters = str(args.parameters)
+    det.rx_zmqstream = 1
+    config = readConfig(det)
+    logger.info(f'{config}')
+
+    pipelineClass = SharedMemoryPipeline if args.transport == 'shared-memory' else ProcessingPipeline
+    pipeline = pipelineClass(config,
+                             image=args.image,
+                             nWorkers=args.workers,
+                             outputDir=args.output if args.output is not None else Path(det.fpath),
+                             fileNamePrefix=det.fname or 'run',
+                             pedestalFrames=args.pedestal_frames,
+                             pedestalFile=args.pedestal,
+                             expectedFrames=det.frames * det.triggers,
+                             singleFile=scan is not None,
+                             headerKeys=['acquisition'] if scan is not None else [])
+    source = ZmqFrameSource(det.rx_zmqip, det.rx_zmqport)
+    if scan is not None:
+        ScanRunner(det, pipeline, source).run(scan, args.measurements, args.timeout)
+    else:
+        HeadlessRunner(det, pipeline, source).run(args.measurements, args.timeout)
+    source.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+from .config import AcquisitionConfig
+from .frameTracker import FrameTracker
+from .pedestal import Pedestal
+from .processors import FrameProcessor, analogImage, analogWaveform, digitalWaveform, transceiverImage, \
+    transceiverWaveform
@@ -0,0 +1,79 @@
+"""
+process recorded data without the gui
+
+usage:
+    python -m pyctbgui.processing run_0.zidx --romode analog --asamples 5000 --adcmask 0xFFFFFFFF -o out/run_0
+    python -m pyctbgui.processing raw.npy --romode transceiver --tsamples 288 --image --pedestal-frames 100
+
+the processed arrays are written to <output>_<key>.npy (keys: analog, digital, transceiver, analog_image, tx_image)
+"""
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from pyctbgui.processing.config import AcquisitionConfig
+from pyctbgui.processing.processors import FrameProcessor
+from pyctbgui.utils.fakeReceiver import ROMODES, addLayoutArguments
+from pyctbgui.utils.frameSource import FrameLogSource, NpyFrameSource
+from pyctbgui.utils.numpyWriter.npy_writer import NumpyFileManager
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Process recorded ctb data (.zidx zmq log or .npy raw frames)')
+    parser.add_argument('input', type=Path)
+    addLayoutArguments(parser)
+    parser.add_argument('--image', action='store_true', help='decode images instead of waveforms')
+    parser.add_argument('--pedestal-frames', type=int, default=0, help='record a pedestal from the first frames')
+    parser.add_argument('--pedestal', type=Path, help='.npy pedestal file to subtract')
+    parser.add_argument('-o', '--output', type=Path, help='output prefix, defaults to the input path')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger('processing')
+
+    config = AcquisitionConfig(ROMODES.index(args.romode), args.asamples, args.dsamples, args.tsamples, args.adcmask,
+                               args.dbitlist, args.dbitoffset, args.transceivermask)
+    processor = FrameProcessor(config, image=args.image)
+    output = args.output if args.output is not None else args.input.with_suffix('')
+    source = FrameLogSource(args.input, None) if args.input.suffix == '.zidx' else NpyFrameSource(args.input)
+
+    if args.pedestal is not None:
+        for key in processor.keys:
+            processor.pedestal(key).load(args.pedestal)
+
+    writers: dict[str, NumpyFileManager] = {}
+    nFrames = 0
+    for i in range(len(source)):
+        msg = source.message(i)
+        if len(msg) != 2:
+            continue
+        header, data = msg
+        processor.pedestalRecord = nFrames < args.pedestal_frames
+        processor.pedestalApply = args.pedestal is not None or nFrames >= args.pedestal_frames > 0
+        frames = processor.process(data)
+        nFrames += 1
+        if processor.pedestalRecord:
+            continue
+        for key, frame in frames.items():
+            if key not in writers:
+                path = output.with_name(f'{output.name}_{key}.npy')
+                writers[key] = NumpyFileManager(path, 'w', frame.shape, frame.dtype)
+            writers[key].writeOneFrame(frame)
+        if nFrames % 1000 == 0:
+            logger.info(f'processed {nFrames} frames (frameIndex {json.loads(header).get("frameIndex")})')
+
+    source.close()
+    for key, writer in writers.items():
+        logger.info(f'{writer.frameCount} frames written to {writer.file.name}')
+        writer.close()
+    for key, pedestal in processor.pedestals.items():
+        if pedestal.frameCount > 0:
+            path = output.with_name(f'{output.name}_{key}_pedestal.npy')
+            np.save(path, pedestal.calculate())
+            logger.info(f'pedestal of {pedestal.frameCount} frames saved to {path}')
+
+
+if __name__ == '__main__':
+    main()
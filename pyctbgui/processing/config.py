@@ -0,0 +1,42 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class AcquisitionConfig:
+    """
+    detector settings needed to interpret the raw data of a frame
+    @note: romode is the value of slsdet.readoutMode (0: analog, 1: digital, 2: analog_digital, 3: transceiver,
+    4: digital_transceiver)
+    """
+    romode: int = 0
+    aSamples: int = 0
+    dSamples: int = 0
+    tSamples: int = 0
+    adcMask: int = 0xFFFFFFFF
+    dbitList: list[int] = field(default_factory=list)
+    dbitOffset: int = 0
+    transceiverMask: int = 0x3
+
+    @property
+    def analog(self) -> bool:
+        return self.romode in [0, 2]
+
+    @property
+    def digital(self) -> bool:
+        return self.romode in [1, 2, 4]
+
+    @property
+    def transceiver(self) -> bool:
+        return self.romode in [3, 4]
+
+    @property
+    def nADCEnabled(self) -> int:
+        return bin(self.adcMask).count('1')
+
+    @property
+    def nDBitEnabled(self) -> int:
+        return len(self.dbitList)
+
+    @property
+    def nTransceiverEnabled(self) -> int:
+        return bin(self.transceiverMask).count('1')
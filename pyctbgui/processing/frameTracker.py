@@ -0,0 +1,101 @@
+"""
+completeness of an acquisition from the frameIndex of the zmq json headers
+
+frames dropped by zmq (high water mark reached) or by the receiver show up as gaps in the frame indices. The
+result is saved next to the numpy files of the acquisition (FrameTracker.metadataPath) so a file can be
+checked before it is trusted, e.g. for pedestals.
+"""
+import json
+from pathlib import Path
+
+
+class FrameTracker:
+
+    def __init__(self, expectedFrames: int | None = None):
+        """
+        @param expectedFrames: frames of the acquisition (frames * triggers), None if unknown
+        """
+        self.reset(expectedFrames)
+
+    def reset(self, expectedFrames: int | None = None):
+        self.expectedFrames = expectedFrames
+        self.received = 0
+        self.lastFrameIndex = -1
+        # (first missing frameIndex, number of missing frames)
+        self.gaps: list[tuple[int, int]] = []
+        self.outOfOrder = 0
+        self.finished = False
+
+    def update(self, frameIndex: int) -> int:
+        """
+        @return: number of frames missing before frameIndex
+        """
+        gap = frameIndex - self.lastFrameIndex - 1
+        if gap > 0:
+            self.gaps.append((self.lastFrameIndex + 1, gap))
+        elif gap < 0:
+            # repeated or late frame
+            self.outOfOrder += 1
+        self.lastFrameIndex = max(self.lastFrameIndex, frameIndex)
+        self.received += 1
+        return max(gap, 0)
+
+    def finish(self) -> int:
+        """
+        end of the acquisition, count the frames missing after the last received one
+        @return: number of frames missing after the last received one
+        """
+        if self.finished:
+            return 0
+        self.finished = True
+        if self.expectedFrames is not None and self.lastFrameIndex < self.expectedFrames - 1:
+            self.gaps.append((self.lastFrameIndex + 1, self.expectedFrames - 1 - self.lastFrameIndex))
+            return self.gaps[-1][1]
+        return 0
+
+    @property
+    def missing(self) -> int:
+        return sum(length for _, length in self.gaps)
+
+    @property
+    def lossRate(self) -> float:
+        total = self.received + self.missing
+        return self.missing / total if total else 0.0
+
+    @property
+    def complete(self) -> bool:
+        return self.missing == 0 and (self.expectedFrames is None or self.received >= self.expectedFrames)
+
+    def metadata(self) -> dict:
+        return {
+            'expectedFrames': self.expectedFrames,
+            'receivedFrames': self.received,
+            'missingFrames': self.missing,
+            'lossRate': self.lossRate,
+            'complete': self.complete,
+            'outOfOrderFrames': self.outOfOrder,
+            'gaps': [list(gap) for gap in self.gaps],
+        }
+
+    def save(self, dataPath: Path, extra: dict | None = None) -> Path:
+        """
+        write the metadata next to the numpy file dataPath
+        @param extra: additional settings of the acquisition to save (e.g. zmq high water mark)
+        @return: path of the metadata file
+        """
+        path = self.metadataPath(dataPath)
+        with open(path, 'w') as f:
+            json.dump(self.metadata() | (extra or {}), f, indent=2)
+        return path
+
+    @staticmethod
+    def metadataPath(dataPath: Path) -> Path:
+        return Path(dataPath).with_suffix('.json')
+
+    @staticmethod
+    def load(dataPath: Path) -> dict:
+        """
+        @return: metadata saved for the numpy file dataPath
+        """
+        with open(FrameTracker.metadataPath(dataPath)) as f:
+            return json.load(f)
@@ -0,0 +1,77 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+
+
+class Pedestal:
+    """
+    running average of recorded frames that is subtracted from the processed frames
+
+    a pedestal is recorded for frames of one shape, recording a frame with a different shape starts over
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('Pedestal')
+        self.frameCount = 0
+        self.loaded = False
+        self.__sum = np.array(0, np.float64)
+        self.__pedestal = np.array(0, np.float64)
+
+    def reset(self):
+        self.frameCount = 0
+        self.loaded = False
+        self.__sum = np.array(0, np.float64)
+        self.__pedestal = np.array(0, np.float64)
+
+    def calculate(self) -> np.ndarray:
+        """
+        @return: the loaded pedestal or the average of the recorded frames
+        """
+        if self.loaded:
+            return self.__pedestal
+        if self.frameCount == 0:
+            self.__pedestal = np.array(0, np.float64)
+        else:
+            self.__pedestal = self.__sum / self.frameCount
+        return self.__pedestal
+
+    def checkShape(self, frame: np.ndarray) -> bool:
+        """
+        reset the recorded pedestal if its shape does not match the frame
+        @return: False if the pedestal was reset
+        """
+        if self.frameCount > 0 and self.__sum.shape != frame.shape:
+            self.logger.info('pedestal shape mismatch. resetting pedestal...')
+            self.reset()
+            return False
+        return True
+
+    def record(self, frame: np.ndarray) -> np.ndarray:
+        """
+        add a frame to the pedestal
+        @return: the frame untouched
+        """
+        if self.loaded:
+            # reset loaded pedestal if we acquire in record mode
+            self.logger.warning('resetting loaded pedestal...')
+            self.reset()
+        self.checkShape(frame)
+        self.frameCount += 1
+        self.__sum = np.add(self.__sum, frame, dtype=np.float64)
+        return frame
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """
+        @return: frame - pedestal
+        """
+        return frame - self.calculate()
+
+    def save(self, path: Path):
+        np.save(path, self.calculate())
+
+    def load(self, path: Path):
+        pedestal = np.load(path)
+        self.reset()
+        self.loaded = True
+        self.__pedestal = pedestal
@@ -0,0 +1,426 @@
+"""
+parallel processing of a stream of frames
+
+frames are decoded in worker processes (decoding holds the GIL), a pedestal loaded from file is subtracted by
+the workers as well. The json headers are parsed, recorded pedestals are handled and the results are written to
+numpy files in a writer thread, in the order the frames were submitted.
+
+ProcessingPipeline pickles the frames to a process pool, SharedMemoryPipeline passes them through shared
+memory rings which avoids serializing large frames (e.g. moench04 images) twice.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from pyctbgui.processing.config import AcquisitionConfig
+from pyctbgui.processing.frameTracker import FrameTracker
+from pyctbgui.processing.processors import FrameProcessor
+from pyctbgui.processing.sharedRing import FrameLayout, SharedRing
+from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.numpyWriter.npy_writer import NumpyFileManager
+from pyctbgui.utils.numpyWriter.npz_writer import NpzFileWriter
+
+# processor of the worker processes
+__workerProcessor: FrameProcessor | None = None
+
+
+def workerProcessor(config: AcquisitionConfig, image: bool, pedestalFile: Path | None) -> FrameProcessor:
+    """
+    processor of the worker processes, subtracting the pedestal of pedestalFile (stateless) if given
+    """
+    processor = FrameProcessor(config, image=image, pedestalApply=pedestalFile is not None)
+    if pedestalFile is not None:
+        for key in processor.keys:
+            processor.pedestal(key).load(pedestalFile)
+    return processor
+
+
+def _initWorker(config: AcquisitionConfig, image: bool, pedestalFile: Path | None):
+    global __workerProcessor
+    __workerProcessor = workerProcessor(config, image, pedestalFile)
+
+
+def _decode(data: bytes) -> dict[str, np.ndarray]:
+    return __workerProcessor.process(data)
+
+
+def _sharedRingWorker(config: AcquisitionConfig, image: bool, pedestalFile: Path | None, nSlots: int, inputName: str,
+                      inputSlotSize: int, outputName: str, layout: FrameLayout, tasks, results):
+    """
+    decode the payloads of the input ring into the slots of the output ring until None is received
+    """
+    processor = workerProcessor(config, image, pedestalFile)
+    inputRing = SharedRing(nSlots, inputSlotSize, inputName)
+    outputRing = SharedRing(nSlots, layout.size, outputName)
+    try:
+        for seq, slot, size in iter(tasks.get, None):
+            try:
+                layout.write(outputRing.slot(slot), processor.process(inputRing.slot(slot)[:size]))
+                results.put((seq, None))
+            except Exception as e:
+                results.put((seq, repr(e)))
+    finally:
+        inputRing.close()
+        outputRing.close()
+
+
+class ProcessingPipeline:
+    END_OF_ACQUISITION = object()
+    STOP = object()
+
+    def __init__(self,
+                 config: AcquisitionConfig,
+                 image: bool = False,
+                 nWorkers: int | None = None,
+                 outputDir: Path = Path('./'),
+                 fileNamePrefix: str = 'run',
+                 pedestalFrames: int = 0,
+                 pedestalFile: Path | None = None,
+                 expectedFrames: int | None = None,
+                 singleFile: bool = False,
+                 headerKeys: list[str] = ()):
+        """
+        @param nWorkers: number of decoding processes, defaults to the number of cpus
+        @param pedestalFrames: number of frames of the first acquisition recorded as pedestal (not written)
+        @param pedestalFile: .npy pedestal subtracted from all frames
+        @param expectedFrames: frames per acquisition, used to detect frames lost at the end of an acquisition
+        @param singleFile: write all acquisitions to one file (closed by close()) instead of one file each
+        @param headerKeys: json header fields saved as an array next to the frames (e.g. 'frameNumber')
+        """
+        self.logger = logging.getLogger('ProcessingPipeline')
+        self.nWorkers = nWorkers if nWorkers is not None else (os.cpu_count() or 1)
+        self.outputDir = Path(outputDir)
+        self.fileNamePrefix = fileNamePrefix
+        self.pedestalFrames = pedestalFrames
+        # without recording, the pedestal of the file is subtracted by the workers
+        self.workerPedestalFile = pedestalFile if pedestalFrames == 0 else None
+        self.processor = FrameProcessor(config, image=image, pedestalApply=pedestalFile is not None)
+        if pedestalFile is not None:
+            for key in self.processor.keys:
+                self.processor.pedestal(key).load(pedestalFile)
+        self.numpyFileManagers: dict[str, NumpyFileManager] = {}
+        self.frameTracker = FrameTracker(expectedFrames)
+        self.singleFile = singleFile
+        self.headerKeys = list(headerKeys)
+        # saved with the frame metadata next to the numpy files
+        self.metadata: dict = {}
+        # frame metadata of each acquisition in single file mode
+        self.acquisitions: list[dict] = []
+        self.savedFiles: list[Path] = []
+        self.framesProcessed = 0
+        self.framesWritten = 0
+        self.errors = 0
+        # frames dropped because of their file index, see submit
+        self.lateMessages = 0
+
+        self._startWorkers(config, image)
+        # bounds the frames in flight, the zmq high water mark takes over once it is full
+        self.__pending = queue.Queue(maxsize=4 * self.nWorkers)
+        self.__fileIndex = 0
+        self.__writer = threading.Thread(target=self.__writeLoop, name='ProcessingPipelineWriter', daemon=True)
+        self.__writer.start()
+
+    def _startWorkers(self, config: AcquisitionConfig, image: bool):
+        # decoding does not need much state, spawn avoids forking the threads of zmq
+        self.__executor = ProcessPoolExecutor(self.nWorkers,
+                                              mp_context=multiprocessing.get_context('spawn'),
+                                              initializer=_initWorker,
+                                              initargs=(config, image, self.workerPedestalFile))
+
+    def _decodeAsync(self, data: bytes):
+        """
+        hand the frame to the workers
+        @return: object whose result() blocks until the decoded frames are available
+        """
+        return self.__executor.submit(_decode, data)
+
+    def _stopWorkers(self):
+        self.__executor.shutdown()
+
+    def submit(self, header: dict | bytes, data: bytes, fields: dict | None = None, fileIndex: int | None = None):
+        """
+        @param header: json header of the frame, or the json of the zmq message (parsed in the writer thread)
+        @param fields: added to the json header, e.g. {'acquisition': 2}
+        @param fileIndex: if given, the frame is dropped (counted in lateMessages) if the file index of its json
+        header differs, e.g. a late message of a previous measurement
+        """
+        self.__pending.put(((header, fields, fileIndex), self._decodeAsync(data)))
+
+    def endOfAcquisition(self):
+        """
+        close the numpy files of the current acquisition once all submitted frames are written (unless all
+        acquisitions go to a single file)
+        """
+        self.__pending.put((self.END_OF_ACQUISITION, None))
+
+    def join(self):
+        """
+        wait until all submitted frames are written
+        """
+        self.__pending.join()
+
+    def close(self):
+        self.endOfAcquisition()
+        self.__pending.put((self.STOP, None))
+        self.__writer.join()
+        self._stopWorkers()
+
+    def __writeLoop(self):
+        while True:
+            item, future = self.__pending.get()
+            try:
+                if item is self.STOP:
+                    self.__closeFiles()
+                    break
+                if item is self.END_OF_ACQUISITION:
+                    self.__endAcquisition()
+                    continue
+                header, fields, fileIndex = item
+                jsonHeader = json.loads(header) if isinstance(header, bytes | bytearray | memoryview) else header
+                if fields:
+                    jsonHeader = jsonHeader | fields
+                if fileIndex is not None and jsonHeader.get('fileIndex') != fileIndex:
+                    self.lateMessages += 1
+                    continue
+                self.frameTracker.update(jsonHeader['frameIndex'])
+                self.__write(jsonHeader, future.result())
+            except Exception:
+                self.errors += 1
+                self.logger.exception('Exception caught')
+            finally:
+                self.__pending.task_done()
+
+    def __write(self, jsonHeader: dict, frames: dict[str, np.ndarray]):
+        record = self.framesProcessed < self.pedestalFrames
+        if self.workerPedestalFile is None:
+            self.processor.pedestalRecord = record
+            if self.pedestalFrames > 0 and not record:
+                self.processor.pedestalApply = True
+            frames = {key: self.processor.applyPedestal(key, frame) for key, frame in frames.items()}
+        self.framesProcessed += 1
+        if record:
+            return
+        for key in self.headerKeys:
+            frames[key] = np.asarray(jsonHeader[key])
+
+        if len(self.numpyFileManagers) == 0:
+            # single files are named after their first acquisition
+            self.__fileIndex = jsonHeader.get('fileIndex', 0)
+        for key, frame in frames.items():
+            if key not in self.numpyFileManagers:
+                path = self.outputDir / f'{self.fileNamePrefix}_{key}_{self.__fileIndex}.npy'
+                self.numpyFileManagers[key] = NumpyFileManager(path,
+                                                               'w',
+                                                               frame.shape,
+                                                               frame.dtype,
+                                                               checkpointFrames=Defines.Numpy_checkpoint_frames,
+                                                               checkpointSeconds=Defines.Numpy_checkpoint_seconds)
+            self.numpyFileManagers[key].writeOneFrame(frame)
+        self.framesWritten += 1
+        if jsonHeader.get('progress', 0) >= 100 and not self.singleFile:
+            self.__closeFiles()
+
+    def __endAcquisition(self):
+        if not self.singleFile:
+            self.__closeFiles()
+            return
+        if self.frameTracker.received > 0:
+            self.frameTracker.finish()
+            self.acquisitions.append(self.frameTracker.metadata())
+        self.frameTracker.reset(self.frameTracker.expectedFrames)
+
+    def __closeFiles(self):
+        if len(self.numpyFileManagers) == 0:
+            self.frameTracker.reset(self.frameTracker.expectedFrames)
+            return
+        newPath = NpzFileWriter.bundleNpyFiles(self.numpyFileManagers,
+                                               self.outputDir / f'{self.fileNamePrefix}_{self.__fileIndex}')
+        self.numpyFileManagers.clear()
+        self.savedFiles.append(newPath)
+        if self.singleFile:
+            with open(FrameTracker.metadataPath(newPath), 'w') as f:
+                json.dump({'acquisitions': self.acquisitions} | self.metadata, f, indent=2)
+        else:
+            self.frameTracker.finish()
+            self.frameTracker.save(newPath, self.metadata)
+            if not self.frameTracker.complete:
+                self.logger.warning(f'{newPath} is missing {self.frameTracker.missing} frames '
+                                    f'({100 * self.frameTracker.lossRate:.2f}%)')
+            self.frameTracker.reset(self.frameTracker.expectedFrames)
+        self.logger.info(f'Saving numpy data in {newPath} Finished')
+
+
+class SharedMemoryPipeline(ProcessingPipeline):
+    """
+    ProcessingPipeline passing the frames to and from the worker processes through shared memory rings
+
+    the payload is copied once into a free slot of the input ring, the workers decode it in parallel into the
+    same slot of the output ring and the writer gets the frames in submission order. The rings are allocated
+    with the first frame, its size and decoded shapes are used for every slot.
+
+    A worker dying (e.g. killed when out of memory) takes the frame it decoded with it: all frames in flight and
+    submitted afterwards fail instead of waiting for it forever.
+    """
+    # seconds between checks of the workers while waiting for a result or a free slot
+    workerPollInterval = 0.5
+    # seconds a worker has to exit when stopping before it is terminated
+    workerStopTimeout = 5
+
+    def __init__(self, *args, nSlots: int | None = None, **kwargs):
+        """
+        @param nSlots: number of frames in flight, defaults to enough slots to keep all workers busy
+        """
+        self.nSlots = nSlots
+        super().__init__(*args, **kwargs)
+
+    def _startWorkers(self, config: AcquisitionConfig, image: bool):
+        if self.nSlots is None:
+            # frames queued for the writer + the one being written
+            self.nSlots = 4 * self.nWorkers + 2
+        self.__config = config
+        self.__image = image
+        self.__inputRing: SharedRing | None = None
+        self.__outputRing: SharedRing | None = None
+        self.__layout: FrameLayout | None = None
+        self.__workers = []
+        self.__submitted = 0
+        self.__inFlight: dict[int, tuple[int, Future]] = {}
+        # guards __inFlight and __workerError, shared by the submitting and the collector threads
+        self.__lock = threading.Lock()
+        self.__workerError: str | None = None
+        self.__stopping = False
+        self.__collectorStopped = threading.Event()
+
+    def __allocate(self, data: bytes):
+        frames = self.processor.decode(data)
+        if self.workerPedestalFile is not None:
+            # the workers subtract the loaded pedestals (and check their shape)
+            frames = {
+                key: frame.astype(np.result_type(frame.dtype,
+                                                 self.processor.pedestal(key).calculate().dtype))
+                for key, frame in frames.items()
+            }
+        self.__layout = FrameLayout(frames)
+        self.__inputRing = SharedRing(self.nSlots, len(data))
+        self.__outputRing = SharedRing(self.nSlots, self.__layout.size)
+        self.__freeSlots = queue.Queue()
+        for slot in range(self.nSlots):
+            self.__freeSlots.put(slot)
+        context = multiprocessing.get_context('spawn')
+        self.__tasks = context.Queue()
+        self.__results = context.Queue()
+        for _ in range(self.nWorkers):
+            worker = context.Process(target=_sharedRingWorker,
+                                     args=(self.__config, self.__image, self.workerPedestalFile, self.nSlots,
+                                           self.__inputRing.name, self.__inputRing.slotSize, self.__outputRing.name,
+                                           self.__layout, self.__tasks, self.__results),
+                                     daemon=True)
+            worker.start()
+            self.__workers.append(worker)
+        self.__collector = threading.Thread(target=self.__collectLoop, name='SharedMemoryCollector', daemon=True)
+        self.__collector.start()
+
+    def __collectLoop(self):
+        while True:
+            self.__checkWorkers()
+            try:
+                result = self.__results.get(timeout=self.workerPollInterval)
+            except queue.Empty:
+                if self.__collectorStopped.is_set():
+                    return
+                continue
+            if result is None:
+                return
+            seq, error = result
+            with self.__lock:
+                slot, future = self.__inFlight.pop(seq, (None, None))
+            if future is None:
+                # already failed by a dead worker
+                continue
+            if error is None:
+                future.set_result(self.__layout.read(self.__outputRing.slot(slot)))
+            else:
+                future.set_exception(RuntimeError(error))
+            self.__freeSlots.put(slot)
+
+    def __checkWorkers(self):
+        """
+        fail all frames in flight if a worker died
+        """
+        if self.__stopping or self.__workerError is not None:
+            return
+        dead = [worker for worker in self.__workers if worker.exitcode is not None]
+        if not dead:
+            return
+        error = f'decoding worker {dead[0].pid} died (exit code {dead[0].exitcode})'
+        self.logger.error(error)
+        with self.__lock:
+            self.__workerError = error
+            inFlight = list(self.__inFlight.values())
+            self.__inFlight.clear()
+        for _, future in inFlight:
+            future.set_exception(RuntimeError(error))
+
+    def __failed(self, future: Future) -> Future:
+        future.set_exception(RuntimeError(self.__workerError))
+        return future
+
+    def _decodeAsync(self, data: bytes) -> Future:
+        if self.__inputRing is None:
+            self.__allocate(data)
+        future = Future()
+        if len(data) > self.__inputRing.slotSize:
+            future.set_exception(
+                ValueError(f'frame of {len(data)} bytes is larger than the slots ({self.__inputRing.slotSize} bytes)'))
+            return future
+        # blocks while all slots are in use
+        while True:
+            if self.__workerError is not None:
+                return self.__failed(future)
+            try:
+                slot = self.__freeSlots.get(timeout=self.workerPollInterval)
+                break
+            except queue.Empty:
+                continue
+        size = self.__inputRing.write(slot, data)
+        with self.__lock:
+            if self.__workerError is not None:
+                return self.__failed(future)
+            seq = self.__submitted
+            self.__submitted += 1
+            self.__inFlight[seq] = (slot, future)
+        self.__tasks.put((seq, slot, size))
+        return future
+
+    def _stopWorkers(self):
+        if self.__inputRing is None:
+            return
+        self.__stopping = True
+        for _ in self.__workers:
+            self.__tasks.put(None)
+        for worker in self.__workers:
+            worker.join(self.workerStopTimeout)
+            if worker.is_alive():
+                self.logger.warning(f'decoding worker {worker.pid} did not stop, terminating it')
+                worker.terminate()
+                worker.join()
+        self.__collectorStopped.set()
+        if self.__workerError is None:
+            self.__results.put(None)
+        else:
+            # the tasks of the dead worker are never read, do not wait for them to be sent at exit. A worker killed
+            # while sending a result can leave the results queue locked or a message cut, the collector stops
+            # after its next poll instead of waiting for None
+            self.__tasks.cancel_join_thread()
+        self.__collector.join(self.workerStopTimeout)
+        if self.__collector.is_alive():
+            self.logger.warning('shared memory collector did not stop')
+        self.__inputRing.close()
+        self.__outputRing.close()
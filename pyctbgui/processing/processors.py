@@ -0,0 +1,176 @@
+"""
+processing of the raw frames sent by the receiver
+
+the functions are stateless and only depend on their arguments. FrameProcessor bundles them for a given
+AcquisitionConfig and keeps the pedestal state of each kind of data.
+"""
+from functools import cache
+
+import numpy as np
+
+from pyctbgui.processing.config import AcquisitionConfig
+from pyctbgui.processing.pedestal import Pedestal
+from pyctbgui.utils import decoder
+import pyctbgui.utils.pixelmap as pm
+
+
+@cache
+def moench04AnalogPixelMap() -> np.ndarray:
+    # generating the pixel maps is slower than decoding a frame, build them once
+    return pm.moench04_analog()
+
+
+@cache
+def matterhornTransceiverPixelMap() -> np.ndarray:
+    return pm.matterhorn_transceiver()
+
+
+def digitalBytesPerBit(dSamples: int) -> int:
+    """
+    the receiver groups the samples of each digital bit and pads them to a full byte
+    """
+    return (dSamples + 7) // 8
+
+
+def analogWaveform(data: bytes, aSamples: int, nADCEnabled: int) -> np.ndarray:
+    """
+    @return: array of shape (aSamples, nADCEnabled)
+    """
+    analog_array = np.array(np.frombuffer(data, dtype=np.uint16, count=nADCEnabled * aSamples))
+    return analog_array.reshape(-1, nADCEnabled)
+
+
+def analogImage(data: bytes, aSamples: int, nADCEnabled: int, pixelMap: np.ndarray = None) -> np.ndarray:
+    """
+    @param pixelMap: defaults to the moench04 analog pixel map
+    """
+    analog_array = np.frombuffer(data, dtype=np.uint16, count=nADCEnabled * aSamples)
+    return decoder.decode(analog_array, pixelMap if pixelMap is not None else moench04AnalogPixelMap())
+
+
+def digitalWaveform(data: bytes, aSamples: int, dSamples: int, nDBitEnabled: int, dbitOffset: int, romode: int,
+                    nADCEnabled: int) -> np.ndarray:
+    """
+    @return: float64 array of shape (nDBitEnabled, dSamples) with the value (0 or 1) of each bit for each sample,
+    the dtype of the digital waveforms saved by earlier versions
+    """
+    offset = dbitOffset
+    if romode == 2:
+        offset += nADCEnabled * 2 * aSamples
+    nBytes = digitalBytesPerBit(dSamples)
+    digital_array = np.frombuffer(data, offset=offset, dtype=np.uint8, count=nDBitEnabled * nBytes)
+    bits = np.unpackbits(digital_array.reshape(nDBitEnabled, nBytes), axis=1, bitorder='little')
+    return bits[:, :dSamples].astype(np.float64)
+
+
+def transceiverOffset(dSamples: int, romode: int, nDBitEnabled: int) -> int:
+    """
+    @return: offset in bytes of the transceiver data (it follows the digital data in digital_transceiver mode)
+    """
+    if romode == 4:
+        return nDBitEnabled * digitalBytesPerBit(dSamples)
+    return 0
+
+
+def transceiverWaveform(data: bytes, dSamples: int, romode: int, nDBitEnabled: int,
+                        nTransceiverEnabled: int) -> np.ndarray:
+    """
+    @return: array of shape (-1, nTransceiverEnabled)
+    """
+    offset = transceiverOffset(dSamples, romode, nDBitEnabled)
+    trans_array = np.array(np.frombuffer(data, offset=offset, dtype=np.uint16))
+    return trans_array.reshape(-1, nTransceiverEnabled)
+
+
+def transceiverImage(data: bytes,
+                     dSamples: int,
+                     romode: int,
+                     nDBitEnabled: int,
+                     pixelMap: np.ndarray = None) -> np.ndarray:
+    """
+    @param pixelMap: defaults to the matterhorn transceiver pixel map
+    """
+    offset = transceiverOffset(dSamples, romode, nDBitEnabled)
+    trans_array = np.frombuffer(data, offset=offset, dtype=np.uint16)
+    return decoder.decode(trans_array, pixelMap if pixelMap is not None else matterhornTransceiverPixelMap())
+
+
+class FrameProcessor:
+    """
+    stateful processor turning raw frames into the arrays shown and saved by the gui
+
+    the keys of the returned dict are 'analog', 'digital' and 'transceiver' for waveforms and
+    'analog_image' and 'tx_image' for images
+    """
+
+    def __init__(self,
+                 config: AcquisitionConfig,
+                 image: bool = False,
+                 pedestalRecord: bool = False,
+                 pedestalApply: bool = False):
+        self.config = config
+        self.image = image
+        self.pedestalRecord = pedestalRecord
+        self.pedestalApply = pedestalApply
+        self.pedestals: dict[str, Pedestal] = {}
+
+    @property
+    def keys(self) -> list[str]:
+        """
+        keys of the dict returned by process()
+        """
+        config = self.config
+        if self.image:
+            enabled = {'analog_image': config.analog, 'tx_image': config.transceiver}
+        else:
+            enabled = {'analog': config.analog, 'digital': config.digital, 'transceiver': config.transceiver}
+        return [key for key, isEnabled in enabled.items() if isEnabled]
+
+    def pedestal(self, key: str) -> Pedestal:
+        if key not in self.pedestals:
+            self.pedestals[key] = Pedestal()
+        return self.pedestals[key]
+
+    def applyPedestal(self, key: str, frame: np.ndarray) -> np.ndarray:
+        """
+        record the frame in the pedestal of key or subtract the pedestal depending on the mode
+        """
+        if self.pedestalRecord:
+            return self.pedestal(key).record(frame)
+        if self.pedestalApply and key in self.pedestals:
+            pedestal = self.pedestals[key]
+            pedestal.checkShape(frame)
+            # unlike a recorded pedestal, a loaded one is not reset, numpy would broadcast it or fail obscurely
+            if pedestal.loaded and pedestal.calculate().shape != frame.shape:
+                raise ValueError(f'loaded {key} pedestal of shape {pedestal.calculate().shape} does not match the '
+                                 f'{key} frames of shape {frame.shape}')
+            return pedestal.apply(frame)
+        return frame
+
+    def process(self, data: bytes) -> dict[str, np.ndarray]:
+        """
+        decode the frame and record or apply the pedestals
+        """
+        return {key: self.applyPedestal(key, frame) for key, frame in self.decode(data).items()}
+
+    def decode(self, data: bytes) -> dict[str, np.ndarray]:
+        """
+        decode the frame without pedestal handling (stateless, can run in worker processes)
+        """
+        config = self.config
+        out = {}
+        if self.image:
+            if config.analog:
+                out['analog_image'] = analogImage(data, config.aSamples, config.nADCEnabled)
+            if config.transceiver:
+                out['tx_image'] = transceiverImage(data, config.dSamples, config.romode, config.nDBitEnabled)
+        else:
+            if config.analog:
+                out['analog'] = analogWaveform(data, config.aSamples, config.nADCEnabled)
+            if config.digital:
+                out['digital'] = digitalWaveform(data, config.aSamples, config.dSamples, config.nDBitEnabled,
+                                                 config.dbitOffset, config.romode, config.nADCEnabled)
+            if config.transceiver:
+                out['transceiver'] = transceiverWaveform(data, config.dSamples, config.romode, config.nDBitEnabled,
+                                                         config.nTransceiverEnabled)
+        return out
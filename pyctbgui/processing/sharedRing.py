@@ -0,0 +1,100 @@
+"""
+shared memory transport of frames between processes
+
+A SharedRing is one block of shared memory split into fixed size slots. The ingest side copies each payload
+into a free slot and only the slot index is sent to the worker processes, which decode straight from the slot
+and store the decoded arrays in the slot of the same index of an output ring (laid out by a FrameLayout).
+Only small tuples go through the multiprocessing queues, the frames themselves are never pickled.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedRing:
+
+    def __init__(self, nSlots: int, slotSize: int, name: str | None = None):
+        """
+        @param slotSize: size of a slot in bytes
+        @param name: name of an existing ring to attach to, a new ring is created if None
+        """
+        self.nSlots = nSlots
+        self.slotSize = slotSize
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=max(nSlots * slotSize, 1))
+        self.buffer = np.ndarray((nSlots, slotSize), dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def slot(self, i: int) -> np.ndarray:
+        """
+        @return: uint8 view of the i-th slot
+        """
+        return self.buffer[i]
+
+    def write(self, i: int, data: bytes) -> int:
+        """
+        copy data to the beginning of the i-th slot
+        @return: number of bytes written
+        """
+        size = len(data)
+        if size > self.slotSize:
+            raise ValueError(f'{size} bytes do not fit in a slot of {self.slotSize} bytes')
+        self.buffer[i, :size] = np.frombuffer(data, dtype=np.uint8)
+        return size
+
+    def close(self):
+        """
+        detach from the shared memory, the process which created the ring also frees it
+        """
+        # the exported buffer has to be released before the shared memory can be closed
+        self.buffer = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class FrameLayout:
+    """
+    position of the arrays of a decoded frame (dict key -> array) inside a slot
+    """
+
+    def __init__(self, frames: dict[str, np.ndarray]):
+        """
+        @param frames: decoded frame used as template for the keys, shapes and dtypes
+        """
+        self.entries = []
+        offset = 0
+        for key, frame in frames.items():
+            dtype = frame.dtype
+            # keep every array aligned to its item size
+            offset += -offset % dtype.itemsize
+            self.entries.append((key, frame.shape, dtype, offset))
+            offset += frame.nbytes
+        self.size = offset
+
+    def views(self, slot: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        @return: arrays viewing the memory of the slot
+        """
+        return {
+            key: np.ndarray(shape, dtype=dtype, buffer=slot, offset=offset)
+            for key, shape, dtype, offset in self.entries
+        }
+
+    def write(self, slot: np.ndarray, frames: dict[str, np.ndarray]):
+        views = self.views(slot)
+        if views.keys() != frames.keys():
+            raise ValueError(f'frame keys {list(frames)} do not match the layout {list(views)}')
+        for key, frame in frames.items():
+            if frame.shape != views[key].shape:
+                raise ValueError(f'{key} frame of shape {frame.shape} does not match the layout {views[key].shape}')
+            views[key][...] = frame
+
+    def read(self, slot: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        @return: copies of the arrays of the slot, the slot can be reused afterwards
+        """
+        return {key: view.copy() for key, view in self.views(slot).items()}
@@ -1,18 +1,19 @@
 import logging
 import typing
 from functools import partial
-from pathlib import Path
 
 import numpy as np
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 import pyqtgraph as pg
 from pyqtgraph import LegendItem
 
-from pyctbgui.utils import decoder
+from pyctbgui import processing
 from pyctbgui.utils.bit_utils import bit_is_set, manipulate_bit
 from pyctbgui.utils.defines import Defines
-import pyctbgui.utils.pixelmap as pm
+from pyctbgui.utils.detectorQueue import showWritten
 from pyctbgui.utils.recordOrApplyPedestal import recordOrApplyPedestal
+from pyctbgui.utils.uiLoader import loadUi
+from pyctbgui.utils.waveformCurves import WaveformCurves
 
 if typing.TYPE_CHECKING:
     from pyctbgui.services import AcquisitionTab, PlotTab
@@ -22,7 +23,7 @@ class AdcTab(QtWidgets.QWidget):
 
     def __init__(self, parent, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "adc.ui", parent)
+        loadUi('adc', parent)
         self.view = parent
         self.mainWindow = None
         self.det = None
@@ -47,15 +48,8 @@ class AdcTab(QtWidgets.QWidget):
         self.mainWindow.plotAnalogWaveform = pg.plot()
         self.mainWindow.plotAnalogWaveform.addLegend(colCount=Defines.colCount)
         self.mainWindow.verticalLayoutPlot.addWidget(self.mainWindow.plotAnalogWaveform, 1)
-        self.mainWindow.analogPlots = {}
-        waveform = np.zeros(1000)
-        for i in range(Defines.adc.count):
-            pen = pg.mkPen(color=self.getADCButtonColor(i), width=1)
-            legendName = getattr(self.view, f"labelADC{i}").text()
-            self.mainWindow.analogPlots[i] = self.mainWindow.plotAnalogWaveform.plot(waveform,
-                                                                                     pen=pen,
-                                                                                     name=legendName)
-            self.mainWindow.analogPlots[i].hide()
+        self.mainWindow.analogPlots = WaveformCurves(self.mainWindow.plotAnalogWaveform,
+                                                     lambda i: pg.mkPen(color=self.getADCButtonColor(i), width=1))
 
         self.mainWindow.plotAnalogImage = pg.ImageView()
         self.mainWindow.nAnalogRows = 0
@@ -154,8 +148,7 @@ class AdcTab(QtWidgets.QWidget):
         @param nADCEnabled: number of enabled ADCs
         @return: processed waveform data
         """
-        analog_array = np.array(np.frombuffer(data, dtype=np.uint16, count=nADCEnabled * aSamples))
-        return analog_array.reshape(-1, nADCEnabled)
+        return processing.analogWaveform(data, aSamples, nADCEnabled)
 
     def processImageData(self, data, aSamples):
         """
@@ -192,8 +185,7 @@ class AdcTab(QtWidgets.QWidget):
 
     @recordOrApplyPedestal
     def _processImageData(self, data, aSamples, nADCEnabled):
-        analog_array = np.array(np.frombuffer(data, dtype=np.uint16, count=nADCEnabled * aSamples))
-        return decoder.decode(analog_array, pm.moench04_analog())
+        return processing.analogImage(data, aSamples, nADCEnabled)
 
     def getADCEnableReg(self):
         retval = self.det.adcenable
@@ -205,19 +197,32 @@ class AdcTab(QtWidgets.QWidget):
         return retval
 
     def setADCEnableReg(self):
-        self.view.lineEditADCEnable.editingFinished.disconnect()
         try:
             mask = int(self.mainWindow.lineEditADCEnable.text(), 16)
-            if self.det.tengiga:
-                self.det.adcenable10g = mask
-            else:
-                self.det.adcenable = mask
-        except Exception as e:
+        except ValueError as e:
             QtWidgets.QMessageBox.warning(self.mainWindow, "ADC Enable Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
-        # TODO: handling double event exceptions
-        self.view.lineEditADCEnable.editingFinished.connect(self.setADCEnableReg)
-        self.updateADCEnable()
+            self.updateADCEnable()
+            return
+        self.writeADCEnable('adcenable', lambda _: mask)
+
+    def writeADCEnable(self, name, update):
+        """
+        change the adc enable mask of the current (1g or 10g) readout in the detector queue thread
+        @param name: name of the detector queue call, changes of different bits have different names so that they
+        are not coalesced
+        @param update: function(mask) -> new mask, applied to the mask read just before writing it
+        """
+
+        def write(det):
+            if det.tengiga:
+                det.adcenable10g = update(det.adcenable10g)
+            else:
+                det.adcenable = update(det.adcenable)
+
+        self.mainWindow.detectorQueue.write(name,
+                                            write,
+                                            showWritten(self.mainWindow, "ADC Enable Fail", self.updateADCEnable),
+                                            read=lambda det: (det.adcenable, det.adcenable10g))
 
     def getADCEnable(self, i, mask):
         checkBox = getattr(self.view, f"checkBoxADC{i}En")
@@ -238,17 +243,8 @@ class AdcTab(QtWidgets.QWidget):
 
     def setADCEnable(self, i):
         checkBox = getattr(self.view, f"checkBoxADC{i}En")
-        try:
-            if self.det.tengiga:
-                enableMask = manipulate_bit(checkBox.isChecked(), self.det.adcenable10g, i)
-                self.det.adcenable10g = enableMask
-            else:
-                enableMask = manipulate_bit(checkBox.isChecked(), self.det.adcenable, i)
-                self.det.adcenable = enableMask
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "ADC Enable Fail", str(e), QtWidgets.QMessageBox.Ok)
-
-        self.updateADCEnable()
+        enable = checkBox.isChecked()
+        self.writeADCEnable(f'adcenable{i}', lambda mask: manipulate_bit(enable, mask, i))
 
     def getADCEnableRange(self, mask):
         self.view.checkBoxADC0_15En.stateChanged.disconnect()
@@ -260,19 +256,15 @@ class AdcTab(QtWidgets.QWidget):
             partial(self.setADCEnableRange, Defines.adc.half, Defines.adc.count))
 
     def setADCEnableRange(self, start_nr, end_nr):
-        mask = self.getADCEnableReg()
         checkBox = getattr(self.view, f"checkBoxADC{start_nr}_{end_nr - 1}En")
-        for i in range(start_nr, end_nr):
-            mask = manipulate_bit(checkBox.isChecked(), mask, i)
-        try:
-            if self.det.tengiga:
-                self.det.adcenable10g = mask
-            else:
-                self.det.adcenable = mask
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "ADC Enable Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
-        self.updateADCEnable()
+        enable = checkBox.isChecked()
+
+        def update(mask):
+            for i in range(start_nr, end_nr):
+                mask = manipulate_bit(enable, mask, i)
+            return mask
+
+        self.writeADCEnable(f'adcenable{start_nr}_{end_nr - 1}', update)
 
     def getADCEnablePlot(self, i):
         checkBox = getattr(self.view, f"checkBoxADC{i}En")
@@ -324,7 +316,7 @@ class AdcTab(QtWidgets.QWidget):
         pushButton = getattr(self.view, f"pushButtonADC{i}")
         self.plotTab.showPalette(pushButton)
         pen = pg.mkPen(color=self.getADCButtonColor(i), width=1)
-        self.mainWindow.analogPlots[i].setPen(pen)
+        self.mainWindow.analogPlots.setPen(i, pen)
 
     def getADCButtonColor(self, i):
         pushButton = getattr(self.view, f"pushButtonADC{i}")
@@ -342,15 +334,26 @@ class AdcTab(QtWidgets.QWidget):
         return retval
 
     def setADCInvReg(self):
-        self.view.lineEditADCInversion.editingFinished.disconnect()
         try:
-            self.det.adcinvert = int(self.mainWindow.lineEditADCInversion.text(), 16)
-        except Exception as e:
+            mask = int(self.mainWindow.lineEditADCInversion.text(), 16)
+        except ValueError as e:
             QtWidgets.QMessageBox.warning(self.mainWindow, "ADC Inversion Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
-        # TODO: handling double event exceptions
-        self.view.lineEditADCInversion.editingFinished.connect(self.setADCInvReg)
-        self.updateADCInv()
+            self.updateADCInv()
+            return
+        self.writeADCInv('adcinvert', lambda _: mask)
+
+    def writeADCInv(self, name, update):
+        """
+        change the adc inversion mask in the detector queue thread, see writeADCEnable
+        """
+
+        def write(det):
+            det.adcinvert = update(det.adcinvert)
+
+        self.mainWindow.detectorQueue.write(name,
+                                            write,
+                                            showWritten(self.mainWindow, "ADC Inversion Fail", self.updateADCInv),
+                                            read=lambda det: det.adcinvert)
 
     def getADCInv(self, i, inv):
         checkBox = getattr(self.view, f"checkBoxADC{i}Inv")
@@ -365,14 +368,9 @@ class AdcTab(QtWidgets.QWidget):
         self.getADCInvRange(retval)
 
     def setADCInv(self, i):
-        out = self.det.adcinvert
         checkBox = getattr(self.view, f"checkBoxADC{i}Inv")
-        mask = manipulate_bit(checkBox.isChecked(), out, i)
-        self.det.adcinvert = mask
-
-        retval = self.getADCInvReg()
-        self.getADCInv(i, retval)
-        self.getADCInvRange(retval)
+        invert = checkBox.isChecked()
+        self.writeADCInv(f'adcinvert{i}', lambda mask: manipulate_bit(invert, mask, i))
 
     def getADCInvRange(self, inv):
         self.view.checkBoxADC0_15Inv.stateChanged.disconnect()
@@ -384,15 +382,11 @@ class AdcTab(QtWidgets.QWidget):
             partial(self.setADCInvRange, Defines.adc.half, Defines.adc.count))
 
     def setADCInvRange(self, start_nr, end_nr):
-        out = self.det.adcinvert
         checkBox = getattr(self.view, f"checkBoxADC{start_nr}_{end_nr - 1}Inv")
-        mask = getattr(Defines.adc, f"BIT{start_nr}_{end_nr - 1}_MASK")
-        if checkBox.isChecked():
-            self.det.adcinvert = out | mask
-        else:
-            self.det.adcinvert = out & ~mask
-
-        self.updateADCInv()
+        rangeMask = getattr(Defines.adc, f"BIT{start_nr}_{end_nr - 1}_MASK")
+        invert = checkBox.isChecked()
+        self.writeADCInv(f'adcinvert{start_nr}_{end_nr - 1}', lambda mask: mask | rangeMask
+                         if invert else mask & ~rangeMask)
 
     def saveParameters(self) -> list[str]:
         return [
@@ -4,13 +4,28 @@ from pathlib import Path
 import numpy as np
 import time
 import zmq
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 import logging
 
-from slsdet import readoutMode, runStatus
+from slsdet import readoutMode
+from pyctbgui.processing import FrameTracker
+from pyctbgui.utils import measurement
+from pyctbgui.utils.adaptiveHwm import AdaptiveHwm
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.detectorQueue import showWritten
+from pyctbgui.utils.frameRecorder import FrameRecorder
+from pyctbgui.utils.frameSource import FrameSource, ReplayFrameSource, ZmqFrameSource
+from pyctbgui.utils.instrumentation import instrumentation
 from pyctbgui.utils.numpyWriter.npy_writer import NumpyFileManager
 from pyctbgui.utils.numpyWriter.npz_writer import NpzFileWriter
+from pyctbgui.utils.statusPoller import StatusPoller
+from pyctbgui.utils.uiLoader import loadUi
+
+# read before an acquisition, the tabs then show them from the DetectorState cache
+ACQUISITION_SETTINGS = [
+    'romode', 'tsamples', 'asamples', 'dsamples', 'rx_dbitoffset', 'adcenable', 'tengiga', 'rx_dbitlist',
+    'transceiverenable'
+]
 
 if typing.TYPE_CHECKING:
     # only used for type hinting. To avoid circular dependencies these
@@ -28,7 +43,7 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.stoppedFlag = None
         self.asamples = None
         self.tsamples = None
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "acquisition.ui", parent)
+        loadUi('acquisition', parent)
         self.view = parent
         self.mainWindow = None
         self.det = None
@@ -40,6 +55,11 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.outputDir: Path = Path('/')
         self.outputFileNamePrefix: str = ''
         self.numpyFileManagers: dict[str, NumpyFileManager] = {}
+        self.frameTracker = FrameTracker()
+        self.adaptiveHwm = AdaptiveHwm()
+        self.frameRecorder: FrameRecorder | None = None
+        self.zmqSource: ZmqFrameSource | None = None
+        self.frameSource: FrameSource | None = None
 
         self.logger = logging.getLogger('AcquisitionTab')
 
@@ -48,9 +68,13 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.transceiverTab = self.mainWindow.transceiverTab
         self.adcTab = self.mainWindow.adcTab
         self.plotTab = self.mainWindow.plotTab
+        self.statusPoller = StatusPoller(self.det, self)
         self.toggleStartButton(False)
 
     def connect_ui(self):
+        self.statusPoller.statusUpdated.connect(self.updateStatus)
+        self.statusPoller.measurementDone.connect(self.measurementFinished)
+        self.statusPoller.measurementFailed.connect(self.measurementFailed)
         # For Acquistions Tab
         self.view.comboBoxROMode.currentIndexChanged.connect(self.setReadOut)
         self.view.spinBoxRunF.editingFinished.connect(self.setRunFrequency)
@@ -94,7 +118,7 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.getFrames()
         self.getTriggers()
         self.getPeriod()
-        self.updateDetectorStatus(self.det.status)
+        self.mainWindow.detectorQueue.request('status', lambda det: det.status, self.updateDetectorStatus)
 
     # Acquisition Tab functions
 
@@ -155,23 +179,18 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.read_zmq()
 
     def setReadOut(self):
-        self.view.comboBoxROMode.currentIndexChanged.disconnect()
-        try:
-            if self.view.comboBoxROMode.currentIndex() == 0:
-                self.det.romode = readoutMode.ANALOG_ONLY
-            elif self.view.comboBoxROMode.currentIndex() == 1:
-                self.det.romode = readoutMode.DIGITAL_ONLY
-            elif self.view.comboBoxROMode.currentIndex() == 2:
-                self.det.romode = readoutMode.ANALOG_AND_DIGITAL
-            elif self.view.comboBoxROMode.currentIndex() == 3:
-                self.det.romode = readoutMode.TRANSCEIVER_ONLY
-            else:
-                self.det.romode = readoutMode.DIGITAL_AND_TRANSCEIVER
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Readout Mode Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.comboBoxROMode.currentIndexChanged.connect(self.setReadOut)
-        self.getReadout()
+        if self.view.comboBoxROMode.currentIndex() == 0:
+            romode = readoutMode.ANALOG_ONLY
+        elif self.view.comboBoxROMode.currentIndex() == 1:
+            romode = readoutMode.DIGITAL_ONLY
+        elif self.view.comboBoxROMode.currentIndex() == 2:
+            romode = readoutMode.ANALOG_AND_DIGITAL
+        elif self.view.comboBoxROMode.currentIndex() == 3:
+            romode = readoutMode.TRANSCEIVER_ONLY
+        else:
+            romode = readoutMode.DIGITAL_AND_TRANSCEIVER
+        self.mainWindow.detectorQueue.writeProperty('romode', romode,
+                                                    showWritten(self.mainWindow, "Readout Mode Fail", self.getReadout))
 
     def getRunFrequency(self):
         self.view.spinBoxRunF.editingFinished.disconnect()
@@ -179,14 +198,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxRunF.editingFinished.connect(self.setRunFrequency)
 
     def setRunFrequency(self):
-        self.view.spinBoxRunF.editingFinished.disconnect()
-        try:
-            self.det.runclk = self.view.spinBoxRunF.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Run Frequency Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxRunF.editingFinished.connect(self.setRunFrequency)
-        self.getRunFrequency()
+        self.mainWindow.detectorQueue.writeProperty(
+            'runclk', self.view.spinBoxRunF.value(),
+            showWritten(self.mainWindow, "Run Frequency Fail", self.getRunFrequency))
 
     def getTransceiver(self):
         self.view.spinBoxTransceiver.editingFinished.disconnect()
@@ -195,15 +209,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxTransceiver.editingFinished.connect(self.setTransceiver)
 
     def setTransceiver(self):
-        self.view.spinBoxTransceiver.editingFinished.disconnect()
-        try:
-            self.det.tsamples = self.view.spinBoxTransceiver.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Transceiver Samples Fail", str(e),
-                                          QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxTransceiver.editingFinished.connect(self.setTransceiver)
-        self.getTransceiver()
+        self.mainWindow.detectorQueue.writeProperty(
+            'tsamples', self.view.spinBoxTransceiver.value(),
+            showWritten(self.mainWindow, "Transceiver Samples Fail", self.getTransceiver))
 
     def getAnalog(self):
         self.view.spinBoxAnalog.editingFinished.disconnect()
@@ -212,14 +220,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxAnalog.editingFinished.connect(self.setAnalog)
 
     def setAnalog(self):
-        self.view.spinBoxAnalog.editingFinished.disconnect()
-        try:
-            self.det.asamples = self.view.spinBoxAnalog.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Digital Samples Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxAnalog.editingFinished.connect(self.setAnalog)
-        self.getAnalog()
+        self.mainWindow.detectorQueue.writeProperty(
+            'asamples', self.view.spinBoxAnalog.value(),
+            showWritten(self.mainWindow, "Digital Samples Fail", self.getAnalog))
 
     def getDigital(self):
         self.view.spinBoxDigital.editingFinished.disconnect()
@@ -228,14 +231,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxDigital.editingFinished.connect(self.setDigital)
 
     def setDigital(self):
-        self.view.spinBoxDigital.editingFinished.disconnect()
-        try:
-            self.det.dsamples = self.view.spinBoxDigital.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Digital Samples Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxDigital.editingFinished.connect(self.setDigital)
-        self.getDigital()
+        self.mainWindow.detectorQueue.writeProperty(
+            'dsamples', self.view.spinBoxDigital.value(),
+            showWritten(self.mainWindow, "Digital Samples Fail", self.getDigital))
 
     def getADCFrequency(self):
         self.view.spinBoxADCF.editingFinished.disconnect()
@@ -243,14 +241,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxADCF.editingFinished.connect(self.setADCFrequency)
 
     def setADCFrequency(self):
-        self.view.spinBoxADCF.editingFinished.disconnect()
-        try:
-            self.det.adcclk = self.view.spinBoxADCF.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "ADC Frequency Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxADCF.editingFinished.connect(self.setADCFrequency)
-        self.getADCFrequency()
+        self.mainWindow.detectorQueue.writeProperty(
+            'adcclk', self.view.spinBoxADCF.value(),
+            showWritten(self.mainWindow, "ADC Frequency Fail", self.getADCFrequency))
 
     def getADCPhase(self):
         self.view.spinBoxADCPhase.editingFinished.disconnect()
@@ -258,14 +251,8 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxADCPhase.editingFinished.connect(self.setADCPhase)
 
     def setADCPhase(self):
-        self.view.spinBoxADCPhase.editingFinished.disconnect()
-        try:
-            self.det.adcphase = self.view.spinBoxADCPhase.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "ADC Phase Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxADCPhase.editingFinished.connect(self.setADCPhase)
-        self.getADCPhase()
+        self.mainWindow.detectorQueue.writeProperty('adcphase', self.view.spinBoxADCPhase.value(),
+                                                    showWritten(self.mainWindow, "ADC Phase Fail", self.getADCPhase))
 
     def getADCPipeline(self):
         self.view.spinBoxADCPipeline.editingFinished.disconnect()
@@ -273,14 +260,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxADCPipeline.editingFinished.connect(self.setADCPipeline)
 
     def setADCPipeline(self):
-        self.view.spinBoxADCPipeline.editingFinished.disconnect()
-        try:
-            self.det.adcpipeline = self.view.spinBoxADCPipeline.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "ADC Pipeline Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxADCPipeline.editingFinished.connect(self.setADCPipeline)
-        self.getADCPipeline()
+        self.mainWindow.detectorQueue.writeProperty(
+            'adcpipeline', self.view.spinBoxADCPipeline.value(),
+            showWritten(self.mainWindow, "ADC Pipeline Fail", self.getADCPipeline))
 
     def getDBITFrequency(self):
         self.view.spinBoxDBITF.editingFinished.disconnect()
@@ -288,14 +270,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxDBITF.editingFinished.connect(self.setDBITFrequency)
 
     def setDBITFrequency(self):
-        self.view.spinBoxDBITF.editingFinished.disconnect()
-        try:
-            self.det.dbitclk = self.view.spinBoxDBITF.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "DBit Frequency Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxDBITF.editingFinished.connect(self.setDBITFrequency)
-        self.getDBITFrequency()
+        self.mainWindow.detectorQueue.writeProperty(
+            'dbitclk', self.view.spinBoxDBITF.value(),
+            showWritten(self.mainWindow, "DBit Frequency Fail", self.getDBITFrequency))
 
     def getDBITPhase(self):
         self.view.spinBoxDBITPhase.editingFinished.disconnect()
@@ -303,14 +280,8 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxDBITPhase.editingFinished.connect(self.setDBITPhase)
 
     def setDBITPhase(self):
-        self.view.spinBoxDBITPhase.editingFinished.disconnect()
-        try:
-            self.det.dbitphase = self.view.spinBoxDBITPhase.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "DBit Phase Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxDBITPhase.editingFinished.connect(self.setDBITPhase)
-        self.getDBITPhase()
+        self.mainWindow.detectorQueue.writeProperty('dbitphase', self.view.spinBoxDBITPhase.value(),
+                                                    showWritten(self.mainWindow, "DBit Phase Fail", self.getDBITPhase))
 
     def getDBITPipeline(self):
         self.view.spinBoxDBITPipeline.editingFinished.disconnect()
@@ -318,14 +289,9 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxDBITPipeline.editingFinished.connect(self.setDBITPipeline)
 
     def setDBITPipeline(self):
-        self.view.spinBoxDBITPipeline.editingFinished.disconnect()
-        try:
-            self.det.dbitpipeline = self.view.spinBoxDBITPipeline.value()
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "DBit Pipeline Fail", str(e), QtWidgets.QMessageBox.Ok)
-        # TODO: handling double event exceptions
-        self.view.spinBoxDBITPipeline.editingFinished.connect(self.setDBITPipeline)
-        self.getDBITPipeline()
+        self.mainWindow.detectorQueue.writeProperty(
+            'dbitpipeline', self.view.spinBoxDBITPipeline.value(),
+            showWritten(self.mainWindow, "DBit Pipeline Fail", self.getDBITPipeline))
 
     def getFileWrite(self):
         self.view.checkBoxFileWriteRaw.stateChanged.disconnect()
@@ -333,8 +299,8 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.checkBoxFileWriteRaw.stateChanged.connect(self.setFileWrite)
 
     def setFileWrite(self):
-        self.det.fwrite = self.view.checkBoxFileWriteRaw.isChecked()
-        self.getFileWrite()
+        self.mainWindow.detectorQueue.writeProperty('fwrite', self.view.checkBoxFileWriteRaw.isChecked(),
+                                                    showWritten(self.mainWindow, "File Write Fail", self.getFileWrite))
 
     def setFileWriteNumpy(self):
         """
@@ -357,8 +323,8 @@ class AcquisitionTab(QtWidgets.QWidget):
         """
         slot for setting the filename from the widget to the detector
         """
-        self.det.fname = self.view.lineEditFileName.text()
-        self.getFileName()
+        self.mainWindow.detectorQueue.writeProperty('fname', self.view.lineEditFileName.text(),
+                                                    showWritten(self.mainWindow, "File Name Fail", self.getFileName))
 
     def getFilePath(self):
         """
@@ -374,8 +340,47 @@ class AcquisitionTab(QtWidgets.QWidget):
         """
         slot to set the directory of the output for the detector
         """
-        self.det.fpath = Path(self.view.lineEditFilePath.text())
-        self.getFilePath()
+        self.mainWindow.detectorQueue.writeProperty('fpath', Path(self.view.lineEditFilePath.text()),
+                                                    showWritten(self.mainWindow, "File Path Fail", self.getFilePath))
+
+    def startFrameRecorder(self):
+        """
+        start recording the raw zmq stream of the current acquisition if requested
+        """
+        self.stopFrameRecorder()
+        if not self.view.checkBoxRecordZmq.isChecked():
+            return
+        outputDir = Path('./') if self.outputDir == Path('/') else Path(self.outputDir)
+        prefix = self.outputFileNamePrefix if self.outputFileNamePrefix != '' else 'run'
+        logPrefix = outputDir / f'{prefix}_{self.view.spinBoxAcquisitionIndex.value()}'
+        self.frameRecorder = FrameRecorder(logPrefix)
+        self.logger.info(f'Recording zmq stream to {logPrefix}')
+
+    def stopFrameRecorder(self):
+        if self.frameRecorder is None:
+            return
+        frameRecorder, self.frameRecorder = self.frameRecorder, None
+        try:
+            frameRecorder.close()
+        except RuntimeError as e:
+            # the writer thread failed, e.g. the disk is full
+            self.logger.exception(f'Recording zmq stream to {frameRecorder.prefix} failed')
+            QtWidgets.QMessageBox.warning(
+                self.mainWindow, "Record Zmq Fail", f'Recording zmq stream to {frameRecorder.prefix} stopped after '
+                f'{frameRecorder.framesRecorded} messages: {e.__cause__}', QtWidgets.QMessageBox.Ok)
+            return
+        self.logger.info(f'Recorded {frameRecorder.framesRecorded} zmq messages '
+                         f'({frameRecorder.bytesRecorded} bytes) to {frameRecorder.prefix}')
+
+    def recordMessage(self, header: bytes, data: bytes | None = None, frameIndex: int = -1):
+        """
+        record a zmq message, the recorder is stopped and the user told if its writer thread failed
+        """
+        try:
+            self.frameRecorder.record(header, data, frameIndex)
+        except RuntimeError:
+            # close raises the error of the writer thread again, stopFrameRecorder reports it
+            self.stopFrameRecorder()
 
     def saveNumpyFile(self, data: np.ndarray | dict[str, np.ndarray], jsonHeader):
         """
@@ -394,7 +399,15 @@ class AcquisitionTab(QtWidgets.QWidget):
         for device in data:
             if device not in self.numpyFileManagers:
                 tmpPath = self.outputDir / f'{self.outputFileNamePrefix}_{device}_{jsonHeader["fileIndex"]}.npy'
-                self.numpyFileManagers[device] = NumpyFileManager(tmpPath, 'w', data[device].shape, data[device].dtype)
+                # number of frames of one measurement is known: preallocate the file
+                nFrames = self.view.spinBoxFrames.value() * self.view.spinBoxTriggers.value()
+                self.numpyFileManagers[device] = NumpyFileManager(tmpPath,
+                                                                  'w',
+                                                                  data[device].shape,
+                                                                  data[device].dtype,
+                                                                  nFrames=nFrames,
+                                                                  checkpointFrames=Defines.Numpy_checkpoint_frames,
+                                                                  checkpointSeconds=Defines.Numpy_checkpoint_seconds)
             self.numpyFileManagers[device].writeOneFrame(data[device])
 
         if 'progress' in jsonHeader and jsonHeader['progress'] >= 100:
@@ -409,23 +422,14 @@ class AcquisitionTab(QtWidgets.QWidget):
             return
         if len(self.numpyFileManagers) == 0:
             return
-        oneFile: bool = len(self.numpyFileManagers) == 1
-
-        filepaths = [npw.file.name for device, npw in self.numpyFileManagers.items()]
-        filenames = list(self.numpyFileManagers.keys())
-        ext = 'npy' if oneFile else 'npz'
-        newPath = self.outputDir / f'{self.outputFileNamePrefix}_{jsonHeader["fileIndex"]}.{ext}'
-
-        if not oneFile:
-            # if there is multiple .npy files group them in an .npz file
-            self.numpyFileManagers.clear()
-            NpzFileWriter.zipNpyFiles(newPath, filepaths, filenames, deleteOriginals=True, compressed=False)
-        else:
-            # rename files from "run_ADC0_0.npy" to "run_0.npy" if it is a single .npy file
-            oldPath = self.outputDir / f'{self.outputFileNamePrefix}_' \
-                                       f'{self.numpyFileManagers.popitem()[0]}_{jsonHeader["fileIndex"]}.{ext}'
-            Path.rename(oldPath, newPath)
-
+        path = self.outputDir / f'{self.outputFileNamePrefix}_{jsonHeader["fileIndex"]}'
+        newPath = NpzFileWriter.bundleNpyFiles(self.numpyFileManagers, path)
+        self.numpyFileManagers.clear()
+        self.frameTracker.finish()
+        self.frameTracker.save(newPath, {'zmqHwm': self.plotTab.zmqHwm})
+        if not self.frameTracker.complete:
+            self.logger.warning(f'{newPath} is missing {self.frameTracker.missing} frames '
+                                f'({100 * self.frameTracker.lossRate:.2f}%)')
         self.logger.info(f'Saving numpy data in {newPath} Finished')
 
     def browseFilePath(self):
@@ -441,13 +445,22 @@ class AcquisitionTab(QtWidgets.QWidget):
             self.setFilePath()
 
     def getAccquisitionIndex(self):
+        # the file index is not cached (the receiver can change it)
+        self.mainWindow.detectorQueue.request('findexRead', lambda det: det.findex, self.showAccquisitionIndex)
+
+    def showAccquisitionIndex(self, findex):
         self.view.spinBoxAcquisitionIndex.editingFinished.disconnect()
-        self.view.spinBoxAcquisitionIndex.setValue(self.det.findex)
+        self.view.spinBoxAcquisitionIndex.setValue(findex)
         self.view.spinBoxAcquisitionIndex.editingFinished.connect(self.setAccquisitionIndex)
 
     def setAccquisitionIndex(self):
-        self.det.findex = self.view.spinBoxAcquisitionIndex.value()
-        self.getAccquisitionIndex()
+        self.mainWindow.detectorQueue.writeProperty('findex', self.view.spinBoxAcquisitionIndex.value(),
+                                                    self.accquisitionIndexWritten)
+
+    def accquisitionIndexWritten(self, error, findex):
+        if error is not None:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Acquisition Index Fail", error, QtWidgets.QMessageBox.Ok)
+        self.showAccquisitionIndex(findex)
 
     def getFrames(self):
         self.view.spinBoxFrames.editingFinished.disconnect()
@@ -455,8 +468,8 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxFrames.editingFinished.connect(self.setFrames)
 
     def setFrames(self):
-        self.det.frames = self.view.spinBoxFrames.value()
-        self.getFrames()
+        self.mainWindow.detectorQueue.writeProperty('frames', self.view.spinBoxFrames.value(),
+                                                    showWritten(self.mainWindow, "Frames Fail", self.getFrames))
 
     def getPeriod(self):
         self.view.spinBoxPeriod.editingFinished.disconnect()
@@ -480,17 +493,21 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxPeriod.editingFinished.connect(self.setPeriod)
         self.view.comboBoxPeriod.currentIndexChanged.connect(self.setPeriod)
 
-    def setPeriod(self):
+    def periodValue(self) -> float:
+        """
+        @return: period shown in the tab in s
+        """
         if self.view.comboBoxPeriod.currentIndex() == 0:
-            self.det.period = self.view.spinBoxPeriod.value()
-        elif self.view.comboBoxPeriod.currentIndex() == 1:
-            self.det.period = self.view.spinBoxPeriod.value() * (1e-3)
-        elif self.view.comboBoxPeriod.currentIndex() == 2:
-            self.det.period = self.view.spinBoxPeriod.value() * (1e-6)
-        else:
-            self.det.period = self.view.spinBoxPeriod.value() * (1e-9)
+            return self.view.spinBoxPeriod.value()
+        if self.view.comboBoxPeriod.currentIndex() == 1:
+            return self.view.spinBoxPeriod.value() * (1e-3)
+        if self.view.comboBoxPeriod.currentIndex() == 2:
+            return self.view.spinBoxPeriod.value() * (1e-6)
+        return self.view.spinBoxPeriod.value() * (1e-9)
 
-        self.getPeriod()
+    def setPeriod(self):
+        self.mainWindow.detectorQueue.writeProperty('period', self.periodValue(),
+                                                    showWritten(self.mainWindow, "Period Fail", self.getPeriod))
 
     def getTriggers(self):
         self.view.spinBoxTriggers.editingFinished.disconnect()
@@ -498,8 +515,8 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.view.spinBoxTriggers.editingFinished.connect(self.setTriggers)
 
     def setTriggers(self):
-        self.det.triggers = self.view.spinBoxTriggers.value()
-        self.getTriggers()
+        self.mainWindow.detectorQueue.writeProperty('triggers', self.view.spinBoxTriggers.value(),
+                                                    showWritten(self.mainWindow, "Triggers Fail", self.getTriggers))
 
     def updateDetectorStatus(self, status):
         self.mainWindow.labelDetectorStatus.setText(status.name)
@@ -514,6 +531,11 @@ class AcquisitionTab(QtWidgets.QWidget):
     def updateAcquiredFrames(self, val):
         self.mainWindow.labelAcquiredFrames.setText(str(val))
 
+    def updateMissingFrames(self):
+        missing = self.frameTracker.missing
+        self.mainWindow.labelMissingFrames.setText(f'{missing} ({100 * self.frameTracker.lossRate:.1f}%)')
+        self.mainWindow.labelMissingFrames.setStyleSheet('color:red' if missing else '')
+
     def toggleAcquire(self):
         if self.mainWindow.pushButtonStart.isChecked():
             self.plotTab.showPatternViewer(False)
@@ -522,6 +544,8 @@ class AcquisitionTab(QtWidgets.QWidget):
             self.stopAcquisition()
 
     def toggleStartButton(self, started):
+        # a replay would be mixed with the frames of the acquisition
+        self.mainWindow.actionReplay.setEnabled(not started)
         if started:
             self.mainWindow.pushButtonStart.setChecked(True)
             self.mainWindow.pushButtonStart.setText('Stop')
@@ -530,8 +554,8 @@ class AcquisitionTab(QtWidgets.QWidget):
             self.mainWindow.pushButtonStart.setText('Start')
 
     def stopAcquisition(self):
-        self.det.stop()
         self.stoppedFlag = True
+        self.mainWindow.detectorQueue.request('stop', lambda det: det.stop())
 
     def checkBeforeAcquire(self):
         if self.plotTab.view.radioButtonImage.isChecked():
@@ -570,9 +594,29 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.toggleStartButton(True)
         self.currentMeasurement = 0
 
-        # ensure zmq streaming is enabled
-        if self.det.rx_zmqstream == 0:
-            self.det.rx_zmqstream = 1
+        # queued after the settings just changed, the acquisition starts with them
+        self.mainWindow.detectorQueue.write('prepareAcquisition', self.prepareAcquisition, self.acquisitionPrepared)
+
+    @staticmethod
+    def prepareAcquisition(det):
+        """
+        ensure zmq streaming is enabled and read the settings the acquisition depends on into the DetectorState
+        cache, runs in the detector queue thread
+        """
+        if det.rx_zmqstream == 0:
+            det.rx_zmqstream = 1
+        for name in ACQUISITION_SETTINGS + (['adcenable10g'] if det.tengiga else []):
+            getattr(det, name)
+
+    def acquisitionPrepared(self, error, result=None):
+        if error is not None:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Acquire Fail", error, QtWidgets.QMessageBox.Ok)
+            self.toggleStartButton(False)
+            return
+        if self.stoppedFlag:
+            # stopped before the first measurement started
+            self.toggleStartButton(False)
+            return
 
         # some functions that must be updated for local values
         self.getTransceiver()
@@ -587,103 +631,169 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.startMeasurement()
 
     def startMeasurement(self):
+        hwm = None
         try:
             self.updateCurrentMeasurement()
             self.updateCurrentFrame(0)
             self.updateAcquiredFrames(0)
+            self.frameTracker.reset(self.view.spinBoxFrames.value() * self.view.spinBoxTriggers.value())
+            self.updateMissingFrames()
             self.mainWindow.progressBar.setValue(0)
 
-            self.det.rx_start()
-            self.det.start()
-            time.sleep(Defines.Time_Wait_For_Packets_ms)
-            self.checkEndofAcquisition()
+            if self.plotTab.zmqHwmAdaptive:
+                hwm = self.chooseZmqHwm()
+            self.adaptiveHwm.startRun()
+            self.startFrameRecorder()
+            self.statusPoller.watcher.reset(self.view.spinBoxAcquisitionIndex.value())
         except Exception as e:
             QtWidgets.QMessageBox.warning(self.mainWindow, "Acquire Fail", str(e), QtWidgets.QMessageBox.Ok)
-            self.checkEndofAcquisition()
+        if hwm is not None and hwm != self.plotTab.zmqHwm:
+            # started once the gui reads from the socket with the new high water mark, the frames of the
+            # measurement are neither dropped nor read twice when the socket is replaced
+            self.plotTab.applyZMQHWM(hwm, self.queueMeasurementStart, 'measurementZmqHwm')
+        else:
+            self.queueMeasurementStart()
+
+    def queueMeasurementStart(self):
+        if self.stoppedFlag:
+            self.toggleStartButton(False)
+            return
+        # queued after the calls requested before (e.g. the acquisition index of this measurement)
+        self.mainWindow.detectorQueue.write('startMeasurement', measurement.startMeasurement, self.measurementStarted)
+
+    def measurementStarted(self, error, result=None):
+        if error is not None:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Acquire Fail", error, QtWidgets.QMessageBox.Ok)
+        # the end of the measurement is reported by measurementFinished
+        self.statusPoller.startPolling()
+
+    def chooseZmqHwm(self) -> int:
+        """
+        choose the zmq high water mark of the next measurement from the throughput of the previous ones
+        """
+        saving = self.view.checkBoxFileWriteRaw.isChecked() or self.view.checkBoxFileWriteNumpy.isChecked()
+        hwm, reason = self.adaptiveHwm.choose(saving)
+        self.logger.info(f'Measurement {self.currentMeasurement}: zmq hwm {hwm} ({reason})')
+        return hwm
 
-    def checkEndofAcquisition(self):
-        caught = self.det.rx_framescaught[0]
+    def updateStatus(self, caught, status):
         self.updateAcquiredFrames(caught)
-        status = self.det.getDetectorStatus()[0]
         self.updateDetectorStatus(status)
-        measurementDone = False
-        # print(f'status:{status}')
-        match status:
-            case runStatus.RUNNING:
-                pass
-            case runStatus.WAITING:
-                pass
-            case runStatus.TRANSMITTING:
-                pass
-            case _:
-                measurementDone = True
-
-        # check for 500ms for no packets
-        # needs more time for 1g streaming out done
-        if measurementDone:
-            time.sleep(Defines.Time_Wait_For_Packets_ms)
-            if self.det.rx_framescaught[0] != caught:
-                measurementDone = False
+        self.adaptiveHwm.update(caught)
 
+    def measurementFinished(self, caught, status):
+        """
+        called by the status poller at the end of a measurement (the receiver is already stopped)
+        """
+        self.updateStatus(caught, status)
+        self.adaptiveHwm.endRun(caught)
         numMeasurments = self.view.spinBoxMeasurements.value()
-        if measurementDone:
-
-            if self.det.rx_status == runStatus.RUNNING:
-                self.det.rx_stop()
-            if self.view.checkBoxFileWriteRaw.isChecked() or self.view.checkBoxFileWriteNumpy.isChecked():
-                self.view.spinBoxAcquisitionIndex.stepUp()
-                self.setAccquisitionIndex()
-            # next measurement
-            self.currentMeasurement += 1
-            if self.currentMeasurement < numMeasurments and not self.stoppedFlag:
-                self.startMeasurement()
-            else:
-                self.mainWindow.statusTimer.stop()
-                self.toggleStartButton(False)
+        if self.view.checkBoxFileWriteRaw.isChecked() or self.view.checkBoxFileWriteNumpy.isChecked():
+            self.view.spinBoxAcquisitionIndex.stepUp()
+            self.setAccquisitionIndex()
+        # next measurement
+        self.currentMeasurement += 1
+        if self.currentMeasurement < numMeasurments and not self.stoppedFlag:
+            # started after the acquisition index just written, the files of the measurement use it
+            self.startMeasurement()
         else:
-            self.mainWindow.statusTimer.start(Defines.Time_Status_Refresh_ms)
+            self.toggleStartButton(False)
+
+    def measurementFailed(self, message):
+        QtWidgets.QMessageBox.warning(self.mainWindow, "Acquire Fail", message, QtWidgets.QMessageBox.Ok)
+        self.toggleStartButton(False)
 
     # For other functios
     # Reading data from zmq and decoding it
     def read_zmq(self):
-        # print("in readzmq")
+        """
+        slot of the read timer, reads one message of the receiver stream or all the messages of a replay due since
+        the previous tick (for at most Defines.Time_Plot_Refresh_ms, the gui stays responsive)
+        """
+        deadline = time.perf_counter() + Defines.Time_Plot_Refresh_ms / 1000
+        while self.readMessage() and isinstance(self.frameSource, ReplayFrameSource) \
+                and time.perf_counter() < deadline:
+            pass
+
+    def readMessage(self) -> bool:
+        """
+        @return: False if no message was available
+        """
         try:
-            msg = self.socket.recv_multipart(flags=zmq.NOBLOCK)
+            start = time.perf_counter()
+            msg = self.frameSource.receive()
+            if msg is None:
+                if isinstance(self.frameSource, ReplayFrameSource) and self.frameSource.finished:
+                    self.stopReplay()
+                return False
+            instrumentation.add('recv', start)
             if len(msg) != 2:
                 if len(msg) != 1:
                     print(f'len(msg) = {len(msg)}')
-                return
+                else:
+                    # end of acquisition message of the receiver
+                    jsonHeader = json.loads(msg[0])
+                    self.statusPoller.watcher.streamEnded(jsonHeader.get('fileIndex'))
+                    instrumentation.endOfAcquisition(self.frameTracker.finish())
+                    self.updateMissingFrames()
+                    if self.frameRecorder is not None:
+                        self.recordMessage(msg[0])
+                        self.stopFrameRecorder()
+                    # the last frames were lost, the files were not closed by saveNumpyFile
+                    self.closeOpenedNumpyFiles(jsonHeader)
+                return True
             header, data = msg
-            jsonHeader = json.loads(header)
+            with instrumentation.stage('parse'):
+                jsonHeader = json.loads(header)
+            missing = self.frameTracker.update(jsonHeader['frameIndex'])
+            instrumentation.frameReceived(len(data), missing)
+            if missing:
+                self.updateMissingFrames()
+            self.adaptiveHwm.frameConsumed()
+            if self.frameRecorder is not None:
+                with instrumentation.stage('record'):
+                    self.recordMessage(header, data, jsonHeader['frameIndex'])
             self.mainWindow.progressBar.setValue(int(jsonHeader['progress']))
             self.updateCurrentFrame(jsonHeader['frameIndex'])
 
-            # waveform
-            waveforms = {}
-            if self.plotTab.view.radioButtonWaveform.isChecked():
-                # analog
-                if self.mainWindow.romode.value in [0, 2]:
-                    waveforms |= self.adcTab.processWaveformData(data, self.asamples)
-                # digital
-                if self.mainWindow.romode.value in [1, 2, 4]:
-                    waveforms |= self.signalsTab.processWaveformData(data, self.asamples, self.dsamples)
-                # transceiver
-                if self.mainWindow.romode.value in [3, 4]:
-                    waveforms |= self.transceiverTab.processWaveformData(data, self.dsamples)
-            # image
-            else:
-                # analog
-                if self.mainWindow.romode.value in [0, 2]:
-                    waveforms['analog_image'] = self.adcTab.processImageData(data, self.asamples)
-                # transceiver
-                if self.mainWindow.romode.value in [3, 4]:
-                    waveforms['tx_image'] = self.transceiverTab.processImageData(data, self.dsamples)
-
-            self.saveNumpyFile(waveforms, jsonHeader)
+            # decoding and pedestal are timed as nested stages by recordOrApplyPedestal
+            with instrumentation.stage('plot'):
+                waveforms = self.processFrame(data)
+
+            with instrumentation.stage('save'):
+                self.saveNumpyFile(waveforms, jsonHeader)
         except zmq.ZMQError:
-            pass
+            return False
         except Exception:
             self.logger.exception("Exception caught")
+        return True
+
+    def processFrame(self, data: bytes) -> dict[str, np.ndarray]:
+        """
+        process and plot the frame in the tabs of the enabled readout modes
+        @return: processed data to save
+        """
+        # waveform
+        waveforms = {}
+        if self.plotTab.view.radioButtonWaveform.isChecked():
+            # analog
+            if self.mainWindow.romode.value in [0, 2]:
+                waveforms |= self.adcTab.processWaveformData(data, self.asamples)
+            # digital
+            if self.mainWindow.romode.value in [1, 2, 4]:
+                waveforms |= self.signalsTab.processWaveformData(data, self.asamples, self.dsamples)
+            # transceiver
+            if self.mainWindow.romode.value in [3, 4]:
+                waveforms |= self.transceiverTab.processWaveformData(data, self.dsamples)
+        # image
+        else:
+            # analog
+            if self.mainWindow.romode.value in [0, 2]:
+                waveforms['analog_image'] = self.adcTab.processImageData(data, self.asamples)
+            # transceiver
+            if self.mainWindow.romode.value in [3, 4]:
+                waveforms['tx_image'] = self.transceiverTab.processImageData(data, self.dsamples)
+        return waveforms
 
     def setup_zmq(self):
         self.det.rx_zmqstream = 1
@@ -691,10 +801,39 @@ class AcquisitionTab(QtWidgets.QWidget):
         self.zmqport = self.det.rx_zmqport
         self.zmq_stream = self.det.rx_zmqstream
 
-        self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.SUB)
-        self.socket.connect(f"tcp://{self.zmqIp}:{self.zmqport}")
-        self.socket.subscribe("")
+        self.zmqSource = ZmqFrameSource(self.zmqIp, self.zmqport)
+        self.frameSource = self.zmqSource
+
+    def startReplay(self, source: ReplayFrameSource):
+        """
+        feed the messages of a replay source through the processing pipeline instead of the receiver stream
+        @note: the readout mode and the sample counts must match the replayed data
+        """
+        self.stopReplay()
+        self.frameSource = source
+        # no acquisition while replaying, like no replay while acquiring
+        self.mainWindow.pushButtonStart.setEnabled(False)
+        self.currentMeasurement = 0
+        self.updateCurrentFrame(0)
+        self.frameTracker.reset()
+        self.updateMissingFrames()
+        self.mainWindow.progressBar.setValue(0)
+        if source.rate is None:
+            # read messages on every event loop iteration
+            self.mainWindow.read_timer.setInterval(0)
+        self.logger.info(f'Replaying {len(source)} messages')
+
+    def stopReplay(self):
+        """
+        switch back to the receiver stream
+        """
+        if self.frameSource is self.zmqSource:
+            return
+        self.logger.info(f'Replay stopped after {self.frameSource.position} messages')
+        self.frameSource.close()
+        self.frameSource = self.zmqSource
+        self.mainWindow.read_timer.setInterval(Defines.Time_Plot_Refresh_ms)
+        self.mainWindow.pushButtonStart.setEnabled(True)
 
     def saveParameters(self) -> list[str]:
         return [
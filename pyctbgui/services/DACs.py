@@ -1,8 +1,9 @@
 from functools import partial
-from pathlib import Path
 
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.detectorQueue import showWritten
+from pyctbgui.utils.uiLoader import loadUi
 
 from slsdet import dacIndex
 
@@ -11,17 +12,19 @@ class DacTab(QtWidgets.QWidget):
 
     def __init__(self, parent):
         super().__init__(parent)
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "Dacs.ui", parent)
+        loadUi('Dacs', parent)
         self.view = parent
 
     def setup_ui(self):
-        for i in range(Defines.dac.count):
-            dac = getattr(dacIndex, f"DAC_{i}")
-            getattr(self.view, f"spinBoxDAC{i}").setValue(self.det.getDAC(dac)[0])
+        # the dac values are shown by the first refresh
+        self.mainWindow.detectorQueue.request('highvoltageSetup', lambda det: det.highvoltage, self.setupHighVoltage)
 
-        if self.det.highvoltage == 0:
+    def setupHighVoltage(self, retval):
+        if retval == 0:
+            self.view.checkBoxHighVoltage.stateChanged.disconnect()
             self.view.spinBoxHighVoltage.setDisabled(True)
             self.view.checkBoxHighVoltage.setChecked(False)
+            self.view.checkBoxHighVoltage.stateChanged.connect(self.setHighVoltage)
 
     def connect_ui(self):
         n_dacs = len(self.det.daclist)
@@ -35,23 +38,47 @@ class DacTab(QtWidgets.QWidget):
         self.view.checkBoxHighVoltage.stateChanged.connect(self.setHighVoltage)
 
     def refresh(self):
-        self.updateDACNames()
-        for i in range(Defines.dac.count):
-            self.getDACTristate(i)
-            self.getDAC(i)
+        inMv = [getattr(self.view, f"checkBoxDAC{i}mV").isChecked() for i in range(Defines.dac.count)]
+        self.mainWindow.detectorQueue.request('dacs', partial(self.readDACs, inMv=inMv), self.showDACs)
 
-        self.getADCVpp()
-        self.getHighVoltage()
+    @staticmethod
+    def readDACs(det, inMv: list[bool]) -> dict:
+        """
+        read all values shown in the tab, runs in the detector queue thread
+        @param inMv: read the value in mV of each DAC as well
+        """
+        dacs = [getattr(dacIndex, f"DAC_{i}") for i in range(Defines.dac.count)]
+        return {
+            'names': det.getDacNames(),
+            'dacs': [det.getDAC(dac)[0] for dac in dacs],
+            'dacsMv': [det.getDAC(dac, True)[0] if mV else None for dac, mV in zip(dacs, inMv)],
+            'adcvpp': det.adcvpp,
+            'highvoltage': det.highvoltage,
+        }
+
+    def showDACs(self, values: dict):
+        self.showDACNames(values['names'])
+        for i in range(Defines.dac.count):
+            self.showDACTristate(i, values['dacs'][i])
+            self.showDAC(i, values['dacs'][i], values['dacsMv'][i])
+        self.showADCVpp(values['adcvpp'])
+        self.showHighVoltage(values['highvoltage'])
 
     def updateDACNames(self):
-        for i, name in enumerate(self.det.getDacNames()):
+        self.showDACNames(self.det.getDacNames())
+
+    def showDACNames(self, names: list[str]):
+        for i, name in enumerate(names):
             getattr(self.view, f"checkBoxDAC{i}").setText(name)
 
     def getDACTristate(self, i):
-        checkBox = getattr(self.view, f"checkBoxDAC{i}")
         dac = getattr(dacIndex, f"DAC_{i}")
+        self.showDACTristate(i, self.det.getDAC(dac)[0])
+
+    def showDACTristate(self, i, value):
+        checkBox = getattr(self.view, f"checkBoxDAC{i}")
         checkBox.stateChanged.disconnect()
-        if (self.det.getDAC(dac)[0]) == -100:
+        if value == -100:
             checkBox.setChecked(False)
         else:
             checkBox.setChecked(True)
@@ -64,18 +91,28 @@ class DacTab(QtWidgets.QWidget):
         self.getDAC(i)
 
     def getDAC(self, i):
+        dac = getattr(dacIndex, f"DAC_{i}")
+        valueMv = None
+        if getattr(self.view, f"checkBoxDAC{i}mV").isChecked():
+            valueMv = self.det.getDAC(dac, True)[0]
+        self.showDAC(i, self.det.getDAC(dac)[0], valueMv)
+
+    def showDAC(self, i, value, valueMv=None):
+        """
+        @param value: value of DAC i in dac units, -100 if disabled
+        @param valueMv: value in mV, None if it was not read
+        """
         checkBox = getattr(self.view, f"checkBoxDAC{i}")
         checkBoxmV = getattr(self.view, f"checkBoxDAC{i}mV")
         spinBox = getattr(self.view, f"spinBoxDAC{i}")
         label = getattr(self.view, f"labelDAC{i}")
-        dac = getattr(dacIndex, f"DAC_{i}")
 
         checkBox.stateChanged.disconnect()
         checkBoxmV.stateChanged.disconnect()
         spinBox.editingFinished.disconnect()
 
         # do not uncheck automatically
-        if self.det.getDAC(dac)[0] != -100:
+        if value != -100:
             checkBox.setChecked(True)
 
         if checkBox.isChecked():
@@ -85,8 +122,8 @@ class DacTab(QtWidgets.QWidget):
             spinBox.setDisabled(True)
             checkBoxmV.setDisabled(True)
 
-        in_mv = checkBoxmV.isChecked() and checkBox.isChecked()
-        dacValue = self.det.getDAC(dac, in_mv)[0]
+        in_mv = checkBoxmV.isChecked() and checkBox.isChecked() and valueMv is not None
+        dacValue = valueMv if in_mv else value
         unit = "mV" if in_mv else ""
         label.setText(f"{dacValue} {unit}")
         spinBox.setValue(dacValue)
@@ -105,11 +142,15 @@ class DacTab(QtWidgets.QWidget):
         if checkBoxDac.isChecked():
             value = spinBox.value()
         in_mV = checkBoxDac.isChecked() and checkBoxmV.isChecked()
-        self.det.setDAC(dac, value, in_mV)
-        self.getDAC(i)
+        self.mainWindow.detectorQueue.write(f'dac{i}',
+                                            lambda det: det.setDAC(dac, value, in_mV),
+                                            showWritten(self.mainWindow, "DAC Fail", partial(self.getDAC, i)),
+                                            read=lambda det: (det.getDAC(dac), det.getDAC(dac, True)))
 
     def getADCVpp(self):
-        retval = self.det.adcvpp
+        self.showADCVpp(self.det.adcvpp)
+
+    def showADCVpp(self, retval):
         self.view.labelADCVpp.setText(f'Mode: {str(retval)}')
 
         self.view.comboBoxADCVpp.currentIndexChanged.disconnect()
@@ -117,11 +158,13 @@ class DacTab(QtWidgets.QWidget):
         self.view.comboBoxADCVpp.currentIndexChanged.connect(self.setADCVpp)
 
     def setADCVpp(self):
-        self.det.adcvpp = self.view.comboBoxADCVpp.currentIndex()
-        self.getADCVpp()
+        self.mainWindow.detectorQueue.writeProperty('adcvpp', self.view.comboBoxADCVpp.currentIndex(),
+                                                    showWritten(self.mainWindow, "ADC Vpp Fail", self.getADCVpp))
 
     def getHighVoltage(self):
-        retval = self.det.highvoltage
+        self.showHighVoltage(self.det.highvoltage)
+
+    def showHighVoltage(self, retval):
         self.view.labelHighVoltage.setText(str(retval))
 
         self.view.spinBoxHighVoltage.editingFinished.disconnect()
@@ -140,12 +183,8 @@ class DacTab(QtWidgets.QWidget):
         value = 0
         if self.view.checkBoxHighVoltage.isChecked():
             value = self.view.spinBoxHighVoltage.value()
-        try:
-            self.det.highvoltage = value
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "High Voltage Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
-        self.getHighVoltage()
+        self.mainWindow.detectorQueue.writeProperty(
+            'highvoltage', value, showWritten(self.mainWindow, "High Voltage Fail", self.getHighVoltage))
 
     def saveParameters(self) -> list:
         """
@@ -1,29 +1,36 @@
-import os
 from functools import partial
 from pathlib import Path
 
-from PyQt5 import QtWidgets, uic
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from PyQt5 import QtWidgets
 
 from pyctbgui.utils.defines import Defines
-from pyctbgui.utils.plotPattern import PlotPattern
+from pyctbgui.utils.detectorQueue import showWritten
+from pyctbgui.utils.pattern import Pattern
+from pyctbgui.utils.patternCompiler import PatternCompiler, backupCompiled, cachedCompilation
+from pyctbgui.utils.patternTimeline import PatternTimeline, acquisitionTime
+from pyctbgui.utils.patternViewer import PatternViewer
+from pyctbgui.utils.uiLoader import loadUi
 
 
 class PatternTab(QtWidgets.QWidget):
 
     def __init__(self, parent):
         super().__init__(parent)
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "pattern.ui", parent)
+        loadUi('pattern', parent)
         self.view = parent
         self.mainWindow = None
         self.det = None
         self.plotTab = None
+        self.acquisitionTab = None
+        # pyqtgraph pattern viewer, created when a pattern is first viewed
+        self.patternViewer = None
+        # compiles the pattern code in the background
+        self.patternCompiler = None
 
     def setup_ui(self):
         # Pattern Tab
         self.plotTab = self.mainWindow.plotTab
+        self.acquisitionTab = self.mainWindow.acquisitionTab
 
         for i in range(len(Defines.Colors)):
             self.view.comboBoxPatColor.addItem(Defines.Colors[i])
@@ -39,15 +46,8 @@ class PatternTab(QtWidgets.QWidget):
         self.view.spinBoxPatClockSpacing.setValue(self.clock_vertical_lines_spacing)
         self.view.checkBoxPatShowClockNumber.setChecked(self.show_clocks_number)
         self.view.doubleSpinBoxLineWidth.setValue(self.line_width)
-        self.view.lineEditPatternFile.setText(self.det.patfname[0])
+        self.mainWindow.detectorQueue.request('patfname', lambda det: det.patfname, self.showPatFile)
         # rest gets updated after connecting to slots
-        # pattern viewer plot area
-        self.figure, self.ax = plt.subplots()
-        self.canvas = FigureCanvas(self.figure)
-        self.toolbar = NavigationToolbar(self.canvas, self.view)
-        self.mainWindow.gridLayoutPatternViewer.addWidget(self.toolbar)
-        self.mainWindow.gridLayoutPatternViewer.addWidget(self.canvas)
-        self.figure.clear()
 
     def connect_ui(self):
         # For Pattern Tab
@@ -84,6 +84,7 @@ class PatternTab(QtWidgets.QWidget):
         self.view.checkBoxPatShowClockNumber.stateChanged.connect(self.updatePatViewerParameters)
         self.view.doubleSpinBoxLineWidth.editingFinished.connect(self.updatePatViewerParameters)
         self.view.pushButtonViewPattern.clicked.connect(self.viewPattern)
+        self.view.pushButtonExportPattern.clicked.connect(self.exportPattern)
 
     def refresh(self):
         self.getPatLimitAddress()
@@ -105,23 +106,49 @@ class PatternTab(QtWidgets.QWidget):
         self.view.lineEditStopAddress.editingFinished.connect(self.setPatLimitAddress)
 
     def setPatLimitAddress(self):
-        self.view.lineEditStartAddress.editingFinished.disconnect()
-        self.view.lineEditStopAddress.editingFinished.disconnect()
         try:
             start = int(self.view.lineEditStartAddress.text(), 16)
             stop = int(self.view.lineEditStopAddress.text(), 16)
-            self.det.patlimits = [start, stop]
-        except Exception as e:
+        except ValueError as e:
             QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Limit Address Fail", str(e),
                                           QtWidgets.QMessageBox.Ok)
-            pass
-        # TODO: handling double event exceptions
-        self.view.lineEditStartAddress.editingFinished.connect(self.setPatLimitAddress)
-        self.view.lineEditStopAddress.editingFinished.connect(self.setPatLimitAddress)
-        self.getPatLimitAddress()
+            self.getPatLimitAddress()
+            return
+        self.mainWindow.detectorQueue.writeProperty(
+            'patlimits', [start, stop],
+            showWritten(self.mainWindow, "Pattern Limit Address Fail", self.getPatLimitAddress))
+
+    def writePatLoop(self, name, level, value, title, show):
+        """
+        write the pattern loop parameter name (patloop, patwait, patnloop, patwaittime) of a level in the detector
+        queue thread
+        @param show: function(level, value) showing the value read back
+        """
+
+        def write(det):
+            getattr(det, name)[level] = value
+
+        self.mainWindow.detectorQueue.write(f'{name}{level}',
+                                            write,
+                                            partial(self.patLoopWritten, title, show, level),
+                                            read=lambda det: getattr(det, name)[level])
+
+    def patLoopWritten(self, title, show, level, error, value):
+        if error is not None:
+            QtWidgets.QMessageBox.warning(self.mainWindow, title, error, QtWidgets.QMessageBox.Ok)
+        show(level, value)
+
+    def readPatLoop(self, name, level, show):
+        """
+        read the pattern loop setting name (not cached) of level in the detector queue and show it
+        """
+        self.mainWindow.detectorQueue.request(f'{name}{level}Read', lambda det: getattr(det, name)[level],
+                                              partial(show, level))
 
     def getPatLoopStartStopAddress(self, level):
-        retval = self.det.patloop[level]
+        self.readPatLoop('patloop', level, self.showPatLoopStartStopAddress)
+
+    def showPatLoopStartStopAddress(self, level, retval):
         lineEditStart = getattr(self.view, f"lineEditLoop{level}Start")
         lineEditStop = getattr(self.view, f"lineEditLoop{level}Stop")
         lineEditStart.editingFinished.disconnect()
@@ -134,23 +161,20 @@ class PatternTab(QtWidgets.QWidget):
     def setPatLoopStartStopAddress(self, level):
         lineEditStart = getattr(self.view, f"lineEditLoop{level}Start")
         lineEditStop = getattr(self.view, f"lineEditLoop{level}Stop")
-        lineEditStart.editingFinished.disconnect()
-        lineEditStop.editingFinished.disconnect()
+        title = "Pattern Loop Start Stop Address Fail"
         try:
             start = int(lineEditStart.text(), 16)
             stop = int(lineEditStop.text(), 16)
-            self.det.patloop[level] = [start, stop]
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Loop Start Stop Address Fail", str(e),
-                                          QtWidgets.QMessageBox.Ok)
-            pass
-        # TODO: handling double event exceptions
-        lineEditStart.editingFinished.connect(partial(self.setPatLoopStartStopAddress, level))
-        lineEditStop.editingFinished.connect(partial(self.setPatLoopStartStopAddress, level))
-        self.getPatLoopStartStopAddress(level)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self.mainWindow, title, str(e), QtWidgets.QMessageBox.Ok)
+            self.getPatLoopStartStopAddress(level)
+            return
+        self.writePatLoop('patloop', level, [start, stop], title, self.showPatLoopStartStopAddress)
 
     def getPatLoopWaitAddress(self, level):
-        retval = self.det.patwait[level]
+        self.readPatLoop('patwait', level, self.showPatLoopWaitAddress)
+
+    def showPatLoopWaitAddress(self, level, retval):
         lineEdit = getattr(self.view, f"lineEditLoop{level}Wait")
         lineEdit.editingFinished.disconnect()
         lineEdit.setText("0x{:04x}".format(retval))
@@ -158,20 +182,19 @@ class PatternTab(QtWidgets.QWidget):
 
     def setPatLoopWaitAddress(self, level):
         lineEdit = getattr(self.view, f"lineEditLoop{level}Wait")
-        lineEdit.editingFinished.disconnect()
+        title = "Pattern Wait Address Fail"
         try:
             addr = int(lineEdit.text(), 16)
-            self.det.patwait[level] = addr
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Wait Address Fail", str(e),
-                                          QtWidgets.QMessageBox.Ok)
-            pass
-        # TODO: handling double event exceptions
-        lineEdit.editingFinished.connect(partial(self.setPatLoopWaitAddress, level))
-        self.getPatLoopWaitAddress(level)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self.mainWindow, title, str(e), QtWidgets.QMessageBox.Ok)
+            self.getPatLoopWaitAddress(level)
+            return
+        self.writePatLoop('patwait', level, addr, title, self.showPatLoopWaitAddress)
 
     def getPatLoopRepetition(self, level):
-        retval = self.det.patnloop[level]
+        self.readPatLoop('patnloop', level, self.showPatLoopRepetition)
+
+    def showPatLoopRepetition(self, level, retval):
         spinBox = getattr(self.view, f"spinBoxLoop{level}Repetition")
         spinBox.editingFinished.disconnect()
         spinBox.setValue(retval)
@@ -179,11 +202,13 @@ class PatternTab(QtWidgets.QWidget):
 
     def setPatLoopRepetition(self, level):
         spinBox = getattr(self.view, f"spinBoxLoop{level}Repetition")
-        self.det.patnloop[level] = spinBox.value()
-        self.getPatLoopRepetition(level)
+        self.writePatLoop('patnloop', level, spinBox.value(), "Pattern Loop Repetition Fail",
+                          self.showPatLoopRepetition)
 
     def getPatLoopWaitTime(self, level):
-        retval = self.det.patwaittime[level]
+        self.readPatLoop('patwaittime', level, self.showPatLoopWaitTime)
+
+    def showPatLoopWaitTime(self, level, retval):
         spinBox = getattr(self.view, f"spinBoxLoop{level}WaitTime")
         spinBox.editingFinished.disconnect()
         spinBox.setValue(retval)
@@ -191,8 +216,7 @@ class PatternTab(QtWidgets.QWidget):
 
     def setPatLoopWaitTime(self, level):
         spinBox = getattr(self.view, f"spinBoxLoop{level}WaitTime")
-        self.det.patwaittime[level] = spinBox.value()
-        self.getPatLoopWaitTime(level)
+        self.writePatLoop('patwaittime', level, spinBox.value(), "Pattern Wait Time Fail", self.showPatLoopWaitTime)
 
     def setCompiler(self):
         response = QtWidgets.QFileDialog.getOpenFileName(
@@ -228,59 +252,102 @@ class PatternTab(QtWidgets.QWidget):
         if response[0]:
             self.view.lineEditPatternFile.setText(response[0])
 
-    def compilePattern(self):
+    def compilePattern(self, action):
+        """
+        compile the uncompiled pattern file in the background, or reuse it if it is up to date
+        @param action: function(compiled pattern file) run once the pattern is compiled
+        """
         compilerFile = self.view.lineEditCompiler.text()
         if not compilerFile:
             QtWidgets.QMessageBox.warning(self.mainWindow, "Compile Fail", "No compiler selected. Please select one.",
                                           QtWidgets.QMessageBox.Ok)
-            return ""
+            return
+        if self.patternCompiler is not None and self.patternCompiler.isRunning():
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Compile Fail", "A pattern is already being compiled.",
+                                          QtWidgets.QMessageBox.Ok)
+            return
 
         pattern_file = self.view.lineEditUncompiled.text()
+        try:
+            compiled = cachedCompilation(pattern_file, compilerFile)
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Compile Fail", str(e), QtWidgets.QMessageBox.Ok)
+            return
+        if compiled is not None:
+            self.view.labelCompileOutput.setText(f'{compiled} is up to date, not compiled again')
+            self.view.labelCompileOutput.setToolTip('')
+            action(str(compiled))
+            return
 
         # if old compile file exists, backup and remove to ensure old copy not loaded
-        oldFile = Path(pattern_file + 'at')
-        if oldFile.is_file():
-            print("Moving old compiled pattern file to _bck")
-            exit_status = os.system('mv ' + str(oldFile) + ' ' + str(oldFile) + '_bkup')
-            if exit_status != 0:
-                retval = QtWidgets.QMessageBox.question(
-                    self.mainWindow, "Backup Fail",
-                    "Could not make a backup of old compiled code. Proceed anyway to compile and overwrite?",
-                    QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.No)
-                if retval == QtWidgets.QMessageBox.No:
-                    return ""
-
-        compileCommand = compilerFile + ' ' + pattern_file
-        print(compileCommand)
-        print("Compiling pattern code to .pat file")
-        exit_status = os.system(compileCommand)
-        if exit_status != 0:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Compile Fail", "Could not compile pattern.",
-                                          QtWidgets.QMessageBox.Ok)
-            return ""
-        pattern_file += 'at'
-
-        return pattern_file
-
-    def getCompiledPatFname(self):
+        try:
+            backupCompiled(pattern_file)
+        except OSError:
+            retval = QtWidgets.QMessageBox.question(
+                self.mainWindow, "Backup Fail",
+                "Could not make a backup of old compiled code. Proceed anyway to compile and overwrite?",
+                QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.No)
+            if retval == QtWidgets.QMessageBox.No:
+                return
+
+        self.view.labelCompileOutput.setText(f'Compiling {pattern_file}...')
+        self.patternCompiler = PatternCompiler(pattern_file, compilerFile, self)
+        self.patternCompiler.compiled.connect(partial(self.patternCompiled, action))
+        self.patternCompiler.compileFailed.connect(self.patternCompileFailed)
+        self.patternCompiler.start()
+
+    def patternCompiled(self, action, pattern_file, output):
+        self.showCompileOutput(output)
+        action(pattern_file)
+
+    def patternCompileFailed(self, message, output):
+        self.showCompileOutput(output)
+        messageBox = QtWidgets.QMessageBox(QtWidgets.QMessageBox.Warning, "Compile Fail", message,
+                                           QtWidgets.QMessageBox.Ok, self.mainWindow)
+        if output:
+            messageBox.setDetailedText(output)
+        messageBox.exec_()
+
+    def showCompileOutput(self, output):
+        """
+        show the last line of the compiler output, all of it in the tool tip
+        """
+        lines = output.strip().splitlines()
+        self.view.labelCompileOutput.setText(lines[-1] if lines else 'Compiler printed nothing')
+        self.view.labelCompileOutput.setToolTip(output.strip())
+
+    def withCompiledPatFname(self, action):
+        """
+        run action(pattern file) with the pattern file of the pattern field, or the uncompiled pattern file once
+        compiled if compiling is enabled
+        """
         if self.view.checkBoxCompile.isChecked():
-            pattern_file = self.compilePattern()
+            self.compilePattern(action)
+            return
         # pat name from pattern field
-        else:
-            pattern_file = self.view.lineEditPatternFile.text()
-            if not pattern_file:
-                QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Fail",
-                                              "No pattern file selected. Please select one.", QtWidgets.QMessageBox.Ok)
-                return ""
-        return pattern_file
-
-    def loadPattern(self):
-        pattern_file = self.getCompiledPatFname()
+        pattern_file = self.view.lineEditPatternFile.text()
         if not pattern_file:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Fail",
+                                          "No pattern file selected. Please select one.", QtWidgets.QMessageBox.Ok)
             return
+        action(pattern_file)
+
+    def loadPattern(self):
+        self.withCompiledPatFname(self.loadPatternFile)
+
+    def loadPatternFile(self, pattern_file):
+        self.showPatternDuration(pattern_file)
         # load pattern
-        self.det.pattern = pattern_file
-        self.view.lineEditPatternFile.setText(self.det.patfname[0])
+        self.mainWindow.detectorQueue.write('pattern',
+                                            lambda det: setattr(det, 'pattern', pattern_file),
+                                            showWritten(self.mainWindow, "Pattern Fail", self.getPatFile),
+                                            read=lambda det: det.patfname)
+
+    def getPatFile(self):
+        self.showPatFile(self.det.patfname)
+
+    def showPatFile(self, patfname):
+        self.view.lineEditPatternFile.setText(patfname[0])
 
     def getPatViewerColors(self):
         colorLevel = self.view.comboBoxPatColorSelect.currentIndex()
@@ -404,14 +471,82 @@ class PatternTab(QtWidgets.QWidget):
 
     def viewPattern(self):
         self.plotTab.showPatternViewer(True)
-        pattern_file = self.getCompiledPatFname()
-        if not pattern_file:
+        self.withCompiledPatFname(self.viewPatternFile)
+
+    def viewPatternFile(self, pattern_file):
+        try:
+            pattern = Pattern.load(pattern_file)
+            if self.patternViewer is None:
+                self.patternViewer = PatternViewer()
+                self.mainWindow.gridLayoutPatternViewer.addWidget(self.patternViewer)
+            if self.view.checkBoxPatRealTime.isChecked():
+                self.patternViewer.setTimeline(pattern, PatternTimeline(pattern), self.det.getSignalNames(),
+                                               self.colors_plot, self.show_clocks_number, self.line_width,
+                                               Defines.pattern.timeline_clocks)
+            else:
+                self.patternViewer.setPattern(
+                    pattern,
+                    self.det.getSignalNames(),
+                    self.colors_plot,
+                    self.colors_wait,
+                    self.linestyles_wait,
+                    self.alpha_wait,
+                    self.alpha_wait_rect,
+                    self.colors_loop,
+                    self.linestyles_loop,
+                    self.alpha_loop,
+                    self.alpha_loop_rect,
+                    self.show_clocks_number,
+                    self.line_width,
+                )
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Viewer Fail", str(e), QtWidgets.QMessageBox.Ok)
             return
+        self.showPatternDuration(pattern_file)
+
+    def showPatternDuration(self, pattern_file):
+        """
+        show the duration of one run of the pattern and the acquisition time estimated with the run clock, period,
+        frames and triggers of the acquisition tab
+        """
+        try:
+            timeline = PatternTimeline(Pattern.load(pattern_file))
+        except (OSError, ValueError) as e:
+            self.view.labelPatternDuration.setText(f'Duration unknown: {e}')
+            return
+        acquisition = self.acquisitionTab.view
+        duration = timeline.duration(acquisition.spinBoxRunF.value())
+        total = acquisitionTime(duration, self.acquisitionTab.periodValue(), acquisition.spinBoxFrames.value(),
+                                acquisition.spinBoxTriggers.value())
+        self.view.labelPatternDuration.setText(f'{timeline.clocks} clk = {duration * 1e6:.6g} us, '
+                                               f'acquisition ~{total:.3g} s')
+
+    def exportPattern(self):
+        self.withCompiledPatFname(self.exportPatternFile)
+
+    def exportPatternFile(self, pattern_file):
+        response = QtWidgets.QFileDialog.getSaveFileName(parent=self.mainWindow,
+                                                         caption="Export pattern figure",
+                                                         directory=str(Path(pattern_file).with_suffix('.png')),
+                                                         filter='Figure(*.png *.pdf *.svg)')
+        if not response[0]:
+            return
+        try:
+            self.savePatternFigure(pattern_file, response[0])
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Export Fail", str(e), QtWidgets.QMessageBox.Ok)
+
+    def savePatternFigure(self, pattern_file, path):
+        """
+        save the matplotlib figure of a pattern file (one axis per signal), the format is given by the suffix of path
+        """
+        # matplotlib takes a noticeable part of the gui startup to import, only import it when it is used
+        import matplotlib.pyplot as plt
+        from pyctbgui.utils.plotPattern import PlotPattern
 
-        signalNames = self.det.getSignalNames()
-        p = PlotPattern(
+        figure = PlotPattern(
             pattern_file,
-            signalNames,
+            self.det.getSignalNames(),
             self.colors_plot,
             self.colors_wait,
             self.linestyles_wait,
@@ -424,23 +559,11 @@ class PatternTab(QtWidgets.QWidget):
             self.clock_vertical_lines_spacing,
             self.show_clocks_number,
             self.line_width,
-        )
-
-        plt.close(self.figure)
-        self.mainWindow.gridLayoutPatternViewer.removeWidget(self.canvas)
-        self.canvas.close()
-        self.mainWindow.gridLayoutPatternViewer.removeWidget(self.toolbar)
-        self.toolbar.close()
-
+        ).patternPlot()
         try:
-            self.figure = p.patternPlot()
-            self.canvas = FigureCanvas(self.figure)
-            self.toolbar = NavigationToolbar(self.canvas, self.view)
-            self.mainWindow.gridLayoutPatternViewer.addWidget(self.toolbar)
-            self.mainWindow.gridLayoutPatternViewer.addWidget(self.canvas)
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Pattern Viewer Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
+            figure.savefig(path)
+        finally:
+            plt.close(figure)
 
     def saveParameters(self) -> list[str]:
         commands = []
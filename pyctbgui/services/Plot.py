@@ -4,13 +4,14 @@ import random
 from pathlib import Path
 
 import numpy as np
-from PyQt5 import QtWidgets, QtGui, uic
+from PyQt5 import QtWidgets, QtGui
 
 import pyqtgraph as pg
 from pyctbgui.utils import recordOrApplyPedestal
 from pyqtgraph import PlotWidget
 
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.uiLoader import loadUi
 
 
 class PlotTab(QtWidgets.QWidget):
@@ -19,7 +20,7 @@ class PlotTab(QtWidgets.QWidget):
         super().__init__(parent)
         self.frame_min: float = 0.0
         self.frame_max: float = 0.0
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "plot.ui", parent)
+        loadUi('plot', parent)
         self.view = parent
         self.mainWindow = None
         self.det = None
@@ -38,6 +39,8 @@ class PlotTab(QtWidgets.QWidget):
         self.pedestalRecord: bool = False
         self.pedestalApply: bool = True
         self.__acqFrames = None
+        self.zmqHwm: int | None = None
+        self.zmqHwmAdaptive: bool = False
         self.logger = logging.getLogger('PlotTab')
 
     def setup_ui(self):
@@ -270,15 +273,29 @@ class PlotTab(QtWidgets.QWidget):
         self.mainWindow.plotTransceiverImage.setColorMap(cm)
 
     def getZMQHWM(self):
+        self.mainWindow.detectorQueue.request('zmqHwmRead', self.readZMQHWM, self.showZMQHWM)
 
+    @staticmethod
+    def readZMQHWM(det) -> int:
+        """
+        runs in the detector queue thread
+        @return: zmq high water mark of the receiver
+        """
+        rx_zmq_hwm = det.getRxZmqHwm()[0]
+        # ensure same value in client zmq
+        det.setClientZmqHwm(rx_zmq_hwm)
+        return rx_zmq_hwm
+
+    def showZMQHWM(self, rx_zmq_hwm: int):
         self.view.comboBoxZMQHWM.currentIndexChanged.disconnect()
 
-        rx_zmq_hwm = self.det.getRxZmqHwm()[0]
-        # ensure same value in client zmq
-        self.det.setClientZmqHwm(rx_zmq_hwm)
+        self.zmqHwm = rx_zmq_hwm
 
+        # adaptive, the hwm is chosen at the start of each measurement
+        if self.zmqHwmAdaptive:
+            self.view.comboBoxZMQHWM.setCurrentIndex(2)
         # high readout, low HWM
-        if -1 < rx_zmq_hwm < 25:
+        elif -1 < rx_zmq_hwm < 25:
             self.view.comboBoxZMQHWM.setCurrentIndex(1)
         # low readout, high HWM
         else:
@@ -287,31 +304,74 @@ class PlotTab(QtWidgets.QWidget):
 
     def setZMQHWM(self):
         val = self.view.comboBoxZMQHWM.currentIndex()
+        self.zmqHwmAdaptive = val == 2
         # low readout, high HWM
         if val == 0:
-            self.det.setRxZmqHwm(Defines.Zmq_hwm_low_speed)
-            self.det.setClientZmqHwm(Defines.Zmq_hwm_low_speed)
+            self.applyZMQHWM(Defines.Zmq_hwm_low_speed)
         # high readout, low HWM
-        else:
-            self.det.setRxZmqHwm(Defines.Zmq_hwm_high_speed)
-            self.det.setClientZmqHwm(Defines.Zmq_hwm_high_speed)
+        elif val == 1:
+            self.applyZMQHWM(Defines.Zmq_hwm_high_speed)
 
+        # queued after the high water mark is written
         self.getZMQHWM()
 
+    def applyZMQHWM(self, hwm: int, callback=None, name: str = 'zmqHwm'):
+        """
+        set the high water mark of the receiver, of the client and of the zmq socket of the gui in the detector
+        queue, self.zmqHwm is updated once it is done.
+        the socket of the gui only reconnects if its high water mark changes. The new socket is connected in the
+        queue, it waits for the connection to the receiver so that no frame is lost when a measurement is started
+        right after, and replaces the socket of the gui in the gui thread
+        @param hwm: -1 for the zmq default
+        @param callback: function() called in the gui thread once the high water mark is applied (or failed)
+        @param name: name of the queued call, a pending call of the same name is replaced
+        """
+        source = self.acquisitionTab.zmqSource
+        sourceHwm = hwm if hwm >= 0 else Defines.Zmq_hwm_default
+
+        def write(det):
+            det.setRxZmqHwm(hwm)
+            det.setClientZmqHwm(hwm)
+
+        def connect(det):
+            if sourceHwm == source.hwm:
+                return None
+            return source.connect(sourceHwm, Defines.Time_Zmq_Reconnect_ms)
+
+        self.mainWindow.detectorQueue.write(name, write, partial(self.zmqHwmApplied, hwm, sourceHwm, callback),
+                                            connect)
+
+    def zmqHwmApplied(self, hwm: int, sourceHwm: int, callback, error: str | None, connection):
+        """
+        @param connection: socket connected with sourceHwm and whether it connected to the receiver, None if the
+        socket of the gui already used sourceHwm
+        """
+        if error is not None:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "ZMQ HWM", error, QtWidgets.QMessageBox.Ok)
+        else:
+            self.zmqHwm = hwm
+        if connection is not None:
+            socket, connected = connection
+            self.acquisitionTab.zmqSource.replaceSocket(socket, sourceHwm)
+            if not connected:
+                self.logger.warning(
+                    f'zmq socket not reconnected to the receiver within {Defines.Time_Zmq_Reconnect_ms} ms')
+        if callback is not None:
+            callback()
+
     def addSelectedAnalogPlots(self, i):
         enable = getattr(self.adcTab.view, f"checkBoxADC{i}Plot").isChecked()
         if enable:
             self.mainWindow.analogPlots[i].show()
         if not enable:
-            self.mainWindow.analogPlots[i].hide()
+            self.mainWindow.analogPlots.hide(i)
 
     def addAllSelectedAnalogPlots(self):
         for i in range(Defines.adc.count):
             self.addSelectedAnalogPlots(i)
 
     def removeAllAnalogPlots(self):
-        for i in range(Defines.adc.count):
-            self.mainWindow.analogPlots[i].hide()
+        self.mainWindow.analogPlots.hideAll()
 
         cm = pg.colormap.get('CET-L9')  # prepare a linear color map
         self.mainWindow.plotDigitalImage.setColorMap(cm)
@@ -321,30 +381,28 @@ class PlotTab(QtWidgets.QWidget):
         if enable:
             self.mainWindow.digitalPlots[i].show()
         if not enable:
-            self.mainWindow.digitalPlots[i].hide()
+            self.mainWindow.digitalPlots.hide(i)
 
     def addAllSelectedDigitalPlots(self):
         for i in range(Defines.signals.count):
             self.addSelectedDigitalPlots(i)
 
     def removeAllDigitalPlots(self):
-        for i in range(Defines.signals.count):
-            self.mainWindow.digitalPlots[i].hide()
+        self.mainWindow.digitalPlots.hideAll()
 
     def addSelectedTransceiverPlots(self, i):
         enable = getattr(self.transceiverTab.view, f"checkBoxTransceiver{i}Plot").isChecked()
         if enable:
             self.mainWindow.transceiverPlots[i].show()
         if not enable:
-            self.mainWindow.transceiverPlots[i].hide()
+            self.mainWindow.transceiverPlots.hide(i)
 
     def addAllSelectedTransceiverPlots(self):
         for i in range(Defines.transceiver.count):
             self.addSelectedTransceiverPlots(i)
 
     def removeAllTransceiverPlots(self):
-        for i in range(Defines.transceiver.count):
-            self.mainWindow.transceiverPlots[i].hide()
+        self.mainWindow.transceiverPlots.hideAll()
 
     def showPlot(self):
         self.mainWindow.plotAnalogWaveform.hide()
@@ -512,8 +570,9 @@ class PlotTab(QtWidgets.QWidget):
 
     def saveParameters(self):
         commands = []
-        if self.view.comboBoxZMQHWM.currentIndex() == 0:
-            commands.append(f"zmqhwm {Defines.Zmq_hwm_low_speed}")
-        else:
+        if self.view.comboBoxZMQHWM.currentIndex() == 1:
             commands.append(f"zmqhwm {Defines.Zmq_hwm_high_speed}")
+        else:
+            # adaptive runs start with the full hwm
+            commands.append(f"zmqhwm {Defines.Zmq_hwm_low_speed}")
         return commands
@@ -1,8 +1,8 @@
 from functools import partial
-from pathlib import Path
 
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.uiLoader import loadUi
 
 from slsdet import dacIndex
 
@@ -11,14 +11,30 @@ class PowerSuppliesTab(QtWidgets.QWidget):
 
     def __init__(self, parent):
         super().__init__(parent)
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "powerSupplies.ui", parent)
+        loadUi('powerSupplies', parent)
         self.view = parent
 
     def refresh(self):
-        self.updateVoltageNames()
-        for i in Defines.powerSupplies:
-            self.getVoltage(i)
-            self.getCurrent(i)
+        self.mainWindow.detectorQueue.request('powerSupplies', self.readPowerSupplies, self.showPowerSupplies)
+
+    @staticmethod
+    def readPowerSupplies(det) -> dict:
+        """
+        read all values shown in the tab, runs in the detector queue thread
+        """
+        return {
+            'names': det.getPowerNames(),
+            'voltages': [det.getMeasuredPower(getattr(dacIndex, f"V_POWER_{i}"))[0] for i in Defines.powerSupplies],
+            'currents': [det.getMeasuredCurrent(getattr(dacIndex, f"I_POWER_{i}"))[0] for i in Defines.powerSupplies],
+            'vchip': det.getPower(dacIndex.V_POWER_CHIP)[0],
+        }
+
+    def showPowerSupplies(self, values: dict):
+        self.showVoltageNames(values['names'])
+        for i, voltage, current in zip(Defines.powerSupplies, values['voltages'], values['currents']):
+            self.showVoltage(i, voltage)
+            self.showCurrent(i, current)
+        self.showVChip(values['vchip'])
 
     def connect_ui(self):
         for i in Defines.powerSupplies:
@@ -29,18 +45,32 @@ class PowerSuppliesTab(QtWidgets.QWidget):
         self.view.pushButtonPowerOff.clicked.connect(self.powerOff)
 
     def setup_ui(self):
-        for i in Defines.powerSupplies:
-            dac = getattr(dacIndex, f"V_POWER_{i}")
+        self.mainWindow.detectorQueue.request('powerSuppliesSetup', self.readVoltageSettings, self.setupVoltages)
+
+    @staticmethod
+    def readVoltageSettings(det) -> list[int]:
+        """
+        voltages set (not measured) of the power supplies, runs in the detector queue thread
+        """
+        return [det.getPower(getattr(dacIndex, f"V_POWER_{i}"))[0] for i in Defines.powerSupplies]
+
+    def setupVoltages(self, voltages: list[int]):
+        for i, retval in zip(Defines.powerSupplies, voltages):
             spinBox = getattr(self.view, f"spinBoxV{i}")
             checkBox = getattr(self.view, f"checkBoxV{i}")
-            retval = self.det.getPower(dac)[0]
+            spinBox.editingFinished.disconnect()
+            checkBox.stateChanged.disconnect()
             spinBox.setValue(retval)
             if retval == 0:
                 checkBox.setChecked(False)
                 spinBox.setDisabled(True)
+            spinBox.editingFinished.connect(partial(self.setVoltage, i))
+            checkBox.stateChanged.connect(partial(self.setVoltage, i))
 
     def updateVoltageNames(self):
-        retval = self.det.getPowerNames()
+        self.showVoltageNames(self.det.getPowerNames())
+
+    def showVoltageNames(self, retval: list[str]):
         getattr(self.view, "checkBoxVA").setText(retval[0])
         getattr(self.view, "checkBoxVB").setText(retval[1])
         getattr(self.view, "checkBoxVC").setText(retval[2])
@@ -48,15 +78,21 @@ class PowerSuppliesTab(QtWidgets.QWidget):
         getattr(self.view, "checkBoxVIO").setText(retval[4])
 
     def getVoltage(self, i):
+        voltageIndex = getattr(dacIndex, f"V_POWER_{i}")
+        self.mainWindow.detectorQueue.request(f'voltage{i}', lambda det: det.getMeasuredPower(voltageIndex)[0],
+                                              partial(self.showVoltage, i))
+        self.getVChip()
+
+        # TODO: handle multiple events when pressing enter (twice)
+
+    def showVoltage(self, i, retval):
         spinBox = getattr(self.view, f"spinBoxV{i}")
         checkBox = getattr(self.view, f"checkBoxV{i}")
-        voltageIndex = getattr(dacIndex, f"V_POWER_{i}")
         label = getattr(self.view, f"labelV{i}")
 
         spinBox.editingFinished.disconnect()
         checkBox.stateChanged.disconnect()
 
-        retval = self.det.getMeasuredPower(voltageIndex)[0]
         # spinBox.setValue(retval)
         if retval > 1:
             checkBox.setChecked(True)
@@ -69,10 +105,6 @@ class PowerSuppliesTab(QtWidgets.QWidget):
         spinBox.editingFinished.connect(partial(self.setVoltage, i))
         checkBox.stateChanged.connect(partial(self.setVoltage, i))
 
-        self.getVChip()
-
-        # TODO: handle multiple events when pressing enter (twice)
-
     def setVoltage(self, i):
         checkBox = getattr(self.view, f"checkBoxV{i}")
         spinBox = getattr(self.view, f"spinBoxV{i}")
@@ -82,25 +114,45 @@ class PowerSuppliesTab(QtWidgets.QWidget):
         value = 0
         if checkBox.isChecked():
             value = spinBox.value()
-        try:
-            self.det.setPower(voltageIndex, value)
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Voltage Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
+        self.mainWindow.detectorQueue.write(f'power{i}',
+                                            lambda det: det.setPower(voltageIndex, value),
+                                            partial(self.voltageWritten, i),
+                                            read=partial(self.readPowerSupply, i=i))
 
         # TODO: (properly) disconnecting and connecting to handle multiple events (out of focus and pressing enter).
         spinBox.editingFinished.connect(partial(self.setVoltage, i))
-        self.getVoltage(i)
-        self.getCurrent(i)
+
+    @staticmethod
+    def readPowerSupply(det, i) -> tuple:
+        """
+        @return: measured voltage and current of power supply i and the chip voltage, runs in the detector queue
+        thread
+        """
+        return (det.getMeasuredPower(getattr(dacIndex, f"V_POWER_{i}"))[0],
+                det.getMeasuredCurrent(getattr(dacIndex, f"I_POWER_{i}"))[0], det.getPower(dacIndex.V_POWER_CHIP)[0])
+
+    def voltageWritten(self, i, error, values):
+        if error is not None:
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Voltage Fail", error, QtWidgets.QMessageBox.Ok)
+        voltage, current, vchip = values
+        self.showVoltage(i, voltage)
+        self.showCurrent(i, current)
+        self.showVChip(vchip)
 
     def getCurrent(self, i):
-        label = getattr(self.view, f"labelI{i}")
         currentIndex = getattr(dacIndex, f"I_POWER_{i}")
-        retval = self.det.getMeasuredCurrent(currentIndex)[0]
+        self.mainWindow.detectorQueue.request(f'current{i}', lambda det: det.getMeasuredCurrent(currentIndex)[0],
+                                              partial(self.showCurrent, i))
+
+    def showCurrent(self, i, retval):
+        label = getattr(self.view, f"labelI{i}")
         label.setText(f'{str(retval)} mA')
 
     def getVChip(self):
-        self.view.spinBoxVChip.setValue(self.det.getPower(dacIndex.V_POWER_CHIP)[0])
+        self.showVChip(self.det.getPower(dacIndex.V_POWER_CHIP)[0])
+
+    def showVChip(self, retval):
+        self.view.spinBoxVChip.setValue(retval)
 
     def powerOff(self):
         for i in Defines.powerSupplies:
@@ -1,21 +1,24 @@
 from functools import partial
-from pathlib import Path
 
 import numpy as np
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 import pyqtgraph as pg
 from pyqtgraph import LegendItem
 
+from pyctbgui import processing
 from pyctbgui.utils.bit_utils import bit_is_set, manipulate_bit
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.detectorQueue import showWritten
 from pyctbgui.utils.recordOrApplyPedestal import recordOrApplyPedestal
+from pyctbgui.utils.uiLoader import loadUi
+from pyctbgui.utils.waveformCurves import WaveformCurves
 
 
 class SignalsTab(QtWidgets.QWidget):
 
     def __init__(self, parent):
         super().__init__(parent)
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "signals.ui", parent)
+        loadUi('signals', parent)
         self.view = parent
         self.mainWindow = None
         self.det = None
@@ -87,39 +90,14 @@ class SignalsTab(QtWidgets.QWidget):
                 self.legend.addItem(plot, name)
 
     @recordOrApplyPedestal
-    def _processWaveformData(self, data, aSamples, dSamples, rx_dbitlist, isPlottedArray, rx_dbitoffset, romode,
-                             nADCEnabled):
+    def _processWaveformData(self, data, aSamples, dSamples, rx_dbitlist, rx_dbitoffset, romode, nADCEnabled):
         """
         transform raw waveform data into a processed numpy array
         @param data:  raw waveform data
+        @return: array of shape (number of enabled bits, dSamples)
         """
-        dbitoffset = rx_dbitoffset
-        if romode == 2:
-            dbitoffset += nADCEnabled * 2 * aSamples
-        digital_array = np.array(np.frombuffer(data, offset=dbitoffset, dtype=np.uint8))
-        nbitsPerDBit = dSamples
-        if nbitsPerDBit % 8 != 0:
-            nbitsPerDBit += (8 - (dSamples % 8))
-        offset = 0
-        arr = []
-        for i in rx_dbitlist:
-            # where numbits * numsamples is not a multiple of 8
-            if offset % 8 != 0:
-                offset += (8 - (offset % 8))
-            if not isPlottedArray[i]:
-                offset += nbitsPerDBit
-                return None
-            waveform = np.zeros(dSamples)
-            for iSample in range(dSamples):
-                # all samples for digital bit together from slsReceiver
-                index = int(offset / 8)
-                iBit = offset % 8
-                bit = (digital_array[index] >> iBit) & 1
-                waveform[iSample] = bit
-                offset += 1
-            arr.append(waveform)
-
-        return np.array(arr)
+        return processing.digitalWaveform(data, aSamples, dSamples, len(rx_dbitlist), rx_dbitoffset, romode,
+                                          nADCEnabled)
 
     def processWaveformData(self, data, aSamples, dSamples):
         """
@@ -130,18 +108,15 @@ class SignalsTab(QtWidgets.QWidget):
         asamples: analog samples
         """
         waveforms = {}
-        isPlottedArray = {i: getattr(self.view, f"checkBoxBIT{i}Plot").isChecked() for i in self.rx_dbitlist}
-
-        digital_array = self._processWaveformData(data, aSamples, dSamples, self.rx_dbitlist, isPlottedArray,
-                                                  self.rx_dbitoffset, self.mainWindow.romode.value,
-                                                  self.mainWindow.nADCEnabled)
+        digital_array = self._processWaveformData(data, aSamples, dSamples, self.rx_dbitlist, self.rx_dbitoffset,
+                                                  self.mainWindow.romode.value, self.mainWindow.nADCEnabled)
 
         irow = 0
         for idx, i in enumerate(self.rx_dbitlist):
             # bits enabled but not plotting
-            waveform = digital_array[idx]
-            if waveform is None:
+            if not getattr(self.view, f"checkBoxBIT{i}Plot").isChecked():
                 continue
+            waveform = digital_array[idx]
             self.mainWindow.digitalPlots[i].setData(waveform)
             plotName = getattr(self.view, f"labelBIT{i}").text()
             waveforms[plotName] = waveform
@@ -157,16 +132,9 @@ class SignalsTab(QtWidgets.QWidget):
         self.mainWindow.plotDigitalWaveform = pg.plot()
         self.mainWindow.plotDigitalWaveform.addLegend(colCount=Defines.colCount)
         self.mainWindow.verticalLayoutPlot.addWidget(self.mainWindow.plotDigitalWaveform, 3)
-        self.mainWindow.digitalPlots = {}
-        waveform = np.zeros(1000)
-        for i in range(Defines.signals.count):
-            pen = pg.mkPen(color=self.getDBitButtonColor(i), width=1)
-            legendName = getattr(self.view, f"labelBIT{i}").text()
-            self.mainWindow.digitalPlots[i] = self.mainWindow.plotDigitalWaveform.plot(waveform,
-                                                                                       pen=pen,
-                                                                                       name=legendName,
-                                                                                       stepMode="left")
-            self.mainWindow.digitalPlots[i].hide()
+        self.mainWindow.digitalPlots = WaveformCurves(self.mainWindow.plotDigitalWaveform,
+                                                      lambda i: pg.mkPen(color=self.getDBitButtonColor(i), width=1),
+                                                      stepMode="left")
 
         self.mainWindow.plotDigitalImage = pg.ImageView()
         self.mainWindow.nDigitalRows = 0
@@ -198,15 +166,30 @@ class SignalsTab(QtWidgets.QWidget):
         self.getEnableBitPlotRange()
 
     def setDigitalBitEnable(self, i):
-        bitList = self.det.rx_dbitlist
         checkBox = getattr(self.view, f"checkBoxBIT{i}DB")
-        if checkBox.isChecked():
-            bitList.append(i)
-        else:
-            bitList.remove(i)
-        self.det.rx_dbitlist = bitList
+        self.writeDigitalBitEnable(f'rx_dbitlist{i}', range(i, i + 1), checkBox.isChecked())
 
-        self.updateDigitalBitEnable()
+    def writeDigitalBitEnable(self, name, bits, enable):
+        """
+        add or remove bits from the digital bit list in the detector queue thread, applied to the list read just
+        before writing it
+        @param name: name of the detector queue call, changes of different bits are not coalesced
+        """
+
+        def write(det):
+            bitList = list(det.rx_dbitlist)
+            for i in bits:
+                if enable and i not in bitList:
+                    bitList.append(i)
+                elif not enable and i in bitList:
+                    bitList.remove(i)
+            det.rx_dbitlist = bitList
+
+        self.mainWindow.detectorQueue.write(name,
+                                            write,
+                                            showWritten(self.mainWindow, "Digital Bit Enable Fail",
+                                                        self.updateDigitalBitEnable),
+                                            read=lambda det: det.rx_dbitlist)
 
     def getDigitalBitEnableRange(self, dbitList):
         self.view.checkBoxBIT0_31DB.stateChanged.disconnect()
@@ -220,18 +203,9 @@ class SignalsTab(QtWidgets.QWidget):
             partial(self.setDigitalBitEnableRange, Defines.signals.half, Defines.signals.count))
 
     def setDigitalBitEnableRange(self, start_nr, end_nr):
-        bitList = self.det.rx_dbitlist
         checkBox = getattr(self.view, f"checkBoxBIT{start_nr}_{end_nr - 1}DB")
-        for i in range(start_nr, end_nr):
-            if checkBox.isChecked():
-                if i not in list(bitList):
-                    bitList.append(i)
-            else:
-                if i in list(bitList):
-                    bitList.remove(i)
-        self.det.rx_dbitlist = bitList
-
-        self.updateDigitalBitEnable()
+        self.writeDigitalBitEnable(f'rx_dbitlist{start_nr}_{end_nr - 1}', range(start_nr, end_nr),
+                                   checkBox.isChecked())
 
     def getEnableBitPlot(self, i):
         checkBox = getattr(self.view, f"checkBoxBIT{i}DB")
@@ -284,7 +258,7 @@ class SignalsTab(QtWidgets.QWidget):
         pushButton = getattr(self.view, f"pushButtonBIT{i}")
         self.plotTab.showPalette(pushButton)
         pen = pg.mkPen(color=self.getDBitButtonColor(i), width=1)
-        self.mainWindow.digitalPlots[i].setPen(pen)
+        self.mainWindow.digitalPlots.setPen(i, pen)
 
     def getDBitButtonColor(self, i):
         pushButton = getattr(self.view, f"pushButtonBIT{i}")
@@ -302,15 +276,28 @@ class SignalsTab(QtWidgets.QWidget):
         return retval
 
     def setIOOutReg(self):
-        self.view.lineEditPatIOCtrl.editingFinished.disconnect()
         try:
-            self.det.patioctrl = int(self.view.lineEditPatIOCtrl.text(), 16)
-        except Exception as e:
+            mask = int(self.view.lineEditPatIOCtrl.text(), 16)
+        except ValueError as e:
             QtWidgets.QMessageBox.warning(self.mainWindow, "IO Out Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
-        # TODO: handling double event exceptions
-        self.view.lineEditPatIOCtrl.editingFinished.connect(self.setIOOutReg)
-        self.updateIOOut()
+            self.updateIOOut()
+            return
+        self.writeIOOut('patioctrl', lambda _: mask)
+
+    def writeIOOut(self, name, update):
+        """
+        change the io control mask in the detector queue thread
+        @param name: name of the detector queue call, changes of different bits are not coalesced
+        @param update: function(mask) -> new mask, applied to the mask read just before writing it
+        """
+
+        def write(det):
+            det.patioctrl = update(det.patioctrl)
+
+        self.mainWindow.detectorQueue.write(name,
+                                            write,
+                                            showWritten(self.mainWindow, "IO Out Fail", self.updateIOOut),
+                                            read=lambda det: det.patioctrl)
 
     def updateCheckBoxIOOut(self, i, out):
         checkBox = getattr(self.view, f"checkBoxBIT{i}Out")
@@ -325,14 +312,9 @@ class SignalsTab(QtWidgets.QWidget):
         self.getIOoutRange(retval)
 
     def setIOOut(self, i):
-        out = self.det.patioctrl
         checkBox = getattr(self.view, f"checkBoxBIT{i}Out")
-        mask = manipulate_bit(checkBox.isChecked(), out, i)
-        self.det.patioctrl = mask
-
-        retval = self.getIOOutReg()
-        self.updateCheckBoxIOOut(i, retval)
-        self.getIOoutRange(retval)
+        out = checkBox.isChecked()
+        self.writeIOOut(f'patioctrl{i}', lambda mask: manipulate_bit(out, mask, i))
 
     def getIOoutRange(self, out):
         self.view.checkBoxBIT0_31Out.stateChanged.disconnect()
@@ -345,14 +327,11 @@ class SignalsTab(QtWidgets.QWidget):
             partial(self.setIOOutRange, Defines.signals.half, Defines.signals.count))
 
     def setIOOutRange(self, start_nr, end_nr):
-        out = self.det.patioctrl
         checkBox = getattr(self.view, f"checkBoxBIT{start_nr}_{end_nr - 1}Out")
-        mask = getattr(Defines.signals, f"BIT{start_nr}_{end_nr - 1}_MASK")
-        if checkBox.isChecked():
-            self.det.patioctrl = out | mask
-        else:
-            self.det.patioctrl = out & ~mask
-        self.updateIOOut()
+        rangeMask = getattr(Defines.signals, f"BIT{start_nr}_{end_nr - 1}_MASK")
+        out = checkBox.isChecked()
+        self.writeIOOut(f'patioctrl{start_nr}_{end_nr - 1}', lambda mask: mask | rangeMask
+                        if out else mask & ~rangeMask)
 
     def getDBitOffset(self):
         self.view.spinBoxDBitOffset.editingFinished.disconnect()
@@ -361,7 +340,9 @@ class SignalsTab(QtWidgets.QWidget):
         self.view.spinBoxDBitOffset.editingFinished.connect(self.setDbitOffset)
 
     def setDbitOffset(self):
-        self.det.rx_dbitoffset = self.view.spinBoxDBitOffset.value()
+        self.mainWindow.detectorQueue.writeProperty(
+            'rx_dbitoffset', self.view.spinBoxDBitOffset.value(),
+            showWritten(self.mainWindow, "Digital Bit Offset Fail", self.getDBitOffset))
 
     def saveParameters(self) -> list:
         commands = []
@@ -1,45 +1,198 @@
+import logging
+import time
 from functools import partial
 from pathlib import Path
 
-from PyQt5 import uic, QtWidgets
+from PyQt5 import QtWidgets, QtCore
+import pyqtgraph as pg
 
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.monitor import MonitorBuffer, MonitorLog
+from pyctbgui.utils.uiLoader import loadUi
 from slsdet import dacIndex
 
 
 class SlowAdcTab(QtWidgets.QWidget):
+    # channels of the monitor, grouped as in comboBoxMonitorPlot
+    MONITOR_GROUPS = [
+        [f'slowAdc{i}' for i in range(Defines.slowAdc.count)],
+        [f'I_{i}' for i in Defines.powerSupplies],
+        ['temperature'],
+    ]
 
     def __init__(self, parent):
         super().__init__(parent)
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "slowAdcs.ui", parent)
+        loadUi('slowAdcs', parent)
         self.view = parent
         self.mainWindow = None
         self.det = None
+        self.logger = logging.getLogger('SlowAdcTab')
+        self.monitorBuffer = MonitorBuffer([channel for group in self.MONITOR_GROUPS for channel in group])
+        self.monitorLog: MonitorLog | None = None
+        self.monitorTimer = QtCore.QTimer()
+        # a monitor sample is queued or being read
+        self.monitorSampling = False
+        self.monitorPlot = None
+        self.monitorCurves = {}
 
     def setup_ui(self):
-        pass
+        self.view.doubleSpinBoxMonitorInterval.setValue(Defines.Time_Monitor_Interval_s)
+        self.monitorPlot = pg.PlotWidget()
+        self.monitorPlot.addLegend(colCount=Defines.colCount)
+        self.monitorPlot.setLabel('bottom', 'time [s]')
+        self.view.verticalLayoutMonitorPlot.addWidget(self.monitorPlot)
+        for group in self.MONITOR_GROUPS:
+            for i, channel in enumerate(group):
+                self.monitorCurves[channel] = self.monitorPlot.plot(pen=pg.mkPen(pg.intColor(i, len(group)), width=1),
+                                                                    name=channel)
+        self.plotMonitor()
 
     def connect_ui(self):
         for i in range(Defines.slowAdc.count):
             getattr(self.view, f"pushButtonSlowAdc{i}").clicked.connect(partial(self.updateSlowAdc, i))
         self.view.pushButtonTemp.clicked.connect(self.updateTemperature)
+        self.view.checkBoxMonitor.stateChanged.connect(self.setMonitor)
+        self.view.doubleSpinBoxMonitorInterval.editingFinished.connect(self.setMonitor)
+        self.view.comboBoxMonitorPlot.currentIndexChanged.connect(self.plotMonitor)
+        self.view.pushButtonMonitorLog.clicked.connect(self.setMonitorLog)
+        self.monitorTimer.timeout.connect(self.requestMonitor)
+        self.mainWindow.detectorQueue.callFailed.connect(self.monitorFailed)
 
     def refresh(self):
-        self.updateSlowAdcNames()
-        for i in range(Defines.slowAdc.count):
-            self.updateSlowAdc(i)
-        self.updateTemperature()
+        self.mainWindow.detectorQueue.request('slowAdcs', self.readSlowAdcs, self.showSlowAdcs)
+
+    @staticmethod
+    def readSlowAdcs(det) -> dict:
+        """
+        read all values shown in the tab, runs in the detector queue thread
+        """
+        slowAdcs = [getattr(dacIndex, f"SLOW_ADC{i}") for i in range(Defines.slowAdc.count)]
+        return {
+            'names': det.getSlowADCNames(),
+            'slowAdcs': [det.getSlowADC(slowAdc)[0] / 1000 for slowAdc in slowAdcs],
+            'temperature': det.getTemperature(dacIndex.SLOW_ADC_TEMP)[0],
+        }
+
+    def showSlowAdcs(self, values: dict):
+        self.showSlowAdcNames(values['names'])
+        for i, value in enumerate(values['slowAdcs']):
+            self.showSlowAdc(i, value)
+        self.showTemperature(values['temperature'])
 
     def updateSlowAdcNames(self):
-        for i, name in enumerate(self.mainWindow.det.getSlowADCNames()):
+        self.showSlowAdcNames(self.mainWindow.det.getSlowADCNames())
+
+    def showSlowAdcNames(self, names: list[str]):
+        for i, name in enumerate(names):
             getattr(self.view, f"labelSlowAdc{i}").setText(name)
 
     def updateSlowAdc(self, i):
         slowADCIndex = getattr(dacIndex, f"SLOW_ADC{i}")
+        self.mainWindow.detectorQueue.request(f'slowAdc{i}', lambda det: det.getSlowADC(slowADCIndex)[0] / 1000,
+                                              partial(self.showSlowAdc, i))
+
+    def showSlowAdc(self, i, slowadc):
+        """
+        @param slowadc: value in mV
+        """
         label = getattr(self.view, f"labelSlowAdcValue{i}")
-        slowadc = (self.det.getSlowADC(slowADCIndex))[0] / 1000
         label.setText(f'{slowadc:.2f} mV')
 
     def updateTemperature(self):
-        slowadc = self.det.getTemperature(dacIndex.SLOW_ADC_TEMP)
-        self.view.labelTempValue.setText(f'{str(slowadc[0])} °C')
+        self.mainWindow.detectorQueue.request('temperature', lambda det: det.getTemperature(dacIndex.SLOW_ADC_TEMP)[0],
+                                              self.showTemperature)
+
+    def showTemperature(self, value):
+        self.view.labelTempValue.setText(f'{str(value)} °C')
+
+    def setMonitor(self):
+        if self.view.checkBoxMonitor.isChecked():
+            self.monitorTimer.start(int(self.view.doubleSpinBoxMonitorInterval.value() * 1000))
+            self.requestMonitor()
+        else:
+            self.monitorTimer.stop()
+
+    def requestMonitor(self):
+        # the queue only replaces a sample still waiting, the timeouts are skipped until the sample requested
+        # before is read so that a slow detector only lowers the sampling rate
+        if self.monitorSampling:
+            return
+        self.monitorSampling = True
+        self.mainWindow.detectorQueue.request('monitor', self.readMonitor, self.monitorSampled)
+
+    def monitorFailed(self, name: str, message: str):
+        if name == 'monitor':
+            self.monitorSampling = False
+
+    @staticmethod
+    def readMonitor(det) -> tuple[float, dict[str, float]]:
+        """
+        read one sample of all monitored channels, runs in the detector queue thread
+        @return: (time, value of each channel)
+        """
+        values = {}
+        for i in range(Defines.slowAdc.count):
+            values[f'slowAdc{i}'] = det.getSlowADC(getattr(dacIndex, f"SLOW_ADC{i}"))[0] / 1000
+        for i in Defines.powerSupplies:
+            values[f'I_{i}'] = det.getMeasuredCurrent(getattr(dacIndex, f"I_POWER_{i}"))[0]
+        values['temperature'] = det.getTemperature(dacIndex.SLOW_ADC_TEMP)[0]
+        return time.time(), values
+
+    def monitorSampled(self, sample: tuple[float, dict[str, float]]):
+        self.monitorSampling = False
+        timestamp, values = sample
+        self.monitorBuffer.append(timestamp, values)
+        if self.monitorLog is not None:
+            self.monitorLog.write(timestamp, values)
+
+        for i in range(Defines.slowAdc.count):
+            self.showSlowAdc(i, values[f'slowAdc{i}'])
+        self.showTemperature(values['temperature'])
+        for i in Defines.powerSupplies:
+            self.mainWindow.powerSuppliesTab.showCurrent(i, values[f'I_{i}'])
+        self.plotMonitor()
+
+    def plotMonitor(self):
+        """
+        plot the trend of the selected group of channels, time in seconds relative to the last sample
+        """
+        group = self.MONITOR_GROUPS[self.view.comboBoxMonitorPlot.currentIndex()]
+        times, values = self.monitorBuffer.window()
+        if len(times):
+            times = times - times[-1]
+        for channel, curve in self.monitorCurves.items():
+            if channel in group:
+                curve.setData(times, values[:, self.monitorBuffer.channels.index(channel)])
+                curve.show()
+            else:
+                curve.hide()
+
+    def setMonitorLog(self):
+        if self.monitorLog is not None:
+            self.closeMonitorLog()
+            return
+        response = QtWidgets.QFileDialog.getSaveFileName(self.view, "Monitor Log",
+                                                         str(Path(self.det.fpath) / 'monitor.csv'),
+                                                         'CSV (*.csv);;Binary (*.bin)')
+        if response[0] == '':
+            self.view.pushButtonMonitorLog.setChecked(False)
+            return
+        try:
+            self.monitorLog = MonitorLog(response[0], self.monitorBuffer.channels)
+        except OSError as e:
+            self.logger.exception(e)
+            QtWidgets.QMessageBox.warning(self.mainWindow, "Monitor Log Fail", str(e), QtWidgets.QMessageBox.Ok)
+            self.view.pushButtonMonitorLog.setChecked(False)
+            return
+        self.view.labelMonitorLog.setText(self.monitorLog.path.name)
+
+    def closeMonitorLog(self):
+        if self.monitorLog is not None:
+            self.monitorLog.close()
+            self.monitorLog = None
+        self.view.pushButtonMonitorLog.setChecked(False)
+        self.view.labelMonitorLog.setText('')
+
+    def stopMonitor(self):
+        self.monitorTimer.stop()
+        self.closeMonitorLog()
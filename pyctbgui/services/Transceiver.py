@@ -1,24 +1,25 @@
 from functools import partial
-from pathlib import Path
 
 import numpy as np
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 import pyqtgraph as pg
 from pyqtgraph import LegendItem
 
-from pyctbgui.utils import decoder
+from pyctbgui import processing
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.detectorQueue import showWritten
 
 from pyctbgui.utils.bit_utils import bit_is_set, manipulate_bit
-import pyctbgui.utils.pixelmap as pm
 from pyctbgui.utils.recordOrApplyPedestal import recordOrApplyPedestal
+from pyctbgui.utils.uiLoader import loadUi
+from pyctbgui.utils.waveformCurves import WaveformCurves
 
 
 class TransceiverTab(QtWidgets.QWidget):
 
     def __init__(self, parent):
         super().__init__(parent)
-        uic.loadUi(Path(__file__).parent.parent / 'ui' / "transceiver.ui", parent)
+        loadUi('transceiver', parent)
         self.view = parent
         self.mainWindow = None
         self.det = None
@@ -85,14 +86,7 @@ class TransceiverTab(QtWidgets.QWidget):
         @param nTransceiverEnabled: number of transceivers enabled
         @return: processed transceiver data
         """
-        transceiverOffset = 0
-        if romode == 4:
-            nbitsPerDBit = dSamples
-            if dSamples % 8 != 0:
-                nbitsPerDBit += (8 - (dSamples % 8))
-            transceiverOffset += nDBitEnabled * (nbitsPerDBit // 8)
-        trans_array = np.array(np.frombuffer(data, offset=transceiverOffset, dtype=np.uint16))
-        return trans_array.reshape(-1, nTransceiverEnabled)
+        return processing.transceiverWaveform(data, dSamples, romode, nDBitEnabled, nTransceiverEnabled)
 
     def processWaveformData(self, data, dSamples):
         """
@@ -126,14 +120,7 @@ class TransceiverTab(QtWidgets.QWidget):
         @param nDBitEnabled:
         @return:
         """
-        transceiverOffset = 0
-        if romode == 4:
-            nbitsPerDBit = dSamples
-            if dSamples % 8 != 0:
-                nbitsPerDBit += (8 - (dSamples % 8))
-            transceiverOffset += nDBitEnabled * (nbitsPerDBit // 8)
-        trans_array = np.array(np.frombuffer(data, offset=transceiverOffset, dtype=np.uint16))
-        return decoder.decode(trans_array, pm.matterhorn_transceiver())
+        return processing.transceiverImage(data, dSamples, romode, nDBitEnabled)
 
     def processImageData(self, data, dSamples):
         """
@@ -172,15 +159,9 @@ class TransceiverTab(QtWidgets.QWidget):
         self.mainWindow.plotTransceiverWaveform = pg.plot()
         self.mainWindow.plotTransceiverWaveform.addLegend(colCount=Defines.colCount)
         self.mainWindow.verticalLayoutPlot.addWidget(self.mainWindow.plotTransceiverWaveform, 5)
-        self.mainWindow.transceiverPlots = {}
-        waveform = np.zeros(1000)
-        for i in range(Defines.transceiver.count):
-            pen = pg.mkPen(color=self.getTransceiverButtonColor(i), width=1)
-            legendName = getattr(self.view, f"labelTransceiver{i}").text()
-            self.mainWindow.transceiverPlots[i] = self.mainWindow.plotTransceiverWaveform.plot(waveform,
-                                                                                               pen=pen,
-                                                                                               name=legendName)
-            self.mainWindow.transceiverPlots[i].hide()
+        self.mainWindow.transceiverPlots = WaveformCurves(
+            self.mainWindow.plotTransceiverWaveform,
+            lambda i: pg.mkPen(color=self.getTransceiverButtonColor(i), width=1))
 
         self.mainWindow.plotTransceiverImage = pg.ImageView()
         self.mainWindow.nTransceiverRows = 0
@@ -201,16 +182,29 @@ class TransceiverTab(QtWidgets.QWidget):
         return retval
 
     def setTransceiverEnableReg(self):
-        self.view.lineEditTransceiverMask.editingFinished.disconnect()
         try:
             mask = int(self.view.lineEditTransceiverMask.text(), 16)
-            self.det.transceiverenable = mask
-        except Exception as e:
+        except ValueError as e:
             QtWidgets.QMessageBox.warning(self.mainWindow, "Transceiver Enable Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
-        # TODO: handling double event exceptions
-        self.view.lineEditTransceiverMask.editingFinished.connect(self.setTransceiverEnableReg)
-        self.updateTransceiverEnable()
+            self.updateTransceiverEnable()
+            return
+        self.writeTransceiverEnable('transceiverenable', lambda _: mask)
+
+    def writeTransceiverEnable(self, name, update):
+        """
+        change the transceiver enable mask in the detector queue thread
+        @param name: name of the detector queue call, changes of different bits are not coalesced
+        @param update: function(mask) -> new mask, applied to the mask read just before writing it
+        """
+
+        def write(det):
+            det.transceiverenable = update(det.transceiverenable)
+
+        self.mainWindow.detectorQueue.write(name,
+                                            write,
+                                            showWritten(self.mainWindow, "Transceiver Enable Fail",
+                                                        self.updateTransceiverEnable),
+                                            read=lambda det: det.transceiverenable)
 
     def getTransceiverEnable(self, i, mask):
         checkBox = getattr(self.view, f"checkBoxTransceiver{i}")
@@ -229,14 +223,8 @@ class TransceiverTab(QtWidgets.QWidget):
 
     def setTransceiverEnable(self, i):
         checkBox = getattr(self.view, f"checkBoxTransceiver{i}")
-        try:
-            enableMask = manipulate_bit(checkBox.isChecked(), self.det.transceiverenable, i)
-            self.det.transceiverenable = enableMask
-        except Exception as e:
-            QtWidgets.QMessageBox.warning(self.mainWindow, "Transceiver Enable Fail", str(e), QtWidgets.QMessageBox.Ok)
-            pass
-
-        self.updateTransceiverEnable()
+        enable = checkBox.isChecked()
+        self.writeTransceiverEnable(f'transceiverenable{i}', lambda mask: manipulate_bit(enable, mask, i))
 
     def getTransceiverEnablePlot(self, i):
         checkBox = getattr(self.view, f"checkBoxTransceiver{i}")
@@ -259,7 +247,7 @@ class TransceiverTab(QtWidgets.QWidget):
         pushButton = getattr(self.view, f"pushButtonTransceiver{i}")
         self.plotTab.showPalette(pushButton)
         pen = pg.mkPen(color=self.getTransceiverButtonColor(i), width=1)
-        self.mainWindow.transceiverPlots[i].setPen(pen)
+        self.mainWindow.transceiverPlots.setPen(i, pen)
 
     def getTransceiverButtonColor(self, i):
         pushButton = getattr(self.view, f"pushButtonTransceiver{i}")
@@ -0,0 +1,84 @@
+import logging
+from pathlib import Path
+
+from PyQt5 import QtWidgets, QtCore
+
+from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.instrumentation import instrumentation
+
+
+class DiagnosticsDialog(QtWidgets.QDialog):
+    """
+    shows the per stage timing of the acquisition read path collected by pyctbgui.utils.instrumentation
+    """
+    COLUMNS = ['stage', 'count', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'rate_hz']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger('DiagnosticsDialog')
+        self.setWindowTitle('Diagnostics')
+        self.resize(700, 320)
+
+        self.checkBoxEnable = QtWidgets.QCheckBox('Enable instrumentation')
+        self.checkBoxEnable.setChecked(instrumentation.enabled)
+        self.labelFrames = QtWidgets.QLabel()
+        self.tableStages = QtWidgets.QTableWidget(0, len(self.COLUMNS))
+        self.tableStages.setHorizontalHeaderLabels(self.COLUMNS)
+        self.tableStages.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.tableStages.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tableStages.verticalHeader().setVisible(False)
+        self.pushButtonReset = QtWidgets.QPushButton('Reset')
+        self.pushButtonSave = QtWidgets.QPushButton('Save...')
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.checkBoxEnable)
+        buttons.addStretch()
+        buttons.addWidget(self.pushButtonReset)
+        buttons.addWidget(self.pushButtonSave)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(buttons)
+        layout.addWidget(self.labelFrames)
+        layout.addWidget(self.tableStages)
+
+        self.checkBoxEnable.stateChanged.connect(self.setEnabledInstrumentation)
+        self.pushButtonReset.clicked.connect(self.resetInstrumentation)
+        self.pushButtonSave.clicked.connect(self.saveInstrumentation)
+
+        self.refreshTimer = QtCore.QTimer(self)
+        self.refreshTimer.timeout.connect(self.refresh)
+        self.refreshTimer.start(Defines.Time_Diagnostics_Refresh_ms)
+        self.refresh()
+
+    def setEnabledInstrumentation(self):
+        instrumentation.enabled = self.checkBoxEnable.isChecked()
+
+    def resetInstrumentation(self):
+        instrumentation.reset()
+        self.refresh()
+
+    def saveInstrumentation(self):
+        response = QtWidgets.QFileDialog.getSaveFileName(self, "Save Diagnostics",
+                                                         str(Path.cwd() / 'diagnostics.json'),
+                                                         'JSON (*.json);;CSV samples (*.csv)')
+        if response[0] == '':
+            return
+        try:
+            instrumentation.dump(response[0])
+        except OSError as e:
+            self.logger.exception(e)
+            QtWidgets.QMessageBox.warning(self, "Save Diagnostics Fail", str(e), QtWidgets.QMessageBox.Ok)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        summary = instrumentation.summary()
+        self.labelFrames.setText(f"Frames received: {summary['framesReceived']}    "
+                                 f"Missing (frameIndex gaps): {summary['framesMissing']}    "
+                                 f"MB received: {summary['bytesReceived'] / 1e6:.1f}")
+        stages = summary['stages']
+        self.tableStages.setRowCount(len(stages))
+        for row, stage in enumerate(stages):
+            for column, key in enumerate(self.COLUMNS):
+                value = stage[key]
+                text = f'{value:.3f}' if isinstance(value, float) else str(value)
+                self.tableStages.setItem(row, column, QtWidgets.QTableWidgetItem(text))
@@ -1,6 +1,6 @@
 import logging
 
-from PyQt5 import QtWidgets, QtCore, uic
+from PyQt5 import QtWidgets, QtCore
 import argparse
 import signal
 import pyqtgraph as pg
@@ -11,8 +11,13 @@ from slsdet import Detector, dacIndex
 
 from pyctbgui.services import TransceiverTab, DacTab, AdcTab, AcquisitionTab, SignalsTab, PatternTab, \
     SlowAdcTab, PlotTab, PowerSuppliesTab
+from pyctbgui.ui.Diagnostics import DiagnosticsDialog
 from pyctbgui.utils import alias_utility
 from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.detectorQueue import DetectorQueue
+from pyctbgui.utils.detectorState import DetectorState
+from pyctbgui.utils.frameSource import FrameLogSource, NpyFrameSource, ReplayFrameSource
+from pyctbgui.utils.uiLoader import loadUi
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -32,20 +37,25 @@ class MainWindow(QtWidgets.QMainWindow):
 
         super().__init__(*args, **kwargs)
 
-        uic.loadUi(Path(__file__).parent / "CtbGui.ui", self)
+        loadUi('CtbGui', self)
         logging.basicConfig(encoding='utf-8', level=logging.INFO)
 
         self.logger = logging.getLogger(__name__)
         self.det = None
         self.showLegend = True
         self.settings = None
+        self.diagnosticsDialog = None
         try:
-            self.det = Detector()
+            # settings read by the tabs are cached, see DetectorState
+            self.det = DetectorState(Detector())
             # ensure detector is up
             self.det.detectorserverversion[0]
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Connect Fail", str(e) + "Exiting Gui...", QtWidgets.QMessageBox.Ok)
             raise
+        # detector calls of the tabs run one after the other in the background
+        self.detectorQueue = DetectorQueue(self.det, self)
+        self.detectorQueue.callFailed.connect(self.detectorCallFailed)
 
         # get Tab Classes
         self.plotTab: PlotTab = self.widgetPlot
@@ -69,8 +79,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.tabWidget.currentChanged.connect(self.refresh_tab)
         self.connect_ui()
 
-        for tab in self.tabs_list:
-            tab.refresh()
+        # the window shows before the settings are read: they are all read at once in the background, then the tabs
+        # show them from the cache
+        self.pushButtonStart.setEnabled(False)
+        self.actionReplay.setEnabled(False)
+        self.statusbar.showMessage('Reading detector settings...')
+        self.detectorQueue.request('refresh', lambda det: det.refresh(), self.initialRefreshDone)
 
         # also refreshes timer to start plotting
         self.plotTab.plotOptions()
@@ -82,9 +96,6 @@ class MainWindow(QtWidgets.QMainWindow):
         self.patternTab.updatePatViewerParameters()
         self.plotTab.showPatternViewer(False)
 
-        if self.alias_file is not None:
-            self.loadAliasFile()
-
         self.signalShortcutAcquire.connect(self.pushButtonStart.click)
         self.signalShortcutTabUp.connect(partial(self.changeTabIndex, True))
         self.signalShortcutTabDown.connect(partial(self.changeTabIndex, False))
@@ -176,6 +187,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.savePlotTypeAndDetector()
 
     def closeEvent(self, event):
+        self.acquisitionTab.statusPoller.stopPolling()
+        self.slowAdcTab.stopMonitor()
+        self.detectorQueue.stopQueue()
         self.saveSettings()
 
     def loadAliasFile(self):
@@ -256,16 +270,93 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         if response[0] == '':
             return
+        self.detectorQueue.write('parameters', lambda det: setattr(det, 'parameters', response[0]),
+                                 self.parametersLoaded)
+
+    def parametersLoaded(self, error, result=None):
+        if error is not None:
+            self.logger.error(f'Loading parameters failed: {error}')
+            QtWidgets.QMessageBox.warning(self, "Load Parameter Fail", error, QtWidgets.QMessageBox.Ok)
+            return
         try:
-            self.det.parameters = (response[0])
             for tab in self.tabs_list:
                 tab.refresh()
             QtWidgets.QMessageBox.information(self, "Load Parameter Success", "Parameters loaded successfully",
                                               QtWidgets.QMessageBox.Ok)
-        except (RuntimeError, FileNotFoundError) as e:
+        except RuntimeError as e:
             self.logger.exception(e)
             QtWidgets.QMessageBox.warning(self, "Load Parameter Fail", str(e), QtWidgets.QMessageBox.Ok)
 
+    def refreshFromDetector(self):
+        """
+        read all settings again from the detector, e.g. after they were changed outside of the gui
+        """
+        self.detectorQueue.request('refresh', lambda det: det.refresh(), self.refreshTabs)
+
+    def refreshTabs(self, result=None):
+        try:
+            for tab in self.tabs_list:
+                tab.refresh()
+        except RuntimeError as e:
+            self.logger.exception(e)
+            QtWidgets.QMessageBox.warning(self, "Refresh Fail", str(e), QtWidgets.QMessageBox.Ok)
+
+    def initialRefreshDone(self, result=None):
+        self.refreshTabs()
+        # the names of the alias file replace the names read from the detector
+        if self.alias_file is not None:
+            self.loadAliasFile()
+        self.statusbar.clearMessage()
+        self.enableAcquisition()
+
+    def enableAcquisition(self):
+        self.pushButtonStart.setEnabled(True)
+        self.actionReplay.setEnabled(True)
+
+    def detectorCallFailed(self, name, message):
+        self.statusbar.setStyleSheet("color:red")
+        self.statusbar.showMessage(f'Detector call {name} failed: {message}')
+        if name == 'refresh':
+            self.enableAcquisition()
+
+    def showDiagnostics(self):
+        if self.diagnosticsDialog is None:
+            self.diagnosticsDialog = DiagnosticsDialog(self)
+        self.diagnosticsDialog.show()
+        self.diagnosticsDialog.raise_()
+
+    def replayData(self):
+        """
+        replay a recorded zmq stream (.zidx) or a .npy stack of raw frames through the acquisition pipeline
+        """
+        response = QtWidgets.QFileDialog.getOpenFileName(parent=self,
+                                                         caption="Select data to replay",
+                                                         directory=str(Path.cwd()),
+                                                         filter='Recorded data (*.zidx *.npy)')
+        if response[0] == '':
+            return
+        path = Path(response[0])
+        rates = ['As fast as possible', 'Fixed rate']
+        if path.suffix == '.zidx':
+            rates.insert(0, 'Recorded rate')
+        choice, ok = QtWidgets.QInputDialog.getItem(self, "Replay Data", "Replay rate:", rates, 0, False)
+        if not ok:
+            return
+        rate = None
+        if choice == 'Recorded rate':
+            rate = ReplayFrameSource.RECORDED_RATE
+        elif choice == 'Fixed rate':
+            rate, ok = QtWidgets.QInputDialog.getDouble(self, "Replay Data", "Frames per second:", 50, 0.01, 1e6, 2)
+            if not ok:
+                return
+        try:
+            source = FrameLogSource(path, rate) if path.suffix == '.zidx' else NpyFrameSource(path, rate)
+        except Exception as e:
+            self.logger.exception(e)
+            QtWidgets.QMessageBox.warning(self, "Replay Fail", str(e), QtWidgets.QMessageBox.Ok)
+            return
+        self.acquisitionTab.startReplay(source)
+
     def refresh_tab(self, tab_index):
         match tab_index:
             case 0:
@@ -288,10 +379,6 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.plotTab.refresh()
 
     def setup_ui(self):
-        # To check detector status
-        self.statusTimer = QtCore.QTimer()
-        self.statusTimer.timeout.connect(self.acquisitionTab.checkEndofAcquisition)
-
         # To auto trigger the read
         self.read_timer = QtCore.QTimer()
         self.read_timer.timeout.connect(self.acquisitionTab.read_zmq)
@@ -332,6 +419,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actionLoadParameters.triggered.connect(self.loadParameters)
         self.pushButtonStart.clicked.connect(self.acquisitionTab.toggleAcquire)
         self.actionSaveParameters.triggered.connect(self.saveParameters)
+        self.actionReplay.triggered.connect(self.replayData)
+        self.actionDiagnostics.triggered.connect(self.showDiagnostics)
+        self.actionRefreshDetector.triggered.connect(self.refreshFromDetector)
 
         for tab in self.tabs_list:
             tab.connect_ui()
@@ -0,0 +1,97 @@
+"""
+Automatic choice of the zmq high water mark of a measurement
+
+Runs saving data need the full high water mark (Defines.Zmq_hwm_low_speed) so no frame is dropped. Live
+tuning runs only need the latest frames: when the gui consumes frames slower than the receiver catches them,
+a minimal high water mark (Defines.Zmq_hwm_high_speed) drops the backlog instead of showing frames that are
+seconds old.
+
+The throughput of the consumer (frames processed by read_zmq) and of the producer (rx_framescaught) and the
+backlog between them (frames caught but not yet processed) are measured during each measurement. The value
+for the next measurement is chosen from the smoothed rates of the previous ones: the high water mark of the
+receiver is only changed between measurements.
+"""
+import time
+
+from pyctbgui.utils.defines import Defines
+
+
+class AdaptiveHwm:
+
+    def __init__(self,
+                 margin: float = Defines.Zmq_hwm_adaptive_margin,
+                 maxBacklog: int = Defines.Zmq_hwm_adaptive_backlog,
+                 smoothing: float = 0.5,
+                 clock=time.monotonic):
+        """
+        @param margin: the consumer keeps up if its rate is at least margin * the rate of the producer
+        @param maxBacklog: frames waiting to be processed above which the consumer does not keep up
+        @param smoothing: weight of the last measurement in the averaged rates
+        """
+        self.margin = margin
+        self.maxBacklog = maxBacklog
+        self.smoothing = smoothing
+        self.clock = clock
+        self.consumerFps: float | None = None
+        self.producerFps: float | None = None
+        self.hwm: int | None = None
+        self.reason = ''
+        self.startRun()
+
+    def startRun(self):
+        self.runStart = self.clock()
+        self.consumed = 0
+        self.caught = 0
+        self.backlog = 0
+        self.maxRunBacklog = 0
+
+    def frameConsumed(self):
+        self.consumed += 1
+
+    def update(self, caught: int):
+        """
+        @param caught: frames caught by the receiver since the start of the measurement
+        """
+        self.caught = caught
+        self.backlog = max(caught - self.consumed, 0)
+        self.maxRunBacklog = max(self.maxRunBacklog, self.backlog)
+
+    def endRun(self, caught: int):
+        """
+        update the rates with the measurement that just finished
+        """
+        self.update(caught)
+        elapsed = self.clock() - self.runStart
+        if elapsed <= 0 or caught == 0:
+            return
+        self.consumerFps = self.__smooth(self.consumerFps, self.consumed / elapsed)
+        self.producerFps = self.__smooth(self.producerFps, caught / elapsed)
+
+    def __smooth(self, average: float | None, value: float) -> float:
+        if average is None:
+            return value
+        return self.smoothing * value + (1 - self.smoothing) * average
+
+    @property
+    def keepsUp(self) -> bool:
+        if self.maxRunBacklog > self.maxBacklog:
+            return False
+        return self.consumerFps >= self.margin * self.producerFps
+
+    def choose(self, saving: bool) -> tuple[int, str]:
+        """
+        @param saving: raw or numpy file writing is enabled
+        @return: high water mark for the next measurement and the reason for choosing it
+        """
+        if saving:
+            self.hwm, self.reason = Defines.Zmq_hwm_low_speed, 'file writing enabled'
+        elif self.producerFps is None:
+            self.hwm, self.reason = Defines.Zmq_hwm_low_speed, 'no throughput measured yet'
+        elif self.keepsUp:
+            self.hwm, self.reason = Defines.Zmq_hwm_low_speed, \
+                f'gui keeps up ({self.consumerFps:.1f} of {self.producerFps:.1f} fps)'
+        else:
+            self.hwm, self.reason = Defines.Zmq_hwm_high_speed, \
+                f'gui too slow ({self.consumerFps:.1f} of {self.producerFps:.1f} fps, ' \
+                f'backlog {self.maxRunBacklog} frames)'
+        return self.hwm, self.reason
@@ -2,12 +2,29 @@ from enum import Enum
 
 
 class Defines:
-    Time_Wait_For_Packets_ms = 0.5
+    # without new frames for this long after the detector stopped, the measurement is done
+    Time_Wait_For_Packets_s = 0.5
     Time_Status_Refresh_ms = 100
     Time_Plot_Refresh_ms = 20
 
     Zmq_hwm_high_speed = 2
     Zmq_hwm_low_speed = -1
+    # hwm used for the subscriber socket of the gui when the receiver uses the zmq default (-1)
+    Zmq_hwm_default = 1000
+    Zmq_hwm_adaptive_margin = 0.9
+    Zmq_hwm_adaptive_backlog = 10
+    # longest wait for the gui to reconnect to the receiver after a change of hwm, before starting a measurement
+    Time_Zmq_Reconnect_ms = 1000
+
+    Numpy_checkpoint_frames = 100
+    Numpy_checkpoint_seconds = 2
+
+    Diagnostics_window = 1000
+    Time_Diagnostics_Refresh_ms = 500
+
+    # samples kept per channel by the slow adc, current and temperature monitor
+    Monitor_capacity = 3600
+    Time_Monitor_Interval_s = 1.0
 
     Acquisition_Tab_Index = 7
     Max_Tabs = 9
@@ -33,6 +50,8 @@ class Defines:
     class pattern:
         tabIndex = 6
         loops_count = 6
+        # clocks drawn by the real time view of the pattern viewer
+        timeline_clocks = 100000
 
     class transceiver:
         count = 4
@@ -0,0 +1,146 @@
+import contextlib
+import logging
+import threading
+
+from PyQt5 import QtCore, QtWidgets
+
+from pyctbgui.utils.detectorState import DetectorState
+
+
+class DetectorQueue(QtCore.QThread):
+    """
+    runs the detector calls of the gui one after the other in a single background thread, so a slow or
+    unreachable board never freezes the gui and the plotting of a running acquisition goes on while settings
+    are changed
+
+    request(name, call, callback): call(det) runs in the queue thread, callback(result) in the gui thread.
+    write(name, write, callback, read): write(det) changes a setting, read(det) reads back the values the gui
+    shows (filling the DetectorState cache), callback(error, read result) runs in the gui thread, error is the
+    message of a failed write or None.
+
+    Calls are named after what they read or write (e.g. 'dacs', 'dac3', 'period'). A call requested again
+    before it ran only runs once, with the latest arguments and callback and after the calls requested before it:
+    scrubbing a spinbox only writes the last value, and settings written through several calls (e.g. the adc
+    enable mask and one of its bits) end up as they were changed last.
+    """
+    # callback, result
+    callDone = QtCore.pyqtSignal(object, object)
+    # call name, error message
+    callFailed = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, det, parent=None):
+        """
+        @param det: the DetectorState of the gui (or a slsdet Detector)
+        """
+        super().__init__(parent)
+        self.det = det
+        self.logger = logging.getLogger('DetectorQueue')
+        self.__idle = threading.Condition()
+        self.__pending = {}
+        self.__running = None
+        self.__active = False
+        self.__stopped = False
+        # emitted from run(), delivered in the thread of the queue object (gui thread)
+        self.callDone.connect(self.__dispatch)
+
+    def request(self, name: str, call, callback=None):
+        """
+        @param name: a pending call of the same name is replaced
+        @param call: function(det) -> result, runs in the queue thread
+        @param callback: function(result), runs in the gui thread
+        """
+        with self.__idle:
+            if self.__stopped:
+                return
+            # a call requested again moves to the end of the queue, after the calls requested since
+            self.__pending.pop(name, None)
+            self.__pending[name] = (call, callback)
+            start = not self.__active
+            self.__active = True
+        if start:
+            # the previous run may still be returning
+            self.wait()
+            self.start()
+
+    def write(self, name: str, write, callback=None, read=None):
+        """
+        @param write: function(det) writing a setting, runs in the queue thread
+        @param callback: function(error, result), runs in the gui thread, error is None if the write succeeded,
+        result is returned by read
+        @param read: function(det) reading back what the gui shows after the write, runs in the queue thread
+        """
+        self.request(name, lambda det: self.__writeAndRead(det, write, read),
+                     None if callback is None else lambda result: callback(*result))
+
+    def writeProperty(self, name: str, value, callback=None):
+        """
+        write the detector property name and read it back
+        """
+        self.write(name, lambda det: setattr(det, name, value), callback, lambda det: getattr(det, name))
+
+    @staticmethod
+    def __writeAndRead(det, write, read) -> tuple[str | None, object]:
+        error = None
+        try:
+            write(det)
+        except Exception as e:
+            error = str(e)
+        return error, None if read is None else read(det)
+
+    def waitUntilIdle(self, timeout: float | None = None) -> bool:
+        """
+        block until all requested calls ran. Not for the gui thread: the gui queues a call after the ones it
+        depends on (e.g. the start of an acquisition after the settings just written) and continues in its callback
+        @return: False on timeout
+        """
+        with self.__idle:
+            return self.__idle.wait_for(lambda: not self.__pending and self.__running is None, timeout)
+
+    def stopQueue(self):
+        """
+        drop pending calls and wait for the call running
+        """
+        with self.__idle:
+            self.__stopped = True
+            self.__pending.clear()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.__idle:
+                self.__running = None
+                self.__idle.notify_all()
+                if not self.__pending:
+                    self.__active = False
+                    return
+                self.__running = next(iter(self.__pending))
+                call, callback = self.__pending.pop(self.__running)
+            try:
+                # a DetectorState is shared with the gui and status poller threads, hold its lock for the whole
+                # call (objects returned by the detector, e.g. det.patloop, call it outside of DetectorState)
+                with self.det.lock if isinstance(self.det, DetectorState) else contextlib.nullcontext():
+                    result = call(self.det)
+            except Exception as e:
+                self.logger.exception(f'{self.__running} failed')
+                self.callFailed.emit(self.__running, str(e))
+                continue
+            self.callDone.emit(callback, result)
+
+    def __dispatch(self, callback, result):
+        if callback is not None:
+            callback(result)
+
+
+def showWritten(parent, title: str, show):
+    """
+    @param show: function() updating the widgets of the setting from the (cached) detector values
+    @return: callback for DetectorQueue.write and writeProperty, warns in a message box titled title if the write
+    failed and shows the setting
+    """
+
+    def written(error, result):
+        if error is not None:
+            QtWidgets.QMessageBox.warning(parent, title, error, QtWidgets.QMessageBox.Ok)
+        show()
+
+    return written
@@ -0,0 +1,158 @@
+"""
+Cached view of the detector settings shown in the gui tabs
+
+Every read of a slsdet Detector property is a round trip to the detector server or the receiver, milliseconds
+each on a remote board. The tabs read the same settings many times (refreshing a tab re-reads every DAC twice,
+the acquisition tab re-reads eight groups of settings before each start), so DetectorState keeps the settings
+read once and answers the next reads from memory.
+
+DetectorState wraps a Detector and is used in its place:
+    - settings listed in CACHED_PROPERTIES and getters listed in CACHED_METHODS are cached
+    - writing a property or calling a setter writes to the detector and invalidates the cached values it
+      changes (PROPERTY_INVALIDATES and METHOD_INVALIDATES), unknown setters invalidate the whole cache
+    - everything else (measured values, status, frames caught, ...) is always read from the detector
+
+Settings changed outside of the gui (e.g. with sls_detector_put) are only seen after refresh(), which reads all
+cached properties again at once.
+
+The gui thread, the DetectorQueue thread and the StatusPoller thread share the detector: every call forwarded to
+the detector (reading a missing or uncached value, writing a setting, calling a method) holds a lock, so the
+threads never call the detector at the same time and a value read before a write is never cached after it. Reads
+of cached values do not lock. Objects returned by the detector (e.g. det.patloop, written with det.patloop[0] =
+...) call it without the lock, the DetectorQueue holds the lock for its whole calls.
+"""
+import logging
+import threading
+from functools import partial
+
+# detector settings only changed by writing them
+CACHED_PROPERTIES = [
+    'adcclk', 'adcenable', 'adcenable10g', 'adcinvert', 'adcphase', 'adcpipeline', 'adcvpp', 'asamples', 'daclist',
+    'dbitclk', 'dbitphase', 'dbitpipeline', 'dsamples', 'fname', 'fpath', 'frames', 'fwrite', 'highvoltage',
+    'patfname', 'patioctrl', 'patlimits', 'period', 'romode', 'runclk', 'rx_dbitlist', 'rx_dbitoffset', 'rx_zmqip',
+    'rx_zmqport', 'rx_zmqstream', 'tengiga', 'transceiverenable', 'triggers', 'tsamples'
+]
+
+# getters of settings, cached per arguments
+CACHED_METHODS = [
+    'getDAC', 'getPower', 'getAdcNames', 'getDacNames', 'getSignalNames', 'getPowerNames', 'getSlowADCNames',
+    'getSlowADCList', 'getVoltageList', 'getRxZmqHwm'
+]
+
+# cached values changed by writing a property besides the property itself
+PROPERTY_INVALIDATES = {
+    'runclk': ['adcphase', 'dbitphase'],
+    'adcclk': ['adcphase'],
+    'dbitclk': ['dbitphase'],
+    'tengiga': ['adcenable', 'adcenable10g'],
+}
+
+# properties loading many settings at once
+INVALIDATES_ALL = ['parameters', 'pattern', 'config', 'settings']
+
+# cached values changed by a method, methods not listed here and not starting with 'get' invalidate everything
+METHOD_INVALIDATES = {
+    'setDAC': ['getDAC'],
+    'setPower': ['getPower'],
+    'setAdcName': ['getAdcNames'],
+    'setDacName': ['getDacNames'],
+    'setSignalName': ['getSignalNames'],
+    'setSlowADCName': ['getSlowADCNames'],
+    'setVoltageName': ['getPowerNames'],
+    'setRxZmqHwm': ['getRxZmqHwm'],
+    'setClientZmqHwm': [],
+    'start': [],
+    'rx_start': [],
+    'stop': [],
+    'rx_stop': [],
+}
+
+
+class DetectorState:
+
+    def __init__(self, det):
+        """
+        @param det: slsdet Detector
+        """
+        # bypass __setattr__, which writes to the detector
+        object.__setattr__(self, 'detector', det)
+        object.__setattr__(self, 'cache', {})
+        object.__setattr__(self, 'logger', logging.getLogger('DetectorState'))
+        object.__setattr__(self, 'lock', threading.RLock())
+
+    def __getattr__(self, name):
+        if name in CACHED_PROPERTIES:
+            return self.__cached(name, lambda: getattr(self.detector, name))
+        with self.lock:
+            attribute = getattr(self.detector, name)
+        if name in CACHED_METHODS:
+            return partial(self.__cachedCall, name, attribute)
+        if name in METHOD_INVALIDATES or (callable(attribute) and not name.startswith('get')):
+            return partial(self.__invalidatingCall, name, attribute)
+        if callable(attribute):
+            return partial(self.__lockedCall, attribute)
+        return attribute
+
+    def __setattr__(self, name, value):
+        with self.lock:
+            try:
+                setattr(self.detector, name, value)
+            finally:
+                if name in INVALIDATES_ALL:
+                    self.invalidate()
+                else:
+                    self.invalidate(name, *PROPERTY_INVALIDATES.get(name, []))
+
+    def __cached(self, key, read):
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        with self.lock:
+            if key not in self.cache:
+                self.cache[key] = read()
+            return self.cache[key]
+
+    def __cachedCall(self, name, method, *args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        return self.__cached(key, lambda: method(*args, **kwargs))
+
+    def __lockedCall(self, method, *args, **kwargs):
+        with self.lock:
+            return method(*args, **kwargs)
+
+    def __invalidatingCall(self, name, method, *args, **kwargs):
+        with self.lock:
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if name not in METHOD_INVALIDATES:
+                    self.invalidate()
+                elif METHOD_INVALIDATES[name]:
+                    self.invalidate(*METHOD_INVALIDATES[name])
+
+    def invalidate(self, *names: str):
+        """
+        forget cached values, read them again from the detector when needed
+        @param names: properties or getter methods (all argument combinations), everything if none are given
+        """
+        with self.lock:
+            if not names:
+                self.cache.clear()
+                return
+            for key in list(self.cache):
+                if (key[0] if isinstance(key, tuple) else key) in names:
+                    del self.cache[key]
+
+    def refresh(self):
+        """
+        read all cached properties again from the detector at once, getters are read again on their next use
+        """
+        with self.lock:
+            self.invalidate()
+            for name in CACHED_PROPERTIES:
+                try:
+                    self.cache[name] = getattr(self.detector, name)
+                except RuntimeError as e:
+                    # not supported by this detector server, read (and fail) on use
+                    self.logger.debug(f'Could not read {name}: {e}')
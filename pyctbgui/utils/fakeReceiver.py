@@ -0,0 +1,213 @@
+"""
+Stand-in for the zmq stream of slsReceiver, used to load test the gui without a chip test board
+
+Publishes [json header, payload] multipart messages laid out like the receiver's ctb data for the analog,
+digital, analog_digital, transceiver and digital_transceiver readout modes, followed by the single part
+dummy message that ends an acquisition.
+
+usage:
+    python -m pyctbgui.utils.fakeReceiver --romode analog --asamples 5000 --frames 1000 --rate 100
+    python -m pyctbgui.utils.fakeReceiver --romode digital --dsamples 1000 --dbitlist 0 1 2 3 --rate 0
+"""
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+import zmq
+
+ROMODES = ['analog', 'digital', 'analog_digital', 'transceiver', 'digital_transceiver']
+# bytes of one transceiver sample of one transceiver
+TRANSCEIVER_SAMPLE_SIZE = 8
+
+
+def enabledIndices(mask: int) -> list[int]:
+    return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def digitalBytesPerBit(dSamples: int) -> int:
+    """
+    the samples of a digital bit are packed together and padded to a full byte by the receiver
+    """
+    return (dSamples + 7) // 8
+
+
+def payloadSize(romode: int,
+                aSamples: int = 0,
+                dSamples: int = 0,
+                tSamples: int = 0,
+                adcMask: int = 0,
+                dbitList: list[int] = (),
+                transceiverMask: int = 0,
+                dbitOffset: int = 0) -> int:
+    """
+    @return: number of bytes of the data part of a message
+    """
+    size = 0
+    if romode in [0, 2]:
+        size += len(enabledIndices(adcMask)) * aSamples * 2
+    if romode in [1, 2, 4]:
+        size += dbitOffset + len(dbitList) * digitalBytesPerBit(dSamples)
+    if romode in [3, 4]:
+        size += len(enabledIndices(transceiverMask)) * tSamples * TRANSCEIVER_SAMPLE_SIZE
+    return size
+
+
+def makePayload(rng: np.random.Generator,
+                romode: int,
+                aSamples: int = 0,
+                dSamples: int = 0,
+                tSamples: int = 0,
+                adcMask: int = 0,
+                dbitList: list[int] = (),
+                transceiverMask: int = 0,
+                dbitOffset: int = 0) -> bytes:
+    """
+    generate random data with the layout expected by the acquisition tab
+    @param romode: readout mode value (index in ROMODES)
+    """
+    parts = []
+    if romode in [0, 2]:
+        nADC = len(enabledIndices(adcMask))
+        parts.append(rng.integers(0, 1 << 14, size=aSamples * nADC, dtype=np.uint16).tobytes())
+    if romode in [1, 2, 4]:
+        parts.append(bytes(dbitOffset))
+        nBytes = len(dbitList) * digitalBytesPerBit(dSamples)
+        parts.append(rng.integers(0, 256, size=nBytes, dtype=np.uint8).tobytes())
+    if romode in [3, 4]:
+        nTransceiver = len(enabledIndices(transceiverMask))
+        parts.append(
+            rng.integers(0, 1 << 16, size=tSamples * nTransceiver * TRANSCEIVER_SAMPLE_SIZE // 2,
+                         dtype=np.uint16).tobytes())
+    return b''.join(parts)
+
+
+def makeHeader(frameIndex: int, nFrames: int, size: int, fileIndex: int = 0, fname: str = 'run') -> bytes:
+    """
+    json header with the fields of the receiver used by the gui
+    """
+    return json.dumps({
+        'jsonversion': 4,
+        'bitmode': 16,
+        'fileIndex': fileIndex,
+        'detshape': [1, 1],
+        'shape': [1, 1],
+        'size': size,
+        'acqIndex': frameIndex + 1,
+        'frameIndex': frameIndex,
+        'progress': 100 * (frameIndex + 1) / nFrames,
+        'fname': fname,
+        'data': 1,
+        'completeImage': 1,
+        'frameNumber': frameIndex + 1,
+        'timestamp': time.time_ns(),
+    }).encode()
+
+
+def makeDummyHeader(fileIndex: int = 0, fname: str = 'run') -> bytes:
+    return json.dumps({'jsonversion': 4, 'fileIndex': fileIndex, 'fname': fname, 'data': 0}).encode()
+
+
+class FakeReceiver:
+    """
+    zmq PUB socket publishing one acquisition of random frames
+    """
+
+    def __init__(self,
+                 port: int = 30001,
+                 romode: int = 0,
+                 aSamples: int = 5000,
+                 dSamples: int = 0,
+                 tSamples: int = 0,
+                 adcMask: int = 0xFFFFFFFF,
+                 dbitList: list[int] = (),
+                 transceiverMask: int = 0x3,
+                 dbitOffset: int = 0,
+                 hwm: int = 1000,
+                 nPayloads: int = 16,
+                 seed: int = 0):
+        """
+        @param port: tcp port to bind to (the gui connects to rx_zmqport), 0 for a free port (see self.port)
+        @param hwm: send high water mark, messages are dropped by zmq when the subscriber does not keep up
+        @param nPayloads: number of distinct random payloads cycled through (generating is slower than sending)
+        """
+        self.logger = logging.getLogger('FakeReceiver')
+        self.romode = romode
+        self.context = zmq.Context.instance()
+        self.socket = self.context.socket(zmq.PUB)
+        self.socket.setsockopt(zmq.SNDHWM, hwm)
+        if port == 0:
+            self.port = self.socket.bind_to_random_port('tcp://*')
+        else:
+            self.socket.bind(f'tcp://*:{port}')
+            self.port = port
+        rng = np.random.default_rng(seed)
+        self.payloads = [
+            makePayload(rng, romode, aSamples, dSamples, tSamples, adcMask, dbitList, transceiverMask, dbitOffset)
+            for _ in range(nPayloads)
+        ]
+        self.published = 0
+
+    def publish(self, nFrames: int, rate: float = 0, fileIndex: int = 0, fname: str = 'run') -> int:
+        """
+        publish one acquisition
+        @param rate: frames per second, 0 to send as fast as possible
+        @return: number of frames sent
+        """
+        start = time.monotonic()
+        for i in range(nFrames):
+            if rate > 0:
+                delay = start + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            payload = self.payloads[i % len(self.payloads)]
+            self.socket.send_multipart([makeHeader(i, nFrames, len(payload), fileIndex, fname), payload])
+            self.published += 1
+        self.socket.send(makeDummyHeader(fileIndex, fname))
+        elapsed = time.monotonic() - start
+        self.logger.info(f'published {nFrames} frames in {elapsed:.3f} s ({nFrames / max(elapsed, 1e-9):.1f} fps)')
+        return nFrames
+
+    def close(self):
+        self.socket.close()
+
+
+def maskArgument(value: str) -> int:
+    return int(value, 0)
+
+
+def addLayoutArguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--romode', choices=ROMODES, default='analog')
+    parser.add_argument('--asamples', type=int, default=5000, help='analog samples')
+    parser.add_argument('--dsamples', type=int, default=0, help='digital samples')
+    parser.add_argument('--tsamples', type=int, default=0, help='transceiver samples')
+    parser.add_argument('--adcmask', type=maskArgument, default=0xFFFFFFFF, help='enabled adcs (e.g. 0xFFFF)')
+    parser.add_argument('--dbitlist', type=int, nargs='*', default=[], help='enabled digital bits')
+    parser.add_argument('--dbitoffset', type=int, default=0, help='bytes to skip before the digital data')
+    parser.add_argument('--transceivermask', type=maskArgument, default=0x3, help='enabled transceivers')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Publish fake slsReceiver zmq data')
+    addLayoutArguments(parser)
+    parser.add_argument('--port', type=int, default=30001)
+    parser.add_argument('--frames', type=int, default=1000, help='frames per acquisition')
+    parser.add_argument('--acquisitions', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=100, help='frames per second, 0 for as fast as possible')
+    parser.add_argument('--hwm', type=int, default=1000, help='send high water mark')
+    parser.add_argument('--wait', type=float, default=1, help='seconds to wait for subscribers before sending')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    receiver = FakeReceiver(args.port, ROMODES.index(args.romode), args.asamples, args.dsamples, args.tsamples,
+                            args.adcmask, args.dbitlist, args.transceivermask, args.dbitoffset, args.hwm)
+    # PUB sockets drop messages until the subscribers are connected
+    time.sleep(args.wait)
+    for fileIndex in range(args.acquisitions):
+        receiver.publish(args.frames, args.rate, fileIndex)
+    receiver.close()
+
+
+if __name__ == '__main__':
+    main()
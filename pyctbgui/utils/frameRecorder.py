@@ -0,0 +1,219 @@
+"""
+Lossless recording of the zmq stream consumed by the acquisition tab
+
+Every multipart message ([json header, data] or the single part end of acquisition message) is appended
+to a segmented binary log. A fixed size index record is written for each message so that any message
+can be located without parsing the log, and so that the stream can be replayed exactly later on.
+
+files created for the prefix 'run':
+    run_000000.zlog, run_000001.zlog, ...   segments: concatenated header and data bytes
+    run.zidx                                index: one FrameRecorder.INDEX_DTYPE record per message
+
+Writing is done in a background thread with large sequential writes, record() only enqueues the message.
+"""
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+class FrameRecorder:
+    INDEX_DTYPE = np.dtype([
+        ('frameIndex', np.int64),  # frameIndex of the json header, -1 for messages without data
+        ('timestamp', np.float64),  # reception time in seconds (time.time())
+        ('segment', np.uint32),
+        ('offset', np.uint64),  # offset of the header inside the segment
+        ('headerSize', np.uint32),
+        ('dataSize', np.uint64),
+        ('nParts', np.uint8),
+    ])
+    SEGMENT_SIZE = 1 << 30
+    WRITE_SIZE = 8 << 20
+    QUEUE_SIZE = 10000
+
+    def __init__(self, prefix: str | Path, segmentSize: int = None, writeSize: int = None):
+        """
+        @param prefix: path prefix of the log files (e.g. /data/run_0)
+        @param segmentSize: a new segment file is started once the current one exceeds this size in bytes
+        @param writeSize: buffered bytes are written to disk once this size is reached
+        """
+        self.prefix = Path(prefix)
+        self.segmentSize = segmentSize if segmentSize is not None else self.SEGMENT_SIZE
+        self.writeSize = writeSize if writeSize is not None else self.WRITE_SIZE
+        self.logger = logging.getLogger('FrameRecorder')
+        self.framesRecorded = 0
+        self.bytesRecorded = 0
+
+        self.prefix.parent.mkdir(parents=True, exist_ok=True)
+        self.__queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.__error: Exception | None = None
+        self.__segment = 0
+        self.__segmentOffset = 0
+        self.__segmentFile = open(self.segmentPath(self.prefix, 0), 'wb', buffering=0)
+        self.__indexFile = open(self.indexPath(self.prefix), 'wb', buffering=0)
+        self.__thread = threading.Thread(target=self.__writeLoop, name='FrameRecorder', daemon=True)
+        self.__thread.start()
+
+    @staticmethod
+    def segmentPath(prefix: str | Path, segment: int) -> Path:
+        prefix = Path(prefix)
+        return prefix.with_name(f'{prefix.name}_{segment:06d}.zlog')
+
+    @staticmethod
+    def indexPath(prefix: str | Path) -> Path:
+        prefix = Path(prefix)
+        return prefix.with_name(f'{prefix.name}.zidx')
+
+    def record(self, header: bytes, data: bytes | None = None, frameIndex: int = -1):
+        """
+        enqueue one zmq message for writing, blocks only if the writer thread is far behind
+        @param header: first part of the message
+        @param data: second part of the message or None for single part messages
+        @param frameIndex: frame index of the message, used to look up frames in the log
+        """
+        if self.__error is not None:
+            raise RuntimeError('frame recorder stopped') from self.__error
+        self.__queue.put((time.time(), frameIndex, header, data))
+
+    def __startSegment(self):
+        self.__segmentFile.close()
+        self.__segment += 1
+        self.__segmentOffset = 0
+        self.__segmentFile = open(self.segmentPath(self.prefix, self.__segment), 'wb', buffering=0)
+
+    @staticmethod
+    def writeAll(file, data):
+        """
+        the files are unbuffered, a raw write can write only part of the data (e.g. interrupted by a signal)
+        """
+        view = memoryview(data)
+        while view:
+            view = view[file.write(view):]
+
+    def __write(self, buffer: bytearray, index: list):
+        if not index:
+            return
+        self.writeAll(self.__segmentFile, buffer)
+        # the index is written after the data it points to
+        self.writeAll(self.__indexFile, np.array(index, dtype=self.INDEX_DTYPE).tobytes())
+        buffer.clear()
+        index.clear()
+
+    def __writeLoop(self):
+        buffer = bytearray()
+        index = []
+        try:
+            while True:
+                try:
+                    item = self.__queue.get(timeout=0.1 if buffer else None)
+                except queue.Empty:
+                    # the stream is idle, do not keep data in memory
+                    self.__write(buffer, index)
+                    continue
+                if item is None:
+                    break
+                timestamp, frameIndex, header, data = item
+                dataSize = 0 if data is None else len(data)
+                if self.__segmentOffset > 0 and \
+                        self.__segmentOffset + len(header) + dataSize > self.segmentSize:
+                    self.__write(buffer, index)
+                    self.__startSegment()
+                index.append((frameIndex, timestamp, self.__segment, self.__segmentOffset, len(header), dataSize,
+                              1 if data is None else 2))
+                buffer += header
+                if data is not None:
+                    buffer += data
+                self.__segmentOffset += len(header) + dataSize
+                self.framesRecorded += 1
+                self.bytesRecorded += len(header) + dataSize
+                if len(buffer) >= self.writeSize:
+                    self.__write(buffer, index)
+            self.__write(buffer, index)
+        except Exception as e:
+            self.__error = e
+            self.logger.exception('writing the frame log failed')
+            # unblock record() calls waiting for the full queue
+            while not self.__queue.empty():
+                self.__queue.get_nowait()
+
+    def close(self):
+        """
+        write the remaining messages and close the files
+        """
+        if self.__thread.is_alive():
+            self.__queue.put(None)
+            self.__thread.join()
+        self.__segmentFile.close()
+        self.__indexFile.close()
+        if self.__error is not None:
+            raise RuntimeError('frame recorder stopped') from self.__error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FrameLogReader:
+    """
+    random access to the messages of a log written by FrameRecorder
+    """
+
+    def __init__(self, prefix: str | Path):
+        self.prefix = Path(prefix)
+        index = np.fromfile(FrameRecorder.indexPath(self.prefix), dtype=FrameRecorder.INDEX_DTYPE)
+        # drop entries pointing past the end of the segments (log of a crashed run)
+        segments = np.unique(index['segment'])
+        segmentSizes = np.zeros(int(segments.max()) + 1 if len(segments) else 0, dtype=np.uint64)
+        for segment in segments:
+            path = FrameRecorder.segmentPath(self.prefix, segment)
+            segmentSizes[segment] = path.stat().st_size if path.exists() else 0
+        ends = index['offset'] + index['headerSize'] + index['dataSize']
+        valid = ends <= segmentSizes[index['segment']]
+        self.index = index[:np.argmin(valid)] if not valid.all() else index
+        self.__files = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __file(self, segment: int):
+        if segment not in self.__files:
+            self.__files[segment] = open(FrameRecorder.segmentPath(self.prefix, segment), 'rb')
+        return self.__files[segment]
+
+    def __getitem__(self, i: int) -> list[bytes]:
+        """
+        @return: the i-th message as a list of parts like recv_multipart
+        """
+        entry = self.index[i]
+        file = self.__file(int(entry['segment']))
+        file.seek(int(entry['offset']))
+        header = file.read(int(entry['headerSize']))
+        if entry['nParts'] == 1:
+            return [header]
+        return [header, file.read(int(entry['dataSize']))]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, frameIndex: int) -> np.ndarray:
+        """
+        @return: positions in the log of the messages with the given frame index
+        """
+        return np.flatnonzero(self.index['frameIndex'] == frameIndex)
+
+    def close(self):
+        for file in self.__files.values():
+            file.close()
+        self.__files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,233 @@
+"""
+Sources of [json header, data] messages consumed by AcquisitionTab.read_zmq
+
+ZmqFrameSource reads the live stream of the receiver. The replay sources feed previously recorded data
+through the same pipeline, which allows running and tuning the decoding and plotting code without a chip
+test board attached:
+    FrameLogSource: zmq stream recorded with FrameRecorder (exact messages and timing)
+    NpyFrameSource: .npy stack of raw frame payloads, one frame per row
+
+replay rate:
+    ReplayFrameSource.RECORDED_RATE: reproduce the timing of the recording
+    float: fixed number of frames per second
+    None: as fast as possible
+"""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import zmq
+
+from pyctbgui.utils.frameRecorder import FrameLogReader
+
+# the subscription is sent after the handshake, no event tells when the publisher applied it
+SUBSCRIPTION_DELAY_S = 0.01
+
+
+class FrameSource:
+    """
+    interface of the frame sources
+    """
+
+    def receive(self) -> list[bytes] | None:
+        """
+        non blocking read of the next message
+        @return: list of message parts ([header, data] or [dummy header]), None if no message is available
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ZmqFrameSource(FrameSource):
+
+    def __init__(self, ip: str, port: int, context: zmq.Context = None, hwm: int | None = None):
+        """
+        @param hwm: receive high water mark, zmq default if None
+        """
+        self.ip = ip
+        self.port = port
+        self.context = context if context is not None else zmq.Context.instance()
+        self.hwm = hwm
+        self.socket, _ = self.connect(hwm)
+
+    def connect(self, hwm: int | None, timeoutMs: int = 0) -> tuple[zmq.Socket, bool]:
+        """
+        new socket connected to the publisher, the socket of the source is not changed. Can run in another thread
+        than the one reading the source, the socket is then passed to replaceSocket
+        @param hwm: receive high water mark, zmq default if None
+        @param timeoutMs: time to wait for the connection to the publisher, not waiting if 0
+        @return: socket, False if the connection was not established within timeoutMs
+        """
+        socket = self.context.socket(zmq.SUB)
+        if hwm is not None:
+            socket.setsockopt(zmq.RCVHWM, hwm)
+        # the monitor has to be set up before connecting to see the handshake
+        monitor = socket.get_monitor_socket(zmq.EVENT_HANDSHAKE_SUCCEEDED) if timeoutMs > 0 else None
+        socket.connect(f"tcp://{self.ip}:{self.port}")
+        socket.subscribe("")
+        connected = True
+        if monitor is not None:
+            connected = monitor.poll(timeoutMs) != 0
+            socket.disable_monitor()
+            monitor.close()
+            if connected:
+                time.sleep(SUBSCRIPTION_DELAY_S)
+        return socket, connected
+
+    def replaceSocket(self, socket: zmq.Socket, hwm: int | None):
+        """
+        read from socket (returned by connect with hwm) from now on
+        @note: the messages queued in the previous socket are dropped
+        """
+        self.socket.close(linger=0)
+        self.socket = socket
+        self.hwm = hwm
+
+    def setHwm(self, hwm: int | None, timeoutMs: int = 0) -> bool:
+        """
+        reconnect with a new receive high water mark (it only applies to new connections), nothing is done if
+        the high water mark is unchanged
+        @param timeoutMs: time to wait for the connection to the publisher, the publisher drops the messages
+        sent before the subscriber is connected
+        @return: False if the connection was not established within timeoutMs
+        @note: queued messages are dropped
+        """
+        if hwm == self.hwm:
+            return True
+        socket, connected = self.connect(hwm, timeoutMs)
+        self.replaceSocket(socket, hwm)
+        return connected
+
+    def receive(self, timeoutMs: int = 0) -> list[bytes] | None:
+        """
+        @param timeoutMs: time to wait for a message, the gui polls without waiting
+        """
+        if timeoutMs > 0 and not self.socket.poll(timeoutMs):
+            return None
+        try:
+            return self.socket.recv_multipart(flags=zmq.NOBLOCK)
+        except zmq.Again:
+            return None
+
+    def close(self):
+        self.socket.close()
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    base class of the sources replaying stored messages
+    """
+    RECORDED_RATE = 'recorded'
+
+    def __init__(self, rate: float | str | None = None):
+        """
+        @param rate: RECORDED_RATE, frames per second or None to replay as fast as possible
+        """
+        if rate != self.RECORDED_RATE and rate is not None and rate <= 0:
+            raise ValueError(f'invalid replay rate {rate}')
+        self.rate = rate
+        self.position = 0
+        self.__startTime = None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def message(self, i: int) -> list[bytes]:
+        raise NotImplementedError
+
+    def timestamp(self, i: int) -> float:
+        """
+        @return: time of the i-th message relative to the first one in seconds
+        """
+        raise ValueError(f'{type(self).__name__} has no recorded timing')
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self)
+
+    def dueTime(self, i: int) -> float:
+        """
+        @return: time (time.monotonic) at which the i-th message is to be delivered
+        """
+        if self.rate is None:
+            return self.__startTime
+        if self.rate == self.RECORDED_RATE:
+            return self.__startTime + self.timestamp(i)
+        return self.__startTime + i / self.rate
+
+    def receive(self) -> list[bytes] | None:
+        if self.finished:
+            return None
+        now = time.monotonic()
+        if self.__startTime is None:
+            self.__startTime = now
+        if now < self.dueTime(self.position):
+            return None
+        msg = self.message(self.position)
+        self.position += 1
+        return msg
+
+
+class FrameLogSource(ReplayFrameSource):
+    """
+    replay a zmq stream recorded by FrameRecorder
+    """
+
+    def __init__(self, prefix: str | Path, rate: float | str | None = ReplayFrameSource.RECORDED_RATE):
+        """
+        @param prefix: prefix of the log files or path to the .zidx index file
+        """
+        super().__init__(rate)
+        prefix = Path(prefix)
+        if prefix.suffix == '.zidx':
+            prefix = prefix.with_suffix('')
+        self.reader = FrameLogReader(prefix)
+        timestamps = self.reader.index['timestamp']
+        self.__timestamps = timestamps - timestamps[0] if len(timestamps) else timestamps
+
+    def __len__(self):
+        return len(self.reader)
+
+    def message(self, i: int) -> list[bytes]:
+        return self.reader[i]
+
+    def timestamp(self, i: int) -> float:
+        return float(self.__timestamps[i])
+
+    def close(self):
+        self.reader.close()
+
+
+class NpyFrameSource(ReplayFrameSource):
+    """
+    replay a .npy stack of raw frame payloads (shape: (nFrames, ...)), each row is sent as the data of a message.
+    headers are generated and a dummy end of acquisition message is appended like the receiver does.
+    """
+
+    def __init__(self, path: str | Path, rate: float | None = None, fileIndex: int = 0):
+        if rate == self.RECORDED_RATE:
+            raise ValueError('.npy stacks have no recorded timing, use a fixed rate or None')
+        super().__init__(rate)
+        self.frames = np.load(path, mmap_mode='r')
+        self.fileIndex = fileIndex
+
+    def __len__(self):
+        # frames + end of acquisition message
+        return len(self.frames) + 1
+
+    def message(self, i: int) -> list[bytes]:
+        nFrames = len(self.frames)
+        if i == nFrames:
+            return [json.dumps({'fileIndex': self.fileIndex, 'data': 0}).encode()]
+        data = np.ascontiguousarray(self.frames[i]).tobytes()
+        header = {
+            'data': 1,
+            'frameIndex': i,
+            'fileIndex': self.fileIndex,
+            'progress': 100 * (i + 1) / nFrames,
+            'size': len(data),
+        }
+        return [json.dumps(header).encode(), data]
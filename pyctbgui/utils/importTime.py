@@ -0,0 +1,82 @@
+"""
+Import time of the gui modules, measured with python -X importtime in a fresh interpreter
+
+Most of the gui startup before the window shows is importing modules. The report lists the modules taking the
+longest to import (cumulative, with the modules they import) and checks that modules only needed by some
+actions (e.g. matplotlib, used by the pattern viewer) are not imported at startup.
+
+usage:
+    python -m pyctbgui.utils.importTime pyctbgui.ui --top 20
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# modules the gui imports when they are first used
+LAZY_MODULES = ['matplotlib']
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parseImportTime(output: str) -> dict[str, tuple[int, int]]:
+    """
+    @param output: stderr of python -X importtime
+    @return: self and cumulative import time in us of each imported module
+    """
+    times = {}
+    for match in LINE.finditer(output):
+        times[match[4]] = (int(match[1]), int(match[2]))
+    return times
+
+
+def measureImportTime(module: str) -> dict[str, tuple[int, int]]:
+    """
+    import module in a new interpreter
+    @return: self and cumulative import time in us of each module imported
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True,
+                            text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{result.stderr.splitlines()[-1]}')
+    return parseImportTime(result.stderr)
+
+
+def lazyModulesImported(times: dict[str, tuple[int, int]]) -> dict[str, int]:
+    """
+    @return: modules of LAZY_MODULES imported and the longest cumulative import time in us of their submodules
+    (e.g. matplotlib.pyplot importing matplotlib)
+    """
+    imported = {}
+    for lazyModule in LAZY_MODULES:
+        cumulative = [
+            cumulative for module, (_, cumulative) in times.items()
+            if module == lazyModule or module.startswith(f'{lazyModule}.')
+        ]
+        if cumulative:
+            imported[lazyModule] = max(cumulative)
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='measure the import time of a gui module')
+    parser.add_argument('module', nargs='?', default='pyctbgui.ui', help='module to import (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=15, help='modules listed (default: %(default)s)')
+    args = parser.parse_args()
+
+    try:
+        times = measureImportTime(args.module)
+    except RuntimeError as e:
+        parser.exit(1, f'{e}\n')
+    print(f'import {args.module}: {times[args.module][1] / 1000:.1f} ms, {len(times)} modules')
+    print(f'{"cumulative ms":>14} {"self ms":>8}  module')
+    top = sorted(times.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for module, (selfTime, cumulative) in top:
+        print(f'{cumulative / 1000:14.1f} {selfTime / 1000:8.1f}  {module}')
+    for module, cumulative in lazyModulesImported(times).items():
+        print(f'warning: {module} is imported at startup ({cumulative / 1000:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Per stage timing of the acquisition read path
+
+Stages are timed with time.perf_counter around the code of a stage:
+
+    with instrumentation.stage('decode'):
+        ...
+
+or, when only some executions are of interest, recorded afterwards with instrumentation.add(name, start).
+
+Stages can be nested, each stage records its exclusive time (without the time of the stages nested inside),
+so the plotting time of a tab excludes the decoding and pedestal time of the processing it calls.
+
+The last Defines.Diagnostics_window durations of each stage are kept in numpy ring buffers, percentiles,
+throughput and histograms are only computed when a summary is requested. The counters are plain attributes
+only updated from the gui thread. When disabled, stage() returns a shared no-op context manager.
+"""
+import contextlib
+import csv
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from pyctbgui.utils.defines import Defines
+
+# log spaced histogram bin edges in seconds, 1 us to 10 s with 4 bins per decade
+HISTOGRAM_EDGES = np.logspace(-6, 1, 7 * 4 + 1)
+
+
+class StageStatistics:
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.durations = np.zeros(window)
+        self.timestamps = np.zeros(window)
+
+    def add(self, timestamp: float, duration: float):
+        i = self.count % len(self.durations)
+        self.durations[i] = duration
+        self.timestamps[i] = timestamp
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+
+    def window(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        @return: (timestamps, durations) of the last samples in chronological order
+        """
+        n = len(self.durations)
+        if self.count <= n:
+            return self.timestamps[:self.count], self.durations[:self.count]
+        order = np.roll(np.arange(n), -(self.count % n))
+        return self.timestamps[order], self.durations[order]
+
+    def histogram(self) -> np.ndarray:
+        """
+        @return: counts of the last durations in the bins of HISTOGRAM_EDGES
+        """
+        _, durations = self.window()
+        return np.histogram(durations, bins=HISTOGRAM_EDGES)[0]
+
+    def summary(self) -> dict:
+        """
+        @return: count and totals since the last reset, percentiles (ms) and rate (Hz) of the last samples
+        """
+        timestamps, durations = self.window()
+        summary = {
+            'stage': self.name,
+            'count': self.count,
+            'mean_ms': 1e3 * self.total / self.count if self.count else 0.0,
+            'min_ms': 1e3 * self.min if self.count else 0.0,
+            'max_ms': 1e3 * self.max,
+            'p50_ms': 0.0,
+            'p90_ms': 0.0,
+            'p99_ms': 0.0,
+            'rate_hz': 0.0,
+        }
+        if len(durations):
+            p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+            summary |= {'p50_ms': 1e3 * p50, 'p90_ms': 1e3 * p90, 'p99_ms': 1e3 * p99}
+        if len(timestamps) > 1 and timestamps[-1] > timestamps[0]:
+            summary['rate_hz'] = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+        return summary
+
+
+class _StageTimer:
+    __slots__ = ('instrumentation', 'name', 'start', 'nested')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.nested = 0.0
+        self.instrumentation.activeStages.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        elapsed = end - self.start
+        stack = self.instrumentation.activeStages
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        self.instrumentation.statistics(self.name).add(end, elapsed - self.nested)
+        return False
+
+
+class Instrumentation:
+
+    def __init__(self, window: int = Defines.Diagnostics_window):
+        """
+        @param window: number of samples per stage kept for percentiles and histograms
+        """
+        self.enabled = False
+        self.window = window
+        self.stages: dict[str, StageStatistics] = {}
+        self.activeStages: list[_StageTimer] = []
+        self.__disabled = contextlib.nullcontext()
+        self.reset()
+
+    def reset(self):
+        self.stages.clear()
+        self.framesReceived = 0
+        self.framesMissing = 0
+        self.bytesReceived = 0
+        self.startTime = time.perf_counter()
+
+    def statistics(self, name: str) -> StageStatistics:
+        if name not in self.stages:
+            self.stages[name] = StageStatistics(name, self.window)
+        return self.stages[name]
+
+    def stage(self, name: str):
+        """
+        @return: context manager timing the code of the stage name
+        """
+        if not self.enabled:
+            return self.__disabled
+        return _StageTimer(self, name)
+
+    def add(self, name: str, start: float):
+        """
+        record a stage which started at start (time.perf_counter) and ends now
+        """
+        if not self.enabled:
+            return
+        end = time.perf_counter()
+        if self.activeStages:
+            self.activeStages[-1].nested += end - start
+        self.statistics(name).add(end, end - start)
+
+    def frameReceived(self, size: int, missing: int = 0):
+        """
+        count a received frame
+        @param missing: frames missing before it, as found by the FrameTracker of the acquisition (update)
+        """
+        if not self.enabled:
+            return
+        self.framesMissing += missing
+        self.framesReceived += 1
+        self.bytesReceived += size
+
+    def endOfAcquisition(self, missing: int = 0):
+        """
+        @param missing: frames missing after the last received one (FrameTracker.finish)
+        """
+        if self.enabled:
+            self.framesMissing += missing
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.startTime
+        return {
+            'enabled': self.enabled,
+            'elapsed_s': elapsed,
+            'framesReceived': self.framesReceived,
+            'framesMissing': self.framesMissing,
+            'bytesReceived': self.bytesReceived,
+            'stages': [stage.summary() for stage in self.stages.values()],
+            'histogramEdges_s': HISTOGRAM_EDGES.tolist(),
+            'histograms': {
+                name: stage.histogram().tolist()
+                for name, stage in self.stages.items()
+            },
+        }
+
+    def dumpJson(self, path: str | Path):
+        """
+        write the summary, counters and histograms
+        """
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def dumpCsv(self, path: str | Path):
+        """
+        write the samples of the window of each stage, one row per sample
+        """
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'timestamp_s', 'duration_ms'])
+            for name, stage in self.stages.items():
+                timestamps, durations = stage.window()
+                for timestamp, duration in zip(timestamps, durations):
+                    writer.writerow([name, f'{timestamp - self.startTime:.6f}', f'{1e3 * duration:.6f}'])
+
+    def dump(self, path: str | Path):
+        """
+        write a .csv or .json file depending on the suffix of path
+        """
+        if Path(path).suffix == '.csv':
+            self.dumpCsv(path)
+        else:
+            self.dumpJson(path)
+
+
+# instrumentation of the read path of the gui
+instrumentation = Instrumentation()
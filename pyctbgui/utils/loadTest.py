@@ -0,0 +1,126 @@
+"""
+Headless load test of the zmq read path
+
+A FakeReceiver publishes an acquisition from a background thread while the consumer reads the stream the
+way AcquisitionTab.read_zmq does: one non blocking read per timer tick (Defines.Time_Plot_Refresh_ms),
+json parsing of the header and processing of the payload with pyctbgui.processing. The report compares the
+number of published frames with the number of frames received and processed.
+
+usage:
+    python -m pyctbgui.utils.loadTest --romode analog --asamples 5000 --frames 2000 --rate 500
+"""
+import argparse
+import json
+import threading
+import time
+
+import zmq
+
+from pyctbgui.processing import AcquisitionConfig, FrameProcessor, FrameTracker
+from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.fakeReceiver import FakeReceiver, ROMODES, addLayoutArguments
+
+
+class LoadTest:
+
+    def __init__(self,
+                 port: int,
+                 pollIntervalMs: float = Defines.Time_Plot_Refresh_ms,
+                 messagesPerTick: int = 1,
+                 hwm: int = 1000):
+        """
+        @param pollIntervalMs: period of the read timer
+        @param messagesPerTick: messages read per timer tick (read_zmq reads one)
+        @param hwm: receive high water mark of the subscriber
+        """
+        self.pollInterval = pollIntervalMs / 1000
+        self.messagesPerTick = messagesPerTick
+        self.context = zmq.Context.instance()
+        self.socket = self.context.socket(zmq.SUB)
+        self.socket.setsockopt(zmq.RCVHWM, hwm)
+        self.socket.connect(f'tcp://localhost:{port}')
+        self.socket.subscribe('')
+
+    def consume(self, process, timeout: float = 5, expectedFrames: int | None = None) -> dict:
+        """
+        read until the end of acquisition message or until nothing was received for timeout seconds
+        @param process: called with (jsonHeader, data) for each frame
+        @param expectedFrames: frames published, None if unknown
+        """
+        frameTracker = FrameTracker(expectedFrames)
+        start = None
+        lastMessage = time.monotonic()
+        done = False
+        while not done and time.monotonic() - lastMessage < timeout:
+            tick = time.monotonic()
+            for _ in range(self.messagesPerTick):
+                try:
+                    msg = self.socket.recv_multipart(flags=zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                lastMessage = time.monotonic()
+                if start is None:
+                    start = lastMessage
+                if len(msg) != 2:
+                    done = True
+                    break
+                header, data = msg
+                jsonHeader = json.loads(header)
+                frameTracker.update(jsonHeader['frameIndex'])
+                process(jsonHeader, data)
+            delay = self.pollInterval - (time.monotonic() - tick)
+            if delay > 0:
+                time.sleep(delay)
+        frameTracker.finish()
+        elapsed = (lastMessage - start) if start is not None else 0
+        return {
+            'processed': frameTracker.received,
+            'missing': frameTracker.missing,
+            'endReceived': done,
+            'elapsed': elapsed,
+            'fps': frameTracker.received / elapsed if elapsed > 0 else 0,
+        }
+
+    def close(self):
+        self.socket.close()
+
+
+def run(args) -> dict:
+    romode = ROMODES.index(args.romode)
+    receiver = FakeReceiver(args.port, romode, args.asamples, args.dsamples, args.tsamples, args.adcmask,
+                            args.dbitlist, args.transceivermask, args.dbitoffset, args.hwm)
+    loadTest = LoadTest(receiver.port, args.poll_interval, args.messages_per_tick, args.hwm)
+    # let the subscription reach the publisher
+    time.sleep(args.wait)
+    publisher = threading.Thread(target=receiver.publish, args=(args.frames, args.rate))
+    publisher.start()
+
+    config = AcquisitionConfig(romode, args.asamples, args.dsamples, args.tsamples, args.adcmask, args.dbitlist,
+                               args.dbitoffset, args.transceivermask)
+    processor = FrameProcessor(config, image=args.image)
+    report = loadTest.consume(lambda jsonHeader, data: processor.process(data), expectedFrames=args.frames)
+    publisher.join()
+    report['published'] = receiver.published
+    report['dropped'] = receiver.published - report['processed']
+    loadTest.close()
+    receiver.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure how many published frames the zmq read path keeps up with')
+    addLayoutArguments(parser)
+    parser.add_argument('--image', action='store_true', help='decode images instead of waveforms')
+    parser.add_argument('--port', type=int, default=30011, help='0 for a free port')
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=100, help='frames per second, 0 for as fast as possible')
+    parser.add_argument('--hwm', type=int, default=1000, help='send and receive high water mark')
+    parser.add_argument('--poll-interval', type=float, default=Defines.Time_Plot_Refresh_ms, help='read timer in ms')
+    parser.add_argument('--messages-per-tick', type=int, default=1, help='messages read per timer tick')
+    parser.add_argument('--wait', type=float, default=0.5, help='seconds to wait for the subscription')
+    report = run(parser.parse_args(argv))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+detector side of a measurement shared by the acquisition tab and the headless runner
+"""
+import threading
+import time
+
+from slsdet import dacIndex, runStatus
+
+from pyctbgui.utils.defines import Defines
+from pyctbgui.utils.scan import Scan, parseParameterName
+
+ACTIVE_STATUS = [runStatus.RUNNING, runStatus.WAITING, runStatus.TRANSMITTING]
+
+# phases reset by the detector when their clock is written (as in DetectorState.PROPERTY_INVALIDATES)
+CLOCK_PHASES = {'runclk': ['adcphase', 'dbitphase'], 'adcclk': ['adcphase'], 'dbitclk': ['dbitphase']}
+
+
+def startMeasurement(det):
+    det.rx_start()
+    det.start()
+
+
+def applyScanPoint(det, point: dict[str, int], previous: dict[str, int] | None = None):
+    """
+    write the parameters of a scan point that changed since the previous point to the detector, one call per
+    parameter. Clocks are written first, the phases they reset are written again after them: with the value of
+    the point, or the value read before the clock was written if the phase is not scanned
+    @param point: parameter name (see pyctbgui.utils.scan) -> value
+    @param previous: point written before, None to write all parameters of point
+    """
+    changes = Scan.changes(point, previous)
+    clocks = {name: value for name, value in changes.items() if name in CLOCK_PHASES}
+    phases = {}
+    for clock in clocks:
+        for phase in CLOCK_PHASES[clock]:
+            phases[phase] = point[phase] if phase in point else getattr(det, phase)
+    for name, value in clocks.items():
+        setattr(det, name, value)
+    others = {name: value for name, value in changes.items() if name not in clocks}
+    for name, value in (others | phases).items():
+        writeScanParameter(det, name, value)
+
+
+def writeScanParameter(det, name: str, value: int):
+    parameter, index = parseParameterName(name)
+    if parameter == 'dac':
+        det.setDAC(getattr(dacIndex, f'DAC_{index}'), value)
+    elif parameter == 'patwaittime':
+        det.patwaittime[index] = value
+    else:
+        setattr(det, parameter, value)
+
+
+class MeasurementWatcher:
+    """
+    detects the end of a measurement
+
+    the end of acquisition message of the zmq stream (reported with streamEnded() by the zmq reader) ends the
+    measurement as soon as the detector stopped acquiring. Polling is the fallback when the message is lost:
+    the measurement is done when the detector stopped acquiring and the receiver caught no new frames for
+    Defines.Time_Wait_For_Packets_s.
+    wait() blocks and is meant to run in a background thread, streamEnded() can be called from any thread.
+    """
+
+    def __init__(self,
+                 det,
+                 pollInterval: float = Defines.Time_Status_Refresh_ms / 1000,
+                 quietTime: float = Defines.Time_Wait_For_Packets_s):
+        """
+        @param pollInterval: seconds between two polls of the detector and receiver status
+        @param quietTime: seconds without new frames after which the measurement is done
+        """
+        self.det = det
+        self.pollInterval = pollInterval
+        self.quietTime = quietTime
+        self.__fileIndex = None
+        self.__streamEnded = threading.Event()
+
+    def reset(self, fileIndex: int | None = None):
+        """
+        forget end of acquisition messages of previous measurements, call before starting a measurement
+        @param fileIndex: file index of the measurement, end of acquisition messages of other file indexes
+        (previous measurements arriving late) are ignored
+        """
+        self.__fileIndex = fileIndex
+        self.__streamEnded.clear()
+
+    def streamEnded(self, fileIndex: int | None = None):
+        """
+        @param fileIndex: file index of the end of acquisition message (json header field 'fileIndex')
+        """
+        if fileIndex is not None and self.__fileIndex is not None and fileIndex != self.__fileIndex:
+            return
+        self.__streamEnded.set()
+
+    def poll(self) -> tuple[int, runStatus]:
+        return self.det.rx_framescaught[0], self.det.getDetectorStatus()[0]
+
+    def wait(self, stopped: threading.Event | None = None, progress=None) -> tuple[int, runStatus] | None:
+        """
+        block until the measurement is done
+        @param stopped: wait() returns None once it is set
+        @param progress: called with (frames caught, detector status) after each poll
+        @return: (frames caught, detector status)
+        """
+        stopped = stopped if stopped is not None else threading.Event()
+        lastCaught = -1
+        quietSince = time.monotonic()
+        while not stopped.is_set():
+            caught, status = self.poll()
+            if progress is not None:
+                progress(caught, status)
+            ended = self.__streamEnded.is_set()
+            if status in ACTIVE_STATUS:
+                # the end of acquisition message can arrive before the detector is done transmitting, it is kept
+                lastCaught = -1
+            elif ended:
+                return caught, status
+            elif caught != lastCaught:
+                lastCaught = caught
+                quietSince = time.monotonic()
+            elif time.monotonic() - quietSince >= self.quietTime:
+                return caught, status
+            if ended:
+                stopped.wait(self.pollInterval)
+            else:
+                # wakes up as soon as the end of acquisition message is received
+                self.__streamEnded.wait(self.pollInterval)
+        return None
+
+
+def stopReceiver(det):
+    if det.rx_status == runStatus.RUNNING:
+        det.rx_stop()
@@ -0,0 +1,98 @@
+"""
+Time series of the slowly changing detector values (slow ADCs, supply currents, temperature)
+
+The values are polled in the DetectorQueue thread (SlowAdcTab.readMonitor), the last Defines.Monitor_capacity
+samples of each channel are kept in a MonitorBuffer for the trend plots and every sample can be appended to a
+MonitorLog file:
+    .csv    one text row per sample: time, channel values
+    other   a json header line {"channels": [...], "dtype": "<f8"} followed by one binary row of float64 per
+            sample: time, channel values
+"""
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+
+from pyctbgui.utils.defines import Defines
+
+
+class MonitorBuffer:
+
+    def __init__(self, channels: list[str], capacity: int = Defines.Monitor_capacity):
+        self.channels = list(channels)
+        self.times = np.zeros(capacity)
+        self.values = np.full((capacity, len(self.channels)), np.nan)
+        self.count = 0
+
+    def clear(self):
+        self.count = 0
+
+    def append(self, timestamp: float, values: dict[str, float]):
+        """
+        @param values: value of each channel, missing channels are stored as nan
+        """
+        i = self.count % len(self.times)
+        self.times[i] = timestamp
+        self.values[i] = [values.get(channel, np.nan) for channel in self.channels]
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, len(self.times))
+
+    def window(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        @return: (times, values) of the kept samples in chronological order, values has one column per channel
+        """
+        n = len(self.times)
+        if self.count <= n:
+            return self.times[:self.count], self.values[:self.count]
+        order = np.roll(np.arange(n), -(self.count % n))
+        return self.times[order], self.values[order]
+
+    def channel(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        times, values = self.window()
+        return times, values[:, self.channels.index(name)]
+
+
+class MonitorLog:
+
+    def __init__(self, path: str | Path, channels: list[str]):
+        self.path = Path(path)
+        self.channels = list(channels)
+        self.binary = self.path.suffix != '.csv'
+        if self.binary:
+            self.file = open(self.path, 'wb')
+            header = {'channels': self.channels, 'dtype': '<f8'}
+            self.file.write(json.dumps(header).encode() + b'\n')
+        else:
+            self.file = open(self.path, 'w', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(['time'] + self.channels)
+
+    def write(self, timestamp: float, values: dict[str, float]):
+        row = [timestamp] + [values.get(channel, np.nan) for channel in self.channels]
+        if self.binary:
+            self.file.write(np.asarray(row, dtype='<f8').tobytes())
+        else:
+            self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def load(path: str | Path) -> tuple[list[str], np.ndarray, np.ndarray]:
+        """
+        @return: (channels, times, values) of a log file, values has one column per channel
+        """
+        path = Path(path)
+        if path.suffix == '.csv':
+            with open(path, newline='') as f:
+                channels = next(csv.reader(f))[1:]
+                rows = np.loadtxt(f, delimiter=',', ndmin=2)
+        else:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                channels = header['channels']
+                rows = np.frombuffer(f.read(), dtype=header['dtype']).reshape(-1, len(channels) + 1)
+        return channels, rows[:, 0], rows[:, 1:]
@@ -10,16 +10,42 @@ numpy header v1
 - Header as an ASCII dict terminated by \n padded with space \x20 to make sure
 we get len(magic string) + 2 + len(length) + HEADER_LEN divisible with 64
 Allocate enough space to allow for the data to grow
+
+When the number of frames is known in advance (nFrames argument) the header is padded to
+ALIGNMENT bytes so that the frames start on a page boundary, the whole file is preallocated with
+posix_fallocate and frames are written in aligned chunks with os.pwrite.
+
+To survive crashes the header can be rewritten every checkpointFrames frames or checkpointSeconds
+seconds without fsync, files that were not closed properly can be fixed with NumpyFileManager.recover
 """
 
-import ast
+import io
 import os
+import struct
+import time
 import zipfile
 from pathlib import Path
 
 import numpy as np
 
 
+def _npyHeader(dtype: np.dtype, shape: tuple, headerLength: int) -> bytes:
+    """
+    numpy v1.0 header (fortran_order False) padded with spaces to headerLength bytes
+    """
+    header_dict = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape}
+    with io.BytesIO() as buf:
+        np.lib.format.write_array_header_1_0(buf, header_dict)
+        header = buf.getvalue()
+    if len(header) > headerLength:
+        raise ValueError(f'npy header ({len(header)} bytes) does not fit in {headerLength} bytes')
+    if len(header) == headerLength:
+        return header
+    # header[10:-1] is the dictionary already padded with spaces, without the ending newline
+    body = header[10:-1].ljust(headerLength - 11) + b'\n'
+    return np.lib.format.magic(1, 0) + struct.pack('<H', len(body)) + body
+
+
 class NumpyFileManager:
     """
     class used to read and write into .npy files that can't be loaded completely into memory
@@ -27,9 +53,11 @@ class NumpyFileManager:
     for read mode implements numpy like interface and file-like object function
     """
     magic_str = np.lib.format.magic(1, 0)
-    headerLength = np.uint16(128)
+    headerLength = 128
     FSEEK_FILE_END = 2
     BUFFER_MAX = 500
+    ALIGNMENT = 4096
+    WRITE_CHUNK_SIZE = 4 << 20
 
     def __init__(
         self,
@@ -37,6 +65,9 @@ class NumpyFileManager:
         mode: str = 'r',
         frameShape: tuple = None,
         dtype=None,
+        nFrames: int = None,
+        checkpointFrames: int = None,
+        checkpointSeconds: float = None,
     ):
         """
         initiates a NumpyFileManager class for reading or writing bytes directly to/from a .npy file
@@ -44,6 +75,12 @@ class NumpyFileManager:
         @param frameShape: shape of the frame ex: (5000,) for waveforms or (400,400) for image
         @param dtype: type of the numpy array's header
         @param mode: file open mode must be in 'rwx'
+        @param nFrames: expected number of frames (only for modes w and x). The file is preallocated and
+        synced to disk only when closing, its header says 0 frames until the first checkpoint and nFrames once
+        closed. If fewer frames are written the file is truncated when closing, if more are written it grows like
+        a normal file.
+        @param checkpointFrames: rewrite the header (without fsync) every checkpointFrames written frames
+        @param checkpointSeconds: rewrite the header (without fsync) if the last one is older than checkpointSeconds
         """
         if mode not in ['r', 'w', 'x', 'r+']:
             raise ValueError('file mode should be either r,w,x,r+')
@@ -58,18 +95,36 @@ class NumpyFileManager:
         self.dtype = np.dtype(dtype)  # in case we pass a type like np.float32
         self.frameShape = frameShape
         self.frameCount = 0
-        self.cursorPosition = self.headerLength
+        self.nFrames = nFrames
         self.mode = mode
+        self.__writeBuffer = bytearray()
+        self.__writeBufferOffset = 0
+        self.checkpointFrames = checkpointFrames
+        self.checkpointSeconds = checkpointSeconds
+        self.__lastCheckpointFrame = 0
+        self.__lastCheckpointTime = time.monotonic()
 
         # if newFile frameShape and dtype should be present
         if mode == 'w' or mode == 'x':
             assert frameShape is not None
             assert dtype is not None
+            if nFrames is not None:
+                self.headerLength = self.ALIGNMENT
+            self.cursorPosition = self.headerLength
+            self.__frameSize = int(self.dtype.itemsize * np.prod(self.frameShape))
             # create/clear the file with mode wb+
-            self.file = open(file, 'wb+')
-            self.updateHeader()
+            # preallocated files are written with os.pwrite so python's buffer must not hold stale data
+            self.file = open(file, 'wb+', buffering=0 if nFrames is not None else -1)
+            if nFrames is not None:
+                self.__preallocate()
+                # the preallocated frames are zeros until written: a crash before the first checkpoint recovers
+                # no frames rather than nFrames
+                self.updateHeader(sync=False, shapeFrames=0)
+            else:
+                self.updateHeader()
 
         else:
+            assert nFrames is None, "nFrames is only supported when creating a new file"
             # opens file for read and check if the header of the file corresponds to the given function
             # arguments
             if isinstance(file, zipfile.ZipExtFile):
@@ -77,25 +132,27 @@ class NumpyFileManager:
             else:
                 mode = 'rb' if self.mode == 'r' else 'rb+'
                 self.file = open(file, mode)
-            self.file.seek(10)
-            headerStr = self.file.read(np.uint16(self.headerLength - 10)).decode("UTF-8")
-            header_dict = ast.literal_eval(headerStr)
-            self.frameShape = header_dict['shape'][1:]
+            self.file.seek(0)
+            np.lib.format.read_magic(self.file)
+            shape, fortranOrder, storedDtype = np.lib.format.read_array_header_1_0(self.file)
+            # header length can differ from the default for files written with nFrames
+            self.headerLength = self.file.tell()
+            self.cursorPosition = self.headerLength
+            self.frameShape = shape[1:]
             if frameShape is not None:
                 assert frameShape == self.frameShape, \
                     f"shape in arguments ({frameShape}) is not the same as the shape of the stored " \
                     f"file ({self.frameShape})"
 
-            self.dtype = np.lib.format.descr_to_dtype(header_dict['descr'])
+            self.dtype = storedDtype
             if dtype is not None:
                 assert dtype == self.dtype, \
                     f"dtype in argument ({dtype}) is not the same as the dtype of the stored file ({self.dtype})"
 
-            self.frameCount = header_dict['shape'][0]
+            self.frameCount = shape[0]
 
-            assert not header_dict['fortran_order'], "fortran_order in the stored file is not False"
-
-        self.__frameSize = np.dtype(self.dtype).itemsize * np.prod(self.frameShape)
+            assert not fortranOrder, "fortran_order in the stored file is not False"
+            self.__frameSize = int(self.dtype.itemsize * np.prod(self.frameShape))
 
     def __enter__(self):
         return self
@@ -118,22 +175,62 @@ class NumpyFileManager:
 
         return wrapper
 
+    def __preallocate(self):
+        """
+        reserve disk space for nFrames frames. filesystems without fallocate support
+        get a sparse file of the right size instead
+        """
+        size = self.headerLength + self.nFrames * self.__frameSize
+        try:
+            os.posix_fallocate(self.file.fileno(), 0, size)
+        except (AttributeError, OSError):
+            self.file.truncate(size)
+
+    def __headerBytes(self, shapeFrames: int = None) -> bytes:
+        """
+        numpy v1.0 header padded with spaces to headerLength bytes
+        @param shapeFrames: number of frames stored in the header, defaults to the final size of the file
+        """
+        if shapeFrames is None:
+            shapeFrames = self.frameCount if self.nFrames is None else max(self.nFrames, self.frameCount)
+        return _npyHeader(self.dtype, (shapeFrames, *self.frameShape), self.headerLength)
+
     @restoreCursorPosition
-    def updateHeader(self):
+    def updateHeader(self, sync: bool = True, shapeFrames: int = None):
         """
         updates the header of the .npy file with the class attributes
+        @param sync: persist the file to disk (fsync)
+        @param shapeFrames: number of frames stored in the header, defaults to the final size of the file
         @note: fortran_order is always set to False
         """
         if self.mode == 'r':
             return
         self.file.seek(0)
-        header_dict = {
-            'descr': np.lib.format.dtype_to_descr(self.dtype),
-            'fortran_order': False,
-            'shape': (self.frameCount, *self.frameShape)
-        }
-        np.lib.format.write_array_header_1_0(self.file, header_dict)
-        self.flush()
+        self.file.write(self.__headerBytes(shapeFrames))
+        if sync:
+            self.flush()
+        else:
+            self.file.flush()
+
+    def __flushWriteBuffer(self, flushAll: bool = True):
+        """
+        write the buffered frames of preallocated files with a single pwrite
+        @param flushAll: if False only the part of the buffer ending on an ALIGNMENT boundary is written
+        """
+        if not self.__writeBuffer:
+            return
+        end = self.__writeBufferOffset + len(self.__writeBuffer)
+        if not flushAll:
+            end -= end % self.ALIGNMENT
+        nBytes = end - self.__writeBufferOffset
+        if nBytes <= 0:
+            return
+        with memoryview(self.__writeBuffer) as view:
+            written = 0
+            while written < nBytes:
+                written += os.pwrite(self.file.fileno(), view[written:nBytes], self.__writeBufferOffset + written)
+        del self.__writeBuffer[:nBytes]
+        self.__writeBufferOffset += nBytes
 
     @restoreCursorPosition
     def writeOneFrame(self, frame: np.ndarray):
@@ -146,14 +243,50 @@ class NumpyFileManager:
         if frame.dtype != self.dtype:
             raise ValueError(f"frame dtype given {frame.dtype} is not the same as the file's dtype {self.dtype}")
 
-        self.file.seek(0, self.FSEEK_FILE_END)
-        self.frameCount += 1
-        self.file.write(frame.tobytes())
+        if self.nFrames is not None:
+            if not self.__writeBuffer:
+                self.__writeBufferOffset = self.headerLength + self.frameCount * self.__frameSize
+            self.frameCount += 1
+            self.__writeBuffer += frame.tobytes()
+            if len(self.__writeBuffer) >= self.WRITE_CHUNK_SIZE:
+                self.__flushWriteBuffer(flushAll=False)
+        else:
+            self.file.seek(0, self.FSEEK_FILE_END)
+            self.frameCount += 1
+            self.file.write(frame.tobytes())
+
+        if self.checkpointFrames is not None and \
+                self.frameCount - self.__lastCheckpointFrame >= self.checkpointFrames:
+            self.checkpoint()
+        elif self.checkpointSeconds is not None and \
+                time.monotonic() - self.__lastCheckpointTime >= self.checkpointSeconds:
+            self.checkpoint()
+
+    @restoreCursorPosition
+    def checkpoint(self):
+        """
+        hand the written frames to the OS and write a header describing them, so that the file can be
+        loaded with np.load even if the program crashes before close. Does not fsync, the data reaches
+        the disk as long as the OS keeps running.
+        Preallocated files keep their writes aligned: the frames after the last ALIGNMENT boundary stay in the
+        write buffer and are not counted in the header.
+        """
+        self.__flushWriteBuffer(flushAll=False)
+        if self.__writeBuffer:
+            framesOnDisk = (self.__writeBufferOffset - self.headerLength) // self.__frameSize
+        else:
+            framesOnDisk = self.frameCount
+        self.file.seek(0)
+        self.file.write(self.__headerBytes(framesOnDisk))
+        self.file.flush()
+        self.__lastCheckpointFrame = self.frameCount
+        self.__lastCheckpointTime = time.monotonic()
 
     def flush(self):
         """
         persist data into disk
         """
+        self.__flushWriteBuffer()
         self.file.flush()
         os.fsync(self.file)
 
@@ -173,6 +306,7 @@ class NumpyFileManager:
             if frameStart <= 0:
                 raise NotImplementedError("frameEnd must be bigger than frameStart")
             frameCount = 0
+        self.__flushWriteBuffer()
         self.file.seek(self.headerLength + frameStart * self.__frameSize)
         data = self.file.read(frameCount * self.__frameSize)
         return np.frombuffer(data, self.dtype).reshape([-1, *self.frameShape])
@@ -184,6 +318,7 @@ class NumpyFileManager:
         @return: numpy array containing frameCount frames
         """
         assert frameCount > 0
+        self.__flushWriteBuffer()
         data = self.file.read(frameCount * self.__frameSize)
         self.cursorPosition += frameCount * self.__frameSize
         return np.frombuffer(data, self.dtype).reshape([-1, *self.frameShape])
@@ -197,9 +332,48 @@ class NumpyFileManager:
         self.file.seek(self.cursorPosition)
 
     def close(self):
+        """
+        write the buffered frames, truncate the preallocated files of stopped runs and write the final header
+        """
+        if self.nFrames is not None and self.frameCount != self.nFrames:
+            # run stopped early or wrote more frames than expected: fall back to the real size
+            self.__flushWriteBuffer()
+            self.nFrames = None
+            self.file.truncate(self.headerLength + self.frameCount * self.__frameSize)
+        self.__flushWriteBuffer()
         self.updateHeader()
         self.file.close()
 
+    @staticmethod
+    def recover(file: str | Path, preallocated: bool = False) -> int:
+        """
+        fix the header of a .npy file that was not closed (e.g. the gui crashed during an acquisition)
+        incomplete trailing frames are removed
+        @param file: path to the .npy file
+        @param preallocated: file was created with nFrames. The frame count can not be inferred from the size
+        of preallocated files so the count of the last checkpoint stored in the header is used instead
+        @return: number of recovered frames
+        """
+        with open(file, 'rb+') as fp:
+            np.lib.format.read_magic(fp)
+            shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0(fp)
+            headerLength = fp.tell()
+            frameShape = shape[1:]
+            frameSize = int(dtype.itemsize * np.prod(frameShape))
+            fileSize = os.fstat(fp.fileno()).st_size
+            frameCount = (fileSize - headerLength) // frameSize if frameSize else 0
+            if preallocated:
+                frameCount = min(frameCount, shape[0])
+            assert not fortranOrder, "fortran_order in the stored file is not False"
+            header = _npyHeader(dtype, (frameCount, *frameShape), headerLength)
+
+            fp.truncate(headerLength + frameCount * frameSize)
+            fp.seek(0)
+            fp.write(header)
+            fp.flush()
+            os.fsync(fp)
+        return frameCount
+
     def __getitem__(self, item):
         isSlice = False
         if isinstance(item, slice):
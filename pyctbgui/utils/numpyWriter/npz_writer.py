@@ -5,6 +5,7 @@ import io
 
 import numpy as np
 from pyctbgui.utils.numpyWriter.npy_writer import NumpyFileManager
+from pyctbgui.utils.numpyWriter.zip_writer import ParallelDeflateZipWriter
 
 
 class NpzFileWriter:
@@ -14,17 +15,29 @@ class NpzFileWriter:
     to ensure closed after usage.
     """
 
-    def __init__(self, tofile: str, mode='w', compress_file=False):
+    COPY_BUFFER_SIZE = 1 << 20
+
+    def __init__(self, tofile: str, mode='w', compress_file=False, compressionThreads: int | None = None):
         """
         :param tofile: the ``npz`` file to write
         :param mode: must be one of {'x', 'w', 'a'}. See
                https://docs.python.org/3/library/zipfile.html for detail
+        :param compressionThreads: number of threads used to compress (defaults to the number of cpus),
+               only used if compress_file is True
         """
+        self.file = None
+        # compressed entries are written by ParallelDeflateZipWriter, self.file only reads the archive then
+        self.__deflateWriter = None
         self.__openedFiles = {}
+        self.compressionThreads = compressionThreads
         self.compression = zipfile.ZIP_DEFLATED if compress_file else zipfile.ZIP_STORED
         self.tofile = tofile
         self.mode = mode
-        self.file = zipfile.ZipFile(self.tofile, mode=self.mode, compression=self.compression)
+        if compress_file and mode in ('w', 'x', 'a'):
+            self.__deflateWriter = ParallelDeflateZipWriter(self.tofile, self.mode, self.compressionThreads)
+            self.file = zipfile.ZipFile(self.tofile, mode='r')
+        else:
+            self.file = zipfile.ZipFile(self.tofile, mode=self.mode, compression=self.compression)
 
     def __enter__(self):
         return self
@@ -43,8 +56,15 @@ class NpzFileWriter:
         with io.BytesIO() as cbuf:
             np.save(cbuf, data)
             cbuf.seek(0)
+            if self.__deflateWriter is not None:
+                # ZipInfo(key) has the default date (1980-01-01), as the entries written by np.savez_compressed
+                self.__deflateWriter.write(zipfile.ZipInfo(key), cbuf)
+                # reopen to read the new entry, the files already opened keep reading from the previous ZipFile
+                self.file.close()
+                self.file = zipfile.ZipFile(self.tofile, mode='r')
+                return
             with self.file.open(key, mode='w', force_zip64=True) as outfile:
-                shutil.copyfileobj(cbuf, outfile)
+                shutil.copyfileobj(cbuf, outfile, NpzFileWriter.COPY_BUFFER_SIZE)
 
     def readFrames(self, file: str, frameStart: int, frameEnd: int):
         file += '.npy'
@@ -57,16 +77,45 @@ class NpzFileWriter:
                     files: list[str | Path],
                     fileKeys: list[str],
                     deleteOriginals=False,
-                    compressed=False):
-        compression = zipfile.ZIP_DEFLATED if compressed else zipfile.ZIP_STORED
-
-        with zipfile.ZipFile(filename, mode='w', compression=compression, allowZip64=True) as zipf:
-            for idx, file in enumerate(files):
-                zipf.write(file, arcname=fileKeys[idx] + '.npy')
+                    compressed=False,
+                    compressionThreads: int | None = None):
+        if compressed:
+            with ParallelDeflateZipWriter(filename, mode='w', compressionThreads=compressionThreads) as zipw:
+                for idx, file in enumerate(files):
+                    zinfo = zipfile.ZipInfo.from_file(file, arcname=fileKeys[idx] + '.npy')
+                    with open(file, 'rb') as src:
+                        zipw.write(zinfo, src)
+        else:
+            with zipfile.ZipFile(filename, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as zipf:
+                for idx, file in enumerate(files):
+                    zipf.write(file, arcname=fileKeys[idx] + '.npy')
         if deleteOriginals:
             for file in files:
                 Path.unlink(file)
 
+    @staticmethod
+    def bundleNpyFiles(numpyFileManagers: dict[str, NumpyFileManager], path: Path, compressed=False) -> Path:
+        """
+        close the opened .npy files and group them in path.npz (keys of numpyFileManagers used as array names),
+        a single file is renamed to path.npy instead
+        @return: path of the created file
+        """
+        path = Path(path)
+        for npw in numpyFileManagers.values():
+            npw.close()
+        filepaths = [npw.file.name for npw in numpyFileManagers.values()]
+        if len(filepaths) == 1:
+            newPath = path.with_name(path.name + '.npy')
+            Path(filepaths[0]).rename(newPath)
+        else:
+            newPath = path.with_name(path.name + '.npz')
+            NpzFileWriter.zipNpyFiles(newPath,
+                                      filepaths,
+                                      list(numpyFileManagers.keys()),
+                                      deleteOriginals=True,
+                                      compressed=compressed)
+        return newPath
+
     def __getitem__(self, item: str) -> NumpyFileManager:
         """
         returns NumpyFileManager file handling the .npy file under the key item inside of the .npz file
@@ -84,7 +133,9 @@ class NpzFileWriter:
         return sorted([key[:-4] for key in self.file.namelist()])
 
     def close(self):
-        if hasattr(self, 'file') and self.file is not None:
+        if self.__deflateWriter is not None:
+            self.__deflateWriter.close()
+        if self.file is not None:
             self.file.close()
 
     def __del__(self):
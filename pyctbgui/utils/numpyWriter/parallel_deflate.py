@@ -0,0 +1,90 @@
+"""
+Multithreaded DEFLATE compressor used when writing compressed .npz files
+
+The input stream is cut into fixed size chunks which are compressed independently in a thread pool
+(zlib releases the GIL while compressing). Every chunk except the last one is terminated with a
+Z_SYNC_FLUSH so that the compressed chunks can be concatenated in order into one valid raw DEFLATE
+stream (same technique as pigz). The class mimics the interface of zlib's compress objects, it is used as a
+context manager to shut down its threads even if the stream is not flushed.
+"""
+
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ParallelDeflateCompressor:
+    """
+    zlib.compressobj like object producing raw DEFLATE data (wbits=-15) as expected by zipfile
+    """
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, nThreads: int | None = None, level: int = zlib.Z_DEFAULT_COMPRESSION, chunkSize: int = None):
+        """
+        @param nThreads: number of compression threads, defaults to the number of cpus
+        @param level: zlib compression level
+        @param chunkSize: size in bytes of the uncompressed chunks handed to the threads
+        """
+        self.nThreads = nThreads if nThreads is not None else (os.cpu_count() or 1)
+        self.level = level
+        self.chunkSize = chunkSize if chunkSize is not None else self.CHUNK_SIZE
+        self.__buffer = bytearray()
+        self.__pending = deque()
+        self.__executor = ThreadPoolExecutor(max_workers=self.nThreads, thread_name_prefix='deflate')
+        # limit the number of chunks in flight to keep memory usage bounded
+        self.__maxPending = 2 * self.nThreads
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        shutdown the thread pool, chunks not compressed yet are dropped
+        """
+        self.__executor.shutdown(cancel_futures=True)
+
+    def _compressChunk(self, chunk: bytes, last: bool) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        data = compressor.compress(chunk)
+        return data + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    def _collect(self, block: bool) -> bytes:
+        """
+        return the compressed chunks that are ready, keeping the input order
+        @param block: wait for chunks until at most maxPending chunks are left in flight
+        """
+        out = bytearray()
+        while self.__pending:
+            future = self.__pending[0]
+            if not future.done() and not (block and len(self.__pending) > self.__maxPending):
+                break
+            out += self.__pending.popleft().result()
+        return bytes(out)
+
+    def compress(self, data) -> bytes:
+        """
+        buffer data and submit full chunks to the thread pool
+        @return: compressed bytes that are already available (can be empty)
+        """
+        self.__buffer += data
+        while len(self.__buffer) >= self.chunkSize:
+            chunk = bytes(self.__buffer[:self.chunkSize])
+            del self.__buffer[:self.chunkSize]
+            self.__pending.append(self.__executor.submit(self._compressChunk, chunk, False))
+        return self._collect(block=True)
+
+    def flush(self) -> bytes:
+        """
+        compress the remaining data, terminate the stream and shutdown the thread pool
+        """
+        self.__pending.append(self.__executor.submit(self._compressChunk, bytes(self.__buffer), True))
+        self.__buffer = bytearray()
+        out = bytearray()
+        while self.__pending:
+            out += self.__pending.popleft().result()
+        self.__executor.shutdown()
+        return bytes(out)
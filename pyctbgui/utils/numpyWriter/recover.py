@@ -0,0 +1,25 @@
+"""
+command line tool to fix .npy files that were not closed properly
+
+usage: python -m pyctbgui.utils.numpyWriter.recover run_ADC0_0.npy [--preallocated]
+"""
+import argparse
+
+from pyctbgui.utils.numpyWriter.npy_writer import NumpyFileManager
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fix the header of .npy files written by the gui after a crash')
+    parser.add_argument('files', nargs='+', help='.npy files to recover')
+    parser.add_argument('-p',
+                        '--preallocated',
+                        action='store_true',
+                        help='files were preallocated, use the frame count of the last header checkpoint')
+    args = parser.parse_args(argv)
+    for file in args.files:
+        frameCount = NumpyFileManager.recover(file, preallocated=args.preallocated)
+        print(f'{file}: recovered {frameCount} frames')
+
+
+if __name__ == '__main__':
+    main()
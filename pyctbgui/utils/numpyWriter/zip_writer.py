@@ -0,0 +1,235 @@
+"""
+Minimal zip archive writer for DEFLATE entries compressed by a ParallelDeflateCompressor
+
+zipfile.ZipFile has no public way to write an entry with an external compressor, so the archive is
+written here following the zip format (PKWARE APPNOTE.TXT):
+
+- every entry is a local file header, the compressed data, and nothing else (no data descriptor).
+  The local header always carries the zip64 extra field (sizes 0xFFFFFFFF in the header itself) so that
+  it keeps its size when it is written again with the crc and sizes once the data is compressed.
+- the central directory (one record per entry) followed by the end of central directory record
+  (preceded by the zip64 end record and locator when the limits of the classic record are exceeded).
+
+The central directory is written again after every entry so that the archive is valid, and readable with
+zipfile, between two entries. In mode 'a' the raw central directory records of the existing archive are
+kept and the new entries are written over the old central directory.
+
+Entries are described by zipfile.ZipInfo objects using only their documented attributes, the headers match
+the ones written by zipfile.ZipFile.open(name, 'w', force_zip64=True) (as used by np.savez_compressed).
+"""
+
+import struct
+import warnings
+import zipfile
+import zlib
+from pathlib import Path
+
+from pyctbgui.utils.numpyWriter.parallel_deflate import ParallelDeflateCompressor
+
+# limit of the 32 bit fields, same conservative value as zipfile
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+ZIP64_VERSION = 45
+
+LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+CENTRAL_DIR_RECORD = struct.Struct('<4s4B4HL2L5HLL')
+END_RECORD = struct.Struct('<4s4H2LH')
+END_RECORD64 = struct.Struct('<4sQ2H2L4Q')
+END_LOCATOR64 = struct.Struct('<4sLQL')
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+CENTRAL_DIR_SIGNATURE = b'PK\x01\x02'
+END_SIGNATURE = b'PK\x05\x06'
+END64_SIGNATURE = b'PK\x06\x06'
+END_LOCATOR64_SIGNATURE = b'PK\x06\x07'
+ZIP64_EXTRA_ID = 1
+# general purpose flag: file name encoded in utf-8
+UTF8_FLAG = 0x800
+
+
+def _encodeName(zinfo: zipfile.ZipInfo) -> tuple[bytes, int]:
+    try:
+        return zinfo.filename.encode('ascii'), zinfo.flag_bits
+    except UnicodeEncodeError:
+        return zinfo.filename.encode('utf-8'), zinfo.flag_bits | UTF8_FLAG
+
+
+def _dosDateTime(zinfo: zipfile.ZipInfo) -> tuple[int, int]:
+    year, month, day, hour, minute, second = zinfo.date_time
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+def localHeader(zinfo: zipfile.ZipInfo) -> bytes:
+    """
+    local file header of zinfo with the sizes in the zip64 extra field
+    """
+    name, flags = _encodeName(zinfo)
+    dosDate, dosTime = _dosDateTime(zinfo)
+    extra = zinfo.extra + struct.pack('<HHQQ', ZIP64_EXTRA_ID, 16, zinfo.file_size, zinfo.compress_size)
+    header = LOCAL_HEADER.pack(LOCAL_HEADER_SIGNATURE, zinfo.extract_version, zinfo.reserved, flags,
+                               zinfo.compress_type, dosTime, dosDate, zinfo.CRC, 0xFFFFFFFF, 0xFFFFFFFF, len(name),
+                               len(extra))
+    return header + name + extra
+
+
+def centralDirRecord(zinfo: zipfile.ZipInfo) -> bytes:
+    """
+    central directory record of zinfo, sizes and offset above ZIP64_LIMIT go to the zip64 extra field
+    """
+    name, flags = _encodeName(zinfo)
+    dosDate, dosTime = _dosDateTime(zinfo)
+    fileSize, compressSize, headerOffset = zinfo.file_size, zinfo.compress_size, zinfo.header_offset
+    zip64Values = []
+    if fileSize > ZIP64_LIMIT or compressSize > ZIP64_LIMIT:
+        zip64Values += [fileSize, compressSize]
+        fileSize = compressSize = 0xFFFFFFFF
+    if headerOffset > ZIP64_LIMIT:
+        zip64Values.append(headerOffset)
+        headerOffset = 0xFFFFFFFF
+    extra = zinfo.extra
+    if zip64Values:
+        extra = struct.pack(f'<HH{len(zip64Values)}Q', ZIP64_EXTRA_ID, 8 * len(zip64Values), *zip64Values) + extra
+    record = CENTRAL_DIR_RECORD.pack(CENTRAL_DIR_SIGNATURE, zinfo.create_version, zinfo.create_system,
+                                     zinfo.extract_version, zinfo.reserved, flags, zinfo.compress_type, dosTime,
+                                     dosDate, zinfo.CRC, compressSize, fileSize, len(name), len(extra),
+                                     len(zinfo.comment), 0, zinfo.internal_attr, zinfo.external_attr, headerOffset)
+    return record + name + extra + zinfo.comment
+
+
+def readCentralDirectory(file) -> tuple[int, int, bytes, bytes]:
+    """
+    locate the central directory of the archive in the seekable binary file
+    @return: number of entries, offset of the central directory, its raw records, archive comment
+    """
+    fileSize = file.seek(0, 2)
+    tailStart = max(0, fileSize - END_RECORD.size - 0xFFFF)
+    file.seek(tailStart)
+    tail = file.read()
+    endPos = tail.rfind(END_SIGNATURE)
+    if endPos < 0 or endPos + END_RECORD.size > len(tail):
+        raise zipfile.BadZipFile('end of central directory record not found')
+    _, _, _, _, count, size, offset, commentLength = END_RECORD.unpack_from(tail, endPos)
+    comment = tail[endPos + END_RECORD.size:endPos + END_RECORD.size + commentLength]
+    locatorPos = endPos - END_LOCATOR64.size
+    if locatorPos >= 0 and tail[locatorPos:locatorPos + 4] == END_LOCATOR64_SIGNATURE:
+        _, _, end64Offset, _ = END_LOCATOR64.unpack_from(tail, locatorPos)
+        file.seek(end64Offset)
+        end64 = file.read(END_RECORD64.size)
+        if end64[:4] != END64_SIGNATURE:
+            raise zipfile.BadZipFile('zip64 end of central directory record not found')
+        _, _, _, _, _, _, _, count, size, offset = END_RECORD64.unpack(end64)
+    file.seek(offset)
+    records = file.read(size)
+    if len(records) != size:
+        raise zipfile.BadZipFile('truncated central directory')
+    return count, offset, records, comment
+
+
+class ParallelDeflateZipWriter:
+    """
+    write DEFLATE entries compressed in parallel to a zip archive. Can be used as a context manager.
+    """
+    COPY_BUFFER_SIZE = 1 << 20
+
+    def __init__(self, path: str | Path, mode: str = 'w', compressionThreads: int | None = None):
+        """
+        @param path: archive to write
+        @param mode: 'w' truncate, 'x' create a new file, 'a' append to an existing archive (created if missing)
+        @param compressionThreads: number of compression threads, defaults to the number of cpus
+        """
+        self.__file = None
+        if mode not in ('w', 'x', 'a'):
+            raise ValueError("ParallelDeflateZipWriter requires mode 'w', 'x', or 'a'")
+        self.compressionThreads = compressionThreads
+        self.__records = bytearray()
+        self.__count = 0
+        self.__comment = b''
+        self.__names = set()
+        self.__centralDirOffset = 0
+        if mode == 'a' and Path(path).exists():
+            self.__file = open(path, 'r+b')
+            try:
+                self.__count, self.__centralDirOffset, records, self.__comment = readCentralDirectory(self.__file)
+            except Exception:
+                self.__file.close()
+                raise
+            self.__records += records
+            with zipfile.ZipFile(path) as zipf:
+                self.__names.update(zipf.namelist())
+        else:
+            self.__file = open(path, 'xb' if mode == 'x' else 'wb')
+        self.__writeCentralDirectory()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, zinfo: zipfile.ZipInfo, src) -> None:
+        """
+        add the entry zinfo with the content of the binary file-like src (read until its end)
+        @param zinfo: name, date_time and external_attr are used, the other fields are set while writing
+        """
+        if self.__file.closed:
+            raise ValueError('Attempt to write to ZIP archive that was already closed')
+        if zinfo.filename in self.__names:
+            warnings.warn(f'Duplicate name: {zinfo.filename!r}', UserWarning, stacklevel=2)
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.flag_bits = 0
+        zinfo.extract_version = max(zinfo.extract_version, ZIP64_VERSION)
+        zinfo.create_version = max(zinfo.create_version, ZIP64_VERSION)
+        if not zinfo.external_attr:
+            zinfo.external_attr = 0o600 << 16
+        zinfo.CRC = zinfo.file_size = zinfo.compress_size = 0
+        zinfo.header_offset = self.__centralDirOffset
+        try:
+            self.__file.seek(zinfo.header_offset)
+            self.__file.write(localHeader(zinfo))
+            with ParallelDeflateCompressor(self.compressionThreads) as compressor:
+                while chunk := src.read(self.COPY_BUFFER_SIZE):
+                    zinfo.CRC = zlib.crc32(chunk, zinfo.CRC)
+                    zinfo.file_size += len(chunk)
+                    compressed = compressor.compress(chunk)
+                    zinfo.compress_size += len(compressed)
+                    self.__file.write(compressed)
+                compressed = compressor.flush()
+                zinfo.compress_size += len(compressed)
+                self.__file.write(compressed)
+            end = self.__file.tell()
+            self.__file.seek(zinfo.header_offset)
+            self.__file.write(localHeader(zinfo))
+        except BaseException:
+            # drop the partial entry, the central directory is written again at its previous offset
+            self.__writeCentralDirectory()
+            raise
+        self.__centralDirOffset = end
+        self.__records += centralDirRecord(zinfo)
+        self.__count += 1
+        self.__names.add(zinfo.filename)
+        self.__writeCentralDirectory()
+
+    def __writeCentralDirectory(self) -> None:
+        """
+        write the central directory and end records after the last entry and truncate the file there
+        """
+        offset, size, count = self.__centralDirOffset, len(self.__records), self.__count
+        self.__file.seek(offset)
+        self.__file.write(self.__records)
+        if count > ZIP_FILECOUNT_LIMIT or offset > ZIP64_LIMIT or size > ZIP64_LIMIT:
+            end64Offset = offset + size
+            self.__file.write(
+                END_RECORD64.pack(END64_SIGNATURE, END_RECORD64.size - 12, ZIP64_VERSION, ZIP64_VERSION, 0, 0, count,
+                                  count, size, offset))
+            self.__file.write(END_LOCATOR64.pack(END_LOCATOR64_SIGNATURE, 0, end64Offset, 1))
+            count, size, offset = min(count, 0xFFFF), min(size, 0xFFFFFFFF), min(offset, 0xFFFFFFFF)
+        self.__file.write(END_RECORD.pack(END_SIGNATURE, 0, 0, count, count, size, offset, len(self.__comment)))
+        self.__file.write(self.__comment)
+        self.__file.truncate()
+        self.__file.flush()
+
+    def close(self) -> None:
+        if self.__file is not None and not self.__file.closed:
+            self.__file.close()
+
+    def __del__(self):
+        self.close()
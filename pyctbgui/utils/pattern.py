@@ -0,0 +1,123 @@
+"""
+Compiled pattern files (.pat) of the chip test board
+
+A .pat file lists the commands loading a pattern into the board, one per line:
+
+    patword <address> <64 bit word>     output bits at a clock cycle (bit i drives signal i)
+    patioctrl <64 bit mask>             bits that are outputs of the board
+    patlimits <start> <stop>            first and last address run
+    patloop <level> <start> <stop>      addresses repeated by loop level (0-5)
+    patnloop <level> <repetitions>
+    patwait <level> <address>           address at which the pattern waits
+    patwaittime <level> <clocks>
+
+Words, masks and addresses are hexadecimal (with or without 0x), levels and counts decimal. Other commands are
+ignored.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from pyctbgui.utils.defines import Defines
+
+
+@dataclass
+class PatternLoop:
+    start: int | None = None
+    stop: int | None = None
+    repetitions: int | None = None
+
+    @property
+    def defined(self) -> bool:
+        return self.start is not None and self.repetitions is not None
+
+
+@dataclass
+class PatternWait:
+    address: int | None = None
+    time: int | None = None
+
+    @property
+    def defined(self) -> bool:
+        return self.address is not None and self.time is not None
+
+
+def _loops() -> list[PatternLoop]:
+    return [PatternLoop() for _ in range(Defines.pattern.loops_count)]
+
+
+def _waits() -> list[PatternWait]:
+    return [PatternWait() for _ in range(Defines.pattern.loops_count)]
+
+
+@dataclass
+class Pattern:
+    # pattern words in file order
+    words: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint64))
+    ioctrl: int | None = None
+    limits: tuple[int, int] | None = None
+    loops: list[PatternLoop] = field(default_factory=_loops)
+    waits: list[PatternWait] = field(default_factory=_waits)
+
+    @classmethod
+    def load(cls, path: Path) -> 'Pattern':
+        with open(path) as f:
+            return cls.parse(f.read())
+
+    @classmethod
+    def parse(cls, text: str) -> 'Pattern':
+        pattern = cls()
+        words = []
+        for lineNumber, line in enumerate(text.splitlines(), 1):
+            args = line.split()
+            if len(args) < 2:
+                continue
+            try:
+                if args[0] == 'patword':
+                    # the word is the last argument, the address is optional
+                    words.append(int(args[-1], 16))
+                else:
+                    pattern.applyCommand(args[0], args[1:])
+            except (ValueError, IndexError) as e:
+                raise ValueError(f'line {lineNumber}: invalid command {line.strip()!r}') from e
+        # python ints above 2**63 do not fit in int64, the default of np.array
+        pattern.words = np.array(words, dtype=np.uint64)
+        return pattern
+
+    def applyCommand(self, command: str, args: list[str]):
+        """
+        apply a command of a .pat file other than patword, unknown commands are ignored
+        """
+        match command:
+            case 'patioctrl':
+                self.ioctrl = int(args[0], 16)
+            case 'patlimits':
+                self.limits = (int(args[0], 16), int(args[1], 16))
+            case 'patloop':
+                loop = self.loops[int(args[0])]
+                loop.start, loop.stop = int(args[1], 16), int(args[2], 16)
+            case 'patnloop':
+                self.loops[int(args[0])].repetitions = int(args[1])
+            case 'patwait':
+                self.waits[int(args[0])].address = int(args[1], 16)
+            case 'patwaittime':
+                self.waits[int(args[0])].time = int(args[1])
+
+    def __len__(self):
+        return len(self.words)
+
+    def bits(self) -> np.ndarray:
+        """
+        @return: (number of words, 64) uint8 array, column i is the value of bit i of each word
+        """
+        # the 8 bytes of each little endian word hold bits 0-7, 8-15, ...
+        return np.unpackbits(self.words.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+
+    def outputBits(self) -> list[int]:
+        """
+        @return: indices of the bits set in patioctrl
+        """
+        if self.ioctrl is None:
+            return []
+        return [i for i in range(64) if self.ioctrl >> i & 1]
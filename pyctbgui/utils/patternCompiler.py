@@ -0,0 +1,113 @@
+"""
+Compilation of pattern code (.py, .c) into a pattern file with the compiler selected in the pattern tab
+
+The compiler is run as `<compiler> <source>` and writes the compiled pattern to <source>at (pattern.py ->
+pattern.pyat). It runs in a background thread, its output (stdout and stderr) is captured for the gui.
+
+A compiled pattern is reused while its source, the compiler path and the compiler modification time are
+unchanged: the key of the last compilation is written next to the compiled file (<source>at.compilekey).
+"""
+import hashlib
+import subprocess
+from pathlib import Path
+
+from PyQt5 import QtCore
+
+KEY_SUFFIX = '.compilekey'
+
+
+class CompileError(Exception):
+
+    def __init__(self, message: str, output: str = ''):
+        super().__init__(message)
+        # output of the compiler
+        self.output = output
+
+
+def compiledPath(source) -> Path:
+    return Path(f'{source}at')
+
+
+def keyPath(source) -> Path:
+    return Path(f'{compiledPath(source)}{KEY_SUFFIX}')
+
+
+def compileKey(source, compiler) -> str:
+    """
+    @raise OSError: source or compiler can not be read
+    """
+    key = hashlib.sha1(Path(source).read_bytes())
+    key.update(str(Path(compiler).resolve()).encode())
+    key.update(str(Path(compiler).stat().st_mtime_ns).encode())
+    return key.hexdigest()
+
+
+def cachedCompilation(source, compiler) -> Path | None:
+    """
+    @return: the compiled pattern of source if it was compiled from the same source with the same compiler, None
+    otherwise
+    @raise OSError: source or compiler can not be read
+    """
+    compiled = compiledPath(source)
+    key = keyPath(source)
+    if compiled.is_file() and key.is_file() and key.read_text() == compileKey(source, compiler):
+        return compiled
+    return None
+
+
+def backupCompiled(source):
+    """
+    move the compiled pattern of source to <compiled>_bkup, an old pattern is never loaded if a compilation fails
+    @raise OSError: the file can not be moved
+    """
+    compiled = compiledPath(source)
+    if compiled.is_file():
+        compiled.replace(f'{compiled}_bkup')
+
+
+def compilePattern(source, compiler) -> tuple[Path, str]:
+    """
+    @return: compiled pattern, compiler output
+    @raise CompileError: the compiler failed or did not write the compiled pattern
+    """
+    try:
+        key = compileKey(source, compiler)
+        result = subprocess.run([str(compiler), str(source)],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT,
+                                text=True)
+    except OSError as e:
+        raise CompileError(f'Could not run the compiler: {e}') from e
+    if result.returncode != 0:
+        raise CompileError(f'Could not compile pattern, the compiler exited with {result.returncode}.', result.stdout)
+    compiled = compiledPath(source)
+    if not compiled.is_file():
+        raise CompileError(f'The compiler did not write {compiled}.', result.stdout)
+    keyPath(source).write_text(key)
+    return compiled, result.stdout
+
+
+class PatternCompiler(QtCore.QThread):
+    """
+    compiles a pattern in a background thread, the gui stays responsive while the compiler runs
+    """
+    # compiled pattern, compiler output
+    compiled = QtCore.pyqtSignal(str, str)
+    # error message, compiler output
+    compileFailed = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, source, compiler, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.compiler = compiler
+
+    def run(self):
+        try:
+            compiled, output = compilePattern(self.source, self.compiler)
+        except CompileError as e:
+            self.compileFailed.emit(str(e), e.output)
+            return
+        except OSError as e:
+            self.compileFailed.emit(str(e), '')
+            return
+        self.compiled.emit(str(compiled), output)
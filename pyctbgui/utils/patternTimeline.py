@@ -0,0 +1,222 @@
+"""
+Execution timeline of a pattern, the words output clock by clock
+
+The board runs the addresses between the pattern limits once per frame, one word per clock:
+
+    - loop level i repeats the addresses patloop i (start to stop) patnloop i times, 0 skips them
+    - at the address patwait i, the word is held for patwaittime i more clocks
+
+Loops have to be nested (or disjoint), six levels of loops repeated thousands of times are billions of clocks. The
+timeline is never expanded: it is a tree of runs of consecutive words, held words and repeated bodies, its total
+length, the word at a clock and the words of a window of clocks are found by walking down the tree.
+"""
+import bisect
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from pyctbgui.utils.pattern import Pattern
+
+
+@dataclass
+class Words:
+    """
+    addresses start to stop (included), one clock each
+    """
+    start: int
+    stop: int
+
+    @property
+    def clocks(self) -> int:
+        return self.stop - self.start + 1
+
+
+@dataclass
+class Hold:
+    """
+    word of address output for clocks clocks
+    """
+    address: int
+    clocks: int
+
+
+@dataclass
+class Repeat:
+    body: list
+    count: int
+    # clock of each node of body from the start of the body
+    offsets: list[int] = field(init=False)
+    bodyClocks: int = field(init=False)
+
+    def __post_init__(self):
+        self.offsets = []
+        self.bodyClocks = 0
+        for node in self.body:
+            self.offsets.append(self.bodyClocks)
+            self.bodyClocks += node.clocks
+
+    @property
+    def clocks(self) -> int:
+        return self.bodyClocks * self.count
+
+
+class PatternTimeline:
+
+    def __init__(self, pattern: Pattern):
+        """
+        @raise ValueError: the pattern limits are outside the pattern words or loops overlap without being nested
+        """
+        self.words = pattern.words
+        start, stop = pattern.limits if pattern.limits is not None else (0, len(pattern) - 1)
+        if not 0 <= start <= stop < len(pattern):
+            raise ValueError(f'pattern limits 0x{start:04x} 0x{stop:04x} are outside the {len(pattern)} pattern words')
+
+        # words held by the waits
+        self.holds = {}
+        for wait in pattern.waits:
+            if wait.defined and start <= wait.address <= stop:
+                self.holds[wait.address] = self.holds.get(wait.address, 1) + wait.time
+
+        loops = []
+        for level, loop in enumerate(pattern.loops):
+            if not loop.defined or loop.stop < start or loop.start > stop:
+                # not run
+                continue
+            if loop.start > loop.stop or loop.start < start or loop.stop > stop:
+                raise ValueError(f'loop {level} 0x{loop.start:04x} 0x{loop.stop:04x} is not within the pattern limits')
+            loops.append((level, loop))
+        # an outer loop comes before the loops it contains
+        loops.sort(key=lambda item: (item[1].start, -item[1].stop))
+        self.root = Repeat(self.build(start, stop, loops), 1)
+
+    def build(self, start: int, stop: int, loops: list) -> list:
+        """
+        @param loops: (level, PatternLoop) of the loops within start to stop, sorted by start and outer loops first
+        @return: nodes running the addresses start to stop
+        """
+        nodes = []
+        address = start
+        i = 0
+        while i < len(loops):
+            level, loop = loops[i]
+            j = i + 1
+            while j < len(loops) and loops[j][1].start <= loop.stop:
+                if loops[j][1].stop > loop.stop:
+                    raise ValueError(f'loops {level} and {loops[j][0]} overlap without being nested')
+                j += 1
+            nodes += self.buildWords(address, loop.start - 1)
+            if loop.repetitions > 0:
+                nodes.append(Repeat(self.build(loop.start, loop.stop, loops[i + 1:j]), loop.repetitions))
+            address = loop.stop + 1
+            i = j
+        return nodes + self.buildWords(address, stop)
+
+    def buildWords(self, start: int, stop: int) -> list:
+        nodes = []
+        for address in sorted(a for a in self.holds if start <= a <= stop):
+            if address > start:
+                nodes.append(Words(start, address - 1))
+            nodes.append(Hold(address, self.holds[address]))
+            start = address + 1
+        if start <= stop:
+            nodes.append(Words(start, stop))
+        return nodes
+
+    @property
+    def clocks(self) -> int:
+        """
+        clocks of one run of the pattern
+        """
+        return self.root.clocks
+
+    def addressAt(self, clock: int) -> int:
+        if not 0 <= clock < self.clocks:
+            raise IndexError(f'clock {clock} is outside the {self.clocks} clocks of the pattern')
+        node = self.root
+        while isinstance(node, Repeat):
+            clock %= node.bodyClocks
+            index = bisect.bisect_right(node.offsets, clock) - 1
+            clock -= node.offsets[index]
+            node = node.body[index]
+        if isinstance(node, Hold):
+            return node.address
+        return node.start + clock
+
+    def stateAt(self, clock: int) -> int:
+        """
+        @return: word output at clock
+        """
+        return int(self.words[self.addressAt(clock)])
+
+    def segments(self, begin: int = 0, end: int | None = None):
+        """
+        nodes run between the clocks begin and end, repetitions outside of them are skipped
+        @return: iterator of (clock, Words or Hold node), the first and last nodes can start before begin or end
+        after end
+        """
+        end = self.clocks if end is None else min(end, self.clocks)
+        yield from self.nodeSegments(self.root, 0, begin, end)
+
+    def nodeSegments(self, node: Repeat, clock: int, begin: int, end: int):
+        first = max(0, (begin - clock) // node.bodyClocks)
+        for repetition in range(first, node.count):
+            bodyClock = clock + repetition * node.bodyClocks
+            if bodyClock >= end:
+                return
+            for offset, child in zip(node.offsets, node.body):
+                childClock = bodyClock + offset
+                if childClock >= end:
+                    return
+                if childClock + child.clocks <= begin:
+                    continue
+                if isinstance(child, Repeat):
+                    yield from self.nodeSegments(child, childClock, begin, end)
+                else:
+                    yield childClock, child
+
+    def runs(self, begin: int = 0, end: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        words output between the clocks begin and end
+        @return: boundaries (first clock of each run and end), addresses of the runs
+        """
+        end = self.clocks if end is None else min(end, self.clocks)
+        if begin >= end:
+            return np.array([max(begin, 0)]), np.zeros(0, dtype=np.int64)
+        starts, addresses = [], []
+        for clock, node in self.segments(begin, end):
+            if isinstance(node, Hold):
+                starts.append([clock])
+                addresses.append([node.address])
+            else:
+                starts.append(np.arange(clock, clock + node.clocks))
+                addresses.append(np.arange(node.start, node.stop + 1))
+        starts = np.concatenate(starts)
+        addresses = np.concatenate(addresses)
+        inWindow = (starts < end) & (np.append(starts[1:], end) > begin)
+        boundaries = np.append(np.maximum(starts[inWindow], begin), end)
+        return boundaries, addresses[inWindow]
+
+    def edges(self, bit: int, begin: int = 0, end: int | None = None) -> np.ndarray:
+        """
+        @return: clocks between begin and end at which bit changes
+        """
+        boundaries, addresses = self.runs(max(begin - 1, 0), end)
+        values = self.words[addresses] >> np.uint64(bit) & np.uint64(1)
+        edges = boundaries[1:-1][np.diff(values.astype(np.int8)) != 0]
+        return edges[edges >= begin]
+
+    def duration(self, runClock: float) -> float:
+        """
+        @param runClock: run clock frequency in MHz
+        @return: duration of one run of the pattern in s
+        """
+        return self.clocks / (runClock * 1e6)
+
+
+def acquisitionTime(patternDuration: float, period: float, frames: int, triggers: int) -> float:
+    """
+    estimate of the duration of an acquisition, a frame lasts the period or the pattern run if it is longer
+    @param patternDuration: duration of one run of the pattern in s
+    @param period: frame period in s
+    """
+    return max(patternDuration, period) * frames * triggers
@@ -0,0 +1,193 @@
+"""
+Pattern viewer drawn with pyqtgraph
+
+The output signals of a pattern are stacked (first signal on top, signal names on the left axis), each one drawn
+by its own step curve holding only the clocks where the signal changes. pyqtgraph clips a curve to the visible
+range and downsamples it by bisecting its x values, they have to be sorted: signals are never concatenated into
+one curve. Loops and waits are drawn once over all signals. Zooming into long patterns stays fluid.
+
+The real time view draws the words as run by the board instead (PatternTimeline, loops and waits expanded).
+
+The matplotlib figure of PlotPattern (one axis per signal) is still used to export figures.
+"""
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtCore, QtGui
+
+from pyctbgui.utils.pattern import Pattern, PatternLoop, PatternWait
+from pyctbgui.utils.patternTimeline import PatternTimeline
+
+# vertical distance of two signals, a signal spans 1
+SIGNAL_SPACING = 1.5
+
+LINE_STYLES = {
+    '-': QtCore.Qt.SolidLine,
+    '--': QtCore.Qt.DashLine,
+    '-.': QtCore.Qt.DashDotLine,
+    ':': QtCore.Qt.DotLine,
+}
+
+
+def signalOffset(row: int, nSignals: int) -> float:
+    """
+    @return: y of the low level of the signal drawn in row (0 on top)
+    """
+    return (nSignals - 1 - row) * SIGNAL_SPACING
+
+
+def stepVertices(values: np.ndarray,
+                 offset: float = 0.0,
+                 clocks: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    vertices of the step curve of one signal, a value is held from its clock to the next one
+    @param values: value (0 or 1) of the signal at each clock
+    @param clocks: clock at which each value starts and end of the last one (runs of a PatternTimeline), one clock
+    per value if None
+    @return: x, y with a vertex pair at each change of the signal only
+    """
+    changes = np.flatnonzero(np.diff(values)) + 1
+    # horizontal segments start at 0 and at each change and end at the next change or at the end of the pattern
+    starts = np.concatenate(([0], changes))
+    ends = np.concatenate((changes, [len(values)]))
+    x = np.column_stack((starts, ends)).ravel()
+    x = (x if clocks is None else clocks[x]).astype(np.float64)
+    y = np.repeat(values[starts].astype(np.float64), 2) + offset
+    return x, y
+
+
+def signalSteps(bits: np.ndarray, clocks: np.ndarray | None = None) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    vertices of the step curves of stacked signals
+    @param bits: (clocks, signals) array of 0/1
+    @param clocks: see stepVertices
+    @return: x, y of each signal (column of bits), x sorted
+    """
+    nClocks, nSignals = bits.shape
+    if nClocks == 0:
+        return [(np.zeros(0), np.zeros(0)) for _ in range(nSignals)]
+    return [stepVertices(bits[:, row], signalOffset(row, nSignals), clocks) for row in range(nSignals)]
+
+
+def qColor(name: str, alpha: float = 1.0) -> QtGui.QColor:
+    """
+    @param name: color name of Defines.Colors
+    """
+    color = QtGui.QColor(name.lower())
+    color.setAlphaF(alpha)
+    return color
+
+
+class PatternViewer(pg.PlotWidget):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # one curve per signal, reused by the next pattern
+        self.curves = []
+        self.overlays = []
+        # applied to every curve, each one clipped and downsampled on its own x
+        self.setDownsampling(auto=True, mode='peak')
+        self.setClipToView(True)
+        self.setMouseEnabled(x=True, y=False)
+        self.showGrid(x=True, y=False, alpha=0.3)
+
+    def setPattern(self, pattern: Pattern, signalNames, colors_plot, colors_wait, linestyles_wait, alpha_wait,
+                   alpha_wait_rect, colors_loop, linestyles_loop, alpha_loop, alpha_loop_rect, show_clocks_number,
+                   line_width):
+        """
+        draw the output signals of pattern in address order, the parameters are those of the matplotlib PlotPattern
+        """
+        nSignals = self.plotSignals(pattern, pattern.bits(), None, signalNames, colors_plot, line_width)
+        self.getAxis('bottom').setStyle(showValues=show_clocks_number)
+        self.setLabel('bottom', 'Timing [clk]')
+
+        self.clearOverlays()
+        for level, wait in enumerate(pattern.waits):
+            if wait.defined:
+                self.addWait(level, wait, colors_wait[level], linestyles_wait[level], alpha_wait[level],
+                             alpha_wait_rect[level], line_width)
+        for level, loop in enumerate(pattern.loops):
+            if loop.defined:
+                self.addLoop(level, loop, colors_loop[level], linestyles_loop[level], alpha_loop[level],
+                             alpha_loop_rect[level], line_width)
+
+        self.setXRange(0, len(pattern) + 1, padding=0)
+        self.setYRange(-0.2, signalOffset(0, nSignals) + 1.2, padding=0)
+
+    def setTimeline(self, pattern: Pattern, timeline: PatternTimeline, signalNames, colors_plot, show_clocks_number,
+                    line_width, clocks: int):
+        """
+        draw the output signals of pattern as run by the board (loops and waits expanded) for the first clocks
+        """
+        boundaries, addresses = timeline.runs(0, clocks)
+        nSignals = self.plotSignals(pattern,
+                                    pattern.bits()[addresses], boundaries, signalNames, colors_plot, line_width)
+        self.getAxis('bottom').setStyle(showValues=show_clocks_number)
+        self.setLabel('bottom', f'Time [clk] (first {boundaries[-1]} of {timeline.clocks})')
+        self.clearOverlays()
+        self.setXRange(0, boundaries[-1], padding=0)
+        self.setYRange(-0.2, signalOffset(0, nSignals) + 1.2, padding=0)
+
+    def plotSignals(self, pattern: Pattern, bits: np.ndarray, clocks, signalNames, colors_plot, line_width) -> int:
+        """
+        @param bits: bits of the words drawn, starting at clocks (see stepVertices)
+        @return: number of signals drawn
+        """
+        outputBits = pattern.outputBits()
+        if not outputBits:
+            raise ValueError("No patioctrl command found in pattern file")
+        bits = bits[:, outputBits]
+        nSignals = len(outputBits)
+
+        while len(self.curves) < nSignals:
+            self.curves.append(self.plot())
+        for row, (x, y) in enumerate(signalSteps(bits, clocks)):
+            self.curves[row].setData(x, y, pen=pg.mkPen(qColor(colors_plot[row % 2]), width=line_width))
+        for curve in self.curves[nSignals:]:
+            curve.clear()
+        self.getAxis('left').setTicks([[(signalOffset(row, nSignals) + 0.5, signalNames[bit])
+                                        for row, bit in enumerate(outputBits)]])
+        return nSignals
+
+    def clearOverlays(self):
+        for item in self.overlays:
+            self.removeItem(item)
+        self.overlays = []
+
+    def addMarker(self, position: float, color: str, lineStyle: str, alpha: float, lineWidth: float, label=None):
+        pen = pg.mkPen(qColor(color, alpha), width=lineWidth, style=LINE_STYLES.get(lineStyle, QtCore.Qt.SolidLine))
+        line = pg.InfiniteLine(position,
+                               angle=90,
+                               pen=pen,
+                               label=label,
+                               labelOpts={
+                                   'position': 0.98,
+                                   'color': qColor(color),
+                                   'anchors': [(0, 0), (0, 0)]
+                               })
+        self.addItem(line)
+        self.overlays.append(line)
+
+    def addSkipped(self, start: float, stop: float, color: str, alpha: float):
+        """
+        shade the clocks skipped by a loop or a wait
+        """
+        region = pg.LinearRegionItem((start, stop), movable=False, brush=qColor(color, alpha), pen=pg.mkPen(None))
+        self.addItem(region)
+        self.overlays.append(region)
+
+    def addWait(self, level: int, wait: PatternWait, color, lineStyle, alpha, alphaRect, lineWidth):
+        if wait.time == 0:
+            self.addMarker(wait.address, color, lineStyle, alpha, lineWidth, f'wait {level}: skipped')
+            self.addMarker(wait.address + 1, color, lineStyle, alpha, lineWidth)
+            self.addSkipped(wait.address, wait.address + 1, color, alphaRect)
+        else:
+            self.addMarker(wait.address, color, lineStyle, alpha, lineWidth, f'wait {level}: {wait.time} clk')
+
+    def addLoop(self, level: int, loop: PatternLoop, color, lineStyle, alpha, alphaRect, lineWidth):
+        if loop.repetitions == 0:
+            self.addMarker(loop.start, color, lineStyle, alpha, lineWidth, f'loop {level}: skipped')
+            self.addMarker(loop.stop + 1, color, lineStyle, alpha, lineWidth)
+            self.addSkipped(loop.start, loop.stop + 1, color, alphaRect)
+        else:
+            self.addMarker(loop.start, color, lineStyle, alpha, lineWidth, f'loop {level}: {loop.repetitions} times')
+            self.addMarker(loop.stop, color, lineStyle, alpha, lineWidth)
@@ -1,52 +1,36 @@
 import logging
 from pathlib import Path
 
-import numpy as np
+from pyctbgui.processing.pedestal import Pedestal
+from pyctbgui.utils.instrumentation import instrumentation
 
-__frameCount = 0
-__pedestalSum = np.array(0, np.float64)
-__pedestal = np.array(0, np.float32)
-__loadedPedestal = False
+# pedestal shared by the processing functions of the gui tabs
+pedestal = Pedestal()
 
 
 def reset(plotTab):
-    global __frameCount, __pedestalSum, __pedestal, __loadedPedestal
-    __frameCount = 0
-    __pedestalSum = np.array(0, np.float64)
-    __pedestal = np.array(0, np.float64)
-    __loadedPedestal = False
-
+    pedestal.reset()
     plotTab.updateLabelPedestalFrames()
 
 
 def getFramesCount():
-    return __frameCount
+    return pedestal.frameCount
 
 
 def getPedestal():
-    return __pedestal
+    return pedestal.calculate()
 
 
 def calculatePedestal():
-    global __pedestalSum, __pedestal
-    if __loadedPedestal:
-        return __pedestal
-    if __frameCount == 0:
-        __pedestal = np.array(0, np.float64)
-    else:
-        __pedestal = __pedestalSum / __frameCount
-    return __pedestal
+    return pedestal.calculate()
 
 
 def savePedestal(path=Path('/tmp/pedestal')):
-    pedestal = calculatePedestal()
-    np.save(path, pedestal)
+    pedestal.save(path)
 
 
 def loadPedestal(path: Path):
-    global __pedestal, __loadedPedestal
-    __loadedPedestal = True
-    __pedestal = np.load(path)
+    pedestal.load(path)
 
 
 __logger = logging.getLogger('recordOrApplyPedestal')
@@ -65,35 +49,29 @@ def recordOrApplyPedestal(func):
         @param obj: reference to func's class instance (self of its class)
         @return: if record mode: return frame untouched, if apply mode: return frame - pedestal
         """
-        global __frameCount, __pedestal, __pedestalSum
+        with instrumentation.stage('decode'):
+            frame = func(obj, *args, **kwargs)
+        with instrumentation.stage('pedestal'):
+            return applyPedestal(obj, frame)
 
-        frame = func(obj, *args, **kwargs)
-        if not np.array_equal(0, __pedestalSum) and __pedestalSum.shape != frame.shape:
-            # check if __pedestalSum has same different shape as the frame
-            __logger.info('pedestal shape mismatch. resetting pedestal...')
-            reset(obj.plotTab)
+    def applyPedestal(obj, frame):
+        if not pedestal.checkShape(frame):
+            obj.plotTab.updateLabelPedestalFrames()
 
         if obj.plotTab.pedestalRecord:
-            if __loadedPedestal:
-                # reset loaded pedestal if we acquire in record mode
-                __logger.warning('resetting loaded pedestal...')
-                reset(obj.plotTab)
-            __frameCount += 1
-
-            __pedestalSum = np.add(__pedestalSum, frame, dtype=np.float64)
-
+            pedestal.record(frame)
             obj.plotTab.updateLabelPedestalFrames()
             return frame
         if obj.plotTab.pedestalApply:
             # apply pedestal
             # check if pedestal is calculated
-            if __loadedPedestal and frame.shape != __pedestal.shape:
+            if pedestal.loaded and frame.shape != pedestal.calculate().shape:
                 __logger.warning('pedestal shape mismatch. resetting pedestal...')
                 obj.plotTab.mainWindow.statusbar.setStyleSheet("color:red")
                 obj.plotTab.mainWindow.statusbar.showMessage('pedestal shape mismatch. resetting pedestal...')
                 reset(obj.plotTab)
 
-            return frame - calculatePedestal()
+            return pedestal.apply(frame)
 
         return frame
 
@@ -0,0 +1,105 @@
+"""
+Parameter grids scanned by ctbgui-headless --scan
+
+A scan is the cartesian product of the values of its parameters, the last parameter varies fastest. Between
+two points only the parameters whose value changed are written to the detector (measurement.applyScanPoint),
+and the phases reset by a changed clock.
+
+parameters (names of the parameter file commands):
+    dac<i>          value of DAC i in dac units (0 <= i < Defines.dac.count)
+    adcphase        adc clock phase
+    dbitphase       digital bits clock phase
+    runclk          run clock in MHz
+    patwaittime<l>  wait time of pattern loop level l in clock cycles (0 <= l < Defines.pattern.loops_count)
+
+values are given as a comma separated list (100,200,400) or as an inclusive range start:stop:step (0:1000:100)
+"""
+import itertools
+import re
+from dataclasses import dataclass
+
+from pyctbgui.utils.defines import Defines
+
+SCALAR_PARAMETERS = ['adcphase', 'dbitphase', 'runclk']
+INDEXED_PARAMETERS = {'dac': Defines.dac.count, 'patwaittime': Defines.pattern.loops_count}
+
+
+def parseParameterName(name: str) -> tuple[str, int | None]:
+    """
+    @return: (parameter, index) e.g. ('dac', 3) for 'dac3', index is None for scalar parameters
+    """
+    if name in SCALAR_PARAMETERS:
+        return name, None
+    match = re.fullmatch(r'([a-z]+)(\d+)', name)
+    if match is None or match[1] not in INDEXED_PARAMETERS:
+        raise ValueError(f'unknown scan parameter {name}')
+    parameter, index = match[1], int(match[2])
+    if index >= INDEXED_PARAMETERS[parameter]:
+        raise ValueError(f'{parameter} index {index} out of range (0-{INDEXED_PARAMETERS[parameter] - 1})')
+    return parameter, index
+
+
+def parseValues(text: str) -> list[int]:
+    """
+    @param text: '100,200,400' or inclusive range 'start:stop:step'
+    """
+    if ':' in text:
+        start, stop, step = (int(value, 0) for value in text.split(':'))
+        if step == 0:
+            raise ValueError('scan step cannot be 0')
+        values = list(range(start, stop + (1 if step > 0 else -1), step))
+    else:
+        values = [int(value, 0) for value in text.split(',') if value]
+    if len(values) == 0:
+        raise ValueError(f'no scan values in {text}')
+    return values
+
+
+@dataclass
+class ScanParameter:
+    name: str
+    values: list[int]
+
+    def __post_init__(self):
+        # validate the name early, before the detector is configured
+        parseParameterName(self.name)
+
+
+class Scan:
+
+    def __init__(self, parameters: list[ScanParameter]):
+        names = [parameter.name for parameter in parameters]
+        if len(set(names)) != len(names):
+            raise ValueError(f'scan parameters repeated: {names}')
+        self.parameters = parameters
+
+    @property
+    def names(self) -> list[str]:
+        return [parameter.name for parameter in self.parameters]
+
+    def points(self) -> list[dict[str, int]]:
+        """
+        @return: the values of all parameters at each point of the grid
+        """
+        return [
+            dict(zip(self.names, values))
+            for values in itertools.product(*(parameter.values for parameter in self.parameters))
+        ]
+
+    def __len__(self):
+        size = 1
+        for parameter in self.parameters:
+            size *= len(parameter.values)
+        return size
+
+    @staticmethod
+    def changes(point: dict[str, int], previous: dict[str, int] | None) -> dict[str, int]:
+        """
+        @return: parameters of point to write to the detector when coming from previous
+        """
+        if previous is None:
+            return dict(point)
+        return {name: value for name, value in point.items() if previous.get(name) != value}
+
+    def metadata(self) -> dict:
+        return {'parameters': self.names, 'points': [list(point.values()) for point in self.points()]}
@@ -0,0 +1,46 @@
+import logging
+import threading
+
+from PyQt5 import QtCore
+
+from pyctbgui.utils import measurement
+
+
+class StatusPoller(QtCore.QThread):
+    """
+    waits for the end of a measurement in a background thread, the gui thread never blocks on the status of the
+    detector and receiver
+    """
+    # frames caught, detector status
+    statusUpdated = QtCore.pyqtSignal(int, object)
+    measurementDone = QtCore.pyqtSignal(int, object)
+    measurementFailed = QtCore.pyqtSignal(str)
+
+    def __init__(self, det, parent=None):
+        super().__init__(parent)
+        self.det = det
+        self.watcher = measurement.MeasurementWatcher(det)
+        self.__stopped = threading.Event()
+        self.logger = logging.getLogger('StatusPoller')
+
+    def startPolling(self):
+        # the previous run may still be returning after emitting measurementDone
+        self.wait()
+        self.__stopped.clear()
+        self.start()
+
+    def stopPolling(self):
+        self.__stopped.set()
+        self.wait()
+
+    def run(self):
+        try:
+            result = self.watcher.wait(self.__stopped, self.statusUpdated.emit)
+            if result is None:
+                return
+            measurement.stopReceiver(self.det)
+        except Exception as e:
+            self.logger.exception('Exception caught')
+            self.measurementFailed.emit(str(e))
+            return
+        self.measurementDone.emit(*result)
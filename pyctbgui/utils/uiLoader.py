@@ -0,0 +1,91 @@
+"""
+Loading of the Qt Designer files (pyctbgui/ui/*.ui) of the gui
+
+uic.loadUi parses the xml of a .ui file and builds the widgets from it every time the gui starts. The same files
+compiled with pyuic are python modules building the widgets directly, several times faster. Installing the
+package (setup.py build_py) compiles all .ui files into pyctbgui/ui/compiled, in a source checkout they are
+compiled with:
+
+    python -m pyctbgui.utils.uiLoader
+
+A compiled module stores the sha1 of the .ui file it was compiled from: loadUi only uses it while the .ui file is
+unchanged and parses the .ui file otherwise, so editing a .ui file in designer never shows outdated widgets.
+"""
+import hashlib
+import importlib.util
+import io
+import logging
+import re
+from pathlib import Path
+
+from PyQt5 import uic
+
+UI_DIR = Path(__file__).parent.parent / 'ui'
+COMPILED_DIR = UI_DIR / 'compiled'
+
+logger = logging.getLogger('uiLoader')
+
+
+def uiHash(uiFile: Path) -> str:
+    return hashlib.sha1(Path(uiFile).read_bytes()).hexdigest()
+
+
+def compileUi(uiFile: Path, outDir: Path = COMPILED_DIR) -> Path:
+    """
+    compile uiFile with pyuic into outDir/<name of uiFile>.py
+    @return: path of the compiled module
+    """
+    uiFile = Path(uiFile)
+    code = io.StringIO()
+    uic.compileUi(str(uiFile), code)
+    className = re.search(r'^class (Ui_\w+)\(', code.getvalue(), re.MULTILINE)[1]
+    code.write(f'\n\nUi = {className}\n')
+    code.write(f"# sha1 of {uiFile.name} when it was compiled\nUI_SHA1 = '{uiHash(uiFile)}'\n")
+    outDir.mkdir(parents=True, exist_ok=True)
+    path = outDir / f'{uiFile.stem}.py'
+    path.write_text(code.getvalue())
+    return path
+
+
+def compileAll(uiDir: Path = UI_DIR, outDir: Path = COMPILED_DIR) -> list[Path]:
+    """
+    compile all .ui files of uiDir
+    """
+    return [compileUi(uiFile, outDir) for uiFile in sorted(Path(uiDir).glob('*.ui'))]
+
+
+def compiledUi(name: str, uiDir: Path = UI_DIR, compiledDir: Path = COMPILED_DIR):
+    """
+    @return: the Ui class compiled from uiDir/<name>.ui, None if it was not compiled or the .ui file changed since
+    """
+    path = compiledDir / f'{name}.py'
+    if not path.is_file():
+        return None
+    # loaded by path, importing the pyctbgui.ui package would import the main window
+    spec = importlib.util.spec_from_file_location(f'pyctbgui_compiled_ui_{name}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if getattr(module, 'UI_SHA1', None) != uiHash(uiDir / f'{name}.ui'):
+        logger.info(f'{name}.ui changed since it was compiled, loading the .ui file')
+        return None
+    return module.Ui
+
+
+def loadUi(name: str, widget, uiDir: Path = UI_DIR, compiledDir: Path = COMPILED_DIR):
+    """
+    build the widgets of uiDir/<name>.ui into widget, like uic.loadUi the child widgets and layouts become attributes
+    of widget
+    """
+    ui = compiledUi(name, uiDir, compiledDir)
+    if ui is None:
+        uic.loadUi(uiDir / f'{name}.ui', widget)
+        return
+    ui = ui()
+    ui.setupUi(widget)
+    for attribute, value in vars(ui).items():
+        setattr(widget, attribute, value)
+
+
+if __name__ == '__main__':
+    for compiled in compileAll():
+        print(f'compiled {compiled}')
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+class WaveformCurves(dict):
+    """
+    curves of a waveform plot widget by channel (adc, signal or transceiver index)
+
+    A curve is created (hidden) the first time it is used: creating the 32 analog, 64 digital and 4 transceiver
+    curves up front takes a noticeable part of the gui startup while only few of them are ever plotted.
+    Channels without a curve are not plotted, hiding them does nothing.
+    """
+
+    def __init__(self, plotWidget, pen, **options):
+        """
+        @param plotWidget: pyqtgraph PlotWidget the curves are added to
+        @param pen: function(channel) returning the pen of a new curve
+        @param options: options of the PlotDataItem of the curves (e.g. stepMode)
+        """
+        super().__init__()
+        self.plotWidget = plotWidget
+        self.pen = pen
+        self.options = options
+
+    def __missing__(self, channel: int):
+        # no name: the legend is filled with the plotted curves only (getEnabledPlots)
+        curve = self.plotWidget.plot(np.zeros(1000), pen=self.pen(channel), **self.options)
+        curve.hide()
+        self[channel] = curve
+        return curve
+
+    def hide(self, channel: int):
+        if channel in self:
+            self[channel].hide()
+
+    def hideAll(self):
+        for curve in self.values():
+            curve.hide()
+
+    def setPen(self, channel: int, pen):
+        """
+        change the pen of the curve of channel if it was created, a new curve gets the pen from self.pen
+        """
+        if channel in self:
+            self[channel].setPen(pen)
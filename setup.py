@@ -1,5 +1,28 @@
+import importlib.util
+from pathlib import Path
+
 import setuptools
 import numpy as np
+from setuptools.command.build_py import build_py
+
+
+class BuildPyCompileUi(build_py):
+    """
+    also compile the .ui files with pyuic, the gui loads the compiled modules faster (see pyctbgui/utils/uiLoader.py)
+    """
+
+    def run(self):
+        super().run()
+        try:
+            # loaded by path, importing pyctbgui needs the built c extension
+            spec = importlib.util.spec_from_file_location('uiLoader', Path('pyctbgui') / 'utils' / 'uiLoader.py')
+            uiLoader = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(uiLoader)
+        except ImportError as e:
+            print(f'not compiling the .ui files: {e}')
+            return
+        uiLoader.compileAll(Path('pyctbgui') / 'ui', Path(self.build_lib) / 'pyctbgui' / 'ui' / 'compiled')
+
 
 c_ext = setuptools.Extension("pyctbgui._decoder",
                              sources=["src/decoder.c", "src/pm_decode.c"],
@@ -19,8 +42,10 @@ setuptools.setup(
     ]),
     include_package_data=True,
     ext_modules=[c_ext],
+    cmdclass={'build_py': BuildPyCompileUi},
     scripts=[
         'CtbGui',
+        'ctbgui-headless',
     ],
     python_requires='>=3.10',  # using match statement
     install_requires=[
@@ -40,5 +65,6 @@ setuptools.setup(
             'pytest-ruff==0.1.1',
             'pre-commit',
             'pytest-qt',
+            'pytest-benchmark',
         ],
     })
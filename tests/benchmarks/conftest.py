@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import pytest
+
+from pyctbgui.utils import recordOrApplyPedestal
+
+
+class PlotTabStub:
+    """
+    stand-in for PlotTab providing the attributes used by the recordOrApplyPedestal decorator
+    """
+
+    def __init__(self, pedestalRecord=False, pedestalApply=False):
+        self.pedestalRecord = pedestalRecord
+        self.pedestalApply = pedestalApply
+        self.mainWindow = SimpleNamespace(statusbar=None)
+
+    def updateLabelPedestalFrames(self):
+        pass
+
+
+@pytest.fixture()
+def plotTabStub():
+    plotTab = PlotTabStub()
+    recordOrApplyPedestal.reset(plotTab)
+    yield plotTab
+    recordOrApplyPedestal.reset(plotTab)
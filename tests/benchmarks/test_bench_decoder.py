@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from pyctbgui.utils import decoder
+from pyctbgui.utils.pixelmap import matterhorn_transceiver, moench03, moench04_analog
+
+N_FRAMES = 100
+
+
+@pytest.mark.parametrize('pixelMap', [moench04_analog, matterhorn_transceiver])
+def test_decode_single_frame(benchmark, pixelMap):
+    pm = pixelMap()
+    raw = np.arange(pm.size, dtype=np.uint16)
+    out = benchmark(decoder.decode, raw, pm)
+    assert out.shape == pm.shape
+
+
+@pytest.mark.parametrize('nThreads', [1, 2, 4, 8])
+def test_decode_multi_frame(benchmark, nThreads):
+    pm = moench04_analog()
+    raw = np.zeros((N_FRAMES, pm.size), dtype=np.uint16)
+    out = np.zeros((N_FRAMES, *pm.shape), dtype=np.uint16)
+    benchmark(decoder.decode, raw, pm, out=out, n_threads=nThreads)
+
+
+def test_decode_python_reference(benchmark):
+    raw = np.arange(400 * 400, dtype=np.uint16)
+    benchmark.pedantic(decoder.moench04, args=(raw, ), rounds=3)
+
+
+@pytest.mark.parametrize('pixelMap', [moench03, moench04_analog, matterhorn_transceiver])
+def test_pixelmap(benchmark, pixelMap):
+    benchmark.pedantic(pixelMap, rounds=3)
@@ -0,0 +1,11 @@
+import pytest
+
+from pyctbgui.utils.importTime import lazyModulesImported, measureImportTime
+
+
+def test_gui_import_time(benchmark):
+    # the gui modules import the slsdet Detector
+    pytest.importorskip('slsdet')
+    times = benchmark.pedantic(measureImportTime, args=('pyctbgui.ui', ), rounds=3)
+    benchmark.extra_info['modules'] = len(times)
+    assert lazyModulesImported(times) == {}
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from pyctbgui.utils.numpyWriter.npy_writer import NumpyFileManager
+from pyctbgui.utils.numpyWriter.npz_writer import NpzFileWriter
+
+N_FRAMES = 1000
+# compression of random data is slow, keep the zipped files smaller
+ZIP_FRAMES = 100
+FRAME_SHAPE = (400, 400)
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return np.random.default_rng(0).integers(0, 1 << 14, size=FRAME_SHAPE, dtype=np.uint16)
+
+
+def saveFrames(path, frame, nFrames):
+    np.save(path, np.broadcast_to(frame, (nFrames, *FRAME_SHAPE)))
+    return path
+
+
+@pytest.fixture(scope='module')
+def npyFile(tmp_path_factory, frame):
+    return saveFrames(tmp_path_factory.mktemp('bench') / 'frames.npy', frame, N_FRAMES)
+
+
+@pytest.mark.parametrize('nFrames', [None, N_FRAMES], ids=['growing', 'preallocated'])
+def test_write_frames(benchmark, tmp_path, frame, nFrames):
+
+    def write():
+        npw = NumpyFileManager(tmp_path / 'out.npy', 'w', FRAME_SHAPE, np.uint16, nFrames=nFrames)
+        for _ in range(N_FRAMES):
+            npw.writeOneFrame(frame)
+        npw.close()
+
+    benchmark.pedantic(write, rounds=3)
+
+
+def test_read_frames(benchmark, npyFile):
+    npw = NumpyFileManager(npyFile)
+    out = benchmark(npw.readFrames, 0, N_FRAMES)
+    assert out.shape == (N_FRAMES, *FRAME_SHAPE)
+    npw.close()
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_zip_npy_files(benchmark, tmp_path, frame, compressed):
+    npyFile = saveFrames(tmp_path / 'frames.npy', frame, ZIP_FRAMES)
+    benchmark.pedantic(NpzFileWriter.zipNpyFiles,
+                       args=(tmp_path / 'out.npz', [npyFile, npyFile], ['adc', 'tx']),
+                       kwargs={'compressed': compressed},
+                       rounds=2)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from pyctbgui.utils.pattern import Pattern
+
+N_WORDS = 8192
+
+
+def test_parse_pattern(benchmark):
+    words = np.random.default_rng(0).integers(0, 2**63, N_WORDS, dtype=np.uint64)
+    text = 'patioctrl 0xffffffffffffffff\n' + ''.join(f'patword 0x{i:04x} 0x{word:016x}\n'
+                                                      for i, word in enumerate(words))
+    pattern = benchmark(lambda: Pattern.parse(text).bits())
+    assert pattern.shape == (N_WORDS, 64)
+
+
+def test_pattern_viewer_vertices(benchmark):
+    from pyctbgui.utils.patternViewer import signalSteps
+
+    # a clock like signal changes at every word, the worst case of the viewer
+    bits = np.random.default_rng(0).integers(0, 2, (N_WORDS, 64), dtype=np.uint8)
+    steps = benchmark(signalSteps, bits)
+    assert len(steps) == 64
+
+
+def test_pattern_timeline_window(benchmark):
+    from pyctbgui.utils.pattern import PatternLoop
+    from pyctbgui.utils.patternTimeline import PatternTimeline
+
+    # six nested loops, about 10**20 clocks, of which the real time view draws the first 100000
+    pattern = Pattern(words=np.arange(N_WORDS, dtype=np.uint64))
+    for level in range(6):
+        pattern.loops[level] = PatternLoop(level, N_WORDS - 1 - level, 1000)
+    timeline = PatternTimeline(pattern)
+    boundaries, addresses = benchmark(timeline.runs, 0, 100000)
+    assert boundaries[-1] == 100000
@@ -0,0 +1,34 @@
+"""
+throughput of the multi process pipelines for moench04 images, compare the rounds with increasing number of
+workers to check the scaling (limited by the number of cpus of the machine)
+"""
+import os
+
+import numpy as np
+import pytest
+
+from pyctbgui.processing import AcquisitionConfig
+from pyctbgui.processing.pipeline import ProcessingPipeline, SharedMemoryPipeline
+
+N_FRAMES = 200
+
+
+@pytest.fixture(scope='module')
+def moench04Data():
+    return np.random.default_rng(0).integers(0, 1 << 14, size=5000 * 32, dtype=np.uint16).tobytes()
+
+
+@pytest.mark.parametrize('nWorkers', [n for n in [1, 2, 4, 8] if n <= (os.cpu_count() or 1)])
+@pytest.mark.parametrize('pipelineClass', [ProcessingPipeline, SharedMemoryPipeline], ids=['pickle', 'shared-memory'])
+def test_pipeline_moench04(benchmark, tmp_path, moench04Data, pipelineClass, nWorkers):
+    config = AcquisitionConfig(romode=0, aSamples=5000, adcMask=0xFFFFFFFF)
+
+    def run():
+        pipeline = pipelineClass(config, image=True, nWorkers=nWorkers, outputDir=tmp_path)
+        for i in range(N_FRAMES):
+            pipeline.submit({'frameIndex': i, 'progress': 100 * (i + 1) / N_FRAMES}, moench04Data)
+        pipeline.close()
+        return pipeline
+
+    pipeline = benchmark.pedantic(run, rounds=3)
+    assert pipeline.framesWritten == N_FRAMES
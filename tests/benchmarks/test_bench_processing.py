@@ -0,0 +1,82 @@
+"""
+benchmarks of the processing done on every frame received by the acquisition tab
+"""
+import numpy as np
+import pytest
+
+from pyctbgui.processing import AcquisitionConfig, FrameProcessor, digitalWaveform
+from pyctbgui.utils.recordOrApplyPedestal import recordOrApplyPedestal
+
+D_SAMPLES = 1000
+N_DBITS = 64
+
+
+def unpackDigitalBits(data, dSamples, nDBits):
+    """
+    bit by bit unpacking formerly done in SignalsTab._processWaveformData, kept as a baseline
+    """
+    digital_array = np.array(np.frombuffer(data, dtype=np.uint8))
+    nbitsPerDBit = dSamples
+    if nbitsPerDBit % 8 != 0:
+        nbitsPerDBit += (8 - (dSamples % 8))
+    offset = 0
+    arr = []
+    for _ in range(nDBits):
+        if offset % 8 != 0:
+            offset += (8 - (offset % 8))
+        waveform = np.zeros(dSamples)
+        for iSample in range(dSamples):
+            index = int(offset / 8)
+            iBit = offset % 8
+            waveform[iSample] = (digital_array[index] >> iBit) & 1
+            offset += 1
+        arr.append(waveform)
+    return np.array(arr)
+
+
+@pytest.fixture(scope='module')
+def digitalData():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=N_DBITS * D_SAMPLES // 8, dtype=np.uint8).tobytes()
+
+
+def test_digital_bits_loop(benchmark, digitalData):
+    out = benchmark.pedantic(unpackDigitalBits, args=(digitalData, D_SAMPLES, N_DBITS), rounds=3)
+    assert out.shape == (N_DBITS, D_SAMPLES)
+
+
+def test_digital_bits_unpackbits(benchmark, digitalData):
+    out = benchmark(digitalWaveform, digitalData, 0, D_SAMPLES, N_DBITS, 0, 1, 0)
+    assert np.array_equal(out, unpackDigitalBits(digitalData, D_SAMPLES, N_DBITS))
+
+
+@pytest.mark.parametrize('image', [False, True], ids=['waveform', 'image'])
+def test_frame_processor(benchmark, image):
+    config = AcquisitionConfig(romode=0, aSamples=5000, adcMask=0xFFFFFFFF)
+    data = np.random.default_rng(0).integers(0, 1 << 14, size=5000 * 32, dtype=np.uint16).tobytes()
+    processor = FrameProcessor(config, image=image)
+    benchmark(processor.process, data)
+
+
+class Processor:
+
+    def __init__(self, plotTab):
+        self.plotTab = plotTab
+
+    @recordOrApplyPedestal
+    def process(self, frame):
+        return frame
+
+
+@pytest.mark.parametrize('mode', ['record', 'apply', 'none'])
+def test_pedestal(benchmark, plotTabStub, mode):
+    frame = np.random.default_rng(0).integers(0, 1 << 14, size=(400, 400), dtype=np.uint16)
+    processor = Processor(plotTabStub)
+    if mode == 'apply':
+        plotTabStub.pedestalRecord = True
+        processor.process(frame)
+        plotTabStub.pedestalRecord = False
+        plotTabStub.pedestalApply = True
+    elif mode == 'record':
+        plotTabStub.pedestalRecord = True
+    benchmark(processor.process, frame)
@@ -15,11 +15,11 @@ def test_view_pattern(main, qtbot, tmp_path):
     main.tabWidget.setCurrentIndex(Defines.pattern.tabIndex)
     qtbot.keyClicks(main.patternTab.view.lineEditPatternFile, "tests/gui/data/pattern.pat")
     qtbot.mouseClick(main.patternTab.view.pushButtonViewPattern, qt_api.QtCore.Qt.MouseButton.LeftButton)
-    qtbot.wait_until(lambda: main.patternTab.figure is not None)
-    assert main.patternTab.figure is not None
+    qtbot.wait_until(lambda: main.patternTab.patternViewer is not None)
+    assert all(curve.xData is not None for curve in main.patternTab.patternViewer.curves)
 
-    # save pattern
-    main.patternTab.figure.savefig(tmp_path / "pattern.png")
+    # export pattern figure
+    main.patternTab.savePatternFigure("tests/gui/data/pattern.pat", tmp_path / "pattern.png")
     assert Path(tmp_path / "pattern.png").exists()
 
     # pattern files generated from python3.10 libraries differ from python3.11. this would make this
@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app():
+    """
+    Qt application shared by the tests, widgets are drawn offscreen
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5 import QtWidgets
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
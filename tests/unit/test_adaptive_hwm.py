@@ -0,0 +1,49 @@
+from pyctbgui.utils.adaptiveHwm import AdaptiveHwm
+from pyctbgui.utils.defines import Defines
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def runMeasurement(adaptiveHwm, clock, consumed, caught, duration=1.0):
+    adaptiveHwm.startRun()
+    for _ in range(consumed):
+        adaptiveHwm.frameConsumed()
+    clock.now += duration
+    adaptiveHwm.endRun(caught)
+
+
+def test_saving_uses_full_hwm():
+    adaptiveHwm = AdaptiveHwm(clock=FakeClock())
+    assert adaptiveHwm.choose(saving=True)[0] == Defines.Zmq_hwm_low_speed
+    # nothing measured yet
+    assert adaptiveHwm.choose(saving=False)[0] == Defines.Zmq_hwm_low_speed
+
+
+def test_slow_consumer_drops_frames():
+    clock = FakeClock()
+    adaptiveHwm = AdaptiveHwm(clock=clock)
+    runMeasurement(adaptiveHwm, clock, consumed=50, caught=1000)
+    assert adaptiveHwm.backlog == 950
+    hwm, reason = adaptiveHwm.choose(saving=False)
+    assert hwm == Defines.Zmq_hwm_high_speed
+    assert 'too slow' in reason
+    assert adaptiveHwm.choose(saving=True)[0] == Defines.Zmq_hwm_low_speed
+
+
+def test_consumer_keeping_up():
+    clock = FakeClock()
+    adaptiveHwm = AdaptiveHwm(clock=clock)
+    runMeasurement(adaptiveHwm, clock, consumed=20, caught=20)
+    assert adaptiveHwm.choose(saving=False)[0] == Defines.Zmq_hwm_low_speed
+    # rates are smoothed over the measurements
+    runMeasurement(adaptiveHwm, clock, consumed=20, caught=30)
+    assert adaptiveHwm.consumerFps == 20
+    assert adaptiveHwm.producerFps == 25
+    assert adaptiveHwm.choose(saving=False)[0] == Defines.Zmq_hwm_high_speed
@@ -0,0 +1,133 @@
+import threading
+
+from PyQt5 import QtCore
+
+from pyctbgui.utils.detectorQueue import DetectorQueue
+from pyctbgui.utils.detectorState import DetectorState
+
+
+def processEventsUntil(app, condition, timeout=5):
+    timer = QtCore.QElapsedTimer()
+    timer.start()
+    while not condition() and timer.elapsed() < timeout * 1000:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 10)
+
+
+def test_values_are_delivered_in_the_gui_thread(app):
+    queue = DetectorQueue({'dac0': 100})
+    results = []
+    queue.request('dacs', lambda det: (det['dac0'], threading.get_ident()), lambda values: results.append(
+        (values, threading.get_ident())))
+    processEventsUntil(app, lambda: results)
+    queue.stopQueue()
+    ((value, readThread), callbackThread), = results
+    assert value == 100
+    assert readThread != threading.get_ident()
+    assert callbackThread == threading.get_ident()
+
+
+def test_pending_requests_are_coalesced(app):
+    queue = DetectorQueue(None)
+    release = threading.Event()
+    reads = []
+    results = []
+    queue.request('slow', lambda det: release.wait(5), lambda values: results.append('slow'))
+    # requested while the queue is busy, only the last one is read
+    for i in range(3):
+        queue.request('dacs', lambda det, i=i: reads.append(i) or i, results.append)
+    release.set()
+    processEventsUntil(app, lambda: len(results) == 2)
+    queue.stopQueue()
+    assert reads == [2]
+    assert results == ['slow', 2]
+
+
+def test_call_failure(app):
+    queue = DetectorQueue(None)
+    failures = []
+    queue.callFailed.connect(lambda name, message: failures.append((name, message)))
+
+    def read(det):
+        raise RuntimeError('detector not reachable')
+
+    queue.request('dacs', read, print)
+    processEventsUntil(app, lambda: failures)
+    queue.stopQueue()
+    assert failures == [('dacs', 'detector not reachable')]
+
+
+class Settings:
+
+    def __init__(self):
+        self.period = 1
+
+    def setDAC(self, value):
+        if value < 0:
+            raise RuntimeError('dac value out of range')
+        self.dac = value
+
+
+def test_write_property_reads_back(app):
+    queue = DetectorQueue(Settings())
+    results = []
+    queue.writeProperty('period', 5, lambda error, value: results.append((error, value)))
+    processEventsUntil(app, lambda: results)
+    queue.stopQueue()
+    assert results == [(None, 5)]
+
+
+def test_write_error_is_passed_to_the_callback(app):
+    queue = DetectorQueue(Settings())
+    results = []
+    queue.write('dac',
+                lambda det: det.setDAC(-1),
+                lambda error, value: results.append((error, value)),
+                read=lambda det: det.period)
+    processEventsUntil(app, lambda: results)
+    queue.stopQueue()
+    # the setting is read back even if the write failed
+    assert results == [('dac value out of range', 1)]
+
+
+def test_wait_until_idle(app):
+    queue = DetectorQueue(Settings())
+    release = threading.Event()
+    queue.request('slow', lambda det: release.wait(5))
+    queue.writeProperty('period', 7)
+    assert not queue.waitUntilIdle(0.05)
+    release.set()
+    assert queue.waitUntilIdle(5)
+    assert queue.det.period == 7
+    queue.stopQueue()
+
+
+def test_coalesced_call_moves_to_the_end(app):
+    queue = DetectorQueue(None)
+    release = threading.Event()
+    writes = []
+    queue.request('slow', lambda det: release.wait(5))
+    # a mask, one of its bits, then a new mask: the mask typed last is written last
+    queue.request('adcenable', lambda det: writes.append('mask 0x0f'))
+    queue.request('adcenable3', lambda det: writes.append('bit 3'))
+    queue.request('adcenable', lambda det: writes.append('mask 0xff'))
+    release.set()
+    assert queue.waitUntilIdle(5)
+    queue.stopQueue()
+    assert writes == ['bit 3', 'mask 0xff']
+
+
+def test_calls_hold_the_detector_state_lock(app):
+    state = DetectorState(Settings())
+    queue = DetectorQueue(state)
+    held = []
+
+    def call(det):
+        # the lock is taken by the queue thread, another thread can not take it
+        locked = threading.Thread(target=lambda: held.append(not det.lock.acquire(timeout=0.01)))
+        locked.start()
+        locked.join()
+
+    queue.request('call', call)
+    assert queue.waitUntilIdle(5)
+    queue.stopQueue()
+    assert held == [True]
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from pyctbgui.utils.detectorState import DetectorState
+
+
+class FakeDetector:
+    """
+    stands in for slsdet.Detector, counts the reads from the detector
+    """
+
+    def __init__(self):
+        self.reads = 0
+        self.settings = {'adcenable': 0xF, 'tengiga': False, 'runclk': 10, 'adcphase': 20}
+        self.dacs = {0: 100, 1: 200}
+
+    def __getattr__(self, name):
+        if name not in self.settings:
+            raise RuntimeError(f'{name} not supported')
+        self.reads += 1
+        return self.settings[name]
+
+    def __setattr__(self, name, value):
+        if name in ('reads', 'settings', 'dacs'):
+            object.__setattr__(self, name, value)
+        else:
+            self.settings[name] = value
+
+    def getDAC(self, dac, mV=False):
+        self.reads += 1
+        return [self.dacs[dac] * (2 if mV else 1)]
+
+    def setDAC(self, dac, value, mV=False):
+        self.dacs[dac] = value
+
+    def getMeasuredPower(self, index):
+        self.reads += 1
+        return [index]
+
+    def start(self):
+        pass
+
+    def loadParameters(self, path):
+        self.settings['adcenable'] = 0xFF
+
+
+@pytest.fixture()
+def det():
+    return FakeDetector()
+
+
+def test_properties_are_read_once(det):
+    state = DetectorState(det)
+    assert [state.adcenable, state.adcenable, state.tengiga] == [0xF, 0xF, False]
+    assert det.reads == 2
+    state.adcenable = 0x3
+    assert det.settings['adcenable'] == 0x3
+    assert state.adcenable == 0x3
+    assert det.reads == 3
+
+
+def test_dependent_properties_are_invalidated(det):
+    state = DetectorState(det)
+    assert state.adcphase == 20
+    det.settings['adcphase'] = 0
+    state.runclk = 20
+    assert state.adcphase == 0
+
+
+def test_getters_are_cached_per_arguments(det):
+    state = DetectorState(det)
+    assert state.getDAC(0)[0] == state.getDAC(0)[0] == 100
+    assert state.getDAC(0, True)[0] == 200
+    assert state.getDAC(1)[0] == 200
+    assert det.reads == 3
+    state.setDAC(0, 50)
+    # all dacs are read again, setting a dac can change others
+    assert state.getDAC(0)[0] == 50
+    assert state.getDAC(1)[0] == 200
+    assert det.reads == 5
+
+
+def test_measured_values_are_not_cached(det):
+    state = DetectorState(det)
+    state.getMeasuredPower(1)
+    state.getMeasuredPower(1)
+    assert det.reads == 2
+
+
+def test_unknown_setters_invalidate_everything(det):
+    state = DetectorState(det)
+    assert state.adcenable == 0xF
+    state.start()
+    assert state.adcenable == 0xF
+    assert det.reads == 1
+    state.loadParameters('parameters.txt')
+    assert state.adcenable == 0xFF
+
+
+def test_refresh(det):
+    state = DetectorState(det)
+    assert state.adcenable == 0xF
+    det.settings['adcenable'] = 0x1
+    assert state.adcenable == 0xF
+    state.refresh()
+    reads = det.reads
+    assert state.adcenable == 0x1
+    assert state.runclk == 10
+    assert det.reads == reads
+
+
+def test_uncached_calls_hold_the_lock(det):
+    state = DetectorState(det)
+    held = []
+
+    def getMeasuredCurrent(index):
+        locked = threading.Thread(target=lambda: held.append(not state.lock.acquire(timeout=0.01)))
+        locked.start()
+        locked.join()
+        return [index]
+
+    object.__setattr__(det, 'getMeasuredCurrent', getMeasuredCurrent)
+    assert state.getMeasuredCurrent(2) == [2]
+    assert held == [True]
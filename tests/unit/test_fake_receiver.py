@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pyctbgui.processing import AcquisitionConfig, FrameProcessor
+from pyctbgui.utils.fakeReceiver import FakeReceiver, makeHeader, makePayload, payloadSize
+from pyctbgui.utils.loadTest import LoadTest
+
+LAYOUT = {
+    'aSamples': 100,
+    'dSamples': 13,
+    'tSamples': 20,
+    'adcMask': 0xF0F,
+    'dbitList': [0, 5, 63],
+    'transceiverMask': 0x3,
+    'dbitOffset': 4,
+}
+
+
+@pytest.mark.parametrize('romode', range(5))
+def test_payload_layout(romode):
+    layout = LAYOUT.copy()
+    if romode == 4:
+        # the gui expects the transceiver data right after the digital bits
+        layout['dbitOffset'] = 0
+    payload = makePayload(np.random.default_rng(0), romode, **layout)
+    assert len(payload) == payloadSize(romode, **layout)
+    decoded = FrameProcessor(AcquisitionConfig(romode, **layout)).process(payload)
+    if 'analog' in decoded:
+        assert decoded['analog'].shape == (100, 8)
+    if 'digital' in decoded:
+        assert decoded['digital'].shape == (3, 13)
+    if 'transceiver' in decoded:
+        assert decoded['transceiver'].shape == (80, 2)
+    assert len(decoded) == {0: 1, 1: 1, 2: 2, 3: 1, 4: 2}[romode]
+
+
+def test_header():
+    header = json.loads(makeHeader(9, 10, 1234, fileIndex=3))
+    assert header['frameIndex'] == 9
+    assert header['progress'] == 100
+    assert header['fileIndex'] == 3
+    assert header['size'] == 1234
+
+
+def test_publish_and_consume():
+    receiver = FakeReceiver(0, romode=0, aSamples=100, adcMask=0xFF, nPayloads=2)
+    loadTest = LoadTest(receiver.port, pollIntervalMs=1, messagesPerTick=1000)
+    time.sleep(0.3)
+    publisher = threading.Thread(target=receiver.publish, args=(50, ))
+    publisher.start()
+    frames = []
+    report = loadTest.consume(lambda jsonHeader, data: frames.append(data), timeout=2)
+    publisher.join()
+    loadTest.close()
+    receiver.close()
+    assert report['processed'] == 50
+    assert report['endReceived']
+    assert report['missing'] == 0
+    assert frames[0] == receiver.payloads[0]
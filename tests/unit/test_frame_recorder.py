@@ -0,0 +1,97 @@
+import io
+import json
+import shutil
+import time
+
+import numpy as np
+import pytest
+
+from pyctbgui.utils import frameRecorder
+from pyctbgui.utils.frameRecorder import FrameLogReader, FrameRecorder
+
+
+def messages(n):
+    rng = np.random.default_rng(42)
+    msgs = []
+    for i in range(n):
+        header = json.dumps({'frameIndex': i, 'progress': 100 * (i + 1) / n}).encode()
+        msgs.append([header, rng.integers(0, 255, size=int(rng.integers(1, 3000)), dtype=np.uint8).tobytes()])
+    msgs.append([b'{"dummy": 1}'])
+    return msgs
+
+
+@pytest.mark.parametrize('segmentSize', [FrameRecorder.SEGMENT_SIZE, 5000])
+def test_record_and_read(tmp_path, segmentSize):
+    msgs = messages(50)
+    with FrameRecorder(tmp_path / 'run_0', segmentSize=segmentSize, writeSize=10000) as recorder:
+        for i, msg in enumerate(msgs):
+            if len(msg) == 2:
+                recorder.record(msg[0], msg[1], i)
+            else:
+                recorder.record(msg[0])
+    assert recorder.framesRecorded == 51
+    if segmentSize == 5000:
+        assert FrameRecorder.segmentPath(tmp_path / 'run_0', 1).exists()
+
+    with FrameLogReader(tmp_path / 'run_0') as reader:
+        assert len(reader) == 51
+        assert list(reader) == msgs
+        assert reader[17] == msgs[17]
+        assert reader.find(17).tolist() == [17]
+        assert reader.index['frameIndex'][-1] == -1
+        assert np.all(np.diff(reader.index['timestamp']) >= 0)
+
+
+def test_truncated_log(tmp_path):
+    msgs = messages(10)
+    with FrameRecorder(tmp_path / 'run') as recorder:
+        for msg in msgs[:10]:
+            recorder.record(*msg)
+    segment = FrameRecorder.segmentPath(tmp_path / 'run', 0)
+    size = segment.stat().st_size
+    with open(segment, 'r+b') as f:
+        f.truncate(size - 1)
+
+    with FrameLogReader(tmp_path / 'run') as reader:
+        assert len(reader) == 9
+        assert list(reader) == msgs[:9]
+
+
+def test_writer_failure(tmp_path):
+    recorder = FrameRecorder(tmp_path / 'log' / 'run', segmentSize=1)
+    # the second segment can not be created
+    shutil.rmtree(tmp_path / 'log')
+    error = None
+    for frameIndex in range(1000):
+        try:
+            recorder.record(b'header', b'data', frameIndex)
+        except RuntimeError as e:
+            error = e
+            break
+        time.sleep(0.01)
+    assert str(error) == 'frame recorder stopped'
+    assert isinstance(error.__cause__, FileNotFoundError)
+    with pytest.raises(RuntimeError, match='frame recorder stopped'):
+        recorder.close()
+
+
+class PartialFileIO(io.FileIO):
+    """
+    raw file writing at most 1000 bytes per call
+    """
+
+    def write(self, data):
+        return super().write(memoryview(data)[:1000])
+
+
+def test_partial_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(frameRecorder, 'open', lambda path, mode, buffering: PartialFileIO(path, mode), raising=False)
+    msgs = messages(50)
+    with FrameRecorder(tmp_path / 'run_0', writeSize=10000) as recorder:
+        for i, msg in enumerate(msgs[:-1]):
+            recorder.record(msg[0], msg[1], i)
+        recorder.record(msgs[-1][0])
+    monkeypatch.undo()
+
+    with FrameLogReader(tmp_path / 'run_0') as reader:
+        assert list(reader) == msgs
@@ -0,0 +1,139 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+import zmq
+
+from pyctbgui.utils import frameSource
+from pyctbgui.utils.frameRecorder import FrameRecorder
+from pyctbgui.utils.frameSource import FrameLogSource, NpyFrameSource, ReplayFrameSource
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(frameSource.time, 'monotonic', fake)
+    return fake
+
+
+def drain(source):
+    messages = []
+    while not source.finished:
+        msg = source.receive()
+        assert msg is not None
+        messages.append(msg)
+    return messages
+
+
+def test_npy_source_as_fast_as_possible(tmp_path):
+    frames = np.arange(5 * 16, dtype=np.uint16).reshape(5, 16)
+    np.save(tmp_path / 'raw.npy', frames)
+    source = NpyFrameSource(tmp_path / 'raw.npy')
+    messages = drain(source)
+    assert len(messages) == 6
+    for i, (header, data) in enumerate(messages[:5]):
+        assert json.loads(header)['frameIndex'] == i
+        assert np.array_equal(np.frombuffer(data, dtype=np.uint16), frames[i])
+    assert json.loads(messages[-2][0])['progress'] == 100
+    assert len(messages[-1]) == 1
+    assert source.receive() is None
+
+
+def test_fixed_rate(tmp_path, clock):
+    np.save(tmp_path / 'raw.npy', np.zeros((4, 8), dtype=np.uint8))
+    source = NpyFrameSource(tmp_path / 'raw.npy', rate=10)
+    assert source.receive() is not None
+    assert source.receive() is None
+    clock.now += 0.1
+    assert source.receive() is not None
+    assert source.receive() is None
+    clock.now += 1
+    assert len(drain(source)) == 3
+
+
+def test_recorded_rate(tmp_path, clock, monkeypatch):
+    timestamps = iter([10.0, 10.5, 12.0])
+    monkeypatch.setattr('pyctbgui.utils.frameRecorder.time.time', lambda: next(timestamps))
+    with FrameRecorder(tmp_path / 'run') as recorder:
+        recorder.record(b'{"frameIndex": 0}', b'a', 0)
+        recorder.record(b'{"frameIndex": 1}', b'b', 1)
+        recorder.record(b'{}')
+
+    source = FrameLogSource(FrameRecorder.indexPath(tmp_path / 'run'))
+    assert source.receive() == [b'{"frameIndex": 0}', b'a']
+    clock.now += 0.4
+    assert source.receive() is None
+    clock.now += 0.1
+    assert source.receive() == [b'{"frameIndex": 1}', b'b']
+    clock.now += 1.5
+    assert source.receive() == [b'{}']
+    assert source.finished
+    source.close()
+
+
+def test_invalid_rate(tmp_path):
+    np.save(tmp_path / 'raw.npy', np.zeros((4, 8), dtype=np.uint8))
+    with pytest.raises(ValueError, match='no recorded timing'):
+        NpyFrameSource(tmp_path / 'raw.npy', rate=ReplayFrameSource.RECORDED_RATE)
+    with pytest.raises(ValueError, match='invalid replay rate'):
+        NpyFrameSource(tmp_path / 'raw.npy', rate=0)
+
+
+def test_zmq_source_hwm():
+    source = frameSource.ZmqFrameSource('localhost', 30555, hwm=2)
+    assert source.socket.getsockopt(zmq.RCVHWM) == 2
+    source.setHwm(1000)
+    assert source.socket.getsockopt(zmq.RCVHWM) == 1000
+    source.close()
+
+
+def test_zmq_source_hwm_waits_for_connection():
+    publisher = zmq.Context.instance().socket(zmq.PUB)
+    port = publisher.bind_to_random_port('tcp://127.0.0.1')
+    source = frameSource.ZmqFrameSource('127.0.0.1', port, hwm=2)
+    assert source.setHwm(2, timeoutMs=1000)
+    assert source.setHwm(1000, timeoutMs=1000)
+    # nothing sent right after reconnecting is dropped
+    publisher.send_multipart([b'header', b'data'])
+    assert source.receive(timeoutMs=1000) == [b'header', b'data']
+    source.close()
+    publisher.close()
+
+
+def test_zmq_source_hwm_no_publisher():
+    publisher = zmq.Context.instance().socket(zmq.PUB)
+    port = publisher.bind_to_random_port('tcp://127.0.0.1')
+    publisher.close()
+    source = frameSource.ZmqFrameSource('127.0.0.1', port, hwm=2)
+    assert not source.setHwm(1000, timeoutMs=100)
+    source.close()
+
+
+def test_zmq_source_socket_connected_in_another_thread():
+    publisher = zmq.Context.instance().socket(zmq.PUB)
+    port = publisher.bind_to_random_port('tcp://127.0.0.1')
+    source = frameSource.ZmqFrameSource('127.0.0.1', port, hwm=2)
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(source.connect(1000, timeoutMs=1000)))
+    thread.start()
+    thread.join()
+    (socket, connected), = connections
+    assert connected
+    # the source keeps its socket until it is replaced
+    assert source.hwm == 2
+    source.replaceSocket(socket, 1000)
+    assert source.socket.getsockopt(zmq.RCVHWM) == 1000
+    publisher.send_multipart([b'header', b'data'])
+    assert source.receive(timeoutMs=1000) == [b'header', b'data']
+    source.close()
+    publisher.close()
@@ -0,0 +1,38 @@
+from pyctbgui.processing import FrameTracker
+
+
+def test_complete():
+    tracker = FrameTracker(expectedFrames=5)
+    for frameIndex in range(5):
+        assert tracker.update(frameIndex) == 0
+    tracker.finish()
+    assert tracker.complete
+    assert tracker.lossRate == 0
+
+
+def test_gaps():
+    tracker = FrameTracker(expectedFrames=10)
+    for frameIndex in [0, 1, 4, 5, 5, 7]:
+        tracker.update(frameIndex)
+    assert tracker.gaps == [(2, 2), (6, 1)]
+    assert tracker.outOfOrder == 1
+    assert not tracker.complete
+    # frames 8 and 9 never arrived
+    assert tracker.finish() == 2
+    assert tracker.finish() == 0
+    assert tracker.gaps[-1] == (8, 2)
+    assert tracker.missing == 5
+    assert tracker.lossRate == 5 / 11
+
+
+def test_save_load(tmp_path):
+    tracker = FrameTracker()
+    tracker.update(1)
+    tracker.finish()
+    path = tracker.save(tmp_path / 'run_0.npz')
+    assert path == tmp_path / 'run_0.json'
+    metadata = FrameTracker.load(tmp_path / 'run_0.npz')
+    assert metadata['receivedFrames'] == 1
+    assert metadata['missingFrames'] == 1
+    assert metadata['gaps'] == [[0, 1]]
+    assert metadata['complete'] is False
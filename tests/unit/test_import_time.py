@@ -0,0 +1,26 @@
+from pyctbgui.utils.importTime import lazyModulesImported, measureImportTime, parseImportTime
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   matplotlib._api
+import time:      8000 |     201800 |   matplotlib
+import time:      8200 |     412300 | matplotlib.pyplot
+import time:       300 |     423400 | pyctbgui.utils.plotPattern
+"""
+
+
+def test_parse_import_time():
+    times = parseImportTime(OUTPUT)
+    assert times['matplotlib'] == (8000, 201800)
+    assert times['pyctbgui.utils.plotPattern'] == (300, 423400)
+    assert len(times) == 4
+
+
+def test_lazy_modules_imported():
+    assert lazyModulesImported(parseImportTime(OUTPUT)) == {'matplotlib': 412300}
+    assert lazyModulesImported({'numpy': (10, 100)}) == {}
+
+
+def test_measure_import_time():
+    times = measureImportTime('pyctbgui.utils.defines')
+    assert 'pyctbgui.utils.defines' in times
+    assert lazyModulesImported(times) == {}
@@ -0,0 +1,73 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from pyctbgui.processing import FrameTracker
+from pyctbgui.utils.instrumentation import Instrumentation
+
+
+@pytest.fixture()
+def instrumentation():
+    instrumentation = Instrumentation(window=4)
+    instrumentation.enabled = True
+    return instrumentation
+
+
+def test_disabled_records_nothing():
+    instrumentation = Instrumentation()
+    with instrumentation.stage('decode'):
+        pass
+    instrumentation.frameReceived(10, 3)
+    assert instrumentation.stages == {}
+    assert instrumentation.framesReceived == 0
+
+
+def test_nested_stages_are_exclusive(instrumentation, monkeypatch):
+    clock = iter([0.0, 1.0, 3.0, 10.0])
+    monkeypatch.setattr('pyctbgui.utils.instrumentation.time.perf_counter', lambda: next(clock))
+    with instrumentation.stage('plot'):
+        with instrumentation.stage('decode'):
+            pass
+    assert instrumentation.stages['decode'].total == 2.0
+    assert instrumentation.stages['plot'].total == 8.0
+
+
+def test_window(instrumentation):
+    stage = instrumentation.statistics('recv')
+    for i in range(6):
+        stage.add(float(i), i / 1000)
+    timestamps, durations = stage.window()
+    assert np.array_equal(timestamps, [2, 3, 4, 5])
+    summary = stage.summary()
+    assert summary['count'] == 6
+    assert summary['max_ms'] == pytest.approx(5)
+    assert summary['rate_hz'] == pytest.approx(1)
+    assert stage.histogram().sum() == 4
+
+
+def test_frame_gaps(instrumentation):
+    tracker = FrameTracker(expectedFrames=12)
+    for frameIndex in [0, 1, 4, 5, 9]:
+        instrumentation.frameReceived(100, tracker.update(frameIndex))
+    instrumentation.endOfAcquisition(tracker.finish())
+    tracker.reset()
+    instrumentation.frameReceived(100, tracker.update(1))
+    assert instrumentation.framesReceived == 6
+    assert instrumentation.framesMissing == 2 + 3 + 2 + 1
+    assert instrumentation.bytesReceived == 600
+
+
+def test_dump(instrumentation, tmp_path):
+    with instrumentation.stage('parse'):
+        pass
+    instrumentation.dump(tmp_path / 'diagnostics.json')
+    instrumentation.dump(tmp_path / 'diagnostics.csv')
+    summary = json.loads((tmp_path / 'diagnostics.json').read_text())
+    assert summary['stages'][0]['stage'] == 'parse'
+    assert len(summary['histograms']['parse']) == len(summary['histogramEdges_s']) - 1
+    with open(tmp_path / 'diagnostics.csv') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['stage', 'timestamp_s', 'duration_ms']
+    assert rows[1][0] == 'parse'
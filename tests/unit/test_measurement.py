@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('slsdet')
+
+from slsdet import runStatus  # noqa: E402
+
+from pyctbgui.utils.measurement import MeasurementWatcher, applyScanPoint  # noqa: E402
+
+
+class FakeDetector:
+    """
+    detector and receiver status of a measurement, the detector status of each poll is taken from statuses (the
+    last one is repeated)
+    """
+
+    def __init__(self, statuses, caught=10):
+        self.statuses = list(statuses)
+        self.caught = caught
+        self.polls = 0
+
+    @property
+    def rx_framescaught(self):
+        return [self.caught]
+
+    def getDetectorStatus(self):
+        status = self.statuses[min(self.polls, len(self.statuses) - 1)]
+        self.polls += 1
+        return [status]
+
+
+def test_end_message_received_while_transmitting():
+    det = FakeDetector([runStatus.RUNNING, runStatus.TRANSMITTING, runStatus.IDLE])
+    watcher = MeasurementWatcher(det, pollInterval=0.01, quietTime=10)
+    watcher.reset(3)
+    watcher.streamEnded(3)
+    start = time.monotonic()
+    assert watcher.wait() == (10, runStatus.IDLE)
+    # the message is kept until the detector stopped, the quiet time is not waited for
+    assert det.polls == 3
+    assert time.monotonic() - start < 5
+
+
+def test_end_message_of_previous_measurement_ignored():
+    det = FakeDetector([runStatus.IDLE])
+    watcher = MeasurementWatcher(det, pollInterval=0.01, quietTime=0.2)
+    watcher.reset(5)
+    watcher.streamEnded(4)
+    start = time.monotonic()
+    assert watcher.wait() == (10, runStatus.IDLE)
+    assert time.monotonic() - start >= 0.2
+
+
+def test_end_message_wakes_up_wait():
+    det = FakeDetector([runStatus.IDLE])
+    watcher = MeasurementWatcher(det, pollInterval=10, quietTime=10)
+    watcher.reset(5)
+    threading.Timer(0.05, watcher.streamEnded, args=(5, )).start()
+    start = time.monotonic()
+    assert watcher.wait() == (10, runStatus.IDLE)
+    assert time.monotonic() - start < 5
+
+
+def test_quiet_time_in_seconds():
+    det = FakeDetector([runStatus.IDLE])
+    watcher = MeasurementWatcher(det, pollInterval=0.01)
+    start = time.monotonic()
+    watcher.wait()
+    assert 0.5 <= time.monotonic() - start < 5
+
+
+def test_stopped():
+    det = FakeDetector([runStatus.RUNNING])
+    watcher = MeasurementWatcher(det, pollInterval=0.01)
+    stopped = threading.Event()
+    threading.Timer(0.05, stopped.set).start()
+    assert watcher.wait(stopped) is None
+
+
+class ClockedDetector:
+    """
+    records the writes, writing the run clock resets the phases as the ctb does
+    """
+
+    def __init__(self):
+        object.__setattr__(self, 'writes', [])
+        object.__setattr__(self, 'values', {'runclk': 40, 'adcphase': 10, 'dbitphase': 20})
+
+    def __getattr__(self, name):
+        return self.values[name]
+
+    def __setattr__(self, name, value):
+        self.writes.append((name, value))
+        self.values[name] = value
+        if name == 'runclk':
+            self.values['adcphase'] = self.values['dbitphase'] = 0
+
+
+def test_scan_point_writes_phases_after_the_clock():
+    det = ClockedDetector()
+    applyScanPoint(det, {'adcphase': 30, 'runclk': 50})
+    assert det.writes == [('runclk', 50), ('adcphase', 30), ('dbitphase', 20)]
+    assert det.values == {'runclk': 50, 'adcphase': 30, 'dbitphase': 20}
+
+
+def test_scan_point_phases_written_again_when_only_the_clock_changes():
+    det = ClockedDetector()
+    applyScanPoint(det, {'adcphase': 30, 'runclk': 60}, {'adcphase': 30, 'runclk': 50})
+    assert det.writes == [('runclk', 60), ('adcphase', 30), ('dbitphase', 20)]
+
+
+def test_scan_point_only_changes_written():
+    det = ClockedDetector()
+    applyScanPoint(det, {'adcphase': 40, 'runclk': 50}, {'adcphase': 30, 'runclk': 50})
+    assert det.writes == [('adcphase', 40)]
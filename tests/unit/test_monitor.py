@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from pyctbgui.utils.monitor import MonitorBuffer, MonitorLog
+
+
+def test_buffer_keeps_last_samples():
+    buffer = MonitorBuffer(['adc0', 'temperature'], capacity=4)
+    for i in range(6):
+        buffer.append(float(i), {'adc0': 10.0 * i})
+    times, values = buffer.window()
+    assert len(buffer) == 4
+    assert np.array_equal(times, [2, 3, 4, 5])
+    assert np.array_equal(values[:, 0], [20, 30, 40, 50])
+    assert np.isnan(values[:, 1]).all()
+    times, adc0 = buffer.channel('adc0')
+    assert np.array_equal(adc0, [20, 30, 40, 50])
+    buffer.clear()
+    assert len(buffer.window()[0]) == 0
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.bin'])
+def test_log_round_trip(tmp_path, suffix):
+    path = tmp_path / f'monitor{suffix}'
+    log = MonitorLog(path, ['adc0', 'I_A'])
+    log.write(1.5, {'adc0': 100.25, 'I_A': 3.0})
+    log.write(2.5, {'adc0': 101.0})
+    log.close()
+    channels, times, values = MonitorLog.load(path)
+    assert channels == ['adc0', 'I_A']
+    assert np.array_equal(times, [1.5, 2.5])
+    assert np.array_equal(values[:, 0], [100.25, 101.0])
+    assert values[0, 1] == 3.0
+    assert np.isnan(values[1, 1])
@@ -1,4 +1,5 @@
 import filecmp
+import os
 from pathlib import Path
 
 import pytest
@@ -158,3 +159,129 @@ def test_with_statement(tmp_path):
         npw.writeOneFrame(arr)
     np.save(tmp_path / 'tmp2.npy', np.expand_dims(arr, 0))
     assert filecmp.cmp(tmp_path / 'tmp2.npy', tmp_path / 'tmp.npy')
+
+
+@pytest.mark.parametrize('chunkSize', [4096, 4 << 20])
+def test_known_size_file(chunkSize, tmp_path, monkeypatch):
+    monkeypatch.setattr(NumpyFileManager, 'WRITE_CHUNK_SIZE', chunkSize)
+    rng = np.random.default_rng(seed=42)
+    arr = rng.integers(0, 4096, (50, 48, 48), dtype=np.uint16)
+    npw = NumpyFileManager(tmp_path / 'tmp.npy', 'w', (48, 48), np.uint16, nFrames=50)
+    # file is preallocated and data starts aligned
+    assert Path(tmp_path / 'tmp.npy').stat().st_size == NumpyFileManager.ALIGNMENT + arr.nbytes
+    for frame in arr:
+        npw.writeOneFrame(frame)
+    assert np.array_equal(npw[10:20], arr[10:20])
+    npw.close()
+
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr)
+    npw = NumpyFileManager(tmp_path / 'tmp.npy')
+    assert npw.headerLength == NumpyFileManager.ALIGNMENT
+    assert npw.frameCount == 50
+    assert np.array_equal(npw[45:50], arr[45:50])
+
+
+def test_known_size_file_stopped_early(tmp_path):
+    arr = np.arange(7 * 20, dtype=np.float32).reshape(7, 20)
+    with NumpyFileManager(tmp_path / 'tmp.npy', 'w', (20, ), np.float32, nFrames=100) as npw:
+        for frame in arr:
+            npw.writeOneFrame(frame)
+
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr)
+    assert Path(tmp_path / 'tmp.npy').stat().st_size == NumpyFileManager.ALIGNMENT + arr.nbytes
+
+
+def test_known_size_file_grows(tmp_path):
+    arr = np.ones((5, 4, 4), dtype=np.int32) * np.arange(5, dtype=np.int32)[:, None, None]
+    with NumpyFileManager(tmp_path / 'tmp.npy', 'x', (4, 4), np.int32, nFrames=3) as npw:
+        for frame in arr:
+            npw.writeOneFrame(frame)
+
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr)
+
+
+def test_known_size_only_for_new_files(tmp_path):
+    NumpyFileManager(tmp_path / 'tmp.npy', 'w', (4, 4), np.int32).close()
+    with pytest.raises(AssertionError):
+        NumpyFileManager(tmp_path / 'tmp.npy', 'r+', nFrames=5)
+
+
+def test_checkpoint_frames(tmp_path):
+    arr = np.arange(10 * 6, dtype=np.int32).reshape(10, 6)
+    npw = NumpyFileManager(tmp_path / 'tmp.npy', 'w', (6, ), np.int32, checkpointFrames=4)
+    for frame in arr[:9]:
+        npw.writeOneFrame(frame)
+    # simulate a crash: the header describes the frames of the last checkpoint
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr[:8])
+    npw.writeOneFrame(arr[9])
+    npw.close()
+    assert np.load(tmp_path / 'tmp.npy').shape == (10, 6)
+
+
+def test_checkpoint_seconds(tmp_path):
+    # one page per frame, every frame of a preallocated file is written at a checkpoint
+    arr = np.ones((3, 1024), dtype=np.int32)
+    npw = NumpyFileManager(tmp_path / 'tmp.npy', 'w', (1024, ), np.int32, nFrames=10, checkpointSeconds=0)
+    for frame in arr:
+        npw.writeOneFrame(frame)
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr)
+    npw.close()
+
+
+def test_checkpoint_keeps_preallocated_writes_aligned(tmp_path, monkeypatch):
+    writes = []
+    pwrite = os.pwrite
+
+    def alignedPwrite(fd, data, offset):
+        writes.append((offset, len(data)))
+        return pwrite(fd, data, offset)
+
+    monkeypatch.setattr(os, 'pwrite', alignedPwrite)
+    # 1000 bytes per frame, frames cross page boundaries
+    arr = np.arange(10 * 250, dtype=np.int32).reshape(10, 250)
+    npw = NumpyFileManager(tmp_path / 'tmp.npy', 'w', (250, ), np.int32, nFrames=10, checkpointFrames=5)
+    for frame in arr:
+        npw.writeOneFrame(frame)
+    assert writes
+    assert all((offset + length) % NumpyFileManager.ALIGNMENT == 0 for offset, length in writes)
+    # the header only counts the frames entirely on disk: 2 pages of frames after the header page
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr[:8])
+    npw.close()
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr)
+
+
+def test_recover_growable_file(tmp_path):
+    arr = np.arange(5 * 6, dtype=np.float64).reshape(5, 6)
+    npw = NumpyFileManager(tmp_path / 'tmp.npy', 'w', (6, ), np.float64)
+    for frame in arr:
+        npw.writeOneFrame(frame)
+    # crash in the middle of writing the 6th frame
+    npw.file.write(b'\x00' * 13)
+    npw.file.flush()
+    assert np.load(tmp_path / 'tmp.npy').shape == (0, 6)
+
+    assert NumpyFileManager.recover(tmp_path / 'tmp.npy') == 5
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr)
+    npw.file.close()
+
+
+def test_recover_preallocated_file(tmp_path):
+    arr = np.arange(5 * 2048, dtype=np.uint16).reshape(5, 2048)
+    npw = NumpyFileManager(tmp_path / 'tmp.npy', 'w', (2048, ), np.uint16, nFrames=100, checkpointFrames=2)
+    for frame in arr:
+        npw.writeOneFrame(frame)
+    assert NumpyFileManager.recover(tmp_path / 'tmp.npy', preallocated=True) == 4
+    assert np.array_equal(np.load(tmp_path / 'tmp.npy'), arr[:4])
+    assert NumpyFileManager(tmp_path / 'tmp.npy').headerLength == NumpyFileManager.ALIGNMENT
+    npw.file.close()
+
+
+def test_recover_preallocated_file_before_first_checkpoint(tmp_path):
+    npw = NumpyFileManager(tmp_path / 'tmp.npy', 'w', (2048, ), np.uint16, nFrames=100, checkpointFrames=10)
+    for frame in np.ones((3, 2048), dtype=np.uint16):
+        npw.writeOneFrame(frame)
+    # crash: the preallocated frames are zeros, none of them is recovered
+    assert np.load(tmp_path / 'tmp.npy').shape == (0, 2048)
+    assert NumpyFileManager.recover(tmp_path / 'tmp.npy', preallocated=True) == 0
+    assert np.load(tmp_path / 'tmp.npy').shape == (0, 2048)
+    npw.file.close()
@@ -1,4 +1,5 @@
 import filecmp
+import zipfile
 from pathlib import Path
 
 import pytest
@@ -86,6 +87,21 @@ def test_compression(tmp_path):
     assert Path(tmp_path / 'tmp2.npz').stat().st_size > Path(tmp_path / 'tmp.npz').stat().st_size
 
 
+def test_append_compressed(tmp_path):
+    arr = np.arange(1000 * 25, dtype=np.int32).reshape(1000, 5, 5)
+    with NpzFileWriter(tmp_path / 'tmp.npz', 'w', compress_file=True) as npz:
+        npz.writeArray('adc', arr)
+    with NpzFileWriter(tmp_path / 'tmp.npz', 'a', compress_file=True) as npz:
+        npz.writeArray('tx', arr + 1)
+
+    with zipfile.ZipFile(tmp_path / 'tmp.npz') as zipf:
+        assert zipf.testzip() is None
+        assert all(info.compress_type == zipfile.ZIP_DEFLATED for info in zipf.infolist())
+    npzFile = np.load(tmp_path / 'tmp.npz')
+    assert np.array_equal(npzFile['adc'], arr)
+    assert np.array_equal(npzFile['tx'], arr + 1)
+
+
 @pytest.mark.parametrize('compressed', [True, False])
 @pytest.mark.parametrize('isPath', [True, False])
 @pytest.mark.parametrize('deleteOriginals', [True, False])
@@ -192,3 +208,39 @@ def test_namelist(compressed, tmp_path):
     npz.writeArray('adc2', arr2)
     npz.writeArray('adc3', arr1)
     assert npz.namelist() == ['adc1', 'adc2', 'adc3']
+
+
+@pytest.mark.parametrize('compressionThreads', [1, 4])
+def test_parallel_compression(compressionThreads, tmp_path):
+    # large enough to be split into multiple compression chunks
+    rng = np.random.default_rng(seed=42)
+    arr = rng.integers(0, 16, (40, 200, 200), dtype=np.uint16)
+    with NpzFileWriter(tmp_path / 'tmp.npz', 'w', compress_file=True, compressionThreads=compressionThreads) as npz:
+        npz.writeArray('adc', arr)
+
+    np.save(tmp_path / 'tx.npy', arr[:7])
+    NpzFileWriter.zipNpyFiles(tmp_path / 'zipped.npz', [tmp_path / 'tx.npy'], ['tx'],
+                              compressed=True,
+                              compressionThreads=compressionThreads)
+
+    assert np.array_equal(np.load(tmp_path / 'tmp.npz')['adc'], arr)
+    assert np.array_equal(np.load(tmp_path / 'zipped.npz')['tx'], arr[:7])
+    assert Path(tmp_path / 'tmp.npz').stat().st_size < arr.nbytes
+
+
+def test_bundle_npy_files(tmp_path):
+    managers = {}
+    for key in ['adc', 'tx']:
+        managers[key] = NumpyFileManager(tmp_path / f'run_{key}_0.npy', 'w', (4, ), np.int32)
+        for i in range(3):
+            managers[key].writeOneFrame(np.full(4, i, dtype=np.int32))
+    path = NpzFileWriter.bundleNpyFiles(managers, tmp_path / 'run_0')
+    assert path == tmp_path / 'run_0.npz'
+    assert not (tmp_path / 'run_adc_0.npy').exists()
+    with np.load(path) as npz:
+        assert npz['tx'].shape == (3, 4)
+
+    single = {'adc': NumpyFileManager(tmp_path / 'run_adc_1.npy', 'w', (4, ), np.int32)}
+    single['adc'].writeOneFrame(np.ones(4, dtype=np.int32))
+    assert NpzFileWriter.bundleNpyFiles(single, tmp_path / 'run_1') == tmp_path / 'run_1.npy'
+    assert np.load(tmp_path / 'run_1.npy').shape == (1, 4)
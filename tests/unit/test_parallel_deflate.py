@@ -0,0 +1,43 @@
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from pyctbgui.utils.numpyWriter.parallel_deflate import ParallelDeflateCompressor
+
+
+@pytest.mark.parametrize('nThreads', [1, 3, 8])
+def test_stream_is_valid_deflate(nThreads):
+    rng = np.random.default_rng(seed=42)
+    data = rng.integers(0, 8, 3_000_000, dtype=np.uint8).tobytes()
+    compressor = ParallelDeflateCompressor(nThreads, chunkSize=100_000)
+    out = bytearray()
+    # feed in uneven pieces like shutil.copyfileobj would
+    for start in range(0, len(data), 77_777):
+        out += compressor.compress(data[start:start + 77_777])
+    out += compressor.flush()
+
+    assert zlib.decompress(bytes(out), -zlib.MAX_WBITS) == data
+    assert len(out) < len(data)
+
+
+def test_single_chunk_matches_zlib():
+    data = np.arange(1000, dtype=np.int32).tobytes()
+    compressor = ParallelDeflateCompressor(2)
+    out = compressor.compress(data) + compressor.flush()
+
+    reference = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    assert out == reference.compress(data) + reference.flush()
+
+
+def test_empty_stream():
+    compressor = ParallelDeflateCompressor(2)
+    out = compressor.flush()
+    assert zlib.decompress(out, -zlib.MAX_WBITS) == b''
+
+
+def test_threads_stop_without_flush():
+    with ParallelDeflateCompressor(2, chunkSize=10) as compressor:
+        compressor.compress(bytes(100))
+    assert not any(thread.name.startswith('deflate') for thread in threading.enumerate())
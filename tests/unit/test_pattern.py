@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pyctbgui.utils.pattern import Pattern, PatternLoop, PatternWait
+
+PATTERN = """
+patword 0x0000 0x0000000000000001
+patword 0x0001 0x8000000000000002
+patword 0x0002 0x0000000000000000
+patioctrl 0x8000000000000003
+patlimits 0x0000 0x0002
+patloop 1 0x0001 0x0002
+patnloop 1 10
+patwait 0 0x0001
+patwaittime 0 800
+patclkctrl 0x0000000000000000
+"""
+
+
+def test_parse():
+    pattern = Pattern.parse(PATTERN)
+    assert len(pattern) == 3
+    assert pattern.words.dtype == np.uint64
+    assert pattern.words[1] == 0x8000000000000002
+    assert pattern.ioctrl == 0x8000000000000003
+    assert pattern.outputBits() == [0, 1, 63]
+    assert pattern.limits == (0, 2)
+    assert pattern.loops[1] == PatternLoop(1, 2, 10)
+    assert pattern.loops[1].defined
+    assert not pattern.loops[0].defined
+    assert pattern.waits[0] == PatternWait(1, 800)
+    assert not pattern.waits[5].defined
+
+
+def test_bits():
+    bits = Pattern.parse(PATTERN).bits()
+    assert bits.shape == (3, 64)
+    assert bits[0, 0] == 1
+    assert bits[1, 1] == 1
+    assert bits[1, 63] == 1
+    assert bits.sum() == 3
+
+
+def test_bits_match_the_binary_representation_of_the_words():
+    words = np.random.default_rng(42).integers(0, 2**63, 100, dtype=np.uint64) * 2 + 1
+    pattern = Pattern.parse(''.join(f'patword 0x{i:04x} 0x{word:016x}\n' for i, word in enumerate(words)))
+    reference = np.array([[int(bit) for bit in np.binary_repr(int(word), 64)[::-1]] for word in words])
+    assert np.array_equal(pattern.bits(), reference)
+
+
+def test_empty_pattern():
+    pattern = Pattern.parse('')
+    assert len(pattern) == 0
+    assert pattern.bits().shape == (0, 64)
+    assert pattern.outputBits() == []
+
+
+@pytest.mark.parametrize('line', ['patword 0x0000 0xzz', 'patloop 7 0x0 0x1', 'patnloop 0'])
+def test_invalid_command(line):
+    with pytest.raises(ValueError, match='line 2: invalid command'):
+        Pattern.parse(f'patioctrl 0x1\n{line}\n')
+
+
+def test_load_pattern_file():
+    pattern = Pattern.load(Path(__file__).parent.parent / 'gui' / 'data' / 'pattern.pat')
+    assert len(pattern) == 226
+    assert pattern.loops[0] == PatternLoop(0xa9, 0xda, 199)
+    assert pattern.waits[0] == PatternWait(0x18, 800)
@@ -0,0 +1,99 @@
+import os
+import stat
+import sys
+
+import pytest
+from PyQt5 import QtCore
+
+from pyctbgui.utils.patternCompiler import (CompileError, PatternCompiler, backupCompiled, cachedCompilation,
+                                            compilePattern, compiledPath)
+
+COMPILER = f"""#!{sys.executable}
+import sys
+print('compiling', sys.argv[1])
+text = open(sys.argv[1]).read()
+if 'error' in text:
+    sys.exit('syntax error')
+if 'nothing' not in text:
+    with open(sys.argv[1] + 'at', 'w') as f:
+        f.write(text)
+"""
+
+
+@pytest.fixture()
+def compiler(tmp_path):
+    path = tmp_path / 'compiler'
+    path.write_text(COMPILER)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+@pytest.fixture()
+def source(tmp_path):
+    path = tmp_path / 'pattern.py'
+    path.write_text('patword 0x0000 0x0000000000000001\n')
+    return path
+
+
+def test_compile(compiler, source):
+    compiled, output = compilePattern(source, compiler)
+    assert compiled == compiledPath(source) == source.with_suffix('.pyat')
+    assert compiled.read_text() == source.read_text()
+    assert output == f'compiling {source}\n'
+
+
+def test_cached_until_source_or_compiler_change(compiler, source):
+    assert cachedCompilation(source, compiler) is None
+    compiled, _ = compilePattern(source, compiler)
+    assert cachedCompilation(source, compiler) == compiled
+
+    source.write_text('patword 0x0000 0x0000000000000002\n')
+    assert cachedCompilation(source, compiler) is None
+    compilePattern(source, compiler)
+    assert cachedCompilation(source, compiler) == compiled
+
+    stat = compiler.stat()
+    os.utime(compiler, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cachedCompilation(source, compiler) is None
+
+
+def test_compile_failure(compiler, source):
+    source.write_text('error\n')
+    with pytest.raises(CompileError, match='exited with 1') as e:
+        compilePattern(source, compiler)
+    assert 'syntax error' in e.value.output
+    assert cachedCompilation(source, compiler) is None
+
+
+def test_compiled_file_missing(compiler, source):
+    source.write_text('nothing\n')
+    with pytest.raises(CompileError, match='did not write'):
+        compilePattern(source, compiler)
+
+
+def test_compiler_missing(tmp_path, source):
+    with pytest.raises(CompileError, match='Could not run'):
+        compilePattern(source, tmp_path / 'missing')
+
+
+def test_backup(compiler, source):
+    compiled, _ = compilePattern(source, compiler)
+    backupCompiled(source)
+    assert not compiled.exists()
+    assert compiled.with_name('pattern.pyat_bkup').read_text() == source.read_text()
+    # nothing to back up
+    backupCompiled(source)
+
+
+def test_compile_in_background(app, compiler, source):
+    results = []
+    thread = PatternCompiler(str(source), str(compiler))
+    thread.compiled.connect(lambda compiled, output: results.append(compiled))
+    thread.compileFailed.connect(lambda message, output: results.append(message))
+    thread.start()
+    timer = QtCore.QElapsedTimer()
+    timer.start()
+    while not results and timer.elapsed() < 5000:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 10)
+    thread.wait()
+    assert results == [str(compiledPath(source))]
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from pyctbgui.utils.pattern import Pattern, PatternLoop, PatternWait
+from pyctbgui.utils.patternTimeline import PatternTimeline, acquisitionTime
+
+
+def makePattern(nWords=16, limits=None, loops=(), waits=()) -> Pattern:
+    """
+    pattern with word i = i and the loops and waits given as {level: (start, stop, repetitions)} items
+    """
+    pattern = Pattern(words=np.arange(nWords, dtype=np.uint64), limits=limits)
+    for level, (start, stop, repetitions) in loops:
+        pattern.loops[level] = PatternLoop(start, stop, repetitions)
+    for level, (address, time) in waits:
+        pattern.waits[level] = PatternWait(address, time)
+    return pattern
+
+
+def expand(pattern: Pattern) -> list[int]:
+    """
+    addresses of every clock, expanded recursively
+    """
+    loops = sorted((loop for loop in pattern.loops if loop.defined), key=lambda loop: (loop.start, -loop.stop))
+    holds = {}
+    for wait in pattern.waits:
+        if wait.defined:
+            holds[wait.address] = holds.get(wait.address, 1) + wait.time
+
+    def run(start, stop, loops):
+        addresses = []
+        address = start
+        while address <= stop:
+            loop = next((loop for loop in loops if loop.start == address), None)
+            if loop is None:
+                addresses += [address] * holds.get(address, 1)
+                address += 1
+                continue
+            inner = [other for other in loops if other is not loop and loop.start <= other.start <= loop.stop]
+            addresses += run(loop.start, loop.stop, inner) * loop.repetitions
+            loops = [other for other in loops if other is not loop and other not in inner]
+            address = loop.stop + 1
+        return addresses
+
+    start, stop = pattern.limits or (0, len(pattern) - 1)
+    return run(start, stop, loops)
+
+
+PATTERNS = [
+    makePattern(),
+    makePattern(limits=(2, 9)),
+    makePattern(loops=[(0, (3, 5, 4))], waits=[(0, (1, 3))]),
+    makePattern(loops=[(0, (3, 5, 0))]),
+    makePattern(loops=[(2, (2, 12, 3)), (0, (4, 6, 2)), (1, (8, 8, 5))], waits=[(1, (5, 2)), (2, (8, 1))]),
+    makePattern(loops=[(0, (4, 6, 2)), (1, (4, 6, 3))]),
+]
+
+
+@pytest.mark.parametrize('pattern', PATTERNS)
+def test_timeline_matches_expansion(pattern):
+    expanded = expand(pattern)
+    timeline = PatternTimeline(pattern)
+    assert timeline.clocks == len(expanded)
+    assert [timeline.addressAt(clock) for clock in range(len(expanded))] == expanded
+
+    boundaries, addresses = timeline.runs()
+    assert np.repeat(addresses, np.diff(boundaries)).tolist() == expanded
+
+
+@pytest.mark.parametrize(('begin', 'end'), [(0, 5), (3, 17), (16, 40), (39, 100)])
+def test_runs_window(begin, end):
+    pattern = PATTERNS[4]
+    expanded = expand(pattern)
+    boundaries, addresses = PatternTimeline(pattern).runs(begin, end)
+    assert boundaries[0] == begin
+    assert np.repeat(addresses, np.diff(boundaries)).tolist() == expanded[begin:end]
+
+
+def test_edges():
+    pattern = PATTERNS[2]
+    words = np.array(expand(pattern))
+    for bit in range(4):
+        values = words >> bit & 1
+        expected = np.flatnonzero(np.diff(values)) + 1
+        timeline = PatternTimeline(pattern)
+        assert timeline.edges(bit).tolist() == expected.tolist()
+        assert timeline.edges(bit, 5, 12).tolist() == expected[(expected >= 5) & (expected < 12)].tolist()
+
+
+def test_long_pattern_is_not_expanded():
+    pattern = makePattern(loops=[(level, (1, 14 - level, 1000)) for level in range(6)], waits=[(0, (7, 10**6))])
+    timeline = PatternTimeline(pattern)
+    assert timeline.clocks > 10**18
+    assert timeline.addressAt(timeline.clocks - 1) == 15
+    assert timeline.stateAt(0) == 0
+    boundaries, addresses = timeline.runs(10**15, 10**15 + 100)
+    assert boundaries[-1] - boundaries[0] == 100
+
+
+def test_state_at_outside_pattern():
+    with pytest.raises(IndexError):
+        PatternTimeline(makePattern()).stateAt(16)
+
+
+def test_overlapping_loops():
+    with pytest.raises(ValueError, match='overlap'):
+        PatternTimeline(makePattern(loops=[(0, (2, 6, 2)), (1, (4, 8, 2))]))
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError, match='limits'):
+        PatternTimeline(makePattern(limits=(0, 16)))
+
+
+def test_acquisition_time():
+    timeline = PatternTimeline(makePattern(loops=[(0, (0, 15, 1000))]))
+    assert timeline.duration(runClock=16) == pytest.approx(1e-3)
+    assert acquisitionTime(timeline.duration(16), period=2e-3, frames=10, triggers=2) == pytest.approx(40e-3)
+    assert acquisitionTime(timeline.duration(16), period=0, frames=10, triggers=1) == pytest.approx(10e-3)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from pyctbgui.utils.pattern import Pattern
+from pyctbgui.utils.patternViewer import SIGNAL_SPACING, PatternViewer, signalOffset, signalSteps, stepVertices
+
+
+def test_step_vertices_only_at_changes():
+    x, y = stepVertices(np.array([0, 0, 1, 1, 1, 0], dtype=np.uint8))
+    assert x.tolist() == [0, 2, 2, 5, 5, 6]
+    assert y.tolist() == [0, 0, 1, 1, 0, 0]
+
+
+def test_step_vertices_constant_signal():
+    x, y = stepVertices(np.ones(100, dtype=np.uint8), offset=3)
+    assert x.tolist() == [0, 100]
+    assert y.tolist() == [4, 4]
+
+
+def test_signal_steps_first_signal_on_top():
+    bits = np.array([[1, 0], [0, 0]], dtype=np.uint8)
+    (x0, y0), (x1, y1) = signalSteps(bits)
+    assert signalOffset(0, 2) == SIGNAL_SPACING
+    assert x0.tolist() == [0, 1, 1, 2]
+    assert y0.tolist() == [2.5, 2.5, 1.5, 1.5]
+    assert x1.tolist() == [0, 2]
+    assert y1.tolist() == [0, 0]
+
+
+def test_signal_steps_empty():
+    steps = signalSteps(np.zeros((0, 64), dtype=np.uint8))
+    assert len(steps) == 64
+    assert all(len(x) == len(y) == 0 for x, y in steps)
+
+
+def test_zoom_draws_every_signal(app):
+    nWords = 100000
+    pattern = Pattern(words=np.random.default_rng(0).integers(0, 16, nWords, dtype=np.uint64), ioctrl=0xF)
+    viewer = PatternViewer()
+    viewer.resize(800, 600)
+    viewer.show()
+    viewer.plotSignals(pattern, pattern.bits(), None, [f'BIT{i}' for i in range(64)], ['Blue', 'Orange'], 1)
+    viewer.setXRange(4000, 4100, padding=0)
+    app.processEvents()
+
+    assert len(viewer.curves) == 4
+    for row, curve in enumerate(viewer.curves):
+        # data drawn by the curve, clipped to the view
+        x, y = curve.curve.getData()
+        assert 0 < len(x) < len(curve.xData)
+        assert x.min() <= 4000
+        assert x.max() >= 4100
+        # only vertices of this signal, no NaN of other signals
+        offset = signalOffset(row, 4)
+        assert np.all((y == offset) | (y == offset + 1))
+    viewer.close()
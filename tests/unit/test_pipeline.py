@@ -0,0 +1,155 @@
+import json
+import multiprocessing
+import threading
+
+import numpy as np
+
+from pyctbgui.processing import AcquisitionConfig, FrameTracker
+from pyctbgui.processing.pipeline import ProcessingPipeline, SharedMemoryPipeline
+
+
+def frames(nFrames, fileIndex=0):
+    for i in range(nFrames):
+        data = np.full(40, i, dtype=np.uint16).tobytes() + bytes([i % 256] * 4)
+        yield {'frameIndex': i, 'fileIndex': fileIndex, 'progress': 100 * (i + 1) / nFrames}, data
+
+
+def test_pipeline_writes_in_order(tmp_path):
+    config = AcquisitionConfig(romode=2, aSamples=10, dSamples=16, adcMask=0xF, dbitList=[0, 1])
+    pipeline = ProcessingPipeline(config, nWorkers=2, outputDir=tmp_path, fileNamePrefix='run')
+    for jsonHeader, data in frames(30, fileIndex=3):
+        pipeline.submit(jsonHeader, data)
+    pipeline.close()
+
+    assert pipeline.savedFiles == [tmp_path / 'run_3.npz']
+    with np.load(tmp_path / 'run_3.npz') as npz:
+        assert npz['analog'].shape == (30, 10, 4)
+        assert np.array_equal(npz['analog'][:, 0, 0], np.arange(30))
+        assert npz['digital'].shape == (30, 2, 16)
+    assert pipeline.framesWritten == 30
+    assert pipeline.errors == 0
+
+
+def test_pipeline_pedestal(tmp_path):
+    config = AcquisitionConfig(romode=0, aSamples=10, adcMask=0xF)
+    pipeline = ProcessingPipeline(config, nWorkers=1, outputDir=tmp_path, pedestalFrames=10)
+    for jsonHeader, data in frames(20):
+        pipeline.submit(jsonHeader, data[:80])
+    pipeline.endOfAcquisition()
+    pipeline.join()
+    assert pipeline.framesWritten == 10
+    pipeline.close()
+    analog = np.load(tmp_path / 'run_0.npy')
+    # frames 10..19 minus the mean of frames 0..9
+    assert np.array_equal(analog[:, 0, 0], np.arange(10, 20) - 4.5)
+
+
+def test_pipeline_pedestal_file_applied_by_workers(tmp_path):
+    config = AcquisitionConfig(romode=0, aSamples=10, adcMask=0xF)
+    pedestal = np.arange(40, dtype=np.float64).reshape(10, 4)
+    np.save(tmp_path / 'pedestal.npy', pedestal)
+    for pipelineClass in (ProcessingPipeline, SharedMemoryPipeline):
+        outputDir = tmp_path / pipelineClass.__name__
+        outputDir.mkdir()
+        pipeline = pipelineClass(config, nWorkers=2, outputDir=outputDir, pedestalFile=tmp_path / 'pedestal.npy')
+        assert pipeline.workerPedestalFile == tmp_path / 'pedestal.npy'
+        for jsonHeader, data in frames(10):
+            pipeline.submit(jsonHeader, data[:80])
+        pipeline.close()
+        assert pipeline.errors == 0
+        analog = np.load(outputDir / 'run_0.npy')
+        assert analog.dtype == np.float64
+        assert np.array_equal(analog, np.arange(10)[:, None, None] - pedestal)
+
+
+def test_pipeline_parses_headers_and_drops_late_frames(tmp_path):
+    config = AcquisitionConfig(romode=0, aSamples=10, adcMask=0xF)
+    pipeline = ProcessingPipeline(config, nWorkers=1, outputDir=tmp_path, headerKeys=['acquisition'])
+    for fileIndex in (2, 3):
+        for jsonHeader, data in frames(5, fileIndex=fileIndex):
+            pipeline.submit(json.dumps(jsonHeader).encode(), data[:80], {'acquisition': 1}, fileIndex=3)
+    pipeline.close()
+
+    assert pipeline.lateMessages == 5
+    assert pipeline.framesWritten == 5
+    assert pipeline.savedFiles == [tmp_path / 'run_3.npz']
+    with np.load(tmp_path / 'run_3.npz') as npz:
+        assert np.array_equal(npz['acquisition'], [1] * 5)
+
+
+def test_shared_memory_pipeline_writes_in_order(tmp_path):
+    config = AcquisitionConfig(romode=2, aSamples=10, dSamples=16, adcMask=0xF, dbitList=[0, 1])
+    pipeline = SharedMemoryPipeline(config, nWorkers=2, nSlots=3, outputDir=tmp_path, fileNamePrefix='run')
+    for jsonHeader, data in frames(30, fileIndex=3):
+        pipeline.submit(jsonHeader, data)
+    # larger than the slots allocated for the first frame
+    pipeline.submit({'frameIndex': 30, 'fileIndex': 3}, bytes(100))
+    pipeline.close()
+
+    with np.load(tmp_path / 'run_3.npz') as npz:
+        assert npz['analog'].shape == (30, 10, 4)
+        assert np.array_equal(npz['analog'][:, 0, 0], np.arange(30))
+        assert np.array_equal(npz['digital'][:, 0, :8],
+                              np.unpackbits(np.arange(30, dtype=np.uint8)[:, None], axis=1, bitorder='little'))
+    assert pipeline.framesWritten == 30
+    assert pipeline.errors == 1
+
+
+def test_pipeline_frame_metadata(tmp_path):
+    config = AcquisitionConfig(romode=0, aSamples=10, adcMask=0xF)
+    pipeline = ProcessingPipeline(config, nWorkers=1, outputDir=tmp_path, expectedFrames=10)
+    for jsonHeader, data in frames(10):
+        if jsonHeader['frameIndex'] not in [3, 4, 9]:
+            pipeline.submit(jsonHeader, data[:80])
+    pipeline.close()
+    assert pipeline.savedFiles == [tmp_path / 'run_0.npy']
+    metadata = FrameTracker.load(tmp_path / 'run_0.npy')
+    assert metadata['receivedFrames'] == 7
+    assert metadata['gaps'] == [[3, 2], [9, 1]]
+    assert not metadata['complete']
+
+
+def test_pipeline_single_file(tmp_path):
+    config = AcquisitionConfig(romode=0, aSamples=10, adcMask=0xF)
+    pipeline = ProcessingPipeline(config,
+                                  nWorkers=1,
+                                  outputDir=tmp_path,
+                                  singleFile=True,
+                                  headerKeys=['acquisition'],
+                                  expectedFrames=5)
+    pipeline.metadata['scan'] = {'parameters': ['dac0'], 'points': [[100], [200]]}
+    for acquisition in range(2):
+        for jsonHeader, data in frames(5, fileIndex=7):
+            pipeline.submit(jsonHeader | {'acquisition': acquisition}, data[:80])
+        pipeline.endOfAcquisition()
+    pipeline.close()
+
+    assert pipeline.savedFiles == [tmp_path / 'run_7.npz']
+    with np.load(tmp_path / 'run_7.npz') as npz:
+        assert npz['analog'].shape == (10, 10, 4)
+        assert np.array_equal(npz['acquisition'], [0] * 5 + [1] * 5)
+    metadata = FrameTracker.load(tmp_path / 'run_7.npz')
+    assert [acquisition['complete'] for acquisition in metadata['acquisitions']] == [True, True]
+    assert metadata['scan']['points'] == [[100], [200]]
+
+
+def test_shared_memory_pipeline_worker_death(tmp_path):
+    config = AcquisitionConfig(romode=2, aSamples=10, dSamples=16, adcMask=0xF, dbitList=[0, 1])
+    pipeline = SharedMemoryPipeline(config, nWorkers=2, nSlots=3, outputDir=tmp_path)
+    pipeline.workerPollInterval = 0.05
+    allFrames = list(frames(10))
+    pipeline.submit(*allFrames[0])
+    pipeline.join()
+    assert pipeline.framesWritten == 1
+    # e.g. killed by the kernel when out of memory
+    for worker in multiprocessing.active_children():
+        worker.kill()
+    for jsonHeader, data in allFrames[1:]:
+        pipeline.submit(jsonHeader, data)
+
+    closing = threading.Thread(target=pipeline.close)
+    closing.start()
+    closing.join(10)
+    assert not closing.is_alive()
+    assert pipeline.framesWritten == 1
+    assert pipeline.errors == 9
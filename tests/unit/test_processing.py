@@ -0,0 +1,127 @@
+import re
+
+import numpy as np
+import pytest
+
+from pyctbgui.processing import AcquisitionConfig, FrameProcessor, Pedestal, digitalWaveform
+from pyctbgui.processing.__main__ import main
+from pyctbgui.utils.pixelmap import matterhorn_transceiver
+
+
+def unpackDigitalBits(data, dSamples, nDBits, offset=0):
+    """
+    reference implementation: bit by bit unpacking formerly done in SignalsTab
+    """
+    digital_array = np.frombuffer(data, offset=offset, dtype=np.uint8)
+    arr = []
+    bitOffset = 0
+    for _ in range(nDBits):
+        if bitOffset % 8 != 0:
+            bitOffset += (8 - (bitOffset % 8))
+        waveform = np.zeros(dSamples)
+        for iSample in range(dSamples):
+            waveform[iSample] = (digital_array[bitOffset // 8] >> (bitOffset % 8)) & 1
+            bitOffset += 1
+        arr.append(waveform)
+    return np.array(arr)
+
+
+@pytest.mark.parametrize('dSamples', [8, 13, 100])
+def test_digital_waveform(dSamples):
+    rng = np.random.default_rng(0)
+    nDBits = 5
+    aSamples = 10
+    nADC = 4
+    analog = rng.integers(0, 1 << 14, size=aSamples * nADC, dtype=np.uint16).tobytes()
+    digital = rng.integers(0, 256, size=nDBits * ((dSamples + 7) // 8), dtype=np.uint8).tobytes()
+    expected = unpackDigitalBits(digital, dSamples, nDBits)
+
+    waveform = digitalWaveform(digital, 0, dSamples, nDBits, 0, 1, 0)
+    assert waveform.dtype == expected.dtype
+    assert np.array_equal(waveform, expected)
+    # analog_digital: the digital bits follow the analog samples and the dbit offset
+    data = analog + bytes(3) + digital
+    assert np.array_equal(digitalWaveform(data, aSamples, dSamples, nDBits, 3, 2, nADC), expected)
+
+
+def test_pedestal():
+    pedestal = Pedestal()
+    frames = np.arange(3 * 4, dtype=np.uint16).reshape(3, 4)
+    for frame in frames:
+        assert pedestal.record(frame) is frame
+    assert pedestal.frameCount == 3
+    assert np.array_equal(pedestal.calculate(), frames.mean(axis=0))
+    assert np.array_equal(pedestal.apply(frames[2]), frames[2] - frames.mean(axis=0))
+
+    # a frame of another shape starts a new pedestal
+    pedestal.record(np.ones(5))
+    assert pedestal.frameCount == 1
+    assert pedestal.calculate().shape == (5, )
+
+
+def test_pedestal_save_load(tmp_path):
+    pedestal = Pedestal()
+    pedestal.record(np.full(4, 2))
+    pedestal.save(tmp_path / 'pedestal.npy')
+    loaded = Pedestal()
+    loaded.load(tmp_path / 'pedestal.npy')
+    assert loaded.loaded
+    assert np.array_equal(loaded.apply(np.full(4, 5)), np.full(4, 3))
+
+
+def test_frame_processor_waveforms():
+    config = AcquisitionConfig(romode=2, aSamples=10, dSamples=16, adcMask=0xF, dbitList=[1, 7])
+    data = np.arange(40, dtype=np.uint16).tobytes() + bytes([0xFF, 0x00, 0x01, 0x80])
+    processor = FrameProcessor(config)
+    assert processor.keys == ['analog', 'digital']
+    out = processor.process(data)
+    assert np.array_equal(out['analog'], np.arange(40).reshape(10, 4))
+    assert out['digital'].shape == (2, 16)
+    assert out['digital'][0].tolist() == [1] * 8 + [0] * 8
+    assert out['digital'][1].tolist() == [1] + [0] * 14 + [1]
+
+
+def test_frame_processor_pedestal():
+    config = AcquisitionConfig(romode=3, tSamples=2, transceiverMask=0x1)
+    processor = FrameProcessor(config, pedestalRecord=True)
+    processor.process(np.full(8, 10, dtype=np.uint16).tobytes())
+    processor.process(np.full(8, 20, dtype=np.uint16).tobytes())
+    processor.pedestalRecord = False
+    processor.pedestalApply = True
+    out = processor.process(np.full(8, 25, dtype=np.uint16).tobytes())
+    assert np.array_equal(out['transceiver'], np.full((8, 1), 10))
+
+
+def test_frame_processor_loaded_pedestal_shape(tmp_path):
+    config = AcquisitionConfig(romode=0, aSamples=5, adcMask=0xF)
+    processor = FrameProcessor(config, pedestalApply=True)
+    data = np.arange(20, dtype=np.uint16).tobytes()
+    # (4, ) would be broadcast to the (5, 4) frames
+    for shape in [(4, ), (4, 5)]:
+        np.save(tmp_path / 'pedestal.npy', np.zeros(shape))
+        processor.pedestal('analog').load(tmp_path / 'pedestal.npy')
+        with pytest.raises(ValueError, match=re.escape(f'analog pedestal of shape {shape} does not match')):
+            processor.process(data)
+    np.save(tmp_path / 'pedestal.npy', np.ones((5, 4)))
+    processor.pedestal('analog').load(tmp_path / 'pedestal.npy')
+    assert np.array_equal(processor.process(data)['analog'], np.arange(20).reshape(5, 4) - 1)
+
+
+def test_frame_processor_image():
+    config = AcquisitionConfig(romode=3, tSamples=288, transceiverMask=0x3)
+    raw = np.arange(48 * 48, dtype=np.uint16)
+    out = FrameProcessor(config, image=True).process(raw.tobytes())
+    assert list(out) == ['tx_image']
+    assert np.array_equal(out['tx_image'], raw[matterhorn_transceiver()])
+
+
+def test_cli(tmp_path):
+    frames = np.arange(6 * 20, dtype=np.uint16).reshape(6, 20)
+    np.save(tmp_path / 'raw.npy', frames)
+    args = '--romode analog --asamples 5 --adcmask 0xF --pedestal-frames 2'.split()
+    main([str(tmp_path / 'raw.npy'), *args, '-o', str(tmp_path / 'out')])
+    analog = np.load(tmp_path / 'out_analog.npy')
+    pedestal = np.load(tmp_path / 'out_analog_pedestal.npy')
+    assert analog.shape == (4, 5, 4)
+    assert np.array_equal(pedestal, frames[:2].mean(axis=0).reshape(5, 4))
+    assert np.array_equal(analog, frames[2:].reshape(4, 5, 4) - pedestal)
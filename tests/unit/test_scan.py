@@ -0,0 +1,52 @@
+import pytest
+
+from pyctbgui.utils.scan import Scan, ScanParameter, parseParameterName, parseValues
+
+
+def test_parse_values():
+    assert parseValues('0:300:100') == [0, 100, 200, 300]
+    assert parseValues('10:0:-5') == [10, 5, 0]
+    assert parseValues('1,0x10,3') == [1, 16, 3]
+    with pytest.raises(ValueError, match='step'):
+        parseValues('0:10:0')
+
+
+def test_parse_parameter_name():
+    assert parseParameterName('dac17') == ('dac', 17)
+    assert parseParameterName('patwaittime2') == ('patwaittime', 2)
+    assert parseParameterName('runclk') == ('runclk', None)
+    with pytest.raises(ValueError, match='out of range'):
+        parseParameterName('dac18')
+    with pytest.raises(ValueError, match='unknown'):
+        ScanParameter('vthreshold', [1])
+
+
+def test_scan_points_and_changes():
+    scan = Scan([ScanParameter('dac0', [100, 200]), ScanParameter('adcphase', [0, 90, 180])])
+    points = scan.points()
+    assert len(scan) == len(points) == 6
+    assert points[:4] == [
+        {
+            'dac0': 100,
+            'adcphase': 0
+        },
+        {
+            'dac0': 100,
+            'adcphase': 90
+        },
+        {
+            'dac0': 100,
+            'adcphase': 180
+        },
+        {
+            'dac0': 200,
+            'adcphase': 0
+        },
+    ]
+    # only the fastest parameter changes within a row
+    assert Scan.changes(points[1], points[0]) == {'adcphase': 90}
+    assert Scan.changes(points[3], points[2]) == {'dac0': 200, 'adcphase': 0}
+    assert Scan.changes(points[0], None) == points[0]
+    assert scan.metadata()['parameters'] == ['dac0', 'adcphase']
+    with pytest.raises(ValueError, match='repeated'):
+        Scan([ScanParameter('dac0', [1]), ScanParameter('dac0', [2])])
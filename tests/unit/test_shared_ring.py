@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from pyctbgui.processing.sharedRing import FrameLayout, SharedRing
+
+
+def test_ring_attach():
+    ring = SharedRing(4, 16)
+    other = SharedRing(4, 16, ring.name)
+    assert ring.write(2, b'abc') == 3
+    assert bytes(other.slot(2)[:3]) == b'abc'
+    with pytest.raises(ValueError, match='do not fit'):
+        ring.write(0, bytes(17))
+    other.close()
+    ring.close()
+
+
+def test_frame_layout():
+    frames = {'digital': np.ones((3, 5), dtype=np.uint8), 'analog': np.arange(6, dtype=np.uint16).reshape(2, 3)}
+    layout = FrameLayout(frames)
+    # analog is aligned to 2 bytes after the 15 bytes of digital
+    assert layout.size == 16 + 12
+    slot = np.zeros(layout.size, dtype=np.uint8)
+    layout.write(slot, frames)
+    out = layout.read(slot)
+    assert np.array_equal(out['analog'], frames['analog'])
+    assert np.array_equal(out['digital'], frames['digital'])
+    with pytest.raises(ValueError, match='does not match'):
+        layout.write(slot, {'digital': frames['digital'], 'analog': np.zeros(6, dtype=np.uint16)})
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+from PyQt5 import QtCore
+
+pytest.importorskip('slsdet')
+
+from pyctbgui.services.DACs import DacTab  # noqa: E402
+from pyctbgui.services.PowerSupplies import PowerSuppliesTab  # noqa: E402
+from pyctbgui.services.SlowADCs import SlowAdcTab  # noqa: E402
+from pyctbgui.utils.defines import Defines  # noqa: E402
+from pyctbgui.utils.detectorQueue import DetectorQueue  # noqa: E402
+from pyctbgui.utils.detectorState import DetectorState  # noqa: E402
+
+
+def processEventsUntil(app, condition, timeout=5):
+    timer = QtCore.QElapsedTimer()
+    timer.start()
+    while not condition() and timer.elapsed() < timeout * 1000:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 10)
+
+
+class ThreadRecordingDetector:
+    """
+    returns the name of the getter for the names and 1 for every other value, records the threads calling it
+    """
+
+    def __init__(self):
+        self.threads = set()
+        self.adcvpp = self.highvoltage = 1
+
+    def __getattr__(self, name):
+        if not name.startswith('get'):
+            raise AttributeError(name)
+
+        def call(*args):
+            self.threads.add(threading.get_ident())
+            return [name] * 32 if name.endswith('Names') else [1]
+
+        return call
+
+
+@pytest.mark.parametrize(('read', 'names'), [
+    (lambda det: DacTab.readDACs(det, [False] * Defines.dac.count), 'getDacNames'),
+    (PowerSuppliesTab.readPowerSupplies, 'getPowerNames'),
+    (SlowAdcTab.readSlowAdcs, 'getSlowADCNames'),
+])
+def test_tab_read_in_one_queued_call(app, read, names):
+    detector = ThreadRecordingDetector()
+    queue = DetectorQueue(DetectorState(detector))
+    results = []
+    queue.request('tab', read, results.append)
+    processEventsUntil(app, lambda: results)
+    queue.stopQueue()
+    values, = results
+    assert values['names'][0] == names
+    # the names are read with the values, the gui thread does not call the detector
+    assert threading.get_ident() not in detector.threads
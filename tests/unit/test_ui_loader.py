@@ -0,0 +1,40 @@
+from pyctbgui.utils.uiLoader import compileUi, compiledUi
+
+UI = """<?xml version="1.0" encoding="UTF-8"?>
+<ui version="4.0">
+ <class>Form</class>
+ <widget class="QWidget" name="Form">
+  <layout class="QVBoxLayout" name="verticalLayout">
+   <item>
+    <widget class="QLabel" name="labelName">
+     <property name="text">
+      <string>{text}</string>
+     </property>
+    </widget>
+   </item>
+  </layout>
+ </widget>
+ <resources/>
+ <connections/>
+</ui>
+"""
+
+
+def test_compiled_ui_is_used_while_unchanged(tmp_path):
+    uiFile = tmp_path / 'form.ui'
+    uiFile.write_text(UI.format(text='name'))
+    compiledDir = tmp_path / 'compiled'
+    assert compiledUi('form', tmp_path, compiledDir) is None
+    assert compileUi(uiFile, compiledDir) == compiledDir / 'form.py'
+    ui = compiledUi('form', tmp_path, compiledDir)
+    assert ui.__name__ == 'Ui_Form'
+    assert hasattr(ui, 'setupUi')
+
+
+def test_changed_ui_file_is_not_loaded_from_the_compiled_module(tmp_path):
+    uiFile = tmp_path / 'form.ui'
+    uiFile.write_text(UI.format(text='name'))
+    compiledDir = tmp_path / 'compiled'
+    compileUi(uiFile, compiledDir)
+    uiFile.write_text(UI.format(text='new name'))
+    assert compiledUi('form', tmp_path, compiledDir) is None
@@ -0,0 +1,53 @@
+from pyctbgui.utils.waveformCurves import WaveformCurves
+
+
+class Curve:
+
+    def __init__(self, pen, options):
+        self.pen = pen
+        self.options = options
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+    def show(self):
+        self.visible = True
+
+    def setPen(self, pen):
+        self.pen = pen
+
+
+class PlotWidget:
+
+    def __init__(self):
+        self.curves = []
+
+    def plot(self, data, pen, **options):
+        self.curves.append(Curve(pen, options))
+        return self.curves[-1]
+
+
+def test_curves_are_created_hidden_on_first_use():
+    plotWidget = PlotWidget()
+    curves = WaveformCurves(plotWidget, lambda i: f'pen{i}', stepMode='left')
+    assert plotWidget.curves == []
+    curve = curves[3]
+    assert curves[3] is curve
+    assert len(plotWidget.curves) == 1
+    assert not curve.visible
+    assert curve.pen == 'pen3'
+    assert curve.options == {'stepMode': 'left'}
+
+
+def test_hiding_does_not_create_curves():
+    plotWidget = PlotWidget()
+    curves = WaveformCurves(plotWidget, lambda i: 'pen')
+    curves[1].show()
+    curves.hide(0)
+    curves.setPen(0, 'red')
+    assert plotWidget.curves == [curves[1]]
+    curves.setPen(1, 'red')
+    curves.hideAll()
+    assert curves[1].pen == 'red'
+    assert not curves[1].visible
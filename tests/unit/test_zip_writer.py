@@ -0,0 +1,109 @@
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from pyctbgui.utils.numpyWriter import zip_writer
+from pyctbgui.utils.numpyWriter.zip_writer import ParallelDeflateZipWriter
+
+
+def randomBytes(size, seed=42):
+    return np.random.default_rng(seed).integers(0, 8, size, dtype=np.uint8).tobytes()
+
+
+def test_write_entries(tmp_path):
+    data = {'a.npy': randomBytes(3_000_000), 'b.npy': b'', 'ü.npy': b'unicode'}
+    with ParallelDeflateZipWriter(tmp_path / 'tmp.zip', compressionThreads=3) as zipw:
+        for name, content in data.items():
+            zipw.write(zipfile.ZipInfo(name), io.BytesIO(content))
+
+    with zipfile.ZipFile(tmp_path / 'tmp.zip') as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == list(data)
+        for name, content in data.items():
+            assert zipf.getinfo(name).compress_type == zipfile.ZIP_DEFLATED
+            assert zipf.read(name) == content
+
+
+def test_archive_valid_between_entries(tmp_path):
+    zipw = ParallelDeflateZipWriter(tmp_path / 'tmp.zip')
+    with zipfile.ZipFile(tmp_path / 'tmp.zip') as zipf:
+        assert zipf.namelist() == []
+    zipw.write(zipfile.ZipInfo('a'), io.BytesIO(b'first'))
+    with zipfile.ZipFile(tmp_path / 'tmp.zip') as zipf:
+        assert zipf.testzip() is None
+        assert zipf.read('a') == b'first'
+    zipw.close()
+
+
+def test_append(tmp_path):
+    with zipfile.ZipFile(tmp_path / 'tmp.zip', 'w') as zipf:
+        zipf.writestr('stored', b'stored data')
+        zipf.comment = b'kept'
+    with ParallelDeflateZipWriter(tmp_path / 'tmp.zip', 'a') as zipw:
+        zipw.write(zipfile.ZipInfo('deflated'), io.BytesIO(b'deflated data'))
+        with pytest.warns(UserWarning, match='Duplicate name'):
+            zipw.write(zipfile.ZipInfo('stored'), io.BytesIO(b'again'))
+
+    with zipfile.ZipFile(tmp_path / 'tmp.zip', 'a') as zipf:
+        assert zipf.testzip() is None
+        assert zipf.comment == b'kept'
+        assert [info.filename for info in zipf.infolist()] == ['stored', 'deflated', 'stored']
+        assert zipf.read('deflated') == b'deflated data'
+        # zipfile appends after the entries written by ParallelDeflateZipWriter
+        zipf.writestr('last', b'last data')
+    with zipfile.ZipFile(tmp_path / 'tmp.zip') as zipf:
+        assert zipf.testzip() is None
+        assert zipf.read('last') == b'last data'
+
+
+def test_append_creates_missing_file(tmp_path):
+    with ParallelDeflateZipWriter(tmp_path / 'tmp.zip', 'a') as zipw:
+        zipw.write(zipfile.ZipInfo('a'), io.BytesIO(b'data'))
+    with zipfile.ZipFile(tmp_path / 'tmp.zip') as zipf:
+        assert zipf.read('a') == b'data'
+
+
+def test_zip64_records(tmp_path, monkeypatch):
+    # lower the limit to write the zip64 extra fields and end records without writing gigabytes
+    monkeypatch.setattr(zip_writer, 'ZIP64_LIMIT', 100)
+    content = randomBytes(1000)
+    with ParallelDeflateZipWriter(tmp_path / 'tmp.zip') as zipw:
+        zipw.write(zipfile.ZipInfo('a'), io.BytesIO(content))
+        zipw.write(zipfile.ZipInfo('b'), io.BytesIO(content))
+    with ParallelDeflateZipWriter(tmp_path / 'tmp.zip', 'a') as zipw:
+        zipw.write(zipfile.ZipInfo('c'), io.BytesIO(content))
+
+    with zipfile.ZipFile(tmp_path / 'tmp.zip') as zipf:
+        assert zipf.testzip() is None
+        assert [zipf.read(name) for name in 'abc'] == [content] * 3
+
+
+def test_failed_entry_dropped(tmp_path):
+
+    class BrokenSource(io.BytesIO):
+
+        def read(self, size=-1):
+            if self.tell() > 0:
+                raise OSError('read failed')
+            return super().read(size)
+
+    with ParallelDeflateZipWriter(tmp_path / 'tmp.zip') as zipw:
+        zipw.write(zipfile.ZipInfo('a'), io.BytesIO(b'data'))
+        with pytest.raises(OSError, match='read failed'):
+            zipw.write(zipfile.ZipInfo('broken'), BrokenSource(randomBytes(3 * zipw.COPY_BUFFER_SIZE)))
+    with zipfile.ZipFile(tmp_path / 'tmp.zip') as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == ['a']
+
+
+def test_modes(tmp_path):
+    with pytest.raises(ValueError, match='requires mode'):
+        ParallelDeflateZipWriter(tmp_path / 'tmp.zip', 'r')
+    ParallelDeflateZipWriter(tmp_path / 'tmp.zip').close()
+    with pytest.raises(FileExistsError):
+        ParallelDeflateZipWriter(tmp_path / 'tmp.zip', 'x')
+    (tmp_path / 'not_zip').write_bytes(b'not a zip archive')
+    with pytest.raises(zipfile.BadZipFile):
+        ParallelDeflateZipWriter(tmp_path / 'not_zip', 'a')